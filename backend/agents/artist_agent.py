@@ -1,26 +1,28 @@
 """
 文件: agents/artist_agent.py
 职责: 美术设计师Agent - 负责游戏美术资源生成
-依赖: engine/agent.py, tools/image_gen_tool.py
+依赖: engine/agent.py, tools/image_gen_tool.py, config.py
 被依赖: workflows/game_dev_workflow.py
 
 关键能力:
   - 根据策划文档中的美术需求生成游戏素材
-  - 使用Gemini 2.5 Flash Image生成AI图片
+  - 使用Gemini 2.5 Flash Image生成AI图片（多个素材并发生成，数量受 ARTIST_MAX_CONCURRENT 限制，失败自动重试）
   - 为每个素材构建精确的英文绘图Prompt
   - 确保所有素材符合项目规范(尺寸、命名规则)
-  - 将素材存放到指定目录并更新素材清单
+  - 将素材存放到指定目录并更新素材清单（记录每个素材的来源: 本次生成或素材库复用）
 """
 
+import asyncio
 import sys
 import yaml
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable, Awaitable
 
 # 添加 backend 到 Python 路径
 backend_path = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_path))
 
+from config import Config
 from engine.agent import Agent
 from utils.logger import setup_logger
 
@@ -89,11 +91,14 @@ class ArtistAgent(Agent):
     async def generate_assets_from_spec(
         self,
         asset_list: List[Dict[str, Any]],
-        project_dir: str
+        project_dir: str,
+        on_asset: Optional[Callable[[Dict[str, Any], int, int], Awaitable[None]]] = None
     ) -> Dict[str, Any]:
         """
         根据素材清单批量生成游戏素材
         
+        最多同时生成 ARTIST_MAX_CONCURRENT 个素材，失败的素材按指数退避重试 ARTIST_ASSET_RETRIES 次。
+        
         Args:
             asset_list: 素材规格列表
                 [
@@ -105,61 +110,43 @@ class ArtistAgent(Agent):
                     ...
                 ]
             project_dir: 项目目录路径
+            on_asset: 每个素材完成（成功或最终失败）时的回调 on_asset(结果, 已完成数, 总数)，
+                用于逐个推送到前端
         
         Returns:
             {
                 "total": 总数,
                 "success": 成功数,
                 "failed": 失败数,
-                "assets": [每个素材的生成结果],
+                "assets": [每个素材的生成结果，顺序与素材清单相同],
                 "asset_list_path": 素材清单文件路径
             }
         """
-        results = []
-        success_count = 0
-        failed_count = 0
+        total = len(asset_list)
+        results: List[Optional[Dict[str, Any]]] = [None] * total
+        semaphore = asyncio.Semaphore(max(1, Config.ARTIST_MAX_CONCURRENT))
+        done = 0
         
         self.logger.info(
-            f"开始批量生成素材: {len(asset_list)}个"
+            f"开始批量生成素材: {total}个（同时生成{Config.ARTIST_MAX_CONCURRENT}个）"
         )
         
-        for spec in asset_list:
-            self.logger.info(
-                f"生成素材: {spec.get('name', 'unnamed')}"
-            )
-            
-            try:
-                result = await self.call_tool(
-                    "image_gen",
-                    "generate_game_asset",
-                    asset_spec=spec,
-                    project_dir=project_dir
-                )
-                
-                results.append(result)
-                
-                if result.get("success"):
-                    success_count += 1
-                    self.logger.info(
-                        f"✅ 素材生成成功: {spec.get('name')}"
-                    )
-                else:
-                    failed_count += 1
-                    self.logger.warning(
-                        f"⚠️ 素材生成失败: {spec.get('name')} "
-                        f"- {result.get('error')}"
-                    )
-                    
-            except Exception as e:
-                failed_count += 1
-                error_msg = f"素材生成异常: {str(e)}"
-                self.logger.error(error_msg)
-                results.append({
-                    "success": False,
-                    "asset_name": spec.get("name", "unnamed"),
-                    "path": None,
-                    "error": error_msg
-                })
+        async def generate(index: int, spec: Dict[str, Any]) -> None:
+            nonlocal done
+            async with semaphore:
+                result = await self._generate_asset(spec, project_dir)
+            results[index] = result
+            done += 1
+            if on_asset is not None:
+                try:
+                    await on_asset(result, done, total)
+                except Exception as e:
+                    self.logger.warning(f"素材完成回调失败: {e}")
+        
+        await asyncio.gather(*(generate(i, spec) for i, spec in enumerate(asset_list)))
+        
+        success_count = sum(1 for r in results if r.get("success"))
+        failed_count = total - success_count
         
         # 更新素材清单文件
         asset_list_path = await self._update_asset_list(
@@ -167,7 +154,7 @@ class ArtistAgent(Agent):
         )
         
         summary = {
-            "total": len(asset_list),
+            "total": total,
             "success": success_count,
             "failed": failed_count,
             "assets": results,
@@ -175,11 +162,59 @@ class ArtistAgent(Agent):
         }
         
         self.logger.info(
-            f"素材生成完成: {success_count}/{len(asset_list)}成功"
+            f"素材生成完成: {success_count}/{total}成功"
         )
         
         return summary
     
+    async def _generate_asset(
+        self,
+        spec: Dict[str, Any],
+        project_dir: str
+    ) -> Dict[str, Any]:
+        """生成单个素材，失败时按指数退避重试（不可重试的失败直接返回）"""
+        name = spec.get("name", "unnamed")
+        attempts = max(0, Config.ARTIST_ASSET_RETRIES) + 1
+        result: Dict[str, Any] = {}
+        
+        for attempt in range(1, attempts + 1):
+            self.logger.info(
+                f"生成素材: {name}" + (f"（第{attempt}次尝试）" if attempt > 1 else "")
+            )
+            
+            try:
+                result = await self.call_tool(
+                    "image_gen",
+                    "generate_game_asset",
+                    asset_spec=spec,
+                    project_dir=project_dir
+                )
+            except Exception as e:
+                result = {
+                    "success": False,
+                    "asset_name": name,
+                    "path": None,
+                    "error": f"素材生成异常: {str(e)}"
+                }
+            
+            result["attempts"] = attempt
+            if result.get("success"):
+                self.logger.info(f"✅ 素材生成成功: {name}")
+                return result
+            if not result.get("retryable", True) or attempt == attempts:
+                break
+            
+            delay = Config.ARTIST_RETRY_BASE_DELAY * (2 ** (attempt - 1))
+            self.logger.warning(
+                f"素材生成失败: {name} - {result.get('error')}，{delay:.1f}秒后重试"
+            )
+            await asyncio.sleep(delay)
+        
+        self.logger.warning(
+            f"⚠️ 素材生成失败: {name} - {result.get('error')}"
+        )
+        return result
+    
     async def create_prompt_for_asset(
         self,
         asset_spec: Dict[str, Any]
@@ -263,6 +298,9 @@ class ArtistAgent(Agent):
                 }
                 if r.get("error"):
                     asset_entry["error"] = r["error"]
+                if r.get("provenance"):
+                    # 来源: 本次生成，或复用素材库中其它项目生成的图片
+                    asset_entry["provenance"] = r["provenance"]
                 assets_data.append(asset_entry)
             
             # 写入YAML文件
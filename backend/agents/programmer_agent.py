@@ -9,20 +9,46 @@
   - 维护代码结构，确保模块化
   - 读取并遵守项目规范和接口注册表
   - 修复测试反馈的Bug
+  - 补丁式修复: BUG_FIX_MODE=patch 时只让LLM输出 SEARCH/REPLACE 编辑或 unified diff，
+    在本地应用并验证；补丁无法应用时只重写相关的顶层代码块，不再重新生成整个 game.js；
+    game.js 由模块打包而成时，修改写回所属的 output/js/ 模块并重新打包，同步更新接口注册表
+  - 多候选生成: CODE_CANDIDATES > 1 时并发生成多份game.js（不同温度和提示侧重），
+    并行验证后选出最优，有候选通过全部检查时立即停止其余生成
+  - 模块化生成: CODE_MODULES_ENABLED 时先按技术设计和接口注册表规划模块，
+    再并发生成各模块（output/js/），校验跨模块接口后只重新生成有问题的模块，
+    最后打包成 game.js 并更新 api_registry.yaml
 """
 
+import asyncio
 import sys
+import time
 from pathlib import Path
 
 # 添加 backend 到 Python 路径
 backend_path = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_path))
 
+from config import Config
 from engine.agent import Agent
+from tools.code_patcher import apply_edits, find_region, parse_edits, replace_region
+from tools.game_validator import GameValidator
+from tools.module_bundler import ModuleBundler, extract_top_level_names, strip_module_syntax
 from typing import Dict, Any, Optional, List, Tuple
 import json
 import re
 from datetime import datetime
+import yaml
+
+# 补丁无法拆回模块时写入的标记文件（相对 output/）: js/ 下的模块源文件与 game.js 不一致，不能再用来打包
+MODULES_STALE_MARKER = "js/STALE"
+
+# 多候选生成时各候选的提示侧重，依次循环使用
+CANDIDATE_VARIANTS = [
+    "",
+    "请优先保证代码结构清晰、函数职责单一。",
+    "请优先保证健壮性: 检查边界条件，避免运行时错误。",
+    "请保持实现简洁，只实现必要的功能，确保代码完整输出不被截断。",
+]
 
 
 class ProgrammerAgent(Agent):
@@ -97,6 +123,14 @@ function gameLoop() {{
             tools=["file", "code_search"]  # 启用文件和代码搜索工具
         )
         
+        # 多候选生成: 验证器（首次使用时创建）和最近一次的选择报告
+        self._validator: Optional[GameValidator] = None
+        self.last_candidate_report: Optional[Dict[str, Any]] = None
+        # 模块化生成: 最近一次的模块生成报告
+        self.last_module_report: Optional[Dict[str, Any]] = None
+        # 补丁式修复: 最近一次的修复报告
+        self.last_patch_report: Optional[Dict[str, Any]] = None
+        
         self.logger.info(f"Programmer Agent 初始化完成 (项目: {project_name})")
     
     async def process_message(self, message: Dict) -> Optional[str]:
@@ -107,6 +141,11 @@ function gameLoop() {{
         """
         self.logger.info(f"[DEBUG] 收到消息: type={message.get('type')}, content前50字={message.get('content', '')[:50]}")
         
+        # Bug修复任务: 补丁模式下只输出修改部分，在本地应用和验证
+        if Config.BUG_FIX_MODE == "patch" and self._is_bug_fix_task(message):
+            self.logger.info("✓ 检测到Bug修复任务，使用补丁模式修复")
+            return await self._fix_bugs_with_patch(message)
+        
         # 检测是否是编写代码的任务 - 先检测，优先生成代码
         if message.get('type') in ['request_review', 'question']:
             content = message.get('content', '')
@@ -128,8 +167,9 @@ function gameLoop() {{
                     
                     if files_created:
                         file_list = "\n".join([f"  - {f}" for f in files_created])
+                        selection = self._format_candidate_report() + self._format_module_report()
                         # 直接返回成功消息，不调用LLM
-                        return f"✅ 代码已写入以下文件:\n{file_list}\n\n游戏文件生成完成，可以进行测试了。"
+                        return f"✅ 代码已写入以下文件:\n{file_list}\n{selection}\n游戏文件生成完成，可以进行测试了。"
                     else:
                         self.logger.warning("⚠️ 代码文件生成失败(返回空列表)")
                 
@@ -182,7 +222,14 @@ function gameLoop() {{
         # 3. 生成JavaScript文件
         js_path = f"{output_dir}/game.js"
         self.logger.info(f"[DEBUG] 准备生成JS文件: {js_path}")
-        js_content = await self._generate_javascript(game_info)
+        js_content = None
+        if Config.CODE_MODULES_ENABLED:
+            # 模块化生成，规划失败时退回单文件生成
+            js_content = await self._generate_javascript_modules(game_info, output_dir)
+            if js_content is not None:
+                created_files.extend(self.last_module_report["files"])
+        if js_content is None:
+            js_content = await self._generate_javascript(game_info)
         
         try:
             self.logger.info(f"[DEBUG] 调用file工具写入JS...")
@@ -327,10 +374,33 @@ function gameLoop() {{
         """
         生成JavaScript文件内容
         
-        使用LLM根据游戏类型生成完整的游戏逻辑
+        使用LLM根据游戏类型生成完整的游戏逻辑；CODE_CANDIDATES > 1 时走多候选生成
         """
-        # 构建生成代码的提示词
-        prompt = f"""请生成一个完整的{game_info['title']}的JavaScript代码。
+        prompt = self._build_javascript_prompt(game_info)
+        
+        if Config.CODE_CANDIDATES > 1:
+            return await self._generate_javascript_candidates(game_info, prompt, Config.CODE_CANDIDATES)
+        
+        try:
+            # 调用LLM生成代码
+            code = await self.think_and_respond(prompt)
+            
+            # 检查是否是错误消息（think_and_respond在异常时返回错误消息而不是抛出异常）
+            if self._is_error_reply(code):
+                self.logger.warning(f"LLM返回了错误消息: {code[:100]}")
+                return self._get_fallback_javascript(game_info)
+            
+            return self._clean_code(code)
+            
+        except Exception as e:
+            self.logger.error(f"LLM生成代码失败: {e}")
+            # 返回基础模板
+            return self._get_fallback_javascript(game_info)
+    
+    @staticmethod
+    def _build_javascript_prompt(game_info: Dict[str, Any]) -> str:
+        """构建生成game.js的提示词"""
+        return f"""请生成一个完整的{game_info['title']}的JavaScript代码。
 
 要求:
 1. 包含完整的游戏逻辑（初始化、游戏循环、更新、渲染）
@@ -342,27 +412,644 @@ function gameLoop() {{
 
 请直接输出完整的JavaScript代码，不要包含解释文字。
 """
+    
+    @staticmethod
+    def _is_error_reply(code: str) -> bool:
+        """LLM回复是否是错误消息而不是代码"""
+        return code.startswith("抱歉") or "技术问题" in code or "出错" in code
+    
+    @staticmethod
+    def _clean_code(code: str) -> str:
+        """清理代码（移除可能的markdown标记）"""
+        code = re.sub(r'^```javascript\s*', '', code)
+        code = re.sub(r'^```\s*', '', code)
+        code = re.sub(r'\s*```$', '', code)
+        return code
+    
+    async def _generate_javascript_candidates(
+        self,
+        game_info: Dict[str, Any],
+        prompt: str,
+        count: int
+    ) -> str:
+        """
+        并发生成多份game.js并选出最优
+        
+        每个候选使用不同的温度和提示侧重，生成后立即验证（语法、括号配对、必要组件）；
+        有候选通过全部检查时取消其余生成，否则选得分最高的候选。
+        候选生成不写入对话上下文，最终只把选中的代码记入上下文。
         
+        Args:
+            game_info: 游戏信息
+            prompt: 基础提示词
+            count: 候选数
+        
+        Returns:
+            选中的JavaScript代码（全部失败时为后备模板）
+        """
+        temperatures = [float(t) for t in Config.CODE_CANDIDATE_TEMPERATURES.split(",") if t.strip()] or [None]
+        messages = list(self.context_manager.get_messages())
+        start = time.monotonic()
+        self.status = "working"
+        self.logger.info(f"🏁 并发生成 {count} 份game.js候选")
+        
+        tasks = [
+            asyncio.create_task(self._generate_candidate(
+                index,
+                messages,
+                f"{prompt}\n{CANDIDATE_VARIANTS[index % len(CANDIDATE_VARIANTS)]}".strip(),
+                temperatures[index % len(temperatures)]
+            ))
+            for index in range(count)
+        ]
+        
+        candidates: List[Dict[str, Any]] = []
+        best: Optional[Dict[str, Any]] = None
         try:
-            # 调用LLM生成代码
-            code = await self.think_and_respond(prompt)
-            
-            # 检查是否是错误消息（think_and_respond在异常时返回错误消息而不是抛出异常）
-            if code.startswith("抱歉") or "技术问题" in code or "出错" in code:
-                self.logger.warning(f"LLM返回了错误消息: {code[:100]}")
-                return self._get_fallback_javascript(game_info)
-            
-            # 清理代码（移除可能的markdown标记）
-            code = re.sub(r'^```javascript\s*', '', code)
-            code = re.sub(r'^```\s*', '', code)
-            code = re.sub(r'\s*```$', '', code)
+            for finished in asyncio.as_completed(tasks):
+                candidate = await finished
+                candidates.append(candidate)
+                if candidate["code"] is None:
+                    continue
+                if best is None or candidate["validation"]["score"] > best["validation"]["score"]:
+                    best = candidate
+                if candidate["validation"]["passed_all"]:
+                    self.logger.info(f"✅ 候选#{candidate['index']} 通过全部检查，停止其余生成")
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.status = "idle"
+        
+        self.last_candidate_report = {
+            "requested": count,
+            "finished": len(candidates),
+            "cancelled": count - len(candidates),
+            "selected": best["index"] if best else None,
+            "early_stop": bool(best and best["validation"]["passed_all"] and len(candidates) < count),
+            "duration": round(time.monotonic() - start, 2),
+            "candidates": [
+                {
+                    "index": c["index"],
+                    "temperature": c["temperature"],
+                    "duration": c["duration"],
+                    "score": c["validation"]["score"] if c["validation"] else None,
+                    "passed_all": bool(c["validation"] and c["validation"]["passed_all"]),
+                    "error": c["error"]
+                }
+                for c in sorted(candidates, key=lambda c: c["index"])
+            ]
+        }
+        
+        if best is None:
+            self.logger.warning("所有候选都生成失败，使用后备模板")
+            return self._get_fallback_javascript(game_info)
+        
+        self.logger.info(
+            f"选中候选#{best['index']} (温度 {best['temperature']}, 得分 {best['validation']['score']})，"
+            f"完成 {len(candidates)}/{count}，耗时 {self.last_candidate_report['duration']}s"
+        )
+        # 与单次生成一致: 把提示和选中的代码记入对话上下文
+        self.context_manager.add_message("user", prompt)
+        self.context_manager.add_message("model", best["code"])
+        return best["code"]
+    
+    async def _generate_candidate(
+        self,
+        index: int,
+        messages: List[Dict[str, str]],
+        prompt: str,
+        temperature: Optional[float]
+    ) -> Dict[str, Any]:
+        """生成并验证一份候选代码，失败时code为None"""
+        start = time.monotonic()
+        candidate = {"index": index, "temperature": temperature, "code": None, "validation": None, "error": None}
+        try:
+            code = await self.llm_client.generate_response(
+                messages=messages + [{"role": "user", "content": prompt}],
+                system_prompt=self.system_prompt,
+                temperature=temperature
+            )
+            if self._is_error_reply(code):
+                candidate["error"] = code[:100]
+            else:
+                code = self._clean_code(code)
+                if self._validator is None:
+                    self._validator = GameValidator()
+                candidate["validation"] = await self._validator.validate_code(code)
+                candidate["code"] = code
+        except Exception as e:
+            candidate["error"] = str(e)
+            self.logger.warning(f"候选#{index} 生成失败: {e}")
+        candidate["duration"] = round(time.monotonic() - start, 2)
+        return candidate
+    
+    # ==================== 模块化生成 ====================
+    
+    async def _generate_javascript_modules(self, game_info: Dict[str, Any], output_dir: str) -> Optional[str]:
+        """
+        按模块并发生成游戏代码并打包成 game.js
+        
+        1. 根据上下文中的技术设计和接口注册表规划模块及其接口
+        2. 并发生成所有模块
+        3. 校验跨模块接口（约定接口是否声明、顶层名称是否冲突、是否被截断），
+           只重新生成有问题的模块，最多 CODE_MODULE_MAX_RETRIES 轮
+        4. 写入 output/js/ 下的模块文件，更新 api_registry.yaml，返回打包后的 game.js
+        
+        Args:
+            game_info: 游戏信息
+            output_dir: 输出目录（相对工作空间）
+        
+        Returns:
+            打包后的 game.js 内容，规划失败时返回None（调用方退回单文件生成）
+        """
+        start = time.monotonic()
+        bundler = ModuleBundler(max_modules=Config.CODE_MAX_MODULES)
+        registry_path = f"projects/{self.project_name}/shared_knowledge/api_registry.yaml"
+        registry = await self._read_api_registry(registry_path)
+        messages = list(self.context_manager.get_messages())
+        self.status = "working"
+        
+        try:
+            # 1. 规划模块
+            plan_reply = await self.llm_client.generate_response(
+                messages=messages + [{"role": "user", "content": self._build_module_plan_prompt(game_info, registry)}],
+                system_prompt=self.system_prompt
+            )
+            plan = bundler.parse_plan(plan_reply, registry)
+        except Exception as e:
+            self.status = "idle"
+            self.logger.warning(f"模块规划失败，改为单文件生成: {e}")
+            return None
+        
+        self.logger.info(f"🧩 模块规划: {' → '.join(m['name'] for m in plan)}")
+        
+        # 2~3. 并发生成，只重新生成校验失败的模块
+        codes: Dict[str, str] = {}
+        attempts: Dict[str, int] = {m["name"]: 0 for m in plan}
+        problems: Dict[str, List[str]] = {}
+        pending = list(plan)
+        rounds = 0
+        try:
+            while pending and rounds <= Config.CODE_MODULE_MAX_RETRIES:
+                rounds += 1
+                results = await asyncio.gather(*(
+                    self._generate_module(module, plan, game_info, messages, problems.get(module["name"]))
+                    for module in pending
+                ))
+                for module, code in zip(pending, results):
+                    codes[module["name"]] = code
+                    attempts[module["name"]] += 1
+                problems = bundler.verify(plan, codes, registry)
+                pending = [m for m in plan if m["name"] in problems]
+                if pending:
+                    self.logger.warning(
+                        f"第{rounds}轮模块校验未通过: "
+                        + "; ".join(f"{name}: {', '.join(issues)}" for name, issues in problems.items())
+                    )
+        finally:
+            self.status = "idle"
+        
+        if not any(code.strip() for code in codes.values()):
+            self.logger.warning("所有模块都生成失败，改为单文件生成")
+            return None
+        
+        # 4. 写入模块文件和注册表
+        files = []
+        for module in plan:
+            path = f"{output_dir}/{module['file']}"
+            try:
+                if await self.call_tool("file", "write", path, codes.get(module["name"], "")):
+                    files.append(path)
+            except Exception as e:
+                self.logger.error(f"写入模块文件失败 {path}: {e}")
+        await self._write_api_registry(registry_path, registry, bundler.build_registry(plan, codes))
+        await self._clear_modules_stale(output_dir)
+        
+        bundle = bundler.bundle(plan, codes)
+        self.last_module_report = {
+            "modules": [m["name"] for m in plan],
+            "rounds": rounds,
+            "regenerated": {name: count - 1 for name, count in attempts.items() if count > 1},
+            "unresolved": problems,
+            "files": files,
+            "duration": round(time.monotonic() - start, 2)
+        }
+        self.logger.info(
+            f"✅ {len(plan)} 个模块已生成并打包 ({rounds} 轮，耗时 {self.last_module_report['duration']}s)"
+            + (f"，仍有问题: {list(problems)}" if problems else "")
+        )
+        
+        # 对话上下文只记录模块划分和接口，不记录全部代码
+        self.context_manager.add_message("user", self._build_javascript_prompt(game_info))
+        self.context_manager.add_message("model", "已按模块生成game.js:\n" + "\n".join(
+            f"- {m['file']}: {m['description']}（接口: {', '.join(m['exports']) or '无'}）" for m in plan
+        ))
+        return bundle
+    
+    @staticmethod
+    def _build_module_plan_prompt(game_info: Dict[str, Any], registry: Dict[str, Any]) -> str:
+        """构建模块规划的提示词"""
+        registered = ModuleBundler.registered_exports(registry)
+        registry_text = "\n".join(f"- {file}: {', '.join(names)}" for file, names in registered.items()) or "（暂无登记）"
+        return f"""请根据技术设计文档，把{game_info['title']}的JavaScript代码划分为{Config.CODE_MAX_MODULES}个以内的模块。
+
+接口注册表中已登记的模块接口（必须保留）:
+{registry_text}
+
+要求:
+1. 每个模块职责单一（如 config、input、entities、renderer、main）
+2. exports 列出该模块对其它模块公开的函数/类/常量名
+3. depends_on 列出它用到的其它模块
+4. 最后一个模块命名为 main，负责初始化Canvas(canvas/ctx)和游戏循环(gameLoop、update、render)
+
+只输出JSON，格式:
+{{"modules": [{{"name": "config", "description": "游戏配置", "exports": ["CONFIG"], "depends_on": []}}]}}
+"""
+    
+    async def _generate_module(
+        self,
+        module: Dict[str, Any],
+        plan: List[Dict[str, Any]],
+        game_info: Dict[str, Any],
+        messages: List[Dict[str, str]],
+        problems: Optional[List[str]] = None
+    ) -> str:
+        """生成一个模块的代码，失败时返回空字符串（由校验触发重新生成）"""
+        contract = "\n".join(
+            f"- {m['name']} ({m['file']}): {m['description']}；公开接口: {', '.join(m['exports']) or '无'}"
+            for m in plan
+        )
+        feedback = ""
+        if problems:
+            feedback = "\n上一次生成的代码有以下问题，请修正:\n" + "\n".join(f"- {p}" for p in problems) + "\n"
+        prompt = f"""请编写{game_info['title']}的 {module['file']} 模块。
+
+模块职责: {module['description']}
+必须在顶层声明的接口: {', '.join(module['exports']) or '无'}
+可以使用的模块: {', '.join(module['depends_on']) or '无'}
+
+全部模块及其接口（其它模块的接口已由对应模块实现，不要重复定义）:
+{contract}
+{feedback}
+要求:
+1. 普通脚本，不要使用 import/export，所有模块会按依赖顺序打包到同一个全局作用域
+2. 只实现本模块的职责，顶层只声明本模块的接口和私有辅助函数
+3. Canvas尺寸: {game_info['canvas_width']}x{game_info['canvas_height']}
+4. 代码要有注释
+
+请直接输出完整的JavaScript代码，不要包含解释文字。
+"""
+        try:
+            code = await self.llm_client.generate_response(
+                messages=messages + [{"role": "user", "content": prompt}],
+                system_prompt=self.system_prompt
+            )
+            if self._is_error_reply(code):
+                self.logger.warning(f"模块 {module['name']} 生成失败: {code[:100]}")
+                return ""
+            return self._clean_code(code)
+        except Exception as e:
+            self.logger.warning(f"模块 {module['name']} 生成失败: {e}")
+            return ""
+    
+    async def _read_api_registry(self, registry_path: str) -> Dict[str, Any]:
+        """读取接口注册表，不存在或无法解析时返回空字典"""
+        try:
+            content = await self.call_tool("file", "read", registry_path)
+            data = yaml.safe_load(content) if content else None
+            return data if isinstance(data, dict) else {}
+        except Exception as e:
+            self.logger.debug(f"读取接口注册表失败: {e}")
+            return {}
+    
+    async def _write_api_registry(
+        self,
+        registry_path: str,
+        registry: Dict[str, Any],
+        modules: Dict[str, Any]
+    ) -> None:
+        """把生成的模块接口写回接口注册表（保留其它已登记的模块）"""
+        data = dict(registry)
+        data["最后更新时间"] = datetime.now().isoformat()
+        data["更新人"] = "程序员Agent"
+        merged = dict(data.get("modules") or {})
+        merged.update(modules)
+        data["modules"] = merged
+        data["模块列表"] = list(merged)
+        header = (
+            "# API接口注册表\n"
+            "# ==========================================\n"
+            f"# 项目名称: {self.project_name}\n"
+            "# 说明: 程序员写代码前【必须】查阅此表\n"
+            "#       写完代码后【必须】更新此表\n"
+            "# ==========================================\n\n"
+        )
+        try:
+            await self.call_tool(
+                "file", "write", registry_path,
+                header + yaml.safe_dump(data, allow_unicode=True, sort_keys=False)
+            )
+        except Exception as e:
+            self.logger.error(f"更新接口注册表失败: {e}")
+    
+    def _format_module_report(self) -> str:
+        """模块化生成的结果（用于回复消息），未使用模块化生成时为空"""
+        report = self.last_module_report
+        if not report:
+            return ""
+        text = f"\n🧩 按 {len(report['modules'])} 个模块并发生成（{report['rounds']} 轮）: {', '.join(report['modules'])}\n"
+        if report["regenerated"]:
+            text += f"  重新生成: {', '.join(f'{n}×{c}' for n, c in report['regenerated'].items())}\n"
+        if report["unresolved"]:
+            text += f"  ⚠️ 仍有问题的模块: {', '.join(report['unresolved'])}\n"
+        return text
+    
+    def _format_candidate_report(self) -> str:
+        """多候选生成的选择结果（用于回复消息），未使用多候选时为空"""
+        report = self.last_candidate_report
+        if not report or report["selected"] is None:
+            return ""
+        selected = next(c for c in report["candidates"] if c["index"] == report["selected"])
+        return (
+            f"\n🏁 从 {report['finished']}/{report['requested']} 份候选中选用#{selected['index']}"
+            f"（温度 {selected['temperature']}，得分 {selected['score']}"
+            f"{'，通过全部检查' if selected['passed_all'] else ''}）\n"
+        )
+    
+    # ==================== 补丁式Bug修复 ====================
+    
+    @staticmethod
+    def _is_bug_fix_task(message: Dict) -> bool:
+        """是否是工作流下发的Bug修复任务（用户的普通提问仍走对话回复）"""
+        return message.get("type") in ("request_review", "question") and message.get("context") == "Bug修复"
+    
+    async def _fix_bugs_with_patch(self, message: Dict) -> str:
+        """
+        以补丁方式修复 game.js 中的Bug
+        
+        1. 把Bug列表和当前代码发给LLM，要求只输出 SEARCH/REPLACE 编辑（或 unified diff）
+        2. 在本地应用编辑；应用失败的编辑，找到相关的顶层代码块只重写该块，
+           最多 BUG_FIX_MAX_REGION_REWRITES 块
+        3. 验证修改后的代码，原本有效的代码被改坏时不写入
+        4. game.js 由模块打包而成时，把修改写回所属的模块文件并重新打包（见 _sync_patched_modules）
+        
+        对话上下文只记录任务和补丁，不记录整个文件。
+        
+        Args:
+            message: 修复任务消息
+        
+        Returns:
+            回复内容
+        """
+        start = time.monotonic()
+        js_path = f"projects/{self.project_name}/output/game.js"
+        tracker_path = f"projects/{self.project_name}/shared_knowledge/bug_tracker.yaml"
+        self.last_patch_report = None
+        
+        try:
+            code = await self.call_tool("file", "read", js_path)
+        except Exception as e:
+            self.logger.warning(f"读取 game.js 失败，无法以补丁方式修复: {e}")
+            return f"⚠️ 无法读取 {js_path}，Bug未修复: {e}"
+        try:
+            bugs = await self.call_tool("file", "read", tracker_path)
+        except Exception:
+            bugs = ""
+        
+        if self._validator is None:
+            self._validator = GameValidator()
+        before = await self._validator.validate_code(code)
+        messages = list(self.context_manager.get_messages())
+        task = message.get("content", "请修复Bug")
+        report = {
+            "mode": "patch",
+            "edits": 0,
+            "applied": 0,
+            "failed": 0,
+            "region_rewrites": 0,
+            "output_chars": 0,
+            "file_chars": len(code),
+            "written": False,
+            "errors": []
+        }
+        self.status = "working"
+        
+        try:
+            reply = await self.llm_client.generate_response(
+                messages=messages + [{"role": "user", "content": self._build_patch_prompt(task, bugs, code)}],
+                system_prompt=self.system_prompt
+            )
+            report["output_chars"] += len(reply)
+            edits = parse_edits(reply)
+            report["edits"] = len(edits)
             
+            if edits:
+                new_code, applied, failed = apply_edits(code, edits)
+                report["applied"] = len(applied)
+                report["failed"] = len(failed)
+                for edit in failed[:Config.BUG_FIX_MAX_REGION_REWRITES]:
+                    new_code = await self._rewrite_region(new_code, edit, task, bugs, report)
+            elif not self._is_error_reply(reply) and len(self._clean_code(reply)) > len(code) // 2:
+                # 没有按格式输出补丁，而是给出了整个文件
+                self.logger.warning("LLM没有输出补丁，按整个文件处理")
+                report["mode"] = "rewrite"
+                new_code = self._clean_code(reply)
+            else:
+                new_code = code
+                report["errors"].append("回复中没有可应用的补丁")
+        except Exception as e:
+            self.logger.error(f"补丁式修复失败: {e}", exc_info=True)
+            self.status = "idle"
+            return f"⚠️ Bug修复过程中遇到错误: {str(e)}"
+        
+        if new_code != code:
+            after = await self._validator.validate_code(new_code)
+            if before["valid"] and not after["valid"]:
+                report["errors"].append("修改后代码无效，未写入: " + "; ".join(after["errors"]))
+            else:
+                try:
+                    new_code = await self._sync_patched_modules(code, new_code, report)
+                    report["written"] = bool(await self.call_tool("file", "write", js_path, new_code))
+                except Exception as e:
+                    report["errors"].append(f"写入失败: {e}")
+        self.status = "idle"
+        
+        report["duration"] = round(time.monotonic() - start, 2)
+        self.last_patch_report = report
+        self.logger.info(
+            f"🩹 补丁修复: {report['applied']}/{report['edits']} 处编辑已应用，"
+            f"重写 {report['region_rewrites']} 个代码块，输出 {report['output_chars']} 字符"
+            f"（文件 {report['file_chars']} 字符），耗时 {report['duration']}s"
+        )
+        
+        self.context_manager.add_message("user", task)
+        self.context_manager.add_message("model", reply if report["mode"] == "patch" else "已重写 game.js")
+        return self._format_patch_report(js_path)
+    
+    async def _sync_patched_modules(self, old_bundle: str, new_bundle: str, report: Dict[str, Any]) -> str:
+        """
+        game.js 由模块打包而成时，把补丁写回所属的模块文件并重新打包
+        
+        按模块分隔行把修改前后的 game.js 拆回各模块，只写入内容改变的模块，
+        并更新接口注册表中这些模块的接口。补丁改动了分隔行（或整个文件被重写）
+        无法拆回模块时，写入过期标记，之后不能再用 output/js/ 下的模块打包；
+        已有过期标记时不再拆分（剩下的分隔行已不可信），直到重新生成模块。
+        
+        Args:
+            old_bundle: 修改前的 game.js
+            new_bundle: 修改后的 game.js
+            report: 补丁修复报告（记录 modules_updated / modules_stale）
+        
+        Returns:
+            要写入的 game.js（由更新后的模块重新打包；不是模块打包生成的文件时原样返回）
+        """
+        old = ModuleBundler.unbundle(old_bundle)
+        if old is None:
+            return new_bundle
+        
+        output_dir = f"projects/{self.project_name}/output"
+        if (Config.ROOT_DIR / output_dir / MODULES_STALE_MARKER).exists():
+            report["modules_stale"] = True
+            return new_bundle
+        new = ModuleBundler.unbundle(new_bundle)
+        if new is None or [m["name"] for m in new[0]] != [m["name"] for m in old[0]]:
+            report["modules_stale"] = True
+            report["errors"].append("修改涉及模块分隔行，无法写回 output/js/ 下的模块，模块源文件已标记为过期")
+            await self.call_tool(
+                "file", "write", f"{output_dir}/{MODULES_STALE_MARKER}",
+                f"game.js 在 {datetime.now().isoformat()} 由补丁修复直接修改，本目录下的模块源文件已过期，不能再用来打包。\n"
+            )
+            return new_bundle
+        
+        plan, codes = new
+        old_codes = old[1]
+        changed = [m for m in plan if codes[m["name"]] != old_codes[m["name"]]]
+        for module in changed:
+            await self.call_tool("file", "write", f"{output_dir}/{module['file']}", codes[module["name"]] + "\n")
+        report["modules_updated"] = [m["file"] for m in changed]
+        
+        if changed:
+            registry_path = f"projects/{self.project_name}/shared_knowledge/api_registry.yaml"
+            registry = await self._read_api_registry(registry_path)
+            registered = registry.get("modules") if isinstance(registry.get("modules"), dict) else {}
+            updated = {
+                m["file"]: dict(registered.get(m["file"]) or {}, exports=[
+                    {"name": name}
+                    for name in sorted(extract_top_level_names(strip_module_syntax(codes[m["name"]])))
+                ])
+                for m in changed
+            }
+            await self._write_api_registry(registry_path, registry, updated)
+        return ModuleBundler.bundle(plan, codes)
+    
+    async def _clear_modules_stale(self, output_dir: str) -> None:
+        """模块重新生成后删除过期标记"""
+        marker = f"{output_dir}/{MODULES_STALE_MARKER}"
+        if not (Config.ROOT_DIR / marker).exists():
+            return
+        try:
+            await self.call_tool("file", "delete", marker)
+        except Exception as e:
+            self.logger.warning(f"删除模块过期标记失败: {e}")
+    
+    @staticmethod
+    def _build_patch_prompt(task: str, bugs: str, code: str) -> str:
+        """构建补丁式修复的提示词"""
+        return f"""{task}
+
+Bug列表 (bug_tracker.yaml):
+{bugs.strip() or "（无记录，请根据任务描述修复）"}
+
+当前的 game.js:
+```javascript
+{code}
+```
+
+请只输出需要修改的部分，不要输出整个文件。每处修改使用以下格式:
+
+<<<<<<< SEARCH
+（从 game.js 中原样复制的几行代码，足以唯一定位修改位置）
+=======
+（修改后的代码）
+>>>>>>> REPLACE
+
+要求:
+1. SEARCH 部分必须与文件内容逐字一致，包括缩进
+2. 每处修改尽量小，只包含必要的上下文行
+3. 需要新增函数时，SEARCH 选取插入位置附近的代码，REPLACE 中保留这些代码并加上新函数
+4. 每处修改前用一行注释说明修复的是哪个Bug
+"""
+    
+    async def _rewrite_region(
+        self,
+        code: str,
+        edit: Dict[str, Any],
+        task: str,
+        bugs: str,
+        report: Dict[str, Any]
+    ) -> str:
+        """应用失败的编辑: 找到相关的顶层代码块，只让LLM重写该块"""
+        region = find_region(code, edit["search"])
+        if region is None:
+            report["errors"].append(f"编辑#{edit['index']} 无法应用，也找不到相关代码块")
             return code
-            
+        
+        start, end = region
+        block = "".join(code.splitlines(keepends=True)[start:end])
+        prompt = f"""{task}
+
+Bug列表 (bug_tracker.yaml):
+{bugs.strip() or "（无记录）"}
+
+下面是 game.js 第{start + 1}~{end}行的代码:
+```javascript
+{block}
+```
+
+之前计划的修改无法直接应用:
+原代码:
+{edit['search']}
+修改为:
+{edit['replace']}
+
+请重写上面这段代码，完成这处修改。只输出重写后的这段代码，不要输出文件的其它部分，不要包含解释文字。
+"""
+        try:
+            reply = await self.llm_client.generate_response(
+                messages=[{"role": "user", "content": prompt}],
+                system_prompt=self.system_prompt
+            )
         except Exception as e:
-            self.logger.error(f"LLM生成代码失败: {e}")
-            # 返回基础模板
-            return self._get_fallback_javascript(game_info)
+            report["errors"].append(f"重写第{start + 1}~{end}行失败: {e}")
+            return code
+        
+        report["output_chars"] += len(reply)
+        if self._is_error_reply(reply):
+            report["errors"].append(f"重写第{start + 1}~{end}行失败: {reply[:100]}")
+            return code
+        report["region_rewrites"] += 1
+        self.logger.info(f"编辑#{edit['index']} 无法应用，已重写第{start + 1}~{end}行")
+        return replace_region(code, start, end, self._clean_code(reply.strip()))
+    
+    def _format_patch_report(self, js_path: str) -> str:
+        """补丁式修复的结果（用于回复消息）"""
+        report = self.last_patch_report
+        if report["written"]:
+            text = f"✅ 已修复并写入 {js_path}\n"
+        else:
+            text = f"⚠️ {js_path} 未修改\n"
+        if report["mode"] == "patch":
+            text += f"🩹 补丁: {report['applied']}/{report['edits']} 处编辑已应用"
+            if report["region_rewrites"]:
+                text += f"，重写 {report['region_rewrites']} 个代码块"
+            text += f"（输出 {report['output_chars']} 字符，文件 {report['file_chars']} 字符）\n"
+        if report.get("modules_updated"):
+            text += f"🧩 已同步模块: {', '.join(report['modules_updated'])}\n"
+        for error in report["errors"]:
+            text += f"  - {error}\n"
+        return text
     
     def _get_fallback_javascript(self, game_info: Dict[str, Any]) -> str:
         """获取后备JavaScript代码（当LLM失败时使用）"""
@@ -1,11 +1,12 @@
 """
 文件: agents/tester_agent.py
 职责: 测试工程师Agent - 负责游戏测试、Bug报告
-依赖: engine/agent.py
+依赖: engine/agent.py, tools/smoke_harness.py, tools/validation_cache.py
 被依赖: workflows/game_dev_workflow.py
 
 关键能力:
-  - 运行游戏代码，检查是否能正常启动和运行
+  - 运行游戏代码（code_runner 的无头冒烟测试），检查是否能正常启动和运行、有没有运行时异常；
+    游戏文件未改变时复用上次的测试结果
   - 根据策划文档验证功能是否正确实现
   - 撰写测试报告，列出Bug和问题
   - 将Bug反馈给程序员
@@ -18,7 +19,10 @@ from pathlib import Path
 backend_path = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_path))
 
+from config import Config
 from engine.agent import Agent
+from tools.smoke_harness import HARNESS_VERSION, fingerprint
+from tools.validation_cache import get_validation_cache
 from typing import Dict, Any, Optional, List
 import json
 from datetime import datetime
@@ -120,7 +124,10 @@ bugs:
                     test_result = await self._execute_game_test()
                     
                     if test_result['success']:
-                        return f"✅ 游戏测试通过！\n{test_result['message']}\n\n游戏代码语法正确，可以正常运行。"
+                        return f"✅ 游戏测试通过！\n{test_result['message']}\n\n无头运行中没有发现运行时错误。"
+                    elif test_result.get('cached'):
+                        # 同一份代码的Bug已经记录过
+                        return f"❌ 游戏测试失败！游戏文件与上次测试时相同，问题仍未修复。\n{test_result['message']}"
                     else:
                         # 记录Bug
                         bug_id = await self._record_bug(test_result)
@@ -139,7 +146,7 @@ bugs:
         执行游戏测试
         
         Returns:
-            测试结果字典 {success: bool, message: str, error: str}
+            测试结果字典 {success: bool, message: str, error: str}，复用缓存的结果时另有 cached: True
         """
         if not self.project_name:
             return {
@@ -148,7 +155,8 @@ bugs:
                 "error": "配置错误"
             }
         
-        html_path = f"projects/{self.project_name}/output/index.html"
+        output_dir = f"projects/{self.project_name}/output"
+        html_path = f"{output_dir}/index.html"
         
         # 1. 检查文件是否存在
         try:
@@ -177,26 +185,41 @@ bugs:
                 "error": str(e)
             }
         
-        # 3. 执行游戏
+        # 游戏文件和上次测试时相同则直接复用测试结果（如Bug修复没有改动代码）
+        project_dir = Config.PROJECTS_DIR / self.project_name
+        cache = get_validation_cache(project_dir)
+        cache_version = (HARNESS_VERSION, Config.SMOKE_TEST_FRAMES)
+        hashes = {"output": fingerprint(project_dir / "output")}
+        cached = cache.get("game_test", cache_version, hashes)
+        if cached is not None:
+            self.logger.info("游戏文件与上次测试时相同，复用测试结果")
+            return dict(cached, cached=True)
+        
+        # 3. 在无头环境中运行游戏（加载 game.js 等脚本，运行若干帧并模拟输入）
         try:
             self.logger.info("开始执行游戏代码...")
-            result = await self.call_tool("code_runner", "execute_html", html_content, 10.0, True)
+            result = await self.call_tool("code_runner", "execute_html", html_content, 10.0, False, output_dir)
             
             self.logger.info(f"游戏执行结果: success={result.get('success')}")
             
             if result.get('success'):
-                return {
+                test_result = {
                     "success": True,
-                    "message": "游戏代码语法正确，可以正常加载",
+                    "message": f"游戏可以正常加载和运行\n{result.get('output', '')}",
                     "error": ""
                 }
             else:
                 error_msg = result.get('error', '未知错误')
-                return {
+                test_result = {
                     "success": False,
-                    "message": f"游戏代码有错误: {error_msg}",
+                    "message": f"游戏运行时出错: {error_msg}",
                     "error": error_msg
                 }
+            
+            # 冒烟测试真正运行过才缓存（没有Node时不缓存）
+            if result.get("smoke") is not None:
+                cache.put("game_test", cache_version, hashes, test_result)
+            return test_result
         
         except Exception as e:
             self.logger.error(f"执行游戏失败: {e}", exc_info=True)
@@ -5,6 +5,8 @@
 被依赖: main.py
 关键接口:
   - POST /project/start - 发起新项目
+  - POST /project/{project_id}/resume - 从检查点续跑项目（增量重建：只重跑输入变化的阶段）
+  - GET /project/{project_id}/rebuild_plan - 预览增量重建会跳过/重跑哪些阶段
   - GET /project/{project_id}/status - 获取项目状态
   - POST /boss/decision - 老板提交决策
   - GET /projects - 获取所有项目列表
@@ -25,7 +27,8 @@ import asyncio
 
 from config import Config
 from utils.logger import setup_logger
-from workflows.game_dev_workflow import GameDevWorkflow
+from workflows.game_dev_workflow import GameDevWorkflow, build_task_graph
+from workflows.checkpoint import WorkflowCheckpoint
 from api.websocket_handler import (
     broadcast_agent_message, 
     broadcast_agent_status, 
@@ -279,12 +282,15 @@ async def health_check():
     }
 
 
-async def run_workflow_background(project_id: str, project_name: str, game_idea: str):
+async def run_workflow_background(project_id: str, project_name: str, game_idea: str, resume: bool = False):
     """
     后台运行工作流
+    
+    Args:
+        resume: 是否从检查点续跑
     """
     try:
-        logger.info(f"🚀 启动工作流: {project_id}")
+        logger.info(f"🚀 {'续跑' if resume else '启动'}工作流: {project_id}")
         
         # 创建工作流实例
         workflow = GameDevWorkflow(project_name, game_idea)
@@ -298,8 +304,11 @@ async def run_workflow_background(project_id: str, project_name: str, game_idea:
             projects_store[project_id]["status"] = "running"
             projects_store[project_id]["current_phase"] = "立项"
         
-        # 启动工作流（start()内部会调用initialize()，无需额外初始化）
-        await workflow.start()
+        # 启动工作流（start()/resume()内部会调用initialize()，无需额外初始化）
+        if resume:
+            await workflow.resume()
+        else:
+            await workflow.start()
         
         # 工作流完成
         logger.info(f"✅ 工作流完成: {project_id}")
@@ -380,6 +389,113 @@ async def start_project(request: ProjectStartRequest, background_tasks: Backgrou
         raise HTTPException(status_code=500, detail=f"创建项目失败: {str(e)}")
 
 
+@router.post("/project/{project_id}/resume", response_model=ProjectStartResponse)
+async def resume_project(project_id: str, background_tasks: BackgroundTasks):
+    """
+    从检查点续跑项目（跳过已完成且输入未变的阶段）
+    
+    Args:
+        project_id: 项目ID（支持 project_id 或 project_name）
+        background_tasks: 后台任务
+    
+    Returns:
+        续跑结果
+    """
+    try:
+        if project_id in running_workflows:
+            raise HTTPException(status_code=409, detail=f"项目正在运行中: {project_id}")
+        
+        project_dir = _resolve_project_dir(project_id)
+        if not project_dir:
+            raise HTTPException(status_code=404, detail=f"项目不存在: {project_id}")
+        
+        checkpoint = WorkflowCheckpoint(project_dir)
+        if not checkpoint.load():
+            raise HTTPException(status_code=404, detail=f"项目没有可续跑的检查点: {project_id}")
+        
+        project_name = project_dir.name
+        project = projects_store.get(project_id)
+        game_idea = checkpoint.data.get("project_description") or (project or {}).get("game_idea", "")
+        
+        now = datetime.now().isoformat()
+        if project is None:
+            project = {
+                "project_id": project_id,
+                "project_name": project_name,
+                "game_idea": game_idea,
+                "current_phase": "立项",
+                "progress": 0.0,
+                "tasks_completed": 0,
+                "tasks_total": 14,
+                "agents_status": {
+                    "pm": "idle", "planner": "idle",
+                    "programmer": "idle", "artist": "idle", "tester": "idle"
+                },
+                "created_at": now
+            }
+            projects_store[project_id] = project
+        project["status"] = "pending"
+        project["updated_at"] = now
+        
+        completed = list(checkpoint.data.get("completed", {}).keys())
+        logger.info(f"♻️ 续跑项目: {project_id} (检查点已完成 {len(completed)} 个阶段)")
+        
+        background_tasks.add_task(run_workflow_background, project_id, project_name, game_idea, True)
+        
+        return ProjectStartResponse(
+            success=True,
+            project_id=project_id,
+            message=f"项目 '{project_name}' 正在从检查点续跑（已完成 {len(completed)} 个阶段）",
+            created_at=project["created_at"]
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"续跑项目失败: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"续跑项目失败: {str(e)}")
+
+
+@router.get("/project/{project_id}/rebuild_plan")
+async def get_rebuild_plan(project_id: str):
+    """
+    预览增量重建计划（不执行）
+    
+    Args:
+        project_id: 项目ID（支持 project_id 或 project_name）
+    
+    Returns:
+        被外部修改的文件和每个阶段跳过/重跑的原因
+    """
+    try:
+        project_dir = _resolve_project_dir(project_id)
+        if not project_dir:
+            raise HTTPException(status_code=404, detail=f"项目不存在: {project_id}")
+        
+        checkpoint = WorkflowCheckpoint(project_dir)
+        if not checkpoint.load():
+            raise HTTPException(status_code=404, detail=f"项目没有可续跑的检查点: {project_id}")
+        
+        task_graph = build_task_graph()
+        changed = sorted(checkpoint.changed_files())
+        skip = checkpoint.plan_resume(task_graph)
+        
+        return {
+            "success": True,
+            "project_id": project_id,
+            "changed_files": changed,
+            "skip": [name for name in task_graph.order if name in skip],
+            "rerun": [name for name in task_graph.order if name not in skip],
+            "plan": checkpoint.last_plan
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"计算重建计划失败: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"计算重建计划失败: {str(e)}")
+
+
 @router.get("/project/{project_id}/status", response_model=ProjectStatusResponse)
 async def get_project_status(project_id: str):
     """
@@ -643,13 +759,15 @@ async def get_project_file(project_id: str, path: str):
 
 
 @router.post("/project/{project_id}/feedback")
-async def submit_feedback(project_id: str, request: Request):
+async def submit_feedback(project_id: str, request: Request, background_tasks: BackgroundTasks):
     """
     提交游戏反馈/Bug报告
     
     Args:
         project_id: 项目ID
-        request: 包含feedback和severity的JSON
+        request: 包含feedback、severity和可选rebuild的JSON
+                 rebuild为true时立即增量重建（只重跑Bug修复及之后的阶段）
+        background_tasks: 后台任务
     
     Returns:
         提交结果
@@ -664,6 +782,7 @@ async def submit_feedback(project_id: str, request: Request):
         body = await request.json()
         feedback = body.get('feedback', '')
         severity = body.get('severity', 'normal')
+        rebuild = bool(body.get('rebuild', False))
         
         if not feedback:
             raise HTTPException(status_code=400, detail="反馈内容不能为空")
@@ -700,13 +819,20 @@ async def submit_feedback(project_id: str, request: Request):
         
         logger.info(f"✅ 收到反馈: {project_id} - {feedback[:50]}...")
         
-        # TODO: 触发Bug修复流程（需要重新启动工作流的Bug修复阶段）
-        # 这里先简单记录，完整实现需要工作流支持
+        # bug_tracker.yaml 变化后，增量重建只会重跑依赖它的Bug修复和交付阶段
+        rebuild_started = False
+        if rebuild:
+            try:
+                await resume_project(project_id, background_tasks)
+                rebuild_started = True
+            except HTTPException as e:
+                logger.warning(f"反馈已记录，但无法触发增量重建: {e.detail}")
         
         return {
             "success": True,
-            "message": "反馈已提交，AI团队将进行修复",
-            "bug_id": bug_id
+            "message": "反馈已提交，AI团队正在修复" if rebuild_started else "反馈已提交，AI团队将进行修复",
+            "bug_id": bug_id,
+            "rebuild_started": rebuild_started
         }
         
     except HTTPException:
@@ -180,14 +180,16 @@ class ConnectionManager:
         
         logger.debug(f"📡 广播消息: {message.get('event', 'unknown')} (接收者: {len(target_clients)})")
         
-        # 并发发送给所有客户端
-        disconnect_list = []
+        # 并发发送给所有客户端（单个慢连接不阻塞其它连接）
+        results = await asyncio.gather(
+            *(websocket.send_text(message_json) for _, websocket in target_clients),
+            return_exceptions=True
+        )
         
-        for client_id, websocket in target_clients:
-            try:
-                await websocket.send_text(message_json)
-            except Exception as e:
-                logger.error(f"广播失败 ({client_id}): {e}")
+        disconnect_list = []
+        for (client_id, _), result in zip(target_clients, results):
+            if isinstance(result, Exception):
+                logger.error(f"广播失败 ({client_id}): {result}")
                 disconnect_list.append(client_id)
         
         # 断开失败的连接
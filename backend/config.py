@@ -54,6 +54,115 @@ class Config:
     LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "3"))
     LLM_RETRY_BASE_DELAY: float = float(os.getenv("LLM_RETRY_BASE_DELAY", "2.0"))
     LLM_RETRY_MAX_DELAY: float = float(os.getenv("LLM_RETRY_MAX_DELAY", "30.0"))
+    LLM_MAX_CONCURRENT_REQUESTS: int = int(os.getenv("LLM_MAX_CONCURRENT_REQUESTS", "0"))  # 进程内同时进行的LLM请求数，0表示不限制
+    
+    # =====================================================
+    # 消息总线配置
+    # =====================================================
+    MESSAGE_RATE_LIMIT: int = int(os.getenv("MESSAGE_RATE_LIMIT", "10"))
+    MESSAGE_RATE_WINDOW: float = float(os.getenv("MESSAGE_RATE_WINDOW", "60.0"))
+    AGENT_QUEUE_MAXSIZE: int = int(os.getenv("AGENT_QUEUE_MAXSIZE", "100"))
+    AGENT_QUEUE_OVERFLOW: str = os.getenv("AGENT_QUEUE_OVERFLOW", "drop_oldest")  # block/drop_oldest/coalesce
+    WS_OUTBOUND_BUFFER: int = int(os.getenv("WS_OUTBOUND_BUFFER", "1000"))
+    WS_OUTBOUND_BATCH_SIZE: int = int(os.getenv("WS_OUTBOUND_BATCH_SIZE", "50"))
+    WS_CALLBACK_TIMEOUT: float = float(os.getenv("WS_CALLBACK_TIMEOUT", "5.0"))
+    
+    # 传输层: memory(单进程) / broker(通过消息代理跨进程)
+    MESSAGE_BUS_TRANSPORT: str = os.getenv("MESSAGE_BUS_TRANSPORT", "memory")
+    MESSAGE_BROKER_HOST: str = os.getenv("MESSAGE_BROKER_HOST", "127.0.0.1")
+    MESSAGE_BROKER_PORT: int = int(os.getenv("MESSAGE_BROKER_PORT", "8765"))
+    MESSAGE_BUS_NODE_ID: str = os.getenv("MESSAGE_BUS_NODE_ID", "")
+    MESSAGE_BUS_OBSERVE_ALL: bool = os.getenv("MESSAGE_BUS_OBSERVE_ALL", "false").lower() == "true"  # WebSocket网关节点设为true
+    
+    # =====================================================
+    # Agent并发配置
+    # =====================================================
+    AGENT_MAX_PARALLEL: int = int(os.getenv("AGENT_MAX_PARALLEL", "2"))  # 每个Agent同时处理的消息数
+    AGENT_MAX_THREADS: int = int(os.getenv("AGENT_MAX_THREADS", "8"))    # 每个Agent保留的会话线程数(不含主线程)
+    
+    # =====================================================
+    # 代码生成配置
+    # =====================================================
+    CODE_CANDIDATES: int = int(os.getenv("CODE_CANDIDATES", "1"))  # 并发生成的game.js候选数，1表示只生成一份
+    CODE_CANDIDATE_TEMPERATURES: str = os.getenv("CODE_CANDIDATE_TEMPERATURES", "0.7,0.4,1.0")  # 各候选的采样温度，依次循环使用
+    CODE_MODULES_ENABLED: bool = os.getenv("CODE_MODULES_ENABLED", "false").lower() == "true"  # 按模块并发生成代码并打包成game.js
+    CODE_MAX_MODULES: int = int(os.getenv("CODE_MAX_MODULES", "8"))  # 模块规划的模块数上限
+    CODE_MODULE_MAX_RETRIES: int = int(os.getenv("CODE_MODULE_MAX_RETRIES", "2"))  # 校验失败的模块最多重新生成的轮数
+    BUG_FIX_MODE: str = os.getenv("BUG_FIX_MODE", "patch")  # patch: 输出补丁在本地应用；rewrite: 由LLM重写整个文件
+    BUG_FIX_MAX_REGION_REWRITES: int = int(os.getenv("BUG_FIX_MAX_REGION_REWRITES", "2"))  # 补丁应用失败时最多重写的代码块数
+    
+    # =====================================================
+    # 美术素材生成配置
+    # =====================================================
+    ARTIST_MAX_CONCURRENT: int = int(os.getenv("ARTIST_MAX_CONCURRENT", "3"))  # 同时生成的素材数（同时进行的图片API请求数）
+    ARTIST_ASSET_RETRIES: int = int(os.getenv("ARTIST_ASSET_RETRIES", "2"))  # 每个素材生成失败后最多重试的次数
+    ARTIST_RETRY_BASE_DELAY: float = float(os.getenv("ARTIST_RETRY_BASE_DELAY", "2.0"))  # 重试的基础延迟(秒)，每次翻倍
+    
+    # =====================================================
+    # 素材库配置
+    # =====================================================
+    ASSET_CACHE_ENABLED: bool = os.getenv("ASSET_CACHE_ENABLED", "true").lower() == "true"  # 相同Prompt/模型/尺寸的素材直接复用已生成的图片（跨项目共享，不占用图片配额）
+    ASSET_CACHE_DIR: str = os.getenv("ASSET_CACHE_DIR", "")  # 素材库目录，默认为工作空间下的 .asset_cache
+    ASSET_CACHE_MAX_MB: float = float(os.getenv("ASSET_CACHE_MAX_MB", "512"))  # 素材库的总大小上限(MB)，超过时删除最久未使用的图片
+    
+    # =====================================================
+    # 代码索引配置
+    # =====================================================
+    CODE_INDEX_PATH: str = os.getenv("CODE_INDEX_PATH", "")  # 符号索引数据库路径，默认为工作空间下的 .code_index/symbols.db，":memory:" 表示不持久化
+    CODE_INDEX_REFRESH_INTERVAL: float = float(os.getenv("CODE_INDEX_REFRESH_INTERVAL", "2.0"))  # 同一目录两次扫描文件变化的最小间隔(秒)
+    
+    # =====================================================
+    # 代码校验配置
+    # =====================================================
+    JS_SYNTAX_CHECKER: str = os.getenv("JS_SYNTAX_CHECKER", "auto")  # auto: 有Node.js时用 node --check，否则用内置检查；python: 总是用内置检查
+    JS_SYNTAX_CHECK_TIMEOUT: float = float(os.getenv("JS_SYNTAX_CHECK_TIMEOUT", "10.0"))  # node --check 的超时时间(秒)，超时后改用内置检查
+    
+    # =====================================================
+    # Node执行池配置
+    # =====================================================
+    NODE_POOL_ENABLED: bool = os.getenv("NODE_POOL_ENABLED", "true").lower() == "true"  # 在常驻的Node工作进程中执行/检查JavaScript
+    NODE_POOL_SIZE: int = int(os.getenv("NODE_POOL_SIZE", "2"))  # 工作进程数（同时执行的任务数）
+    NODE_POOL_MAX_JOBS: int = int(os.getenv("NODE_POOL_MAX_JOBS", "200"))  # 每个工作进程执行多少个任务后替换为新进程
+    NODE_WORKER_MEMORY_MB: int = int(os.getenv("NODE_WORKER_MEMORY_MB", "256"))  # 每个工作进程的堆内存上限(MB)
+    
+    # =====================================================
+    # 代码执行临时目录配置
+    # =====================================================
+    CODE_RUNNER_SCRATCH_DIR: str = os.getenv("CODE_RUNNER_SCRATCH_DIR", "")  # 任务临时目录的根目录，默认优先使用 /dev/shm（tmpfs）
+    CODE_RUNNER_KEEP_JOBS: str = os.getenv("CODE_RUNNER_KEEP_JOBS", "none")  # 保留任务目录用于排查: none/failed/all
+    CODE_RUNNER_KEEP_MAX: int = int(os.getenv("CODE_RUNNER_KEEP_MAX", "20"))  # 最多保留的任务目录数，超过时删除最旧的
+    CODE_RUNNER_SCRATCH_MAX_MB: float = float(os.getenv("CODE_RUNNER_SCRATCH_MAX_MB", "256"))  # 临时目录的磁盘占用上限(MB)
+    
+    # =====================================================
+    # 冒烟测试配置
+    # =====================================================
+    SMOKE_TEST_FRAMES: int = int(os.getenv("SMOKE_TEST_FRAMES", "120"))  # 无头冒烟测试运行的帧数（按60帧/秒的虚拟时钟）
+    
+    # =====================================================
+    # 验证结果缓存配置
+    # =====================================================
+    VALIDATION_CACHE_ENABLED: bool = os.getenv("VALIDATION_CACHE_ENABLED", "true").lower() == "true"  # 按文件内容哈希缓存验证和冒烟测试结果（projects/<项目>/checkpoints/validation_cache.json）
+    VALIDATION_CACHE_MAX_ENTRIES: int = int(os.getenv("VALIDATION_CACHE_MAX_ENTRIES", "200"))  # 每个项目最多缓存的结果数，超过时删除最久未使用的
+    
+    # =====================================================
+    # 老板决策配置
+    # =====================================================
+    BOSS_DECISION_MODE: str = os.getenv("BOSS_DECISION_MODE", "interactive")  # interactive/speculative/auto
+    BOSS_AUTO_APPROVE: str = os.getenv("BOSS_AUTO_APPROVE", "")  # 自动批准的阶段，逗号分隔，如 "planning,development"，"*"表示全部
+    BOSS_DECISION_TIMEOUT: float = float(os.getenv("BOSS_DECISION_TIMEOUT", "300.0"))
+    BOSS_HEADLESS_TIMEOUT: float = float(os.getenv("BOSS_HEADLESS_TIMEOUT", "10.0"))  # 无前端连接时的等待时间，0表示直接用默认选项
+    
+    # =====================================================
+    # 批量运行配置
+    # =====================================================
+    BATCH_MAX_CONCURRENT: int = int(os.getenv("BATCH_MAX_CONCURRENT", "3"))  # 批量运行时同时进行的项目数
+    BATCH_PROJECT_TIMEOUT: float = float(os.getenv("BATCH_PROJECT_TIMEOUT", "3600.0"))  # 单个项目的最长运行时间(秒)，0表示不限制
+    
+    # =====================================================
+    # 性能追踪配置
+    # =====================================================
+    TRACE_ENABLED: bool = os.getenv("TRACE_ENABLED", "true").lower() == "true"  # 记录耗时span并导出Chrome Trace JSON
+    TRACE_MAX_SPANS: int = int(os.getenv("TRACE_MAX_SPANS", "100000"))  # 每次运行最多记录的span数
     
     # =====================================================
     # 路径配置
@@ -1,13 +1,14 @@
 """
 文件: engine/agent.py
 职责: Agent基类，定义所有AI员工的基本能力
-依赖: llm_client.py, context_manager.py, config.py
+依赖: llm_client.py, context_manager.py, config.py, utils/tracer.py
 被依赖: agents/*.py (所有具体的Agent实现)
 
 关键接口:
   - Agent(agent_id, role, system_prompt) - 创建Agent实例
   - async think_and_respond(user_message) - 让Agent思考并回复
   - async process_message(message_dict) - 处理收到的消息
+  - conversation_thread(thread_id) - 切换到独立的会话线程（并行处理时上下文互不干扰）
 """
 
 import os
@@ -15,6 +16,9 @@ import sys
 from typing import Dict, Any, Optional, List
 from pathlib import Path
 import asyncio
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
 
 # 设置控制台编码为 UTF-8（Windows 兼容）
@@ -36,8 +40,15 @@ from config import Config
 from engine.llm_client import LLMClient
 from engine.context_manager import ContextManager
 from utils.logger import setup_logger
+from utils.tracer import trace_span
 from tools.tool_registry import AgentToolkit
 
+# 主会话线程（工作流下发的任务、加载的文件都在主线程上下文中）
+MAIN_THREAD = "main"
+
+# 当前协程所在的会话线程（每个asyncio任务各自独立）
+_current_thread: ContextVar[str] = ContextVar("agent_conversation_thread", default=MAIN_THREAD)
+
 
 class Agent:
     """
@@ -72,11 +83,10 @@ class Agent:
         # 创建 LLM 客户端
         self.llm_client = LLMClient(model_name)
         
-        # 创建上下文管理器
-        self.context_manager = ContextManager(
-            max_tokens=Config.MAX_PROJECT_TOKENS // 5,  # 每个Agent分配总预算的1/5
-            max_messages=50
-        )
+        # 会话线程的上下文管理器: {thread_id: ContextManager}，主线程始终存在
+        self._contexts: "OrderedDict[str, ContextManager]" = OrderedDict()
+        self._contexts[MAIN_THREAD] = self._new_context_manager()
+        self.max_threads = Config.AGENT_MAX_THREADS
         
         # 创建工具包
         self.toolkit = AgentToolkit(agent_id)
@@ -101,6 +111,69 @@ class Agent:
         if tools:
             self.logger.info(f"启用的工具: {', '.join(tools)}")
     
+    def _new_context_manager(self) -> ContextManager:
+        """创建一个上下文管理器"""
+        return ContextManager(
+            max_tokens=Config.MAX_PROJECT_TOKENS // 5,  # 每个Agent分配总预算的1/5
+            max_messages=50
+        )
+    
+    @property
+    def context_manager(self) -> ContextManager:
+        """当前会话线程的上下文管理器（不在任何线程中时为主线程）"""
+        return self._get_thread_context(_current_thread.get())
+    
+    @context_manager.setter
+    def context_manager(self, value: ContextManager) -> None:
+        self._contexts[MAIN_THREAD] = value
+    
+    def _get_thread_context(self, thread_id: str) -> ContextManager:
+        """
+        获取会话线程的上下文，不存在时从主线程复制一份
+        
+        新线程继承主线程已加载的文件和对话，之后各自独立；
+        线程数超过上限时淘汰最久未使用的非主线程。
+        """
+        context = self._contexts.get(thread_id)
+        if context is not None:
+            self._contexts.move_to_end(thread_id)
+            return context
+        
+        main = self._contexts[MAIN_THREAD]
+        context = self._new_context_manager()
+        context.messages = list(main.messages)
+        context.current_tokens = main.current_tokens
+        self._contexts[thread_id] = context
+        
+        while len(self._contexts) > self.max_threads + 1:
+            oldest = next(tid for tid in self._contexts if tid != MAIN_THREAD)
+            del self._contexts[oldest]
+            self.logger.debug(f"会话线程 [{oldest}] 已淘汰")
+        
+        return context
+    
+    @contextmanager
+    def conversation_thread(self, thread_id: str):
+        """
+        在指定会话线程中执行（用于并行处理多条消息）
+        
+        用法:
+            with agent.conversation_thread("tester"):
+                await agent.process_message(message)
+        
+        Args:
+            thread_id: 会话线程ID
+        """
+        token = _current_thread.set(thread_id or MAIN_THREAD)
+        try:
+            yield self.context_manager
+        finally:
+            _current_thread.reset(token)
+    
+    def get_threads(self) -> List[str]:
+        """获取当前所有会话线程ID"""
+        return list(self._contexts.keys())
+    
     async def think_and_respond(self, user_message: str) -> str:
         """
         让 Agent 思考并生成回复
@@ -127,10 +200,13 @@ class Agent:
                             f"{context_summary['estimated_tokens']}tokens")
             
             # 调用 LLM 生成回复
-            response = await self.llm_client.generate_response(
-                messages=messages,
-                system_prompt=self.system_prompt
-            )
+            with trace_span(f"think:{self.agent_id}", "agent", agent=self.agent_id,
+                            messages=len(messages)) as span:
+                response = await self.llm_client.generate_response(
+                    messages=messages,
+                    system_prompt=self.system_prompt
+                )
+                span.set(response_chars=len(response))
             
             # 将回复添加到上下文
             self.context_manager.add_message("model", response)
@@ -257,12 +333,15 @@ class Agent:
             "status": self.status,
             "current_task": self.current_task,
             "context": context_summary,
+            "threads": self.get_threads(),
             "tools": [tool["name"] for tool in self.get_available_tools()]
         }
     
     def reset_context(self) -> None:
         """清空Agent的上下文（用于开始新项目时）"""
-        self.context_manager.clear()
+        self._contexts[MAIN_THREAD].clear()
+        for thread_id in [tid for tid in self._contexts if tid != MAIN_THREAD]:
+            del self._contexts[thread_id]
         self.status = "idle"
         self.current_task = None
         
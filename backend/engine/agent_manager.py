@@ -1,18 +1,20 @@
 """
 文件: engine/agent_manager.py
 职责: Agent管理器 - 管理所有Agent的生命周期和工作循环
-依赖: engine/message_bus.py, engine/agent.py
+依赖: engine/message_bus.py, engine/agent.py, utils/tracer.py
 被依赖: workflows/game_dev_workflow.py
 
 关键接口:
-  - AgentManager() - 创建Agent管理器
-  - register_agent(agent) - 注册Agent
+  - AgentManager(namespace) - 创建Agent管理器（namespace为项目ID时，Agent以项目作用域地址订阅）
+  - register_agent(agent, max_parallel) - 注册Agent（可单独设置并发数）
   - start_all() - 启动所有Agent的工作循环
   - stop_all() - 停止所有Agent
+  - unregister_all() - 注销所有Agent并释放其消息队列
 """
 
 import asyncio
-from typing import Dict, List, Optional
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
 from pathlib import Path
 import sys
 
@@ -20,9 +22,29 @@ import sys
 backend_path = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_path))
 
-from engine.message_bus import MessageBus
-from engine.agent import Agent
+from config import Config
+from engine.message_bus import MessageBus, scoped_agent_id
+from engine.agent import Agent, MAIN_THREAD
 from utils.logger import setup_logger
+from utils.tracer import trace_span
+
+
+class _AgentWorkers:
+    """
+    单个Agent的并发状态
+    
+    同一会话线程内的消息按到达顺序串行处理，不同线程之间最多 max_parallel 个并行
+    """
+    
+    def __init__(self, max_parallel: int):
+        self.max_parallel = max(1, max_parallel)
+        self.slots = asyncio.Semaphore(self.max_parallel)
+        # 已接收但未处理完的消息数上限，防止消息在管理器中无限堆积
+        self.admission = asyncio.Semaphore(self.max_parallel * 8)
+        self.pending: Dict[str, Deque[Dict[str, Any]]] = {}
+        self.runners: Dict[str, asyncio.Task] = {}
+        self.active = 0
+        self.processed = 0
 
 
 class AgentManager:
@@ -35,12 +57,23 @@ class AgentManager:
     3. 监控Agent的运行状态
     """
     
-    def __init__(self):
-        """初始化Agent管理器"""
+    def __init__(self, namespace: Optional[str] = None):
+        """
+        初始化Agent管理器
+        
+        Args:
+            namespace: 项目ID。同一进程并发运行多个项目时，各项目的Agent
+                       以 "agent_id@项目ID" 订阅消息总线，互不串线
+        """
+        self.namespace = namespace
         self.agents: Dict[str, Agent] = {}
         self.running = False
         self.tasks: List[asyncio.Task] = []
         
+        # 每个Agent的并发设置: {agent_id: max_parallel}，运行时状态: {agent_id: _AgentWorkers}
+        self.max_parallel: Dict[str, int] = {}
+        self._workers: Dict[str, _AgentWorkers] = {}
+        
         # 消息总线
         self.message_bus = MessageBus()
         
@@ -49,12 +82,13 @@ class AgentManager:
         
         self.logger.info("Agent管理器初始化成功")
     
-    def register_agent(self, agent: Agent) -> None:
+    def register_agent(self, agent: Agent, max_parallel: Optional[int] = None) -> None:
         """
         注册Agent
         
         Args:
             agent: Agent实例
+            max_parallel: 该Agent同时处理的消息数，None表示使用默认配置
         """
         agent_id = agent.agent_id
         
@@ -62,9 +96,10 @@ class AgentManager:
             self.logger.warning(f"Agent [{agent_id}] 已经注册，将被覆盖")
         
         self.agents[agent_id] = agent
+        self.max_parallel[agent_id] = max_parallel or Config.AGENT_MAX_PARALLEL
         
         # 订阅消息总线
-        self.message_bus.subscribe(agent_id, agent.process_message)
+        self.message_bus.subscribe(self.bus_id(agent_id), agent.process_message)
         
         self.logger.info(f"Agent [{agent_id}] 注册成功")
     
@@ -77,60 +112,150 @@ class AgentManager:
         """
         if agent_id in self.agents:
             del self.agents[agent_id]
-            self.message_bus.unsubscribe(agent_id)
+            self.max_parallel.pop(agent_id, None)
+            self.message_bus.unsubscribe(self.bus_id(agent_id), drop_queue=self.namespace is not None)
             self.logger.info(f"Agent [{agent_id}] 注销成功")
     
+    def unregister_all(self) -> None:
+        """注销所有Agent（项目结束时调用，释放项目作用域的消息队列）"""
+        for agent_id in list(self.agents):
+            self.unregister_agent(agent_id)
+    
+    def bus_id(self, agent_id: str) -> str:
+        """Agent在消息总线上的地址"""
+        return scoped_agent_id(agent_id, self.namespace)
+    
+    @staticmethod
+    def _thread_of(message: Dict[str, Any]) -> str:
+        """
+        确定消息所属的会话线程
+        
+        1. 消息显式指定 thread 字段时使用该字段
+        2. 工作流下发的任务(reply_to=workflow)进入主线程，与工作流加载的文件共享上下文
+        3. 其它Agent发来的消息按发送者分线程，与主线程的长任务互不阻塞
+        """
+        if message.get("thread"):
+            return message["thread"]
+        if message.get("reply_to") == "workflow":
+            return MAIN_THREAD
+        return message.get("from") or MAIN_THREAD
+    
     async def _agent_work_loop(self, agent: Agent) -> None:
         """
         Agent工作循环
         
         每个Agent的主循环:
         1. 检查是否有新消息需要处理
-        2. 检查是否有分配给自己的任务
-        3. 没有消息也没有任务时，空闲等待
+        2. 按会话线程分发，同一线程内按顺序处理，不同线程并行处理
+        3. 没有消息时空闲等待
         
         Args:
             agent: Agent实例
         """
         agent_id = agent.agent_id
+        workers = _AgentWorkers(self.max_parallel.get(agent_id, Config.AGENT_MAX_PARALLEL))
+        self._workers[agent_id] = workers
         
-        self.logger.info(f"Agent [{agent_id}] 工作循环启动")
+        self.logger.info(f"Agent [{agent_id}] 工作循环启动 (最大并行: {workers.max_parallel})")
         
         try:
             while self.running:
+                # 等待管理器内的积压消息低于上限
+                await workers.admission.acquire()
+                
                 # 1. 检查是否有新消息
-                message = await self.message_bus.receive(agent_id, timeout=2.0)
+                message = await self.message_bus.receive(self.bus_id(agent_id), timeout=2.0)
                 
-                if message:
-                    self.logger.debug(f"Agent [{agent_id}] 收到消息")
-                    
-                    # 处理消息
-                    response_content = await agent.process_message(message)
-                    
-                    # 如果需要回复
-                    if response_content:
-                        # 优先使用reply_to字段，否则回复给发送者
-                        reply_to = message.get("reply_to", message.get("from"))
-                        
-                        response = {
-                            "from": agent_id,
-                            "to": reply_to,
-                            "type": "answer",
-                            "content": response_content,
-                            "priority": "normal"
-                        }
-                        await self.message_bus.send(response)
+                if not message:
+                    workers.admission.release()
+                    continue
                 
-                # 2. TODO: 检查是否有分配的任务(P4阶段实现)
-                # task = await check_tasks(agent.task_queue)
+                # 2. 按会话线程分发
+                thread_id = self._thread_of(message)
+                self.logger.debug(f"Agent [{agent_id}] 收到消息 (线程: {thread_id})")
                 
-                # 3. 空闲等待
-                await asyncio.sleep(0.1)
+                workers.pending.setdefault(thread_id, deque()).append(message)
+                runner = workers.runners.get(thread_id)
+                if runner is None or runner.done():
+                    workers.runners[thread_id] = asyncio.create_task(
+                        self._thread_runner(agent, workers, thread_id),
+                        name=f"agent:{self.bus_id(agent_id)}/{thread_id}"
+                    )
         
         except asyncio.CancelledError:
             self.logger.info(f"Agent [{agent_id}] 工作循环被取消")
         except Exception as e:
             self.logger.error(f"Agent [{agent_id}] 工作循环出错: {e}", exc_info=True)
+        finally:
+            for runner in workers.runners.values():
+                runner.cancel()
+            await asyncio.gather(*workers.runners.values(), return_exceptions=True)
+            workers.runners.clear()
+    
+    async def _thread_runner(self, agent: Agent, workers: _AgentWorkers, thread_id: str) -> None:
+        """
+        按顺序处理一个会话线程中的消息
+        
+        Args:
+            agent: Agent实例
+            workers: 该Agent的并发状态
+            thread_id: 会话线程ID
+        """
+        queue = workers.pending[thread_id]
+        try:
+            while queue:
+                message = queue.popleft()
+                try:
+                    async with workers.slots:
+                        workers.active += 1
+                        try:
+                            with agent.conversation_thread(thread_id):
+                                await self._handle_message(agent, message)
+                        finally:
+                            workers.active -= 1
+                            workers.processed += 1
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.logger.error(f"Agent [{agent.agent_id}] 处理消息出错: {e}", exc_info=True)
+                finally:
+                    workers.admission.release()
+        finally:
+            if not queue:
+                workers.pending.pop(thread_id, None)
+                workers.runners.pop(thread_id, None)
+    
+    async def _handle_message(self, agent: Agent, message: Dict[str, Any]) -> None:
+        """
+        处理一条消息并在需要时回复
+        
+        Args:
+            agent: Agent实例
+            message: 消息字典
+        """
+        agent_id = agent.agent_id
+        
+        # 处理消息
+        with trace_span(f"handle:{agent_id}", "agent", agent=agent_id,
+                        type=message.get("type"), sender=message.get("from")):
+            response_content = await agent.process_message(message)
+        
+        # 如果需要回复
+        if response_content:
+            # 优先使用reply_to字段，否则回复给发送者
+            reply_to = message.get("reply_to", message.get("from"))
+            
+            response = {
+                "from": agent_id,
+                "to": reply_to,
+                "type": "answer",
+                "content": response_content,
+                "priority": "normal"
+            }
+            # 回复沿用原消息的项目标识
+            if message.get("project"):
+                response["project"] = message["project"]
+            await self.message_bus.send(response)
     
     async def start_all(self) -> None:
         """启动所有Agent的工作循环"""
@@ -144,7 +269,9 @@ class AgentManager:
         
         # 为每个Agent创建工作循环任务
         for agent in self.agents.values():
-            task = asyncio.create_task(self._agent_work_loop(agent))
+            task = asyncio.create_task(
+                self._agent_work_loop(agent), name=f"agent:{self.bus_id(agent.agent_id)}"
+            )
             self.tasks.append(task)
         
         self.logger.info("所有Agent工作循环已启动")
@@ -166,6 +293,7 @@ class AgentManager:
         await asyncio.gather(*self.tasks, return_exceptions=True)
         
         self.tasks.clear()
+        self._workers.clear()
         
         self.logger.info("所有Agent工作循环已停止")
     
@@ -183,6 +311,17 @@ class AgentManager:
                 agent_id: agent.get_status()
                 for agent_id, agent in self.agents.items()
             },
+            "concurrency": {
+                agent_id: {
+                    "max_parallel": workers.max_parallel,
+                    "active": workers.active,
+                    "processed": workers.processed,
+                    "pending_by_thread": {
+                        thread_id: len(queue) for thread_id, queue in workers.pending.items()
+                    }
+                }
+                for agent_id, workers in self._workers.items()
+            },
             "message_bus": self.message_bus.get_summary()
         }
 
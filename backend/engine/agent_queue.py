@@ -0,0 +1,271 @@
+"""
+文件: engine/agent_queue.py
+职责: Agent消息队列 - 有界优先级队列，支持背压和溢出策略
+依赖: 无（仅Python标准库）
+被依赖: engine/message_bus.py
+
+关键接口:
+  - AgentMessageQueue(maxsize, overflow) - 创建有界队列
+  - async put(message) - 入队（按溢出策略处理队满）
+  - async get() - 按优先级出队（urgent > blocking > normal）
+  - get_stats() - 获取队列深度、高水位、丢弃数等统计
+"""
+
+import asyncio
+from collections import deque
+from typing import Dict, Any, Deque, Optional
+
+# 消息优先级顺序（数值越小越先处理）
+PRIORITY_ORDER = {"urgent": 0, "blocking": 1, "normal": 2}
+
+# 支持的溢出策略
+OVERFLOW_BLOCK = "block"              # 队满时发送者等待
+OVERFLOW_DROP_OLDEST = "drop_oldest"  # 丢弃优先级不高于新消息的最早非紧急消息，没有时丢弃新消息（紧急消息改为等待）
+OVERFLOW_COALESCE = "coalesce"        # 合并重复的report消息，仍满则按 drop_oldest 处理
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_COALESCE)
+
+
+class AgentMessageQueue:
+    """
+    Agent消息队列
+
+    按优先级分桶的有界队列：每个优先级一个deque，出队时取最高优先级的最早消息，
+    入队/出队都是 O(1)。队满时按溢出策略处理，保证消息风暴下内存占用不变。
+    接口与 asyncio.Queue 保持一致（put/get/qsize/empty/full），等待者使用
+    按需创建的Future，不绑定特定事件循环。
+    """
+
+    def __init__(self, maxsize: int = 100, overflow: str = OVERFLOW_DROP_OLDEST):
+        """
+        初始化队列
+
+        Args:
+            maxsize: 队列容量，<=0 表示不限容量
+            overflow: 溢出策略 block/drop_oldest/coalesce
+
+        Raises:
+            ValueError: 不支持的溢出策略
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"不支持的溢出策略: {overflow}，可选: {', '.join(OVERFLOW_POLICIES)}")
+
+        self.maxsize = maxsize
+        self.overflow = overflow
+
+        # 每个优先级一个桶
+        self._buckets: Dict[int, Deque[Dict[str, Any]]] = {
+            level: deque() for level in sorted(set(PRIORITY_ORDER.values()))
+        }
+        self._size = 0
+
+        # 等待者
+        self._getters: Deque[asyncio.Future] = deque()
+        self._putters: Deque[asyncio.Future] = deque()
+
+        # 统计信息
+        self._high_water = 0
+        self._dropped = 0
+        self._coalesced = 0
+        self._blocked_puts = 0
+        self._total_put = 0
+
+    # ==================== 基本状态 ====================
+
+    def qsize(self) -> int:
+        """当前排队消息数"""
+        return self._size
+
+    def empty(self) -> bool:
+        """队列是否为空"""
+        return self._size == 0
+
+    def full(self) -> bool:
+        """队列是否已满"""
+        return 0 < self.maxsize <= self._size
+
+    @staticmethod
+    def _priority_of(message: Dict[str, Any]) -> int:
+        """获取消息优先级对应的桶编号（未知优先级按normal处理）"""
+        return PRIORITY_ORDER.get(message.get("priority", "normal"), PRIORITY_ORDER["normal"])
+
+    # ==================== 入队 ====================
+
+    async def put(self, message: Dict[str, Any]) -> bool:
+        """
+        入队消息
+
+        block策略下队满会等待；其它策略下只有紧急消息在队中全是紧急消息时等待，
+        已入队的紧急消息不会被丢弃。
+
+        Args:
+            message: 消息字典
+
+        Returns:
+            True: 已入队（或已合并到队中同类消息）
+            False: 消息被丢弃
+        """
+        if self.overflow == OVERFLOW_BLOCK or (
+            self._priority_of(message) == PRIORITY_ORDER["urgent"]
+            and self.full() and self._evictable_level(message) is None
+        ):
+            if self.full():
+                self._blocked_puts += 1
+            while self.full():
+                putter = asyncio.get_running_loop().create_future()
+                self._putters.append(putter)
+                try:
+                    await putter
+                except BaseException:
+                    putter.cancel()
+                    try:
+                        self._putters.remove(putter)
+                    except ValueError:
+                        pass
+                    if not self.full() and not putter.cancelled():
+                        self._wakeup_next(self._putters)
+                    raise
+        return self.put_nowait(message)
+
+    def put_nowait(self, message: Dict[str, Any]) -> bool:
+        """
+        非阻塞入队
+
+        block策略下队满时抛出 asyncio.QueueFull；其它策略按规则丢弃或合并
+        （没有可丢弃的消息时丢弃新消息，紧急消息也不例外）。
+
+        Returns:
+            True: 已入队或已合并；False: 消息被丢弃
+        """
+        if self.overflow == OVERFLOW_COALESCE and self._coalesce(message):
+            return True
+
+        if self.full():
+            if self.overflow == OVERFLOW_BLOCK:
+                raise asyncio.QueueFull
+            if not self._make_room(message):
+                self._dropped += 1
+                return False
+
+        self._buckets[self._priority_of(message)].append(message)
+        self._size += 1
+        self._total_put += 1
+        if self._size > self._high_water:
+            self._high_water = self._size
+        self._wakeup_next(self._getters)
+        return True
+
+    def _coalesce(self, message: Dict[str, Any]) -> bool:
+        """
+        合并重复的report消息：同一发送者、同一上下文的旧report被新消息原位替换
+
+        Returns:
+            是否已合并
+        """
+        if message.get("type") != "report":
+            return False
+
+        bucket = self._buckets[self._priority_of(message)]
+        key = (message.get("from"), message.get("context"))
+        for index, queued in enumerate(bucket):
+            if queued.get("type") == "report" and (queued.get("from"), queued.get("context")) == key:
+                bucket[index] = message
+                self._coalesced += 1
+                return True
+        return False
+
+    def _evictable_level(self, incoming: Dict[str, Any]) -> Optional[int]:
+        """
+        队满时可以丢弃消息的桶：从最低优先级开始，优先级不高于新消息的非空桶
+        （normal 只能挤掉 normal，blocking 可以挤掉 normal/blocking，urgent 可以挤掉 normal/blocking，
+        紧急消息从不被挤掉）
+
+        Returns:
+            桶编号，没有可丢弃的消息时为None
+        """
+        incoming_level = self._priority_of(incoming)
+        for level in sorted(self._buckets, reverse=True):
+            if level < incoming_level or level == PRIORITY_ORDER["urgent"]:
+                break
+            if self._buckets[level]:
+                return level
+        return None
+
+    def _make_room(self, incoming: Dict[str, Any]) -> bool:
+        """
+        队满时腾出一个位置：丢弃可丢弃的桶（见 _evictable_level）中最早的消息
+
+        Returns:
+            是否腾出了位置（False 表示没有可丢弃的消息，新消息应被丢弃）
+        """
+        level = self._evictable_level(incoming)
+        if level is None:
+            return False
+        self._buckets[level].popleft()
+        self._size -= 1
+        self._dropped += 1
+        return True
+
+    # ==================== 出队 ====================
+
+    async def get(self) -> Dict[str, Any]:
+        """按优先级出队，队列为空时等待"""
+        while self.empty():
+            getter = asyncio.get_running_loop().create_future()
+            self._getters.append(getter)
+            try:
+                await getter
+            except BaseException:
+                getter.cancel()
+                try:
+                    self._getters.remove(getter)
+                except ValueError:
+                    pass
+                if not self.empty() and not getter.cancelled():
+                    self._wakeup_next(self._getters)
+                raise
+        return self.get_nowait()
+
+    def get_nowait(self) -> Dict[str, Any]:
+        """
+        非阻塞出队
+
+        Raises:
+            asyncio.QueueEmpty: 队列为空
+        """
+        for level in sorted(self._buckets):
+            bucket = self._buckets[level]
+            if bucket:
+                message = bucket.popleft()
+                self._size -= 1
+                self._wakeup_next(self._putters)
+                return message
+        raise asyncio.QueueEmpty
+
+    @staticmethod
+    def _wakeup_next(waiters: Deque[asyncio.Future]) -> None:
+        """唤醒下一个未取消的等待者"""
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
+
+    # ==================== 统计 ====================
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取队列统计
+
+        Returns:
+            {depth, high_water, maxsize, overflow, dropped, coalesced, blocked_puts, total_put}
+        """
+        return {
+            "depth": self._size,
+            "high_water": self._high_water,
+            "maxsize": self.maxsize,
+            "overflow": self.overflow,
+            "dropped": self._dropped,
+            "coalesced": self._coalesced,
+            "blocked_puts": self._blocked_puts,
+            "total_put": self._total_put
+        }
@@ -0,0 +1,300 @@
+"""
+文件: engine/bus_transport.py
+职责: 消息总线传输层 - 可插拔的跨进程消息传输（默认进程内）
+依赖: engine/message_broker.py, utils/logger.py
+被依赖: engine/message_bus.py
+
+关键接口:
+  - InMemoryTransport() - 进程内传输（默认，不跨进程）
+  - BrokerTransport(host, port, node_id, observe_all) - 通过TCP消息代理跨进程传输
+  - create_transport(name) - 按名称创建传输层（memory/broker）
+
+传输层接口:
+  - async start(on_message) - 连接并注册远端消息回调
+  - async publish(message) - 把本地发出的消息发布给其它节点
+  - register_agent(agent_id) / unregister_agent(agent_id) - 声明本节点的Agent
+  - async stop() - 断开连接
+  - get_stats() - 获取传输统计
+"""
+
+import asyncio
+import json
+import uuid
+from typing import Dict, Any, Awaitable, Callable, Optional, Set
+from pathlib import Path
+import sys
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from engine.message_broker import STREAM_LIMIT
+from utils.logger import setup_logger
+
+# 远端消息回调: async def on_message(message)
+RemoteHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class InMemoryTransport:
+    """
+    进程内传输
+
+    所有Agent都在同一个进程中，本地路由已经完成投递，
+    因此发布是空操作。这是默认传输层，行为与原来的消息总线一致。
+    """
+
+    name = "memory"
+    distributed = False
+
+    async def start(self, on_message: RemoteHandler) -> None:
+        """进程内传输无需连接"""
+        return None
+
+    async def publish(self, message: Dict[str, Any]) -> None:
+        """进程内传输无需发布"""
+        return None
+
+    def register_agent(self, agent_id: str) -> None:
+        """进程内传输无需声明Agent"""
+        return None
+
+    def unregister_agent(self, agent_id: str) -> None:
+        """进程内传输无需声明Agent"""
+        return None
+
+    async def stop(self) -> None:
+        """进程内传输无需断开"""
+        return None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取传输统计"""
+        return {"transport": self.name}
+
+
+class BrokerTransport:
+    """
+    消息代理传输
+
+    连接到 MessageBroker（engine/message_broker.py），本节点发出的消息
+    经代理转发给订阅了目标Agent的其它进程。连接断开时自动重连，
+    重连后重新声明本节点的Agent。
+    """
+
+    name = "broker"
+    distributed = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        node_id: Optional[str] = None,
+        observe_all: bool = False,
+        reconnect_delay: float = 0.5,
+        max_reconnect_delay: float = 5.0
+    ):
+        """
+        初始化代理传输
+
+        Args:
+            host: 代理地址
+            port: 代理端口
+            node_id: 本节点ID，None表示自动生成
+            observe_all: 是否接收所有消息（WebSocket网关等观察者节点）
+            reconnect_delay: 初始重连间隔（秒）
+            max_reconnect_delay: 最大重连间隔（秒）
+        """
+        self.host = host
+        self.port = port
+        self.node_id = node_id or f"node-{uuid.uuid4().hex[:8]}"
+        self.observe_all = observe_all
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        self._agents: Set[str] = set()
+        self._on_message: Optional[RemoteHandler] = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connected = asyncio.Event()
+        self._stopping = False
+
+        # 统计信息
+        self._published = 0
+        self._received = 0
+        self._publish_failures = 0
+        self._reconnects = 0
+
+        self.logger = setup_logger("bus_transport")
+
+    @property
+    def connected(self) -> bool:
+        """是否已连接到代理"""
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def start(self, on_message: RemoteHandler) -> None:
+        """
+        连接到代理并开始接收远端消息
+
+        Args:
+            on_message: 远端消息回调
+
+        Raises:
+            ConnectionError: 首次连接代理失败
+        """
+        self._on_message = on_message
+        self._stopping = False
+        self._connected = asyncio.Event()
+        await self._connect()
+        self._reader_task = asyncio.get_running_loop().create_task(self._read_loop())
+
+    async def _connect(self) -> None:
+        """建立连接并发送hello"""
+        reader, writer = await asyncio.open_connection(self.host, self.port, limit=STREAM_LIMIT)
+        self._reader = reader
+        self._writer = writer
+        self._send_frame({
+            "op": "hello",
+            "node": self.node_id,
+            "agents": sorted(self._agents),
+            "observe_all": self.observe_all
+        })
+        await writer.drain()
+        self._connected.set()
+        self.logger.info(f"节点 [{self.node_id}] 已连接消息代理 {self.host}:{self.port}")
+
+    async def _read_loop(self) -> None:
+        """读取代理转发的消息，断线后自动重连"""
+        delay = self.reconnect_delay
+        while not self._stopping:
+            try:
+                line = await self._reader.readline()
+                if not line:
+                    raise ConnectionError("消息代理关闭了连接")
+                delay = self.reconnect_delay
+
+                frame = json.loads(line)
+                if frame.get("op") == "deliver" and self._on_message is not None:
+                    self._received += 1
+                    try:
+                        await self._on_message(frame.get("message", {}))
+                    except Exception as e:
+                        self.logger.error(f"处理远端消息失败: {e}", exc_info=True)
+            except json.JSONDecodeError:
+                self.logger.warning("收到无法解析的数据帧，已忽略")
+            except asyncio.CancelledError:
+                raise
+            except (ConnectionError, OSError) as e:
+                if self._stopping:
+                    break
+                self._connected.clear()
+                self._writer = None
+                self.logger.warning(f"与消息代理的连接断开: {e}，{delay:.1f}秒后重连")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                try:
+                    await self._connect()
+                    self._reconnects += 1
+                except (ConnectionError, OSError):
+                    continue
+
+    def _send_frame(self, frame: Dict[str, Any]) -> None:
+        """写入一帧（不等待发送完成）"""
+        data = json.dumps(frame, ensure_ascii=False, default=str) + "\n"
+        self._writer.write(data.encode("utf-8"))
+
+    async def publish(self, message: Dict[str, Any]) -> None:
+        """
+        发布本地消息给其它节点
+
+        未连接时消息被丢弃并计数（本地投递不受影响）
+
+        Args:
+            message: 消息字典
+        """
+        if not self.connected:
+            self._publish_failures += 1
+            self.logger.warning("未连接消息代理，消息未能发布到其它节点")
+            return
+
+        try:
+            self._send_frame({"op": "publish", "message": message})
+            await self._writer.drain()
+            self._published += 1
+        except (ConnectionError, OSError) as e:
+            self._publish_failures += 1
+            self.logger.error(f"发布消息失败: {e}")
+
+    def register_agent(self, agent_id: str) -> None:
+        """声明本节点上的Agent，代理会把发给它的消息转发到本节点"""
+        self._agents.add(agent_id)
+        if self.connected:
+            self._send_frame({"op": "subscribe", "agent": agent_id})
+
+    def unregister_agent(self, agent_id: str) -> None:
+        """取消声明本节点上的Agent"""
+        self._agents.discard(agent_id)
+        if self.connected:
+            self._send_frame({"op": "unsubscribe", "agent": agent_id})
+
+    async def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        """等待连接建立（重连期间使用）"""
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def stop(self) -> None:
+        """断开与代理的连接"""
+        self._stopping = True
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._connected.clear()
+        self.logger.info(f"节点 [{self.node_id}] 已断开消息代理")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取传输统计
+
+        Returns:
+            {transport, node_id, connected, agents, published, received, publish_failures, reconnects}
+        """
+        return {
+            "transport": self.name,
+            "node_id": self.node_id,
+            "connected": self.connected,
+            "agents": sorted(self._agents),
+            "published": self._published,
+            "received": self._received,
+            "publish_failures": self._publish_failures,
+            "reconnects": self._reconnects
+        }
+
+
+def create_transport(name: str = "memory", **kwargs):
+    """
+    按名称创建传输层
+
+    Args:
+        name: memory（进程内）或 broker（消息代理）
+        **kwargs: 传给传输层构造函数的参数
+
+    Returns:
+        传输层实例
+
+    Raises:
+        ValueError: 不支持的传输层名称
+    """
+    if name == InMemoryTransport.name:
+        return InMemoryTransport()
+    if name == BrokerTransport.name:
+        return BrokerTransport(**kwargs)
+    raise ValueError(f"不支持的消息总线传输层: {name}，可选: memory, broker")
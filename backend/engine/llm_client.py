@@ -1,17 +1,25 @@
 """
 文件: engine/llm_client.py
 职责: 封装LLM API调用，主力使用Gemini 3 Pro，兼容多模型切换
-依赖: google.generativeai, config.py
+依赖: google.generativeai, config.py, utils/tracer.py
 被依赖: engine/agent.py
 
 P11新增功能:
 - 集成Context Caching，支持缓存长文档减少Token消耗
 - 添加响应长度限制配置
+
+进程内共享:
+- 同一模型的 GenerativeModel 实例在所有客户端间共享（客户端自身保存各Agent的文档缓存，不共享）
+- 所有客户端的API请求经过同一个并发上限（LLM_MAX_CONCURRENT_REQUESTS），
+  批量并发运行多个项目时不会同时发出过多请求
+- get_llm_request_stats() - 获取进程内LLM请求统计
 """
 
 import os
 import sys
-from typing import List, Dict, Any, Optional
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional
 import asyncio
 from pathlib import Path
 
@@ -39,6 +47,7 @@ except ImportError:
 from config import Config
 from utils.logger import setup_logger
 from utils.retry import async_retry
+from utils.tracer import trace_span
 
 # P11: 导入缓存管理器
 try:
@@ -48,6 +57,97 @@ except ImportError:
     CACHE_AVAILABLE = False
 
 
+# 默认生成配置
+DEFAULT_GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 8192,
+}
+
+# 进程内共享的模型实例: {(model_name, temperature): GenerativeModel}
+_shared_models: Dict[tuple, Any] = {}
+_configured_api_key: Optional[str] = None
+
+# 进程内LLM请求并发上限，每个事件循环一个信号量
+_request_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+_request_stats = {
+    "requests": 0,
+    "active": 0,
+    "peak_active": 0,
+    "queued_seconds": 0.0
+}
+
+
+def _get_shared_model(model_name: str, api_key: str, temperature: Optional[float] = None):
+    """获取（必要时创建）模型的共享实例，temperature为None时使用默认生成配置"""
+    global _configured_api_key
+    if _configured_api_key != api_key:
+        genai.configure(api_key=api_key)
+        _configured_api_key = api_key
+        _shared_models.clear()
+    
+    generation_config = dict(DEFAULT_GENERATION_CONFIG)
+    if temperature is not None:
+        generation_config["temperature"] = temperature
+    key = (model_name, generation_config["temperature"])
+    
+    model = _shared_models.get(key)
+    if model is None:
+        model = genai.GenerativeModel(
+            model_name=model_name,
+            generation_config=generation_config
+        )
+        _shared_models[key] = model
+    return model
+
+
+async def _run_llm_request(call: Callable[[], Any]) -> Any:
+    """
+    在线程池中执行一次同步的LLM API调用，受进程内并发上限约束
+    
+    Args:
+        call: 同步调用（Gemini SDK 不支持原生异步）
+    
+    Returns:
+        调用结果
+    """
+    loop = asyncio.get_running_loop()
+    slots = None
+    if Config.LLM_MAX_CONCURRENT_REQUESTS > 0:
+        slots = _request_slots.get(loop)
+        if slots is None:
+            slots = asyncio.Semaphore(Config.LLM_MAX_CONCURRENT_REQUESTS)
+            _request_slots[loop] = slots
+    
+    queued_at = time.monotonic()
+    if slots is not None:
+        with trace_span("llm.queue", "queue") as span:
+            if not slots.locked():
+                span.discard()
+            await slots.acquire()
+    _request_stats["queued_seconds"] += time.monotonic() - queued_at
+    _request_stats["requests"] += 1
+    _request_stats["active"] += 1
+    _request_stats["peak_active"] = max(_request_stats["peak_active"], _request_stats["active"])
+    try:
+        with trace_span("llm.request", "llm"):
+            return await loop.run_in_executor(None, call)
+    finally:
+        _request_stats["active"] -= 1
+        if slots is not None:
+            slots.release()
+
+
+def get_llm_request_stats() -> Dict[str, Any]:
+    """获取进程内LLM请求统计（请求数、当前/峰值并发、排队总时间）"""
+    return {
+        "max_concurrent": Config.LLM_MAX_CONCURRENT_REQUESTS,
+        **_request_stats,
+        "queued_seconds": round(_request_stats["queued_seconds"], 3)
+    }
+
+
 class LLMClient:
     """
     LLM API 客户端
@@ -73,22 +173,11 @@ class LLMClient:
         if not self.api_key:
             raise ValueError("未设置 GOOGLE_API_KEY，请检查 .env 文件")
         
-        # 配置 Gemini API
-        genai.configure(api_key=self.api_key)
-        
         # 创建生成配置
-        self.generation_config = {
-            "temperature": 0.7,
-            "top_p": 0.95,
-            "top_k": 40,
-            "max_output_tokens": 8192,
-        }
+        self.generation_config = dict(DEFAULT_GENERATION_CONFIG)
         
-        # 创建模型实例
-        self.model = genai.GenerativeModel(
-            model_name=self.model_name,
-            generation_config=self.generation_config
-        )
+        # 配置 Gemini API 并获取模型实例（同一模型在进程内共享）
+        self.model = _get_shared_model(self.model_name, self.api_key)
         
         # 创建日志器
         self.logger = setup_logger(
@@ -121,7 +210,8 @@ class LLMClient:
     async def generate_response(
         self,
         messages: List[Dict[str, str]],
-        system_prompt: Optional[str] = None
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None
     ) -> str:
         """
         生成 LLM 响应（异步，带重试机制）
@@ -134,6 +224,7 @@ class LLMClient:
         Args:
             messages: 对话历史，格式为 [{"role": "user/model", "content": "..."}]
             system_prompt: 系统提示词（Agent 的角色定义）
+            temperature: 本次请求的采样温度，None表示使用默认配置（多候选生成时使用不同温度）
         
         Returns:
             LLM 生成的响应文本
@@ -162,11 +253,13 @@ class LLMClient:
             self.logger.debug(f"调用 LLM: {self.model_name}")
             self.logger.debug(f"提示词长度: {len(full_prompt)} 字符")
             
+            model = self.model
+            if temperature is not None and temperature != self.generation_config["temperature"]:
+                model = _get_shared_model(self.model_name, self.api_key, temperature)
+            
             # 在新线程中调用同步API（因为 Gemini SDK 不支持原生异步）
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.model.generate_content(full_prompt)
+            response = await _run_llm_request(
+                lambda: model.generate_content(full_prompt)
             )
             
             # 提取响应文本
@@ -324,15 +417,16 @@ class LLMClient:
             if max_response_tokens:
                 gen_config["max_output_tokens"] = max_response_tokens
             
-            # 在线程池中调用同步API
-            loop = asyncio.get_event_loop()
-            model = genai.GenerativeModel(
-                model_name=self.model_name,
-                generation_config=gen_config
-            )
+            # 在线程池中调用同步API（生成配置与默认相同时复用共享模型）
+            if gen_config == self.generation_config:
+                model = self.model
+            else:
+                model = genai.GenerativeModel(
+                    model_name=self.model_name,
+                    generation_config=gen_config
+                )
             
-            response = await loop.run_in_executor(
-                None,
+            response = await _run_llm_request(
                 lambda: model.generate_content(full_prompt)
             )
             
@@ -0,0 +1,226 @@
+"""
+文件: engine/message_broker.py
+职责: 轻量消息代理 - 纯Python实现的TCP消息代理，让多个进程共享一条消息总线
+依赖: utils/logger.py
+被依赖: engine/bus_transport.py（作为客户端连接）
+
+关键接口:
+  - MessageBroker(host, port) - 创建消息代理
+  - async start() / async stop() - 启动/停止代理服务
+  - get_stats() - 获取节点和转发统计
+  - python backend/engine/message_broker.py --port 8765 - 独立运行代理
+
+协议（每行一个JSON对象）:
+  节点 → 代理:
+    {"op": "hello", "node": "节点ID", "agents": [...], "observe_all": bool}
+    {"op": "subscribe", "agent": "agent_id"}
+    {"op": "unsubscribe", "agent": "agent_id"}
+    {"op": "publish", "message": {...}}
+  代理 → 节点:
+    {"op": "deliver", "origin": "来源节点ID", "message": {...}}
+
+路由规则:
+  - to 为 "all"/"boss" 的消息转发给所有其它节点
+  - 点对点消息只转发给订阅了目标Agent（或其项目作用域地址）的节点，以及 observe_all 节点（如WebSocket网关）
+"""
+
+import argparse
+import asyncio
+import json
+from typing import Dict, Any, Optional, Set
+from pathlib import Path
+import sys
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from utils.logger import setup_logger
+
+# 单行消息上限（生成的代码可能较长）
+STREAM_LIMIT = 16 * 1024 * 1024
+
+
+class _BrokerNode:
+    """代理端记录的一个已连接节点"""
+
+    __slots__ = ("node_id", "writer", "agents", "observe_all")
+
+    def __init__(self, node_id: str, writer: asyncio.StreamWriter):
+        self.node_id = node_id
+        self.writer = writer
+        self.agents: Set[str] = set()
+        self.observe_all = False
+
+
+class MessageBroker:
+    """
+    消息代理
+
+    多个进程中的 MessageBus 通过 BrokerTransport 连接到同一个代理，
+    代理按目标Agent把消息转发给对应的节点。
+    代理只做转发，不保存消息，频率限制和历史记录仍在各节点完成。
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765):
+        """
+        初始化消息代理
+
+        Args:
+            host: 监听地址
+            port: 监听端口，0表示随机分配
+        """
+        self.host = host
+        self.port = port
+
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._nodes: Dict[str, _BrokerNode] = {}
+        self._handlers: Set[asyncio.Task] = set()
+
+        # 统计信息
+        self._published = 0
+        self._delivered = 0
+
+        self.logger = setup_logger("message_broker")
+
+    async def start(self) -> None:
+        """启动代理服务"""
+        self._server = await asyncio.start_server(
+            self._handle_node, self.host, self.port, limit=STREAM_LIMIT
+        )
+        # 端口为0时取实际分配的端口
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.logger.info(f"消息代理已启动: {self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        """停止代理服务并断开所有节点"""
+        for node in list(self._nodes.values()):
+            node.writer.close()
+        self._nodes.clear()
+
+        # 等待连接处理任务在读到EOF后自行结束
+        if self._handlers:
+            await asyncio.wait(list(self._handlers), timeout=1.0)
+
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self.logger.info("消息代理已停止")
+
+    async def serve_forever(self) -> None:
+        """启动并一直运行（独立进程模式）"""
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _handle_node(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """处理一个节点连接"""
+        node: Optional[_BrokerNode] = None
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                try:
+                    frame = json.loads(line)
+                except json.JSONDecodeError:
+                    self.logger.warning("收到无法解析的数据帧，已忽略")
+                    continue
+
+                op = frame.get("op")
+                if op == "hello":
+                    node = _BrokerNode(frame.get("node") or f"node-{id(writer)}", writer)
+                    node.agents.update(frame.get("agents", []))
+                    node.observe_all = bool(frame.get("observe_all", False))
+                    self._nodes[node.node_id] = node
+                    self.logger.info(
+                        f"节点 [{node.node_id}] 已连接，Agent: {sorted(node.agents)} "
+                        f"(当前节点数: {len(self._nodes)})"
+                    )
+                elif node is None:
+                    self.logger.warning("节点未发送hello，忽略数据帧")
+                elif op == "subscribe":
+                    node.agents.add(frame.get("agent"))
+                elif op == "unsubscribe":
+                    node.agents.discard(frame.get("agent"))
+                elif op == "publish":
+                    await self._route(node, frame.get("message", {}))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if node is not None and self._nodes.get(node.node_id) is node:
+                del self._nodes[node.node_id]
+                self.logger.info(f"节点 [{node.node_id}] 已断开 (当前节点数: {len(self._nodes)})")
+            writer.close()
+            self._handlers.discard(task)
+
+    async def _route(self, origin: _BrokerNode, message: Dict[str, Any]) -> None:
+        """
+        把消息转发给目标节点
+
+        Args:
+            origin: 来源节点
+            message: 消息字典
+        """
+        self._published += 1
+        to_agent = message.get("to")
+        fan_out = to_agent in ("all", "boss")
+        # 节点可能以项目作用域地址订阅（"programmer@snake_game"）
+        scoped = f"{to_agent}@{message['project']}" if message.get("project") else None
+
+        targets = [
+            node for node in self._nodes.values()
+            if node is not origin and (
+                fan_out or node.observe_all or to_agent in node.agents or scoped in node.agents
+            )
+        ]
+        if not targets:
+            return
+
+        data = (json.dumps(
+            {"op": "deliver", "origin": origin.node_id, "message": message},
+            ensure_ascii=False, default=str
+        ) + "\n").encode("utf-8")
+
+        for node in targets:
+            node.writer.write(data)
+        results = await asyncio.gather(
+            *(node.writer.drain() for node in targets), return_exceptions=True
+        )
+        for node, result in zip(targets, results):
+            if isinstance(result, Exception):
+                self.logger.error(f"转发到节点 [{node.node_id}] 失败: {result}")
+            else:
+                self._delivered += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取代理统计
+
+        Returns:
+            {nodes, published, delivered}
+        """
+        return {
+            "nodes": {
+                node_id: {"agents": sorted(node.agents), "observe_all": node.observe_all}
+                for node_id, node in self._nodes.items()
+            },
+            "published": self._published,
+            "delivered": self._delivered
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AI Company 消息代理")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(MessageBroker(args.host, args.port).serve_forever())
+    except KeyboardInterrupt:
+        pass
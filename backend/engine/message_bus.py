@@ -1,14 +1,23 @@
 """
 文件: engine/message_bus.py
 职责: Agent间消息路由、记录和推送
-依赖: utils/logger.py
+依赖: utils/logger.py, utils/tracer.py, engine/bus_transport.py
 被依赖: api/websocket_handler.py, agents/*.py
 
 关键接口:
   - MessageBus() - 创建消息总线实例(单例)
   - async send(message) - 发送消息
-  - subscribe(agent_id, callback) - 订阅消息
+  - subscribe(agent_id, callback, maxsize, overflow) - 订阅消息（有界队列+溢出策略）
+  - scoped_agent_id(agent_id, project) - 项目作用域的Agent地址（同一进程并发运行多个项目时使用）
+  - subscribe_websocket(callback, batch, project) - 订阅前端推送（后台批量推送，可只接收某个项目的消息）
+  - subscribe_topic(pattern, callback) - 按主题模式订阅，如 "project.x.agent.programmer.*"、"*.report"
+  - unsubscribe_topic(subscription) - 取消主题订阅
   - get_history(limit) - 获取历史消息
+  - configure_project_limits(project_id, max_messages) - 按项目配置频率限制
+  - get_queue_stats() - 获取各Agent队列深度和高水位
+  - async flush_websockets(timeout) - 等待WebSocket推送缓冲区清空
+  - async use_transport(transport) - 切换传输层（跨进程时使用BrokerTransport）
+  - async connect_transport() / async disconnect_transport() - 按配置连接/断开传输层
 """
 
 import asyncio
@@ -22,7 +31,42 @@ import sys
 backend_path = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_path))
 
+from config import Config
+from engine.rate_limiter import SlidingWindowRateLimiter
+from engine.agent_queue import AgentMessageQueue, OVERFLOW_DROP_OLDEST
+from engine.outbound_dispatcher import OutboundDispatcher
+from engine.bus_transport import InMemoryTransport, create_transport
+from engine.topic_router import TopicRouter, TopicSubscription, message_topic
 from utils.logger import setup_logger
+from utils.tracer import trace_span
+
+# 项目作用域地址的分隔符: "programmer@snake_game"
+SCOPE_SEPARATOR = "@"
+
+
+def scoped_agent_id(agent_id: str, project: Optional[str] = None) -> str:
+    """
+    生成项目作用域的Agent地址
+    
+    以作用域地址订阅的Agent只接收该项目的消息。消息本身仍使用普通ID
+    （"to": "programmer", "project": "snake_game"），由总线解析到作用域地址，
+    因此多个项目可以在同一进程中各自拥有一套同名Agent。
+    
+    Args:
+        agent_id: Agent ID
+        project: 项目ID，为空时返回原ID
+    
+    Returns:
+        作用域地址，如 "programmer@snake_game"
+    """
+    return f"{agent_id}{SCOPE_SEPARATOR}{project}" if project else agent_id
+
+
+def _scope_of(address: str) -> Optional[str]:
+    """作用域地址所属的项目，普通地址返回None"""
+    if SCOPE_SEPARATOR not in address:
+        return None
+    return address.split(SCOPE_SEPARATOR, 1)[1]
 
 
 class MessageBus:
@@ -58,15 +102,30 @@ class MessageBus:
         # Agent订阅: {agent_id: callback}
         self.subscribers: Dict[str, Callable] = {}
         
-        # WebSocket订阅者(用于实时推送到前端)
-        self.websocket_callbacks: List[Callable] = []
+        # WebSocket推送管道(后台任务批量推送到前端，不阻塞消息路由)
+        self.outbound = OutboundDispatcher(
+            max_buffer=Config.WS_OUTBOUND_BUFFER,
+            batch_size=Config.WS_OUTBOUND_BATCH_SIZE,
+            callback_timeout=Config.WS_CALLBACK_TIMEOUT
+        )
         
-        # 消息队列: {agent_id: asyncio.Queue}
-        self.message_queues: Dict[str, asyncio.Queue] = {}
+        # 消息队列: {agent_id: AgentMessageQueue}（有界优先级队列）
+        self.message_queues: Dict[str, AgentMessageQueue] = {}
+        self.queue_maxsize = Config.AGENT_QUEUE_MAXSIZE
+        self.queue_overflow = Config.AGENT_QUEUE_OVERFLOW
+        
+        # 主题订阅(观察者、日志、指标等)，每个订阅者有独立队列
+        self.topic_router = TopicRouter()
+        
+        # 消息频率限制: 同一对Agent之间每个窗口最多N条消息(滑动窗口，O(1)判定)
+        self.max_messages_per_minute = Config.MESSAGE_RATE_LIMIT
+        self.rate_limiter = SlidingWindowRateLimiter(
+            max_messages=Config.MESSAGE_RATE_LIMIT,
+            window_seconds=Config.MESSAGE_RATE_WINDOW
+        )
         
-        # 消息频率限制: {(from, to): [(timestamp, count), ...]}
-        self.rate_limits: Dict[tuple, List[tuple]] = {}
-        self.max_messages_per_minute = 10  # 同一对Agent之间每分钟最多10条消息
+        # 传输层: 默认进程内，跨进程时切换为消息代理
+        self.transport = InMemoryTransport()
         
         # 日志器
         self.logger = setup_logger("message_bus")
@@ -75,7 +134,13 @@ class MessageBus:
         
         self.logger.info("消息总线初始化成功")
     
-    def subscribe(self, agent_id: str, callback: Callable) -> None:
+    def subscribe(
+        self,
+        agent_id: str,
+        callback: Callable,
+        maxsize: Optional[int] = None,
+        overflow: Optional[str] = None
+    ) -> None:
         """
         订阅消息
         
@@ -84,76 +149,201 @@ class MessageBus:
         Args:
             agent_id: Agent的唯一标识符
             callback: 消息处理回调函数 async def callback(message)
+            maxsize: 消息队列容量，None表示使用默认配置
+            overflow: 队满时的溢出策略 block/drop_oldest/coalesce，None表示使用默认配置
         """
         self.subscribers[agent_id] = callback
         
-        # 为Agent创建消息队列
+        # 为Agent创建有界消息队列
         if agent_id not in self.message_queues:
-            self.message_queues[agent_id] = asyncio.Queue()
+            self.message_queues[agent_id] = AgentMessageQueue(
+                maxsize=maxsize if maxsize is not None else self.queue_maxsize,
+                overflow=overflow or self.queue_overflow
+            )
+        
+        # 声明到传输层，其它进程发给该Agent的消息会转发到本进程
+        self.transport.register_agent(agent_id)
         
         self.logger.info(f"Agent [{agent_id}] 已订阅消息总线")
     
-    def unsubscribe(self, agent_id: str) -> None:
+    def unsubscribe(self, agent_id: str, drop_queue: bool = False) -> None:
         """
         取消订阅
         
         Args:
             agent_id: Agent的唯一标识符
+            drop_queue: 是否同时删除消息队列（项目结束后释放作用域地址）
         """
         if agent_id in self.subscribers:
             del self.subscribers[agent_id]
+            self.transport.unregister_agent(agent_id)
             self.logger.info(f"Agent [{agent_id}] 已取消订阅")
+        if drop_queue:
+            self.message_queues.pop(agent_id, None)
+    
+    def _resolve_agent(self, agent_id: str, project: Optional[str]) -> str:
+        """点对点消息的投递地址: 优先使用该项目的作用域地址"""
+        if project:
+            scoped = scoped_agent_id(agent_id, project)
+            if scoped in self.message_queues:
+                return scoped
+        return agent_id
+    
+    def subscribe_topic(
+        self,
+        pattern: str,
+        callback: Optional[Callable] = None,
+        subscriber_id: Optional[str] = None,
+        maxsize: Optional[int] = None,
+        overflow: Optional[str] = None
+    ) -> TopicSubscription:
+        """
+        按主题模式订阅消息
+        
+        主题格式为 project.{项目}.agent.{接收者}.{类型}，"*"匹配一个或多个段，
+        "#"匹配零个或多个段。匹配在总线端完成，订阅者只收到需要的消息。
+        
+        Args:
+            pattern: 订阅模式，如 "project.snake.agent.programmer.*"、"*.report"
+            callback: 可选的回调 async def callback(message)，为None时通过 subscription.get() 拉取
+            subscriber_id: 订阅者标识，None表示自动生成
+            maxsize: 订阅队列容量，None表示使用默认配置
+            overflow: 订阅队列溢出策略 drop_oldest/coalesce，None表示 drop_oldest
+                （不沿用Agent队列的配置：订阅者是观察者，不能用 block 拖慢消息路由）
+        
+        Returns:
+            TopicSubscription 订阅对象
+        
+        Raises:
+            ValueError: 溢出策略为 block
+        """
+        subscription = TopicSubscription(
+            pattern,
+            AgentMessageQueue(
+                maxsize=maxsize if maxsize is not None else self.queue_maxsize,
+                overflow=overflow or OVERFLOW_DROP_OLDEST
+            ),
+            callback=callback,
+            subscriber_id=subscriber_id,
+            callback_timeout=Config.WS_CALLBACK_TIMEOUT
+        )
+        self.topic_router.add(subscription)
+        self.logger.info(f"主题订阅 [{subscription.subscriber_id}] 已添加: {pattern}")
+        return subscription
     
-    def subscribe_websocket(self, callback: Callable) -> None:
+    def unsubscribe_topic(self, subscription) -> None:
+        """
+        取消主题订阅
+        
+        Args:
+            subscription: TopicSubscription 对象或订阅者ID
+        """
+        subscriber_id = getattr(subscription, "subscriber_id", subscription)
+        if self.topic_router.remove(subscriber_id) is not None:
+            self.logger.info(f"主题订阅 [{subscriber_id}] 已取消")
+    
+    def subscribe_websocket(self, callback: Callable, batch: bool = False, project: Optional[str] = None) -> None:
         """
         订阅WebSocket推送
         
-        前端通过WebSocket接收实时消息
+        前端通过WebSocket接收实时消息，推送在后台任务中进行
         
         Args:
             callback: WebSocket推送回调函数
+            batch: True表示回调一次接收一批消息(列表)
+            project: 只推送该项目的消息（消息的 "project" 字段），None表示推送全部消息
+        """
+        self.outbound.add_callback(callback, batch=batch, project=project)
+        self.logger.info(f"WebSocket订阅者已添加，当前订阅者数量: {self.outbound.callback_count}")
+    
+    def unsubscribe_websocket(self, callback: Callable) -> None:
+        """
+        取消WebSocket推送订阅
+        
+        Args:
+            callback: 订阅时传入的回调函数
         """
-        self.websocket_callbacks.append(callback)
-        self.logger.info(f"WebSocket订阅者已添加，当前订阅者数量: {len(self.websocket_callbacks)}")
+        self.outbound.remove_callback(callback)
     
-    def _check_rate_limit(self, from_agent: str, to_agent: str) -> bool:
+    async def use_transport(self, transport) -> None:
+        """
+        切换传输层
+        
+        已订阅的Agent会声明到新传输层，旧传输层会被断开
+        
+        Args:
+            transport: InMemoryTransport / BrokerTransport 实例
+        
+        Raises:
+            ConnectionError: 新传输层连接失败(此时仍使用旧传输层)
+        """
+        for agent_id in self.message_queues:
+            transport.register_agent(agent_id)
+        await transport.start(self._on_remote_message)
+        
+        old_transport = self.transport
+        self.transport = transport
+        await old_transport.stop()
+        
+        self.logger.info(f"消息总线传输层: {transport.name}")
+    
+    async def connect_transport(self) -> None:
+        """按配置(MESSAGE_BUS_TRANSPORT等)创建并连接传输层"""
+        transport = create_transport(
+            Config.MESSAGE_BUS_TRANSPORT,
+            host=Config.MESSAGE_BROKER_HOST,
+            port=Config.MESSAGE_BROKER_PORT,
+            node_id=Config.MESSAGE_BUS_NODE_ID or None,
+            observe_all=Config.MESSAGE_BUS_OBSERVE_ALL
+        )
+        await self.use_transport(transport)
+    
+    async def disconnect_transport(self) -> None:
+        """断开当前传输层，恢复进程内传输"""
+        await self.use_transport(InMemoryTransport())
+    
+    def configure_project_limits(
+        self,
+        project_id: str,
+        max_messages: int,
+        window_seconds: Optional[float] = None
+    ) -> None:
+        """
+        为指定项目配置消息频率限制
+        
+        Args:
+            project_id: 项目ID（对应消息中的 "project" 字段）
+            max_messages: 每个窗口内同一对Agent之间允许的最大消息数
+            window_seconds: 窗口长度（秒），None表示沿用默认值
+        """
+        self.rate_limiter.configure_scope(project_id, max_messages, window_seconds)
+        self.logger.info(f"项目 [{project_id}] 消息频率限制: {max_messages} 条/窗口")
+    
+    def _check_rate_limit(self, from_agent: str, to_agent: str, project_id: Optional[str] = None) -> bool:
         """
         检查消息频率是否超限
         
-        同一对Agent之间每分钟最多10条消息
+        同一对Agent之间每个窗口(默认1分钟)最多N条消息(默认10条)
         
         Args:
             from_agent: 发送者
             to_agent: 接收者
+            project_id: 项目ID，用于查找项目级限额
         
         Returns:
             True: 未超限，可以发送
             False: 已超限，拒绝发送
         """
-        key = (from_agent, to_agent)
-        now = datetime.now().timestamp()
-        
-        # 清理1分钟前的记录
-        if key in self.rate_limits:
-            self.rate_limits[key] = [
-                (ts, count) for ts, count in self.rate_limits[key]
-                if now - ts < 60
-            ]
-        else:
-            self.rate_limits[key] = []
-        
-        # 检查是否超限(检查现有消息数，不包括本次)
-        recent_count = sum(count for _, count in self.rate_limits[key])
-        if recent_count >= self.max_messages_per_minute:
-            self.logger.warning(
-                f"消息频率超限: [{from_agent}] → [{to_agent}] "
-                f"({recent_count}/{self.max_messages_per_minute} 消息/分钟)"
-            )
-            return False
-        
-        # 检查通过后，记录本次发送
-        self.rate_limits[key].append((now, 1))
-        return True
+        if self.rate_limiter.allow((from_agent, to_agent), scope=project_id):
+            return True
+        
+        limit, window = self.rate_limiter.get_limits(project_id)
+        self.logger.warning(
+            f"消息频率超限: [{from_agent}] → [{to_agent}] "
+            f"(上限 {limit} 条/{window:.0f}秒，累计拒绝 "
+            f"{self.rate_limiter.get_stats()['rejected']} 条)"
+        )
+        return False
     
     async def send(self, message: Dict[str, Any]) -> bool:
         """
@@ -186,7 +376,7 @@ class MessageBus:
         
         # 检查频率限制(紧急消息除外)
         if priority != "urgent" and to_agent != "all" and to_agent != "boss":
-            if not self._check_rate_limit(from_agent, to_agent):
+            if not self._check_rate_limit(from_agent, to_agent, message.get("project")):
                 return False
         
         # 记录到历史
@@ -201,21 +391,74 @@ class MessageBus:
             f"类型:{msg_type} 优先级:{priority} 内容:{content_preview}..."
         )
         
-        # 推送到WebSocket(实时显示)
-        await self._push_to_websockets(message)
+        # 推送到WebSocket(实时显示)，只入缓冲区，不等待前端
+        self._push_to_websockets(message)
+        
+        with trace_span("bus.send", "bus", sender=from_agent, to=to_agent, type=msg_type):
+            # 路由消息
+            if to_agent == "all":
+                # 广播消息
+                await self._broadcast(message)
+            elif to_agent == "boss":
+                # 发给老板(人类介入)
+                await self._send_to_boss(message)
+            else:
+                # 点对点消息（有项目作用域地址时投递到该项目的Agent）
+                await self._send_to_agent(self._resolve_agent(to_agent, message.get("project")), message)
+            
+            # 投递给匹配的主题订阅者
+            await self._publish_topic(message)
+            
+            # 发布给其它进程(进程内传输时为空操作)
+            await self.transport.publish(message)
+        
+        return True
+    
+    async def _on_remote_message(self, message: Dict[str, Any]) -> None:
+        """
+        处理其它进程经传输层转发来的消息
+        
+        频率限制已在发送方进程完成，这里只记录、推送和本地投递，不再发布
         
-        # 路由消息
+        Args:
+            message: 消息内容
+        """
+        self.message_history.append(message)
+        if len(self.message_history) > self.max_history:
+            self.message_history.pop(0)
+        
+        self._push_to_websockets(message)
+        
+        to_agent = message.get("to")
         if to_agent == "all":
-            # 广播消息
             await self._broadcast(message)
         elif to_agent == "boss":
-            # 发给老板(人类介入)
             await self._send_to_boss(message)
         else:
-            # 点对点消息
-            await self._send_to_agent(to_agent, message)
+            target = self._resolve_agent(to_agent, message.get("project"))
+            if target in self.message_queues:
+                await self._send_to_agent(target, message)
         
-        return True
+        await self._publish_topic(message)
+    
+    async def _publish_topic(self, message: Dict[str, Any]) -> None:
+        """
+        把消息投递给主题匹配的订阅者
+        
+        Args:
+            message: 消息内容
+        """
+        if not len(self.topic_router):
+            return
+        
+        topic = message_topic(message)
+        subscriptions = self.topic_router.match(topic)
+        if not subscriptions:
+            return
+        
+        for subscription in subscriptions:
+            if not subscription.deliver(message):
+                self.logger.warning(f"主题订阅 [{subscription.subscriber_id}] 队列已满，消息被丢弃 ({topic})")
     
     async def _send_to_agent(self, agent_id: str, message: Dict[str, Any]) -> None:
         """
@@ -226,8 +469,13 @@ class MessageBus:
             message: 消息内容
         """
         if agent_id in self.message_queues:
-            await self.message_queues[agent_id].put(message)
-            self.logger.debug(f"消息已加入 [{agent_id}] 的队列")
+            queued = await self.message_queues[agent_id].put(message)
+            if queued:
+                self.logger.debug(f"消息已加入 [{agent_id}] 的队列")
+            else:
+                self.logger.warning(f"Agent [{agent_id}] 队列已满，消息被丢弃")
+        elif self.transport.distributed:
+            self.logger.debug(f"Agent [{agent_id}] 不在本进程，消息交给传输层转发")
         else:
             self.logger.warning(f"Agent [{agent_id}] 未订阅消息总线，消息丢失")
     
@@ -240,10 +488,19 @@ class MessageBus:
         """
         self.logger.debug(f"广播消息给 {len(self.message_queues)} 个Agent")
         
-        for agent_id, queue in self.message_queues.items():
-            # 不发给自己
-            if agent_id != message.get("from"):
-                await queue.put(message)
+        # 并发入队，block策略下某个慢Agent不会拖住其它Agent的投递
+        # 不发给自己，也不发给其它项目作用域下的Agent
+        project = message.get("project")
+        sender = message.get("from")
+        senders = {sender, scoped_agent_id(sender, project)} if sender else set()
+        targets = [
+            (agent_id, queue) for agent_id, queue in self.message_queues.items()
+            if agent_id not in senders and _scope_of(agent_id) in (None, project)
+        ]
+        results = await asyncio.gather(*(queue.put(message) for _, queue in targets))
+        for (agent_id, _), queued in zip(targets, results):
+            if not queued:
+                self.logger.warning(f"Agent [{agent_id}] 队列已满，广播消息被丢弃")
     
     async def _send_to_boss(self, message: Dict[str, Any]) -> None:
         """
@@ -260,19 +517,28 @@ class MessageBus:
         # 实际的等待逻辑在 P7 阶段实现
         pass
     
-    async def _push_to_websockets(self, message: Dict[str, Any]) -> None:
+    def _push_to_websockets(self, message: Dict[str, Any]) -> None:
         """
-        推送消息到所有WebSocket订阅者
+        把消息放入WebSocket推送管道
+        
+        推送由后台任务完成，连接数量和速度不影响Agent间的消息路由
         
         Args:
             message: 消息内容
         """
-        if not self.websocket_callbacks:
-            return
+        self.outbound.enqueue(message)
+    
+    async def flush_websockets(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待WebSocket推送缓冲区中的消息推送完毕
         
-        # 异步推送到所有WebSocket
-        tasks = [callback(message) for callback in self.websocket_callbacks]
-        await asyncio.gather(*tasks, return_exceptions=True)
+        Args:
+            timeout: 最长等待时间(秒)，None表示一直等待
+        
+        Returns:
+            True: 已推送完毕；False: 超时
+        """
+        return await self.outbound.flush(timeout)
     
     async def receive(self, agent_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
         """
@@ -289,18 +555,22 @@ class MessageBus:
             self.logger.warning(f"Agent [{agent_id}] 未订阅消息总线")
             return None
         
-        try:
-            if timeout is None:
-                message = await self.message_queues[agent_id].get()
-            else:
-                message = await asyncio.wait_for(
-                    self.message_queues[agent_id].get(),
-                    timeout=timeout
-                )
-            
-            return message
-        except asyncio.TimeoutError:
-            return None
+        # 只记录收到消息的等待，空轮询不计入追踪
+        with trace_span("bus.receive", "queue", receiver=agent_id) as span:
+            try:
+                if timeout is None:
+                    message = await self.message_queues[agent_id].get()
+                else:
+                    message = await asyncio.wait_for(
+                        self.message_queues[agent_id].get(),
+                        timeout=timeout
+                    )
+                
+                span.set(sender=message.get("from"), type=message.get("type"))
+                return message
+            except asyncio.TimeoutError:
+                span.discard()
+                return None
     
     def get_history(self, limit: Optional[int] = None, agent_id: Optional[str] = None) -> List[Dict[str, Any]]:
         """
@@ -338,13 +608,33 @@ class MessageBus:
         return {
             "total_messages": len(self.message_history),
             "active_agents": len(self.subscribers),
-            "websocket_connections": len(self.websocket_callbacks),
+            "websocket_connections": self.outbound.callback_count,
+            "websocket_outbound": self.outbound.get_stats(),
+            "transport": self.transport.get_stats(),
+            "rate_limit": self.rate_limiter.get_stats(),
             "queued_messages": {
                 agent_id: queue.qsize()
                 for agent_id, queue in self.message_queues.items()
+            },
+            "queue_stats": self.get_queue_stats(),
+            "topic_subscriptions": {
+                sub.subscriber_id: sub.get_stats()
+                for sub in self.topic_router.subscriptions()
             }
         }
     
+    def get_queue_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取所有Agent队列的统计（深度、高水位、丢弃/合并数）
+        
+        Returns:
+            {agent_id: 队列统计字典}
+        """
+        return {
+            agent_id: queue.get_stats()
+            for agent_id, queue in self.message_queues.items()
+        }
+    
     def clear_history(self) -> None:
         """清空消息历史"""
         self.message_history.clear()
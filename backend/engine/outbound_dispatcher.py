@@ -0,0 +1,235 @@
+"""
+文件: engine/outbound_dispatcher.py
+职责: 出站推送管道 - 将消息总线的消息异步批量推送给WebSocket订阅者
+依赖: utils/logger.py
+被依赖: engine/message_bus.py
+
+关键接口:
+  - OutboundDispatcher(max_buffer, batch_size, callback_timeout) - 创建推送管道
+  - add_callback(callback, batch, project) - 添加推送回调（可只接收某个项目的消息）
+  - enqueue(message) - 非阻塞入队（缓冲满时丢弃最早的消息）
+  - async flush(timeout) - 等待缓冲区推送完毕
+  - async stop() - 停止后台推送任务
+  - get_stats() - 获取推送统计
+"""
+
+import asyncio
+from collections import deque
+from typing import Dict, Any, List, Callable, Deque, Optional
+from pathlib import Path
+import sys
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from utils.logger import setup_logger
+
+
+class OutboundDispatcher:
+    """
+    出站推送管道
+
+    消息总线只负责把消息放进有界缓冲区（O(1)，不等待），
+    后台任务按批取出并推送给所有回调。回调之间并发执行，
+    单个回调有超时保护，慢连接不会拖慢Agent之间的消息路由。
+    缓冲区满时丢弃最早的消息（前端看板只关心最新状态）。
+    """
+
+    def __init__(
+        self,
+        max_buffer: int = 1000,
+        batch_size: int = 50,
+        callback_timeout: float = 5.0
+    ):
+        """
+        初始化推送管道
+
+        Args:
+            max_buffer: 缓冲区容量（消息条数）
+            batch_size: 每批最多推送的消息数
+            callback_timeout: 单个回调处理一批消息的超时时间（秒）
+        """
+        self.max_buffer = max_buffer
+        self.batch_size = batch_size
+        self.callback_timeout = callback_timeout
+
+        # 回调列表: [(callback, 是否接收批量消息, 项目过滤)]
+        self._callbacks: List[tuple] = []
+
+        # 有界缓冲区
+        self._buffer: Deque[Dict[str, Any]] = deque()
+
+        # 后台任务及其唤醒事件（与事件循环绑定，换循环时重建）
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Event] = None
+
+        # 统计信息
+        self._enqueued = 0
+        self._delivered = 0
+        self._dropped = 0
+        self._batches = 0
+        self._callback_errors = 0
+        self._callback_timeouts = 0
+        self._high_water = 0
+
+        self.logger = setup_logger("outbound_dispatcher")
+
+    @property
+    def callback_count(self) -> int:
+        """已注册的回调数量"""
+        return len(self._callbacks)
+
+    def add_callback(self, callback: Callable, batch: bool = False, project: Optional[str] = None) -> None:
+        """
+        添加推送回调
+
+        Args:
+            callback: async def callback(message) 或 async def callback(messages)
+            batch: True表示回调一次接收一批消息(列表)，False表示逐条接收
+            project: 只推送 "project" 字段等于该值的消息，None表示推送全部消息
+        """
+        self._callbacks.append((callback, batch, project))
+
+    def remove_callback(self, callback: Callable) -> None:
+        """移除推送回调"""
+        self._callbacks = [item for item in self._callbacks if item[0] is not callback]
+
+    def enqueue(self, message: Dict[str, Any]) -> None:
+        """
+        非阻塞入队，必要时启动后台推送任务
+
+        Args:
+            message: 消息字典
+        """
+        if not self._callbacks:
+            return
+
+        if len(self._buffer) >= self.max_buffer:
+            self._buffer.popleft()
+            self._dropped += 1
+
+        self._buffer.append(message)
+        self._enqueued += 1
+        if len(self._buffer) > self._high_water:
+            self._high_water = len(self._buffer)
+
+        self._ensure_worker()
+        self._idle.clear()
+        self._wakeup.set()
+
+    def _ensure_worker(self) -> None:
+        """确保当前事件循环中有后台推送任务在运行"""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        """后台推送循环：等待唤醒，按批取出消息并推送"""
+        while True:
+            if not self._buffer:
+                self._idle.set()
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            batch = [
+                self._buffer.popleft()
+                for _ in range(min(self.batch_size, len(self._buffer)))
+            ]
+            await self._deliver(batch)
+
+    async def _deliver(self, batch: List[Dict[str, Any]]) -> None:
+        """
+        把一批消息并发推送给所有回调
+
+        Args:
+            batch: 消息列表
+        """
+        callbacks = list(self._callbacks)
+        if not callbacks:
+            return
+
+        results = await asyncio.gather(
+            *(
+                self._call(callback, is_batch, batch if project is None else [m for m in batch if m.get("project") == project])
+                for callback, is_batch, project in callbacks
+            ),
+            return_exceptions=True
+        )
+
+        for result in results:
+            if isinstance(result, asyncio.TimeoutError):
+                self._callback_timeouts += 1
+            elif isinstance(result, Exception):
+                self._callback_errors += 1
+                self.logger.error(f"WebSocket推送回调失败: {result}")
+
+        self._batches += 1
+        self._delivered += len(batch)
+
+    async def _call(self, callback: Callable, is_batch: bool, batch: List[Dict[str, Any]]) -> None:
+        """调用单个回调（带超时），逐条回调按顺序推送整批消息"""
+        if not batch:
+            return
+
+        async def run():
+            if is_batch:
+                await callback(batch)
+            else:
+                for message in batch:
+                    await callback(message)
+
+        await asyncio.wait_for(run(), timeout=self.callback_timeout)
+
+    async def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待缓冲区中的消息推送完毕
+
+        Args:
+            timeout: 最长等待时间（秒），None表示一直等待
+
+        Returns:
+            True: 已推送完毕；False: 超时
+        """
+        if self._task is None or self._task.done() or self._idle is None:
+            return not self._buffer
+
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def stop(self) -> None:
+        """停止后台推送任务（未推送的消息保留在缓冲区）"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取推送统计
+
+        Returns:
+            {buffered, high_water, enqueued, delivered, dropped, batches, callback_errors, callback_timeouts}
+        """
+        return {
+            "buffered": len(self._buffer),
+            "high_water": self._high_water,
+            "enqueued": self._enqueued,
+            "delivered": self._delivered,
+            "dropped": self._dropped,
+            "batches": self._batches,
+            "callback_errors": self._callback_errors,
+            "callback_timeouts": self._callback_timeouts
+        }
@@ -0,0 +1,197 @@
+"""
+文件: engine/rate_limiter.py
+职责: 消息频率限制器 - 基于计数器的滑动窗口，O(1) 判定
+依赖: 无（仅Python标准库）
+被依赖: engine/message_bus.py
+
+关键接口:
+  - SlidingWindowRateLimiter(max_messages, window_seconds) - 创建限流器
+  - allow(key, scope) - 判定一次发送是否允许（通过则计数）
+  - configure_scope(scope, max_messages, window_seconds) - 按项目覆盖限额
+  - get_stats() - 获取拒绝计数等统计信息
+"""
+
+import time
+from typing import Dict, Any, Callable, Hashable, Optional, Tuple
+
+
+class _WindowState:
+    """单个key的窗口状态（当前窗口计数 + 上一窗口计数）"""
+
+    __slots__ = ("window_start", "current", "previous", "last_seen")
+
+    def __init__(self, now: float):
+        self.window_start = now
+        self.current = 0
+        self.previous = 0
+        self.last_seen = now
+
+
+class SlidingWindowRateLimiter:
+    """
+    滑动窗口计数限流器
+
+    每个key只保存两个计数器(当前窗口/上一窗口)，按时间加权估算
+    最近一个窗口内的消息数，判定和记录都是 O(1)。
+    使用单调时钟，不受系统时间调整影响；空闲的key会被定期清理。
+    """
+
+    def __init__(
+        self,
+        max_messages: int = 10,
+        window_seconds: float = 60.0,
+        idle_ttl: float = 600.0,
+        sweep_interval: float = 60.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        初始化限流器
+
+        Args:
+            max_messages: 每个窗口内允许的最大消息数
+            window_seconds: 窗口长度（秒）
+            idle_ttl: key空闲多久后被清理（秒）
+            sweep_interval: 清理检查的最小间隔（秒）
+            clock: 时钟函数，默认 time.monotonic（测试时可注入）
+        """
+        self.max_messages = max_messages
+        self.window_seconds = window_seconds
+        self.idle_ttl = max(idle_ttl, window_seconds * 2)
+        self.sweep_interval = sweep_interval
+        self._clock = clock
+
+        # {key: _WindowState}
+        self._windows: Dict[Hashable, _WindowState] = {}
+
+        # 按作用域(通常是项目ID)覆盖的限额: {scope: (max_messages, window_seconds)}
+        self._scope_limits: Dict[str, Tuple[int, float]] = {}
+
+        # 统计信息
+        self._allowed_total = 0
+        self._rejected_total = 0
+        self._rejected_by_key: Dict[Hashable, int] = {}
+        self._evicted_total = 0
+        self._last_sweep = clock()
+
+    def configure_scope(self, scope: str, max_messages: int, window_seconds: Optional[float] = None) -> None:
+        """
+        为某个作用域（项目）单独配置限额
+
+        Args:
+            scope: 作用域标识（项目ID）
+            max_messages: 每个窗口内允许的最大消息数
+            window_seconds: 窗口长度，None表示沿用默认值
+        """
+        self._scope_limits[scope] = (
+            max_messages,
+            window_seconds if window_seconds is not None else self.window_seconds
+        )
+
+    def remove_scope(self, scope: str) -> None:
+        """移除作用域的限额配置，恢复默认值"""
+        self._scope_limits.pop(scope, None)
+
+    def get_limits(self, scope: Optional[str] = None) -> Tuple[int, float]:
+        """获取作用域生效的 (max_messages, window_seconds)"""
+        if scope is not None and scope in self._scope_limits:
+            return self._scope_limits[scope]
+        return self.max_messages, self.window_seconds
+
+    def allow(self, key: Hashable, scope: Optional[str] = None) -> bool:
+        """
+        判定一次发送是否允许，允许时计入窗口
+
+        Args:
+            key: 限流key（如 (from, to)）
+            scope: 作用域（项目ID），用于查找项目级限额
+
+        Returns:
+            True: 未超限，可以发送
+            False: 已超限，拒绝发送
+        """
+        now = self._clock()
+        self._maybe_sweep(now)
+
+        limit, window = self.get_limits(scope)
+        state_key = (scope, key)
+        state = self._windows.get(state_key)
+        if state is None:
+            state = _WindowState(now)
+            self._windows[state_key] = state
+
+        # 窗口滚动：跨过一个窗口时当前计数变为上一窗口计数，跨过多个则清零
+        elapsed = now - state.window_start
+        if elapsed >= window:
+            windows_passed = int(elapsed // window)
+            state.previous = state.current if windows_passed == 1 else 0
+            state.current = 0
+            state.window_start += windows_passed * window
+            elapsed = now - state.window_start
+
+        state.last_seen = now
+
+        # 上一窗口按剩余重叠比例加权
+        estimated = state.previous * ((window - elapsed) / window) + state.current
+        if estimated >= limit:
+            self._rejected_total += 1
+            self._rejected_by_key[state_key] = self._rejected_by_key.get(state_key, 0) + 1
+            return False
+
+        state.current += 1
+        self._allowed_total += 1
+        return True
+
+    def current_usage(self, key: Hashable, scope: Optional[str] = None) -> float:
+        """获取key在当前滑动窗口内的估算消息数（不计数）"""
+        state = self._windows.get((scope, key))
+        if state is None:
+            return 0.0
+        _, window = self.get_limits(scope)
+        elapsed = self._clock() - state.window_start
+        if elapsed >= 2 * window:
+            return 0.0
+        if elapsed >= window:
+            return state.current * ((2 * window - elapsed) / window)
+        return state.previous * ((window - elapsed) / window) + state.current
+
+    def _maybe_sweep(self, now: float) -> None:
+        """定期清理空闲的key，避免字典无限增长"""
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+
+        idle_keys = [
+            key for key, state in self._windows.items()
+            if now - state.last_seen >= self.idle_ttl
+        ]
+        for key in idle_keys:
+            del self._windows[key]
+            self._rejected_by_key.pop(key, None)
+        self._evicted_total += len(idle_keys)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取限流统计
+
+        Returns:
+            统计字典 {allowed, rejected, tracked_keys, evicted, rejected_by_key}
+        """
+        return {
+            "allowed": self._allowed_total,
+            "rejected": self._rejected_total,
+            "tracked_keys": len(self._windows),
+            "evicted": self._evicted_total,
+            "rejected_by_key": {
+                "/".join(str(part) for part in (scope, *key) if part is not None)
+                if isinstance(key, tuple) else str(key): count
+                for (scope, key), count in self._rejected_by_key.items()
+            }
+        }
+
+    def reset(self) -> None:
+        """清空所有窗口状态和统计"""
+        self._windows.clear()
+        self._rejected_by_key.clear()
+        self._allowed_total = 0
+        self._rejected_total = 0
+        self._evicted_total = 0
@@ -0,0 +1,295 @@
+"""
+文件: engine/topic_router.py
+职责: 主题路由 - 消息主题生成、通配符订阅匹配和订阅者独立队列
+依赖: engine/agent_queue.py, utils/logger.py
+被依赖: engine/message_bus.py
+
+关键接口:
+  - message_topic(message) - 生成消息主题 project.{项目}.agent.{接收者}.{类型}
+  - project_pattern(project_id) - 生成订阅某个项目全部消息的模式
+  - TopicRouter() - 主题订阅索引（前缀树 + 匹配结果缓存）
+  - TopicSubscription - 单个订阅，自带独立队列，可 await get() 或注册回调消费
+  - TopicSubscription.deliver(message) - 非阻塞投递（订阅者慢时丢弃消息，不影响消息路由）
+
+主题格式:
+  project.{project_id}.agent.{to}.{type}
+  例: project.snake.agent.programmer.question / project.snake.agent.all.report
+  消息没有项目字段时 project_id 为 "_"
+
+订阅模式（按"."分段匹配）:
+  - 普通段: 精确匹配
+  - "*": 匹配一个或多个段，如 "project.snake.agent.programmer.*"、"*.report"
+  - "#": 匹配零个或多个段，如 "project.snake.#"
+"""
+
+import asyncio
+import itertools
+from collections import OrderedDict
+from typing import Dict, Any, Callable, List, Optional, Set
+from pathlib import Path
+import sys
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from engine.agent_queue import AgentMessageQueue, OVERFLOW_BLOCK
+from utils.logger import setup_logger
+
+logger = setup_logger("topic_router")
+
+# 匹配结果缓存的主题数上限
+TOPIC_CACHE_SIZE = 1024
+
+
+def topic_segment(value: Any) -> str:
+    """把任意值转换为主题段（"."替换为"_"，避免拆出多余的段）"""
+    return str(value).replace(".", "_")
+
+
+def message_topic(message: Dict[str, Any]) -> str:
+    """
+    生成消息主题
+
+    Args:
+        message: 消息字典
+
+    Returns:
+        主题字符串 project.{project}.agent.{to}.{type}
+    """
+    project = topic_segment(message.get("project") or "_")
+    to_agent = topic_segment(message.get("to", "unknown"))
+    msg_type = topic_segment(message.get("type", "message"))
+    return f"project.{project}.agent.{to_agent}.{msg_type}"
+
+
+def project_pattern(project_id: str) -> str:
+    """生成订阅某个项目全部消息的模式 project.{project_id}.#"""
+    return f"project.{topic_segment(project_id)}.#"
+
+
+class TopicSubscription:
+    """
+    主题订阅
+
+    每个订阅有自己的有界队列，消费者之间互不影响。
+    可以直接 await get() 拉取，也可以传入回调由后台任务推送。
+    投递不会等待：订阅者是观察者，处理慢时按队列的溢出策略丢弃消息，
+    不会拖慢Agent之间的消息路由；回调有超时保护。
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(
+        self,
+        pattern: str,
+        queue: AgentMessageQueue,
+        callback: Optional[Callable] = None,
+        subscriber_id: Optional[str] = None,
+        callback_timeout: Optional[float] = 5.0
+    ):
+        """
+        初始化订阅
+
+        Args:
+            pattern: 订阅模式
+            queue: 订阅者的独立队列（不能使用 block 策略）
+            callback: 可选的异步回调 async def callback(message)
+            subscriber_id: 订阅者标识，None表示自动生成
+            callback_timeout: 回调处理单条消息的超时时间(秒)，None表示不限
+
+        Raises:
+            ValueError: 队列使用 block 策略（订阅者慢时会阻塞消息路由）
+        """
+        if queue.overflow == OVERFLOW_BLOCK:
+            raise ValueError("主题订阅的队列不能使用 block 策略")
+        self.pattern = pattern
+        self.queue = queue
+        self.callback = callback
+        self.subscriber_id = subscriber_id or f"sub-{next(self._ids)}"
+        self.callback_timeout = callback_timeout
+        self.delivered = 0
+        self.callback_timeouts = 0
+        self._consumer: Optional[asyncio.Task] = None
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        拉取下一条匹配的消息
+
+        Args:
+            timeout: 超时时间(秒)，None表示一直等待
+
+        Returns:
+            消息字典，超时返回None
+        """
+        try:
+            if timeout is None:
+                return await self.queue.get()
+            return await asyncio.wait_for(self.queue.get(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def deliver(self, message: Dict[str, Any]) -> bool:
+        """非阻塞投递消息到订阅队列，有回调时确保后台消费任务在运行；返回消息是否入队"""
+        queued = self.queue.put_nowait(message)
+        if queued:
+            self.delivered += 1
+            if self.callback is not None:
+                self._ensure_consumer()
+        return queued
+
+    def _ensure_consumer(self) -> None:
+        """启动后台消费任务（每个事件循环一个）"""
+        loop = asyncio.get_running_loop()
+        if self._consumer is not None and not self._consumer.done() and self._consumer.get_loop() is loop:
+            return
+        self._consumer = loop.create_task(self._consume())
+
+    async def _consume(self) -> None:
+        """后台消费：逐条调用回调，回调异常或超时不影响后续消息"""
+        while True:
+            message = await self.queue.get()
+            try:
+                result = self.callback(message)
+                if asyncio.iscoroutine(result):
+                    await asyncio.wait_for(result, timeout=self.callback_timeout)
+            except asyncio.TimeoutError:
+                self.callback_timeouts += 1
+                logger.warning(f"订阅 [{self.subscriber_id}] 回调处理超时({self.callback_timeout}秒)，跳过该消息")
+            except Exception as e:
+                logger.error(f"订阅 [{self.subscriber_id}] 回调处理失败: {e}", exc_info=True)
+
+    def close(self) -> None:
+        """停止后台消费任务"""
+        if self._consumer is not None and not self._consumer.done():
+            self._consumer.cancel()
+        self._consumer = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取订阅统计"""
+        return {
+            "pattern": self.pattern,
+            "delivered": self.delivered,
+            "callback_timeouts": self.callback_timeouts,
+            **self.queue.get_stats()
+        }
+
+
+class _TrieNode:
+    """前缀树节点"""
+
+    __slots__ = ("children", "subscribers")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.subscribers: Set[str] = set()
+
+
+class TopicRouter:
+    """
+    主题订阅索引
+
+    订阅模式按段存入前缀树，匹配成本与主题段数相关而与订阅数无关；
+    同一主题的匹配结果会被缓存，订阅变化时清空缓存。
+    """
+
+    def __init__(self):
+        self._root = _TrieNode()
+        self._subscriptions: Dict[str, TopicSubscription] = {}
+        self._cache: "OrderedDict[str, List[TopicSubscription]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def add(self, subscription: TopicSubscription) -> None:
+        """
+        添加订阅
+
+        Raises:
+            ValueError: 订阅模式为空或订阅者ID重复
+        """
+        if not subscription.pattern:
+            raise ValueError("订阅模式不能为空")
+        if subscription.subscriber_id in self._subscriptions:
+            raise ValueError(f"订阅者ID已存在: {subscription.subscriber_id}")
+
+        node = self._root
+        for segment in subscription.pattern.split("."):
+            node = node.children.setdefault(segment, _TrieNode())
+        node.subscribers.add(subscription.subscriber_id)
+
+        self._subscriptions[subscription.subscriber_id] = subscription
+        self._cache.clear()
+
+    def remove(self, subscriber_id: str) -> Optional[TopicSubscription]:
+        """移除订阅，返回被移除的订阅（不存在时返回None）"""
+        subscription = self._subscriptions.pop(subscriber_id, None)
+        if subscription is None:
+            return None
+
+        # 沿路径删除，并清理空节点
+        path = [self._root]
+        for segment in subscription.pattern.split("."):
+            path.append(path[-1].children[segment])
+        path[-1].subscribers.discard(subscriber_id)
+        for parent, segment in zip(reversed(path[:-1]), reversed(subscription.pattern.split("."))):
+            child = parent.children[segment]
+            if child.subscribers or child.children:
+                break
+            del parent.children[segment]
+
+        subscription.close()
+        self._cache.clear()
+        return subscription
+
+    def match(self, topic: str) -> List[TopicSubscription]:
+        """
+        获取匹配主题的所有订阅
+
+        Args:
+            topic: 消息主题
+
+        Returns:
+            订阅列表
+        """
+        cached = self._cache.get(topic)
+        if cached is not None:
+            self._cache.move_to_end(topic)
+            return cached
+
+        matched: Set[str] = set()
+        self._walk(self._root, topic.split("."), 0, matched)
+        result = [self._subscriptions[sid] for sid in sorted(matched)]
+
+        self._cache[topic] = result
+        if len(self._cache) > TOPIC_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return result
+
+    def _walk(self, node: _TrieNode, segments: List[str], index: int, matched: Set[str]) -> None:
+        """递归匹配前缀树"""
+        if index == len(segments):
+            matched.update(node.subscribers)
+            # 末尾的 "#" 可以匹配零个段
+            hash_node = node.children.get("#")
+            if hash_node is not None:
+                matched.update(hash_node.subscribers)
+            return
+
+        exact = node.children.get(segments[index])
+        if exact is not None:
+            self._walk(exact, segments, index + 1, matched)
+
+        # "*" 吞掉一个或多个段，"#" 吞掉零个或多个段
+        star = node.children.get("*")
+        if star is not None:
+            for end in range(index + 1, len(segments) + 1):
+                self._walk(star, segments, end, matched)
+        hash_node = node.children.get("#")
+        if hash_node is not None:
+            for end in range(index, len(segments) + 1):
+                self._walk(hash_node, segments, end, matched)
+
+    def subscriptions(self) -> List[TopicSubscription]:
+        """获取所有订阅"""
+        return list(self._subscriptions.values())
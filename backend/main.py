@@ -19,6 +19,7 @@ import uvicorn
 
 from config import Config
 from utils.logger import setup_logger
+from engine.message_bus import MessageBus
 from api.http_routes import router as http_router
 from api.websocket_handler import router as ws_router
 
@@ -43,6 +44,10 @@ async def lifespan(app: FastAPI):
     # 打印配置信息
     Config.print_config()
     
+    # 跨进程部署时连接消息代理
+    if Config.MESSAGE_BUS_TRANSPORT != "memory":
+        await MessageBus().connect_transport()
+    
     logger.info("✅ 应用启动成功")
     logger.info(f"📡 API 文档: http://{Config.SERVER_HOST}:{Config.SERVER_PORT}/api/docs")
     logger.info(f"🌐 前端界面: http://{Config.SERVER_HOST}:{Config.SERVER_PORT}/")
@@ -54,6 +59,9 @@ async def lifespan(app: FastAPI):
     logger.info("="*60)
     logger.info("AI 游戏开发公司 正在关闭...")
     logger.info("="*60)
+    
+    if Config.MESSAGE_BUS_TRANSPORT != "memory":
+        await MessageBus().disconnect_transport()
 
 
 def create_app() -> FastAPI:
@@ -0,0 +1,252 @@
+"""
+文件: tools/asset_store.py
+职责: 图片素材库 - 按 Prompt/模型/尺寸 保存生成过的图片，跨项目复用，相同的素材不再重复调用图片生成API
+依赖: sqlite3（Python标准库）, config.py, utils/logger.py
+被依赖: tools/image_gen_tool.py
+
+关键接口:
+  - get_asset_store() -> 共享的素材库（关闭缓存时为None）
+  - AssetStore.lookup(prompt, model, size) -> 命中的素材记录，没有时为None
+  - AssetStore.materialize(entry, dest) - 把素材放到项目目录（硬链接，不支持时复制）
+  - AssetStore.put(prompt, model, size, source, project) -> 保存新生成的图片，返回素材键
+  - asset_key(prompt, model, size) / normalize_prompt(prompt)
+
+说明:
+  - 目录: ASSET_CACHE_DIR（默认工作空间下的 .asset_cache），索引为 index.db，图片为 objects/<键前2位>/<键>.png
+  - 键 = sha256(模型 + 尺寸 + 规范化的Prompt)，Prompt 只忽略大小写和空白差异
+  - 素材库中的图片设为只读；ImageGenTool 保存图片前先删除目标文件，不会改写硬链接到的素材
+  - 总大小超过 ASSET_CACHE_MAX_MB 时删除最久未使用的图片（已硬链接到项目中的文件不受影响）
+"""
+
+import hashlib
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from config import Config
+from utils.logger import setup_logger
+
+logger = setup_logger("asset_store")
+
+# 表结构版本（记录在 PRAGMA user_version 中）
+_SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    key TEXT PRIMARY KEY,
+    file TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    prompt TEXT NOT NULL,
+    model TEXT NOT NULL,
+    size TEXT NOT NULL,
+    project TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS assets_last_used ON assets(last_used);
+"""
+
+# 每个目录共享一个素材库 {目录: 素材库}
+_stores: Dict[str, "AssetStore"] = {}
+
+
+def normalize_prompt(prompt: str) -> str:
+    """规范化Prompt: 小写、合并空白"""
+    return " ".join(prompt.lower().split())
+
+
+def asset_key(prompt: str, model: str, size: str) -> str:
+    """素材键 = sha256(模型 + 尺寸 + 规范化的Prompt)"""
+    text = "\n".join([model, str(size), normalize_prompt(prompt)])
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def get_asset_store() -> Optional["AssetStore"]:
+    """共享的素材库（首次使用时打开），关闭缓存时为None"""
+    if not Config.ASSET_CACHE_ENABLED:
+        return None
+    root = str(Path(Config.ASSET_CACHE_DIR or Config.ROOT_DIR / ".asset_cache").resolve())
+    store = _stores.get(root)
+    if store is None:
+        try:
+            store = AssetStore(Path(root), Config.ASSET_CACHE_MAX_MB)
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"素材库打开失败，本次不使用缓存: {e}")
+            return None
+        _stores[root] = store
+        logger.info(f"图片素材库: {root}")
+    return store
+
+
+class AssetStore:
+    """
+    图片素材库（SQLite 索引 + 按键存放的图片文件）
+
+    只在事件循环线程中使用；多个进程共用同一目录时由 SQLite 的文件锁保证索引一致。
+    """
+
+    def __init__(self, root: Path, max_mb: float = 512):
+        """
+        Args:
+            root: 素材库目录
+            max_mb: 图片总大小上限(MB)
+        """
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.conn = sqlite3.connect(str(self.root / "index.db"), timeout=10)
+        self.conn.row_factory = sqlite3.Row
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+            # 旧版本的索引直接重建（图片会在下次生成时重新保存）
+            self.conn.execute("DROP TABLE IF EXISTS assets")
+            self.conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+    def _path(self, key: str, suffix: str = ".png") -> Path:
+        return self.objects_dir / key[:2] / f"{key}{suffix}"
+
+    def _remove(self, key: str, file: str) -> None:
+        """删除素材记录和图片（调用方负责提交事务）"""
+        self.conn.execute("DELETE FROM assets WHERE key = ?", (key,))
+        try:
+            (self.root / file).unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"删除素材图片失败: {file}: {e}")
+
+    # ==================== 查询 ====================
+
+    def lookup(self, prompt: str, model: str, size: str) -> Optional[Dict[str, Any]]:
+        """
+        查询素材
+
+        Args:
+            prompt: 生成图片的Prompt
+            model: 图片生成模型
+            size: 尺寸或宽高比
+
+        Returns:
+            {"key", "path", "prompt", "model", "size", "project", "created_at", "hits"}，没有时为None
+        """
+        key = asset_key(prompt, model, size)
+        row = self.conn.execute("SELECT * FROM assets WHERE key = ?", (key,)).fetchone()
+        path = self.root / row["file"] if row else None
+        if row is not None and (not path.is_file() or path.stat().st_size != row["bytes"]):
+            # 图片被手动删除或损坏
+            logger.warning(f"素材图片缺失或大小不符，删除记录: {row['file']}")
+            self._remove(key, row["file"])
+            self.conn.commit()
+            row = None
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+
+        self.conn.execute(
+            "UPDATE assets SET last_used = ?, hits = hits + 1 WHERE key = ?", (time.time(), key)
+        )
+        self.conn.commit()
+        self.stats["hits"] += 1
+        return {
+            "key": key,
+            "path": str(path),
+            "prompt": row["prompt"],
+            "model": row["model"],
+            "size": row["size"],
+            "project": row["project"],
+            "created_at": datetime.fromtimestamp(row["created_at"]).isoformat(timespec="seconds"),
+            "hits": row["hits"] + 1,
+        }
+
+    def materialize(self, entry: Dict[str, Any], dest: Path) -> str:
+        """
+        把素材放到目标路径（已有的文件会被替换）
+
+        Returns:
+            "link"（硬链接）或 "copy"（跨文件系统等不支持硬链接时复制）
+        """
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if dest.exists() or dest.is_symlink():
+            dest.unlink()
+        try:
+            os.link(entry["path"], dest)
+            return "link"
+        except OSError:
+            shutil.copyfile(entry["path"], dest)
+            return "copy"
+
+    # ==================== 保存 ====================
+
+    def put(self, prompt: str, model: str, size: str, source: Path, project: str = "") -> Optional[str]:
+        """
+        保存新生成的图片（复制到素材库），必要时删除最久未使用的图片
+
+        Args:
+            prompt / model / size: 同 lookup()
+            source: 生成的图片文件
+            project: 首次生成该素材的项目
+
+        Returns:
+            素材键，保存失败时为None
+        """
+        key = asset_key(prompt, model, size)
+        dest = self._path(key, Path(source).suffix or ".png")
+        tmp_path = dest.with_name(f"{dest.name}.{os.getpid()}.tmp")
+        try:
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(source, tmp_path)
+            os.chmod(tmp_path, 0o444)
+            os.replace(tmp_path, dest)
+        except OSError as e:
+            logger.warning(f"素材保存失败: {source}: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return None
+
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO assets (key, file, bytes, prompt, model, size, project, created_at, last_used, hits) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+            (key, dest.relative_to(self.root).as_posix(), dest.stat().st_size, prompt, model, str(size), project, now, now),
+        )
+        self.stats["stored"] += 1
+        self._evict(keep=key)
+        self.conn.commit()
+        return key
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """总大小超过上限时按最近使用时间删除（不删除刚保存的素材）"""
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        rows = self.conn.execute("SELECT key, file, bytes FROM assets ORDER BY last_used").fetchall()
+        for row in rows:
+            if total <= self.max_bytes:
+                break
+            if row["key"] == keep:
+                continue
+            self._remove(row["key"], row["file"])
+            total -= row["bytes"]
+            self.stats["evicted"] += 1
+            logger.info(f"素材库超过 {self.max_bytes // 1024}KB，删除最久未使用的素材: {row['file']}")
+
+    def total_bytes(self) -> int:
+        """素材库中图片的总大小"""
+        return self.conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM assets").fetchone()[0]
+
+    def clear(self) -> None:
+        """清空素材库"""
+        for row in self.conn.execute("SELECT key, file FROM assets").fetchall():
+            self._remove(row["key"], row["file"])
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,223 @@
+"""
+文件: tools/code_patcher.py
+职责: 补丁式代码修改 - 解析LLM给出的 SEARCH/REPLACE 编辑和 unified diff，在本地应用到代码上
+依赖: 无
+被依赖: agents/programmer_agent.py
+
+关键接口:
+  - parse_edits(text) -> 从LLM回复中解析编辑列表 [{search, replace}]
+  - apply_edits(code, edits) -> 应用编辑，返回 (新代码, 成功的编号, 失败的编辑)
+  - find_region(code, hint) -> 找到与提示文本最相关的顶层代码块（行号范围）
+  - replace_region(code, start, end, text) -> 用新文本替换指定行范围
+
+编辑格式:
+  <<<<<<< SEARCH
+  原代码（必须与文件中的内容一致）
+  =======
+  新代码
+  >>>>>>> REPLACE
+
+  也接受 ```diff 代码块中的 unified diff，每个 @@ 块会转换成一个编辑。
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+_SEARCH_REPLACE = re.compile(
+    r"^<{5,9} ?SEARCH[^\n]*\n(.*?)^={5,9}[ \t]*\n(.*?)^>{5,9} ?REPLACE[^\n]*$",
+    re.S | re.M
+)
+_DIFF_BLOCK = re.compile(r"```(?:diff|patch)[^\n]*\n(.*?)```", re.S)
+_HUNK_HEADER = re.compile(r"^@@[^@]*@@.*$", re.M)
+
+
+def parse_edits(text: str) -> List[Dict[str, str]]:
+    """
+    从LLM回复中解析编辑
+
+    优先解析 SEARCH/REPLACE 块；没有时解析 unified diff（```diff 代码块，或以 --- / @@ 开头的回复）。
+
+    Args:
+        text: LLM回复
+
+    Returns:
+        编辑列表 [{"search": 原代码, "replace": 新代码}]，按出现顺序
+    """
+    edits = [
+        {"search": search, "replace": replace}
+        for search, replace in _SEARCH_REPLACE.findall(text)
+    ]
+    if edits:
+        return edits
+
+    diffs = _DIFF_BLOCK.findall(text)
+    if not diffs and _HUNK_HEADER.search(text):
+        diffs = [text]
+    for diff in diffs:
+        edits.extend(_parse_unified_diff(diff))
+    return edits
+
+
+def _parse_unified_diff(diff: str) -> List[Dict[str, str]]:
+    """把 unified diff 的每个 @@ 块转换成一个编辑（上下文+删除行 → 上下文+新增行）"""
+    edits = []
+    search: Optional[List[str]] = None
+    replace: List[str] = []
+
+    def flush() -> None:
+        if search is not None and (search or replace) and search != replace:
+            edits.append({
+                "search": "".join(line + "\n" for line in search),
+                "replace": "".join(line + "\n" for line in replace)
+            })
+
+    for line in diff.splitlines():
+        if line.startswith("@@"):
+            flush()
+            search, replace = [], []
+        elif search is None or line.startswith(("---", "+++", "\\")):
+            continue
+        elif line.startswith("-"):
+            search.append(line[1:])
+        elif line.startswith("+"):
+            replace.append(line[1:])
+        else:
+            # 上下文行（LLM有时会漏掉行首的空格）
+            context = line[1:] if line.startswith(" ") else line
+            search.append(context)
+            replace.append(context)
+    flush()
+    return edits
+
+
+def apply_edits(code: str, edits: List[Dict[str, str]]) -> Tuple[str, List[int], List[Dict[str, Any]]]:
+    """
+    依次应用编辑
+
+    先精确匹配；匹配不到时忽略缩进和行尾空白逐行匹配，并按匹配处的缩进调整新代码。
+    SEARCH 为空的编辑表示追加到文件末尾。
+
+    Args:
+        code: 原代码
+        edits: parse_edits() 的结果
+
+    Returns:
+        (新代码, 成功应用的编辑编号, 失败的编辑 [{index, search, replace, reason}])
+    """
+    applied: List[int] = []
+    failed: List[Dict[str, Any]] = []
+    for index, edit in enumerate(edits):
+        search, replace = edit["search"], edit["replace"]
+        if not search.strip():
+            code = code.rstrip("\n") + "\n" + replace
+            applied.append(index)
+            continue
+
+        position = code.find(search)
+        if position >= 0:
+            code = code[:position] + replace + code[position + len(search):]
+            applied.append(index)
+            continue
+
+        patched = _apply_fuzzy(code, search, replace)
+        if patched is not None:
+            code = patched
+            applied.append(index)
+        else:
+            failed.append(dict(edit, index=index, reason="在文件中找不到 SEARCH 部分的代码"))
+    return code, applied, failed
+
+
+def _apply_fuzzy(code: str, search: str, replace: str) -> Optional[str]:
+    """忽略缩进和行尾空白逐行匹配，只替换第一处匹配"""
+    lines = code.splitlines(keepends=True)
+    search_lines = [line.strip() for line in search.splitlines()]
+    # 去掉首尾空行，避免LLM多带的空行导致匹配失败
+    while search_lines and not search_lines[0]:
+        search_lines.pop(0)
+    while search_lines and not search_lines[-1]:
+        search_lines.pop()
+    if not search_lines:
+        return None
+
+    stripped = [line.strip() for line in lines]
+    size = len(search_lines)
+    for start in range(len(lines) - size + 1):
+        if stripped[start:start + size] != search_lines:
+            continue
+        replace_lines = replace.splitlines()
+        found_indent = _indent_of(lines[start])
+        given_indent = next((_indent_of(line) for line in replace_lines if line.strip()), "")
+        new_lines = []
+        for line in replace_lines:
+            if line.strip() and line.startswith(given_indent):
+                line = found_indent + line[len(given_indent):]
+            new_lines.append(line + "\n")
+        return "".join(lines[:start] + new_lines + lines[start + size:])
+    return None
+
+
+def _indent_of(line: str) -> str:
+    return line[:len(line) - len(line.lstrip())]
+
+
+def top_level_blocks(code: str) -> List[Tuple[int, int]]:
+    """
+    把代码切分成顶层代码块（行号范围，左闭右开）
+
+    以行首（无缩进）且不是右括号或注释的行作为块的开始，块前紧邻的注释归入该块，
+    块末尾的空行不归入该块。
+    """
+    lines = code.splitlines()
+    starts = []
+    for number, line in enumerate(lines):
+        if line and not line[0].isspace() and not line.startswith(("}", ")", "]", "//", "/*", "*")):
+            start = number
+            while start > 0 and lines[start - 1].lstrip().startswith(("//", "/*", "*")):
+                start -= 1
+            if not starts or start > starts[-1]:
+                starts.append(start)
+    if not starts:
+        return [(0, len(lines))] if lines else []
+    starts[0] = 0
+    blocks = []
+    for start, end in zip(starts, starts[1:] + [len(lines)]):
+        # 块之间的空行不归入块，替换代码块时保留原有的分隔
+        while end > start + 1 and not lines[end - 1].strip():
+            end -= 1
+        blocks.append((start, end))
+    return blocks
+
+
+def find_region(code: str, hint: str) -> Optional[Tuple[int, int]]:
+    """
+    找到与提示文本（通常是应用失败的 SEARCH 部分）最相关的顶层代码块
+
+    按与提示文本共有的非空行数打分，其次按共有的标识符数打分。
+
+    Returns:
+        (起始行, 结束行)，左闭右开；没有相关的代码块时返回None
+    """
+    hint_lines = {line.strip() for line in hint.splitlines() if len(line.strip()) > 2}
+    hint_names = set(re.findall(r"[A-Za-z_$][\w$]{2,}", hint))
+    if not hint_lines and not hint_names:
+        return None
+
+    lines = code.splitlines()
+    best, best_score = None, (0, 0)
+    for start, end in top_level_blocks(code):
+        block = lines[start:end]
+        shared_lines = len(hint_lines & {line.strip() for line in block})
+        shared_names = len(hint_names & set(re.findall(r"[A-Za-z_$][\w$]{2,}", "\n".join(block))))
+        score = (shared_lines, shared_names)
+        if score > best_score:
+            best, best_score = (start, end), score
+    return best
+
+
+def replace_region(code: str, start: int, end: int, text: str) -> str:
+    """用新文本替换第 start~end 行（左闭右开，从0开始）"""
+    lines = code.splitlines(keepends=True)
+    if text and not text.endswith("\n"):
+        text += "\n"
+    return "".join(lines[:start]) + text + "".join(lines[end:])
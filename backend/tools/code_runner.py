@@ -1,24 +1,41 @@
 """
 文件: tools/code_runner.py
 职责: 在安全的子进程中执行JavaScript/HTML代码
-依赖: utils/logger.py
-被依赖: 测试Agent、程序员Agent
+依赖: utils/logger.py, utils/tracer.py, tools/js_parser.py, tools/node_pool.py, tools/smoke_harness.py, tools/scratch_space.py, config.py
+被依赖: 测试Agent、程序员Agent、tools/game_validator.py
 关键接口:
-  - CodeRunner.execute_html(html_content, timeout) -> 执行HTML文件
-  - CodeRunner.execute_js(js_code, timeout) -> 执行JavaScript代码
-  - CodeRunner.validate_syntax(code, language) -> 验证代码语法
+  - CodeRunner.execute_html(html_content, timeout, base_dir=...) -> 无头冒烟测试：加载页面运行若干帧，收集运行时异常
+  - CodeRunner.execute_js(js_code, timeout) -> 执行JavaScript代码（默认在常驻的Node工作进程池中执行）
+  - CodeRunner.validate_syntax(code, language) -> 验证代码语法（JavaScript 用 node --check，没有Node时用内置检查）
 """
 
 import asyncio
-import tempfile
-import os
+import hashlib
+import re
 import subprocess
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+from config import Config
+from tools.js_parser import check_syntax
+from tools.node_pool import NodeWorkerPool, find_node, get_node_pool
+from tools.scratch_space import ScratchJob, get_scratch_space
+from tools.smoke_harness import load_page, summarize
 from utils.logger import setup_logger
+from utils.tracer import trace_span
 
 logger = setup_logger("code_runner")
 
+# 语法检查结果缓存 {(检查方式, 内容哈希): 结果}，同一份代码在多次验证中只检查一次
+_SYNTAX_CACHE_SIZE = 256
+_syntax_cache: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+
+# 含有 import/export 语句的代码按ES模块检查
+_MODULE_SYNTAX = re.compile(r"^\s*(?:import\s*[\w{*'\"]|export\s)", re.M)
+# node --check 输出中的位置行，如 "[stdin]:12"
+_NODE_LOCATION = re.compile(r"^\[stdin\]:(\d+)\s*$")
+_NODE_ERROR = re.compile(r"^(\w*Error): (.*)$")
+
 
 class CodeRunner:
     """代码执行工具 - 在隔离环境中安全执行代码"""
@@ -34,8 +51,9 @@ class CodeRunner:
             workspace_root = str(Path(__file__).parent.parent.parent)
         
         self.workspace_root = Path(workspace_root).resolve()
-        self.temp_dir = Path(tempfile.gettempdir()) / "ai_company_code_runner"
-        self.temp_dir.mkdir(exist_ok=True)
+        # 每次执行使用独立的临时目录（并发执行互不覆盖），结束后按保留策略清理
+        self.scratch = get_scratch_space()
+        self.temp_dir = self.scratch.root
         
         logger.info(f"代码执行器初始化完成，临时目录: {self.temp_dir}")
     
@@ -43,55 +61,96 @@ class CodeRunner:
         self, 
         html_content: str, 
         timeout: float = 30.0,
-        check_only: bool = False
+        check_only: bool = False,
+        base_dir: Optional[str] = None,
+        frames: Optional[int] = None
     ) -> Dict[str, Any]:
         """
-        执行HTML文件（在浏览器中）
+        执行HTML文件（无头冒烟测试）
+        
+        在Node工作进程的模拟浏览器环境（document、Canvas 2D、requestAnimationFrame、输入事件）中
+        加载页面和脚本，运行固定帧数并模拟用户输入，收集运行时异常、绘制调用次数和帧耗时。
         
         Args:
             html_content: HTML文件内容
             timeout: 超时时间（秒）
             check_only: 仅检查语法，不实际运行
+            base_dir: 游戏目录（相对路径相对于工作空间），用于加载 <script src> 和判断资源是否存在
+            frames: 运行的帧数，默认 Config.SMOKE_TEST_FRAMES
             
         Returns:
-            执行结果字典 {success, output, error, file_path}
+            执行结果字典 {success, output, error, file_path, smoke}
+            smoke: 冒烟测试报告 {frames, raf_frames, frames_with_draws, draw_calls, frame_time_ms,
+                   exceptions, console_errors, warnings, timed_out}，没有运行时为None
         """
-        # 创建临时HTML文件
-        temp_file = self.temp_dir / f"test_{os.getpid()}.html"
-        
-        try:
-            # 写入HTML内容
-            temp_file.write_text(html_content, encoding='utf-8')
-            logger.info(f"创建临时HTML文件: {temp_file}")
-            
-            if check_only:
-                # 仅语法检查（检查是否能解析为有效HTML）
-                return {
-                    "success": True,
-                    "output": "HTML语法检查通过",
-                    "error": None,
-                    "file_path": str(temp_file)
-                }
-            
-            # TODO: 在未来阶段实现浏览器自动化测试
-            # 当前版本只返回文件路径，供手动测试
-            logger.info(f"HTML文件已创建，可在浏览器中打开测试: {temp_file}")
-            
+        if check_only:
+            # 仅语法检查（检查是否能解析为有效HTML）
             return {
                 "success": True,
-                "output": f"HTML文件已创建: {temp_file}",
+                "output": "HTML语法检查通过",
                 "error": None,
-                "file_path": str(temp_file)
+                "file_path": None,
+                "smoke": None
             }
+        
+        with self.scratch.job("html") as scratch:
+            scratch.attach("index.html", html_content)
+            try:
+                if not await self._check_node_available():
+                    # 没有Node时保留页面，供在浏览器中手动测试
+                    result = {"success": True, "output": "Node.js 未安装，未运行冒烟测试", "error": None, "smoke": None}
+                    kept = scratch.finish(result, force=True)
+                    result["file_path"] = str(kept / "index.html") if kept else None
+                    logger.info(f"HTML文件已创建，可在浏览器中打开测试: {result['file_path']}")
+                    return result
+                
+                game_dir = None
+                if base_dir is not None:
+                    game_dir = Path(base_dir)
+                    if not game_dir.is_absolute():
+                        game_dir = self.workspace_root / game_dir
+                result = await self._smoke_test(html_content, game_dir, timeout, frames or Config.SMOKE_TEST_FRAMES)
+                
+            except Exception as e:
+                logger.error(f"执行HTML失败: {e}")
+                result = {
+                    "success": False,
+                    "output": None,
+                    "error": str(e),
+                    "smoke": None
+                }
             
-        except Exception as e:
-            logger.error(f"执行HTML失败: {e}")
-            return {
-                "success": False,
-                "output": None,
-                "error": str(e),
-                "file_path": str(temp_file) if temp_file.exists() else None
-            }
+            kept = scratch.finish(result)
+            result["file_path"] = str(kept / "index.html") if kept else None
+            return result
+    
+    async def _smoke_test(self, html_content: str, game_dir: Optional[Path], timeout: float, frames: int) -> Dict[str, Any]:
+        """在Node工作进程中运行冒烟测试（未启用进程池时临时启动一个工作进程）"""
+        page = load_page(html_content, game_dir)
+        pool = get_node_pool()
+        temporary = pool is None
+        if temporary:
+            pool = NodeWorkerPool(find_node(), size=1, memory_mb=Config.NODE_WORKER_MEMORY_MB)
+        
+        with trace_span("smoke_test", "check", frames=frames, scripts=len(page["scripts"])) as span:
+            try:
+                job = await pool.smoke(page["page"], page["scripts"], frames, timeout=timeout)
+            finally:
+                if temporary:
+                    await pool.close()
+            summary = summarize(job, page)
+            span.set(success=summary["success"], exceptions=len(summary["report"]["exceptions"]))
+        
+        if summary["success"]:
+            logger.info(f"冒烟测试通过: {summary['output'].splitlines()[0]}")
+        else:
+            logger.warning(f"冒烟测试发现问题:\n{summary['error']}")
+        return {
+            "success": summary["success"],
+            "output": summary["output"],
+            "error": summary["error"],
+            "smoke": summary["report"]
+        }
     
     async def execute_js(
         self, 
@@ -108,46 +167,85 @@ class CodeRunner:
             use_node: 是否使用Node.js运行（否则只做语法检查）
             
         Returns:
-            执行结果字典 {success, output, error, exit_code}
+            执行结果字典 {success, output, error, exit_code, file_path}
+            启用Node执行池时代码在常驻工作进程的 vm 上下文中执行，不写临时文件，file_path 为None
         """
-        temp_file = self.temp_dir / f"test_{os.getpid()}.js"
+        if not use_node:
+            # 仅语法检查
+            result = await self.validate_syntax(js_code, "javascript")
+            return {
+                "success": result["valid"],
+                "output": "JavaScript语法检查通过" if result["valid"] else None,
+                "error": result["error"],
+                "exit_code": 0 if result["valid"] else 1,
+                "file_path": None
+            }
         
+        # 检查Node.js是否可用
+        if not await self._check_node_available():
+            logger.warning("Node.js 未安装或不可用，跳过执行")
+            return {
+                "success": True,
+                "output": "Node.js 未安装，代码未执行",
+                "error": None,
+                "exit_code": 0,
+                "file_path": None
+            }
+        
+        with self.scratch.job("js") as scratch:
+            scratch.attach("script.js", js_code)
+            pool = get_node_pool()
+            if pool is not None:
+                result = await self._execute_in_pool(pool, js_code, timeout)
+            else:
+                result = await self._execute_in_process(scratch, js_code, timeout)
+            kept = scratch.finish(result)
+            result["file_path"] = str(kept / "script.js") if kept else None
+            return result
+    
+    async def _execute_in_pool(self, pool: NodeWorkerPool, js_code: str, timeout: float) -> Dict[str, Any]:
+        """在常驻的Node工作进程中执行（全新的 vm 上下文，没有 require/process）"""
+        with trace_span("execute_js", "check", runner="pool", chars=len(js_code)) as span:
+            try:
+                job = await pool.run(js_code, timeout=timeout)
+            except Exception as e:
+                logger.error(f"执行JavaScript失败: {e}")
+                return {"success": False, "output": None, "error": str(e), "exit_code": -1}
+            span.set(ok=job["ok"], timed_out=job["timed_out"])
+        
+        error = job["error"]
+        if job["timed_out"]:
+            logger.error(f"JavaScript执行超时 ({timeout}秒)")
+            message = f"执行超时 ({timeout}秒)"
+        elif error:
+            logger.warning(f"JavaScript执行失败: {error['name']}: {error['message']}")
+            message = error["stack"] or f"{error['name']}: {error['message']}"
+        else:
+            logger.info(f"JavaScript执行成功，耗时 {job['duration_ms']:.1f}ms")
+            message = None
+        
+        return {
+            "success": job["ok"],
+            "output": job["output"],
+            "error": message,
+            "exit_code": 0 if job["ok"] else (-1 if job["timed_out"] else 1)
+        }
+    
+    async def _execute_in_process(self, scratch: ScratchJob, js_code: str, timeout: float) -> Dict[str, Any]:
+        """为每次执行启动一个 node 进程（NODE_POOL_ENABLED=false 时使用），脚本写在任务自己的临时目录中"""
         try:
             # 写入JS代码
-            temp_file.write_text(js_code, encoding='utf-8')
+            temp_file = scratch.write_text("script.js", js_code)
             logger.info(f"创建临时JS文件: {temp_file}")
             
-            if not use_node:
-                # 仅语法检查
-                return {
-                    "success": True,
-                    "output": "JavaScript代码已保存",
-                    "error": None,
-                    "exit_code": 0,
-                    "file_path": str(temp_file)
-                }
-            
-            # 检查Node.js是否可用
-            node_available = await self._check_node_available()
-            
-            if not node_available:
-                logger.warning("Node.js 未安装或不可用，跳过执行")
-                return {
-                    "success": True,
-                    "output": "Node.js 未安装，代码已保存但未执行",
-                    "error": None,
-                    "exit_code": 0,
-                    "file_path": str(temp_file)
-                }
-            
             # 使用Node.js执行
             try:
                 process = await asyncio.create_subprocess_exec(
-                    "node",
+                    find_node(),
                     str(temp_file),
                     stdout=asyncio.subprocess.PIPE,
                     stderr=asyncio.subprocess.PIPE,
-                    cwd=str(self.temp_dir)
+                    cwd=str(scratch.path)
                 )
                 
                 # 等待执行完成（带超时）
@@ -170,8 +268,7 @@ class CodeRunner:
                     "success": success,
                     "output": stdout_text,
                     "error": stderr_text if stderr_text else None,
-                    "exit_code": process.returncode,
-                    "file_path": str(temp_file)
+                    "exit_code": process.returncode
                 }
                 
             except asyncio.TimeoutError:
@@ -182,8 +279,7 @@ class CodeRunner:
                     "success": False,
                     "output": None,
                     "error": f"执行超时 ({timeout}秒)",
-                    "exit_code": -1,
-                    "file_path": str(temp_file)
+                    "exit_code": -1
                 }
             
         except Exception as e:
@@ -192,35 +288,17 @@ class CodeRunner:
                 "success": False,
                 "output": None,
                 "error": str(e),
-                "exit_code": -1,
-                "file_path": str(temp_file) if temp_file.exists() else None
+                "exit_code": -1
             }
-        finally:
-            # 清理临时文件（可选，保留以便调试）
-            # if temp_file.exists():
-            #     temp_file.unlink()
-            pass
     
     async def _check_node_available(self) -> bool:
         """
-        检查Node.js是否可用
+        检查Node.js是否可用（进程内只查找一次）
         
         Returns:
             可用返回True
         """
-        try:
-            process = await asyncio.create_subprocess_exec(
-                "node",
-                "--version",
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            await process.communicate()
-            return process.returncode == 0
-        except FileNotFoundError:
-            return False
-        except Exception:
-            return False
+        return find_node() is not None
     
     async def validate_syntax(
         self, 
@@ -230,36 +308,166 @@ class CodeRunner:
         """
         验证代码语法
         
+        JavaScript: 有Node.js时由Node编译检查（常驻工作进程，ES模块用 node --check，不执行、不写临时文件），
+        否则用内置的轻量检查（未闭合的字符串/注释/正则、括号不配对）。结果按内容哈希缓存。
+        
         Args:
             code: 代码内容
             language: 语言类型 (javascript, html)
             
         Returns:
-            验证结果 {valid, errors}
+            验证结果 {valid, errors, error, checker, cached}
+            errors: [{line, column, message}]，行列号从1开始
+            error: 第一个错误的描述（没有错误时为None）
+            checker: node / python / html
         """
         if language.lower() == "javascript":
-            # JavaScript语法检查
-            result = await self.execute_js(code, use_node=False)
-            return {
-                "valid": result["success"],
-                "errors": result["error"]
-            }
+            return await self._validate_js_syntax(code)
         
         elif language.lower() == "html":
             # HTML语法检查
             result = await self.execute_html(code, check_only=True)
             return {
                 "valid": result["success"],
-                "errors": result["error"]
+                "errors": [],
+                "error": result["error"],
+                "checker": "html",
+                "cached": False
             }
         
         else:
             logger.warning(f"不支持的语言: {language}")
             return {
                 "valid": False,
-                "errors": f"不支持的语言: {language}"
+                "errors": [],
+                "error": f"不支持的语言: {language}",
+                "checker": None,
+                "cached": False
             }
     
+    async def _validate_js_syntax(self, code: str) -> Dict[str, Any]:
+        """检查JavaScript语法（带缓存）"""
+        checker = Config.JS_SYNTAX_CHECKER.lower()
+        if checker != "python" and self._find_node():
+            checker = "node"
+        else:
+            checker = "python"
+        
+        key = (checker, hashlib.sha1(code.encode("utf-8", "surrogatepass")).hexdigest())
+        cached = _syntax_cache.get(key)
+        if cached is not None:
+            _syntax_cache.move_to_end(key)
+            return dict(cached, cached=True)
+        
+        with trace_span("syntax_check", "check", checker=checker, chars=len(code)) as span:
+            errors = await self._node_check(code) if checker == "node" else None
+            if errors is None:
+                # 没有Node或Node检查失败（超时等）时使用内置检查，内置检查的结果同样可以缓存
+                checker = "python"
+                key = (checker, key[1])
+                errors = check_syntax(code)
+            span.set(checker=checker, errors=len(errors))
+        
+        result = {
+            "valid": not errors,
+            "errors": errors,
+            "error": self.format_syntax_error(errors[0]) if errors else None,
+            "checker": checker
+        }
+        _syntax_cache[key] = result
+        if len(_syntax_cache) > _SYNTAX_CACHE_SIZE:
+            _syntax_cache.popitem(last=False)
+        
+        if errors:
+            logger.info(f"JavaScript语法错误 ({checker}): {result['error']}")
+        return dict(result, cached=False)
+    
+    @staticmethod
+    def format_syntax_error(error: Dict[str, Any]) -> str:
+        """把一个语法错误格式化为 第N行第M列: 说明"""
+        return f"第{error['line']}行第{error['column']}列: {error['message']}"
+    
+    @classmethod
+    def _find_node(cls) -> Optional[str]:
+        """查找Node.js可执行文件（进程内只查找一次）"""
+        return find_node()
+    
+    async def _node_check(self, code: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        用Node检查语法：普通脚本交给常驻工作进程编译，ES模块用 node --check --input-type=module
+        
+        Returns:
+            错误列表（语法正确时为空列表），Node无法完成检查时返回None
+        """
+        is_module = bool(_MODULE_SYNTAX.search(code))
+        pool = None if is_module else get_node_pool()
+        if pool is not None:
+            job = await pool.check(code, timeout=Config.JS_SYNTAX_CHECK_TIMEOUT)
+            error = job["error"]
+            if job["ok"]:
+                return []
+            if error["name"] in ("TimeoutError", "WorkerCrashed") or error["line"] is None:
+                logger.warning(f"Node工作进程语法检查失败: {error['message']}")
+                return None
+            return [{"line": error["line"], "column": error["column"], "message": f"{error['name']}: {error['message']}"}]
+        
+        args = [self._find_node(), "--check"]
+        if is_module:
+            args.append("--input-type=module")
+        
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *args,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=str(self.temp_dir)
+            )
+        except OSError as e:
+            logger.warning(f"启动 node --check 失败: {e}")
+            return None
+        
+        try:
+            _, stderr = await asyncio.wait_for(
+                process.communicate(code.encode("utf-8")),
+                timeout=Config.JS_SYNTAX_CHECK_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"node --check 超时 ({Config.JS_SYNTAX_CHECK_TIMEOUT}秒)")
+            process.kill()
+            await process.wait()
+            return None
+        
+        if process.returncode == 0:
+            return []
+        return [self._parse_node_error(stderr.decode("utf-8", errors="replace"))]
+    
+    @staticmethod
+    def _parse_node_error(stderr: str) -> Dict[str, Any]:
+        """
+        解析 node --check 的错误输出:
+        
+            [stdin]:3
+              foo(;
+                  ^
+            
+            SyntaxError: Unexpected token ';'
+        """
+        lines = stderr.splitlines()
+        line, column, message = 0, 0, stderr.strip().splitlines()[0] if stderr.strip() else "语法错误"
+        for index, text in enumerate(lines):
+            location = _NODE_LOCATION.match(text)
+            if location and not line:
+                line, column = int(location.group(1)), 1
+                # 接下来是出错的代码行和指向错误位置的 ^（代码意外结束时没有）
+                if index + 2 < len(lines) and "^" in lines[index + 2]:
+                    column = lines[index + 2].index("^") + 1
+            error = _NODE_ERROR.match(text)
+            if error:
+                message = f"{error.group(1)}: {error.group(2)}"
+                break
+        return {"line": line, "column": column, "message": message}
+    
     async def execute_game_test(
         self, 
         game_dir: str,
@@ -300,27 +508,24 @@ class CodeRunner:
         # 读取HTML内容
         html_content = entry_path.read_text(encoding='utf-8')
         
-        # 执行HTML
-        result = await self.execute_html(html_content, timeout=timeout)
+        # 执行HTML（外部脚本和资源从游戏目录读取）
+        result = await self.execute_html(html_content, timeout=timeout, base_dir=str(game_path))
         
         logger.info(f"游戏测试完成: {game_dir}")
         return result
     
     def cleanup_temp_files(self) -> int:
         """
-        清理临时文件
+        清理临时文件（按保留策略保留的任务目录，以及旧版本遗留的文件）
+        
+        每次执行结束时会自动删除不需要保留的任务目录，这里只用于手动清理保留的目录
         
         Returns:
-            清理的文件数量
+            清理的任务目录和文件数量
         """
         count = 0
         try:
-            for file in self.temp_dir.glob("test_*.html"):
-                file.unlink()
-                count += 1
-            for file in self.temp_dir.glob("test_*.js"):
-                file.unlink()
-                count += 1
+            count = self.scratch.cleanup()
             logger.info(f"清理了 {count} 个临时文件")
         except Exception as e:
             logger.error(f"清理临时文件失败: {e}")
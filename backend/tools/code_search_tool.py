@@ -1,22 +1,57 @@
 """
 文件: tools/code_search_tool.py
 职责: 搜索代码中的函数、类、变量定义
-依赖: utils/logger.py
+依赖: utils/logger.py, tools/symbol_index.py, tools/file_tool.py, config.py
 被依赖: 程序员Agent
 关键接口:
   - CodeSearchTool.search_function(name, directory) -> 搜索函数定义
   - CodeSearchTool.search_class(name, directory) -> 搜索类定义
   - CodeSearchTool.search_variable(name, directory) -> 搜索变量定义
+  - CodeSearchTool.search_prefix(prefix, directory) -> 按名称前缀搜索定义
+  - CodeSearchTool.search_fuzzy(query, directory) -> 模糊搜索定义（拼写不完全一致时）
   - CodeSearchTool.get_api_registry(registry_file) -> 读取API注册表
+
+说明:
+  搜索基于持久化的符号索引（见 tools/symbol_index.py），查询前只检查文件的 mtime/大小，
+  通过 FileTool 写入的文件会立即重新索引。
 """
 
 import re
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+from config import Config
+from tools.file_tool import FileTool
+from tools.symbol_index import SymbolIndex
 from utils.logger import setup_logger
 
 logger = setup_logger("code_search")
 
+# 每个工作空间共享一个索引 {(数据库路径, 工作空间): 索引}
+_indexes: Dict[Tuple[str, str], SymbolIndex] = {}
+
+
+def get_symbol_index(workspace_root: Path) -> SymbolIndex:
+    """获取工作空间的符号索引（首次使用时打开，并监听 FileTool 的写入）"""
+    db_path = Config.CODE_INDEX_PATH or str(workspace_root / ".code_index" / "symbols.db")
+    key = (db_path, str(workspace_root))
+    index = _indexes.get(key)
+    if index is None:
+        index = SymbolIndex(db_path, workspace_root, Config.CODE_INDEX_REFRESH_INTERVAL)
+        FileTool.add_write_listener(index.update_file)
+        _indexes[key] = index
+        logger.info(f"代码符号索引: {db_path}")
+    return index
+
+
+def _to_result(symbol: Dict[str, Any], result_type: str) -> Dict[str, Any]:
+    """索引记录转换为搜索结果 {file, line, content, type}"""
+    return {
+        "file": symbol["file"],
+        "line": symbol["line"],
+        "content": symbol["content"],
+        "type": result_type
+    }
+
 
 class CodeSearchTool:
     """代码搜索工具 - 帮助Agent查找已有的代码实现"""
@@ -32,8 +67,20 @@ class CodeSearchTool:
             workspace_root = str(Path(__file__).parent.parent.parent)
         
         self.workspace_root = Path(workspace_root).resolve()
+        self.index = get_symbol_index(self.workspace_root)
         logger.info(f"代码搜索工具初始化完成，工作空间: {self.workspace_root}")
     
+    def _prepare(self, directory: str, file_pattern: str) -> bool:
+        """检查目录并增量更新索引，目录不存在时返回False"""
+        search_dir = self.workspace_root / directory
+        
+        if not search_dir.exists():
+            logger.warning(f"搜索目录不存在: {search_dir}")
+            return False
+        
+        self.index.refresh(directory, file_pattern)
+        return True
+    
     async def search_function(
         self, 
         function_name: str, 
@@ -41,7 +88,7 @@ class CodeSearchTool:
         file_pattern: str = "*.js"
     ) -> List[Dict[str, Any]]:
         """
-        搜索函数定义
+        搜索函数定义（包括 const foo = () => 形式的函数、类方法、箭头函数类字段和对象方法）
         
         Args:
             function_name: 函数名
@@ -51,50 +98,14 @@ class CodeSearchTool:
         Returns:
             匹配结果列表 [{file, line, content}]
         """
-        search_dir = self.workspace_root / directory
-        
-        if not search_dir.exists():
-            logger.warning(f"搜索目录不存在: {search_dir}")
+        if not self._prepare(directory, file_pattern):
             return []
         
-        results = []
-        
-        # JavaScript函数定义的正则模式
-        patterns = [
-            rf'function\s+{function_name}\s*\(',  # function foo()
-            rf'const\s+{function_name}\s*=\s*function',  # const foo = function
-            rf'const\s+{function_name}\s*=\s*\(',  # const foo = ()
-            rf'let\s+{function_name}\s*=\s*function',  # let foo = function
-            rf'let\s+{function_name}\s*=\s*\(',  # let foo = ()
-            rf'var\s+{function_name}\s*=\s*function',  # var foo = function
-            rf'{function_name}\s*:\s*function',  # foo: function
-            rf'{function_name}\s*\([^)]*\)\s*{{',  # foo() { (方法简写)
+        results = [
+            _to_result(symbol, "function")
+            for symbol in self.index.lookup(function_name, ("function", "method"), directory, file_pattern)
         ]
         
-        # 遍历所有匹配的文件
-        for file_path in search_dir.rglob(file_pattern):
-            if not file_path.is_file():
-                continue
-            
-            try:
-                content = file_path.read_text(encoding='utf-8')
-                lines = content.split('\n')
-                
-                for i, line in enumerate(lines, start=1):
-                    for pattern in patterns:
-                        if re.search(pattern, line):
-                            results.append({
-                                "file": str(file_path.relative_to(self.workspace_root)),
-                                "line": i,
-                                "content": line.strip(),
-                                "type": "function"
-                            })
-                            break  # 一行只记录一次
-            
-            except Exception as e:
-                logger.warning(f"读取文件失败 {file_path}: {e}")
-                continue
-        
         logger.info(f"搜索函数 '{function_name}' 找到 {len(results)} 个结果")
         return results
     
@@ -115,43 +126,14 @@ class CodeSearchTool:
         Returns:
             匹配结果列表
         """
-        search_dir = self.workspace_root / directory
-        
-        if not search_dir.exists():
-            logger.warning(f"搜索目录不存在: {search_dir}")
+        if not self._prepare(directory, file_pattern):
             return []
         
-        results = []
-        
-        # JavaScript类定义的正则模式
-        patterns = [
-            rf'class\s+{class_name}\s*{{',  # class Foo {
-            rf'class\s+{class_name}\s+extends',  # class Foo extends Bar
+        results = [
+            _to_result(symbol, "class")
+            for symbol in self.index.lookup(class_name, ("class",), directory, file_pattern)
         ]
         
-        for file_path in search_dir.rglob(file_pattern):
-            if not file_path.is_file():
-                continue
-            
-            try:
-                content = file_path.read_text(encoding='utf-8')
-                lines = content.split('\n')
-                
-                for i, line in enumerate(lines, start=1):
-                    for pattern in patterns:
-                        if re.search(pattern, line):
-                            results.append({
-                                "file": str(file_path.relative_to(self.workspace_root)),
-                                "line": i,
-                                "content": line.strip(),
-                                "type": "class"
-                            })
-                            break
-            
-            except Exception as e:
-                logger.warning(f"读取文件失败 {file_path}: {e}")
-                continue
-        
         logger.info(f"搜索类 '{class_name}' 找到 {len(results)} 个结果")
         return results
     
@@ -162,7 +144,7 @@ class CodeSearchTool:
         file_pattern: str = "*.js"
     ) -> List[Dict[str, Any]]:
         """
-        搜索变量定义
+        搜索变量定义（const/let/var 声明，包括赋值为函数的声明）
         
         Args:
             var_name: 变量名
@@ -172,44 +154,16 @@ class CodeSearchTool:
         Returns:
             匹配结果列表
         """
-        search_dir = self.workspace_root / directory
-        
-        if not search_dir.exists():
-            logger.warning(f"搜索目录不存在: {search_dir}")
+        if not self._prepare(directory, file_pattern):
             return []
         
-        results = []
-        
-        # 变量定义的正则模式
-        patterns = [
-            rf'const\s+{var_name}\s*=',  # const FOO =
-            rf'let\s+{var_name}\s*=',    # let foo =
-            rf'var\s+{var_name}\s*=',    # var foo =
+        results = [
+            _to_result(symbol, "variable")
+            for symbol in self.index.lookup(
+                var_name, ("variable",), directory, file_pattern, include_declared=True
+            )
         ]
         
-        for file_path in search_dir.rglob(file_pattern):
-            if not file_path.is_file():
-                continue
-            
-            try:
-                content = file_path.read_text(encoding='utf-8')
-                lines = content.split('\n')
-                
-                for i, line in enumerate(lines, start=1):
-                    for pattern in patterns:
-                        if re.search(pattern, line):
-                            results.append({
-                                "file": str(file_path.relative_to(self.workspace_root)),
-                                "line": i,
-                                "content": line.strip(),
-                                "type": "variable"
-                            })
-                            break
-            
-            except Exception as e:
-                logger.warning(f"读取文件失败 {file_path}: {e}")
-                continue
-        
         logger.info(f"搜索变量 '{var_name}' 找到 {len(results)} 个结果")
         return results
     
@@ -230,9 +184,17 @@ class CodeSearchTool:
         Returns:
             分类结果字典 {functions, classes, variables}
         """
-        functions = await self.search_function(name, directory, file_pattern)
-        classes = await self.search_class(name, directory, file_pattern)
-        variables = await self.search_variable(name, directory, file_pattern)
+        functions, classes, variables = [], [], []
+        
+        if self._prepare(directory, file_pattern):
+            # 一次查询，按类型分组（const/let/var 声明的函数同时算作变量，与单独搜索的结果一致）
+            for symbol in self.index.lookup(name, None, directory, file_pattern):
+                if symbol["kind"] == "class":
+                    classes.append(_to_result(symbol, "class"))
+                elif symbol["kind"] in ("function", "method"):
+                    functions.append(_to_result(symbol, "function"))
+                if symbol["decl"]:
+                    variables.append(_to_result(symbol, "variable"))
         
         return {
             "functions": functions,
@@ -241,6 +203,66 @@ class CodeSearchTool:
             "total": len(functions) + len(classes) + len(variables)
         }
     
+    async def search_prefix(
+        self,
+        prefix: str,
+        directory: str = ".",
+        file_pattern: str = "*.js",
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """
+        按名称前缀搜索定义（忽略大小写），如 "player" 可找到 playerMove、PlayerController
+        
+        Args:
+            prefix: 名称前缀
+            directory: 搜索目录
+            file_pattern: 文件匹配模式
+            limit: 最多返回的结果数
+            
+        Returns:
+            匹配结果列表 [{name, parent, file, line, content, type}]，parent 为方法所属的类或对象
+        """
+        if not self._prepare(directory, file_pattern):
+            return []
+        
+        results = [
+            dict(_to_result(symbol, symbol["kind"]), name=symbol["name"], parent=symbol["parent"])
+            for symbol in self.index.search_prefix(prefix, None, directory, file_pattern, limit)
+        ]
+        
+        logger.info(f"前缀搜索 '{prefix}' 找到 {len(results)} 个结果")
+        return results
+    
+    async def search_fuzzy(
+        self,
+        query: str,
+        directory: str = ".",
+        file_pattern: str = "*.js",
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """
+        模糊搜索定义（忽略大小写，包含查询串或拼写相近的名称），按匹配程度排序
+        
+        Args:
+            query: 查询串
+            directory: 搜索目录
+            file_pattern: 文件匹配模式
+            limit: 最多返回的结果数
+            
+        Returns:
+            匹配结果列表 [{name, parent, file, line, content, type, score}]
+        """
+        if not self._prepare(directory, file_pattern):
+            return []
+        
+        results = [
+            dict(_to_result(symbol, symbol["kind"]), name=symbol["name"], parent=symbol["parent"], score=symbol["score"])
+            for symbol in self.index.search_fuzzy(query, None, directory, file_pattern, limit)
+        ]
+        
+        logger.info(f"模糊搜索 '{query}' 找到 {len(results)} 个结果")
+        return results
+    
     async def get_api_registry(self, registry_file: str = "shared_knowledge/api_registry.yaml") -> Dict[str, Any]:
         """
         读取并解析API注册表
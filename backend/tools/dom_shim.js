@@ -0,0 +1,880 @@
+/**
+ * 无头冒烟测试用的浏览器环境（由 node_worker.js 的 smoke 任务使用）
+ *
+ * 提供游戏加载和运行所需的最小浏览器接口:
+ *   - document 和 DOM 元素（按 index.html 的元素树建立，支持简单选择器、事件冒泡）
+ *   - Canvas 2D 上下文（不真正绘制，只统计绘制调用；和浏览器一样对负半径、非有限的渐变坐标等参数报错）
+ *   - 虚拟时钟驱动的 requestAnimationFrame / setTimeout / setInterval / performance.now
+ *   - 键盘、鼠标事件，localStorage，Image / Audio / AudioContext
+ *
+ * 不存在的接口保持不存在（例如拼错的 ctx 方法），让游戏中的真实错误照常抛出。
+ */
+
+'use strict';
+
+const FRAME_MS = 1000 / 60;
+// 定时器的最小间隔（毫秒），避免 setTimeout(fn, 0) 链在一帧内无限执行
+const MIN_TIMER_DELAY = 1;
+
+// 计为一次绘制调用的 Canvas 2D 方法
+const DRAW_METHODS = ['fillRect', 'strokeRect', 'clearRect', 'fillText', 'strokeText', 'drawImage', 'fill', 'stroke', 'putImageData'];
+// 只修改路径或状态的 Canvas 2D 方法
+const PATH_METHODS = [
+    'save', 'restore', 'scale', 'rotate', 'translate', 'transform', 'setTransform', 'resetTransform', 'reset',
+    'beginPath', 'closePath', 'moveTo', 'lineTo', 'bezierCurveTo', 'quadraticCurveTo', 'arcTo', 'rect', 'roundRect',
+    'clip', 'setLineDash', 'drawFocusIfNeeded'
+];
+
+const KEY_CODES = {
+    ArrowLeft: ['ArrowLeft', 37], ArrowUp: ['ArrowUp', 38], ArrowRight: ['ArrowRight', 39], ArrowDown: ['ArrowDown', 40],
+    ' ': ['Space', 32], Enter: ['Enter', 13], Escape: ['Escape', 27],
+    w: ['KeyW', 87], a: ['KeyA', 65], s: ['KeyS', 83], d: ['KeyD', 68]
+};
+
+function domException(name, message) {
+    const error = new Error(message);
+    error.name = name;
+    return error;
+}
+
+function requireFinite(method, values) {
+    for (const value of values) {
+        if (!Number.isFinite(value)) {
+            throw new TypeError(`Failed to execute '${method}' on 'CanvasRenderingContext2D': The provided double value is non-finite.`);
+        }
+    }
+}
+
+/**
+ * 建立一个页面环境
+ *
+ * @param page {elements, files, width, height}
+ *   elements: [{tag, attrs, text, parent}]，parent 为父元素在列表中的下标（根元素为 -1）
+ *   files: 游戏目录中存在的文件（相对路径），用于判断图片等资源能否加载
+ * @param hooks {error(e), console(level, args), warn(message)}
+ * @returns {sandbox, load(), frame(index), input(index), stats}
+ */
+function createEnvironment(page, hooks) {
+    const stats = { drawCalls: 0, rafCallbacks: 0, timerCallbacks: 0, events: 0 };
+    const clock = { now: 0 };
+    const files = new Set(page.files || []);
+    // 在下方初始化，DOM 类中引用
+    let documentObject = null;
+    let windowTarget = null;
+
+    // ---------------- 事件 ----------------
+
+    class Event {
+        constructor(type, init = {}) {
+            Object.assign(this, init);
+            this.type = String(type);
+            this.bubbles = !!init.bubbles;
+            this.cancelable = init.cancelable !== false;
+            this.defaultPrevented = false;
+            this.target = null;
+            this.currentTarget = null;
+            this.timeStamp = clock.now;
+            this._stop = false;
+            this._stopNow = false;
+        }
+        preventDefault() { if (this.cancelable) this.defaultPrevented = true; }
+        stopPropagation() { this._stop = true; }
+        stopImmediatePropagation() { this._stop = true; this._stopNow = true; }
+    }
+    class UIEvent extends Event {}
+    class KeyboardEvent extends UIEvent {}
+    class MouseEvent extends UIEvent {}
+    class PointerEvent extends MouseEvent {}
+    class WheelEvent extends MouseEvent {}
+    class TouchEvent extends UIEvent {}
+    class FocusEvent extends UIEvent {}
+    class CustomEvent extends Event {
+        constructor(type, init = {}) {
+            super(type, init);
+            this.detail = init.detail === undefined ? null : init.detail;
+        }
+    }
+
+    class EventTarget {
+        constructor() {
+            this._listeners = {};
+        }
+        addEventListener(type, listener, options) {
+            if (!listener) return;
+            const list = this._listeners[type] || (this._listeners[type] = []);
+            if (list.some((entry) => entry.listener === listener)) return;
+            list.push({ listener, once: !!(options && typeof options === 'object' && options.once) });
+        }
+        removeEventListener(type, listener) {
+            const list = this._listeners[type];
+            if (list) this._listeners[type] = list.filter((entry) => entry.listener !== listener);
+        }
+        dispatchEvent(event) {
+            if (!event || typeof event.type !== 'string') {
+                throw new TypeError("Failed to execute 'dispatchEvent': parameter 1 is not of type 'Event'.");
+            }
+            stats.events++;
+            event.target = this;
+            const path = [this];
+            if (event.bubbles) {
+                for (let node = this.parentNode; node; node = node.parentNode) path.push(node);
+                if (path[path.length - 1] === documentObject) path.push(windowTarget);
+            }
+            for (const node of path) {
+                node._invoke(event);
+                if (event._stop) break;
+            }
+            return !event.defaultPrevented;
+        }
+        _invoke(event) {
+            event.currentTarget = this === windowTarget ? sandbox : this;
+            const handler = this === windowTarget ? sandbox['on' + event.type] : this['on' + event.type];
+            const list = (this._listeners[event.type] || []).slice();
+            const callbacks = [];
+            if (typeof handler === 'function') callbacks.push({ listener: handler });
+            callbacks.push(...list);
+            for (const entry of callbacks) {
+                if (entry.once) this.removeEventListener(event.type, entry.listener);
+                try {
+                    const listener = entry.listener;
+                    if (typeof listener === 'function') listener.call(event.currentTarget, event);
+                    else if (listener && typeof listener.handleEvent === 'function') listener.handleEvent(event);
+                } catch (e) {
+                    hooks.error(e);
+                }
+                if (event._stopNow) break;
+            }
+        }
+    }
+
+    // ---------------- Canvas ----------------
+
+    class CanvasGradient {
+        addColorStop(offset, color) {
+            if (!(offset >= 0 && offset <= 1)) {
+                throw domException('IndexSizeError', `Failed to execute 'addColorStop' on 'CanvasGradient': The provided value (${offset}) is outside the range (0.0, 1.0).`);
+            }
+        }
+    }
+
+    class CanvasRenderingContext2D {
+        constructor(canvas) {
+            this.canvas = canvas;
+            this.fillStyle = '#000000';
+            this.strokeStyle = '#000000';
+            this.lineWidth = 1;
+            this.lineCap = 'butt';
+            this.lineJoin = 'miter';
+            this.miterLimit = 10;
+            this.lineDashOffset = 0;
+            this.font = '10px sans-serif';
+            this.textAlign = 'start';
+            this.textBaseline = 'alphabetic';
+            this.direction = 'inherit';
+            this.globalAlpha = 1;
+            this.globalCompositeOperation = 'source-over';
+            this.imageSmoothingEnabled = true;
+            this.shadowBlur = 0;
+            this.shadowColor = 'rgba(0, 0, 0, 0)';
+            this.shadowOffsetX = 0;
+            this.shadowOffsetY = 0;
+            this.filter = 'none';
+            this._lineDash = [];
+        }
+        getLineDash() { return this._lineDash.slice(); }
+        getTransform() { return { a: 1, b: 0, c: 0, d: 1, e: 0, f: 0 }; }
+        arc(x, y, radius, startAngle, endAngle) {
+            // 和浏览器一样: 参数不是有限数时忽略调用，半径为负时报错
+            if (radius < 0) {
+                throw domException('IndexSizeError', `Failed to execute 'arc' on 'CanvasRenderingContext2D': The radius provided (${radius}) is negative.`);
+            }
+        }
+        ellipse(x, y, radiusX, radiusY, rotation, startAngle, endAngle) {
+            if (radiusX < 0 || radiusY < 0) {
+                throw domException('IndexSizeError', `Failed to execute 'ellipse' on 'CanvasRenderingContext2D': The radius provided is negative.`);
+            }
+        }
+        createLinearGradient(x0, y0, x1, y1) {
+            requireFinite('createLinearGradient', [x0, y0, x1, y1]);
+            return new CanvasGradient();
+        }
+        createRadialGradient(x0, y0, r0, x1, y1, r1) {
+            requireFinite('createRadialGradient', [x0, y0, r0, x1, y1, r1]);
+            if (r0 < 0 || r1 < 0) {
+                throw domException('IndexSizeError', `Failed to execute 'createRadialGradient' on 'CanvasRenderingContext2D': The radius provided is negative.`);
+            }
+            return new CanvasGradient();
+        }
+        createConicGradient() { return new CanvasGradient(); }
+        createPattern() { return {}; }
+        measureText(text) {
+            const size = parseFloat((String(this.font).match(/(\d+(?:\.\d+)?)px/) || [0, 10])[1]);
+            return { width: String(text).length * size * 0.6, actualBoundingBoxAscent: size * 0.8, actualBoundingBoxDescent: size * 0.2 };
+        }
+        isPointInPath() { return false; }
+        isPointInStroke() { return false; }
+        createImageData(width, height) {
+            if (typeof width === 'object' && width) ({ width, height } = width);
+            return imageData(width, height);
+        }
+        getImageData(x, y, width, height) {
+            if (!Math.trunc(width) || !Math.trunc(height)) {
+                throw domException('IndexSizeError', `Failed to execute 'getImageData' on 'CanvasRenderingContext2D': The source ${width ? 'height' : 'width'} is 0.`);
+            }
+            return imageData(width, height);
+        }
+    }
+    for (const method of PATH_METHODS) {
+        CanvasRenderingContext2D.prototype[method] = function () {};
+    }
+    CanvasRenderingContext2D.prototype.setLineDash = function (segments) {
+        this._lineDash = Array.from(segments || []);
+    };
+    for (const method of DRAW_METHODS) {
+        CanvasRenderingContext2D.prototype[method] = function (image) {
+            if (method === 'drawImage' && (image === null || typeof image !== 'object')) {
+                throw new TypeError("Failed to execute 'drawImage' on 'CanvasRenderingContext2D': The provided value is not of type '(CSSImageValue or HTMLCanvasElement or HTMLImageElement or HTMLVideoElement or ImageBitmap or OffscreenCanvas or SVGImageElement or VideoFrame)'.");
+            }
+            stats.drawCalls++;
+        };
+    }
+
+    function imageData(width, height) {
+        // 大尺寸只分配有限的内存，游戏通常只读取少量像素
+        const w = Math.max(1, Math.abs(Math.floor(width)));
+        const h = Math.max(1, Math.abs(Math.floor(height)));
+        return { width: w, height: h, data: new Uint8ClampedArray(Math.min(w * h, 1 << 20) * 4) };
+    }
+
+    // ---------------- DOM ----------------
+
+    class Node extends EventTarget {
+        constructor() {
+            super();
+            this.parentNode = null;
+            this.childNodes = [];
+            this.ownerDocument = documentObject;
+        }
+        get parentElement() { return this.parentNode instanceof Element ? this.parentNode : null; }
+        get firstChild() { return this.childNodes[0] || null; }
+        get lastChild() { return this.childNodes[this.childNodes.length - 1] || null; }
+        get nextSibling() {
+            const siblings = this.parentNode ? this.parentNode.childNodes : [];
+            return siblings[siblings.indexOf(this) + 1] || null;
+        }
+        get isConnected() {
+            let node = this;
+            while (node.parentNode) node = node.parentNode;
+            return node === documentObject;
+        }
+        appendChild(child) {
+            if (!(child instanceof Node)) {
+                throw new TypeError("Failed to execute 'appendChild' on 'Node': parameter 1 is not of type 'Node'.");
+            }
+            if (child.parentNode) child.parentNode.removeChild(child);
+            child.parentNode = this;
+            this.childNodes.push(child);
+            return child;
+        }
+        append(...nodes) {
+            for (const node of nodes) this.appendChild(node instanceof Node ? node : documentObject.createTextNode(node));
+        }
+        prepend(...nodes) {
+            for (const node of nodes.reverse()) this.insertBefore(node instanceof Node ? node : documentObject.createTextNode(node), this.firstChild);
+        }
+        insertBefore(child, reference) {
+            if (!reference) return this.appendChild(child);
+            if (child.parentNode) child.parentNode.removeChild(child);
+            const index = this.childNodes.indexOf(reference);
+            if (index < 0) throw domException('NotFoundError', "Failed to execute 'insertBefore' on 'Node': The node before which the new node is to be inserted is not a child of this node.");
+            child.parentNode = this;
+            this.childNodes.splice(index, 0, child);
+            return child;
+        }
+        removeChild(child) {
+            const index = this.childNodes.indexOf(child);
+            if (index < 0) throw domException('NotFoundError', "Failed to execute 'removeChild' on 'Node': The node to be removed is not a child of this node.");
+            this.childNodes.splice(index, 1);
+            child.parentNode = null;
+            return child;
+        }
+        replaceChild(child, old) {
+            this.insertBefore(child, old);
+            return this.removeChild(old);
+        }
+        remove() {
+            if (this.parentNode) this.parentNode.removeChild(this);
+        }
+        contains(node) {
+            for (; node; node = node.parentNode) if (node === this) return true;
+            return false;
+        }
+        get textContent() { return this.childNodes.map((child) => child.textContent).join(''); }
+        set textContent(value) {
+            for (const child of this.childNodes) child.parentNode = null;
+            this.childNodes = [];
+            if (value !== '' && value !== null && value !== undefined) this.appendChild(documentObject.createTextNode(value));
+        }
+    }
+
+    class Text extends Node {
+        constructor(data) {
+            super();
+            this.nodeType = 3;
+            this.nodeName = '#text';
+            this.data = String(data);
+        }
+        get textContent() { return this.data; }
+        set textContent(value) { this.data = String(value); }
+    }
+
+    class ClassList {
+        constructor(element) { this._element = element; }
+        _items() { return String(this._element.className).split(/\s+/).filter(Boolean); }
+        _set(items) { this._element.className = items.join(' '); }
+        get length() { return this._items().length; }
+        contains(name) { return this._items().includes(name); }
+        add(...names) { this._set([...new Set([...this._items(), ...names])]); }
+        remove(...names) { this._set(this._items().filter((item) => !names.includes(item))); }
+        toggle(name, force) {
+            const has = this.contains(name);
+            const want = force === undefined ? !has : !!force;
+            if (want && !has) this.add(name);
+            if (!want && has) this.remove(name);
+            return want;
+        }
+        replace(oldName, newName) {
+            if (!this.contains(oldName)) return false;
+            this._set(this._items().map((item) => (item === oldName ? newName : item)));
+            return true;
+        }
+        item(index) { return this._items()[index] || null; }
+        toString() { return this._element.className; }
+    }
+
+    class Element extends Node {
+        constructor(tag, attrs = {}) {
+            super();
+            this.nodeType = 1;
+            this.tagName = String(tag).toUpperCase();
+            this.nodeName = this.tagName;
+            this._attrs = {};
+            this.id = '';
+            this.className = '';
+            this.style = { setProperty() {}, removeProperty() {}, getPropertyValue() { return ''; } };
+            this.dataset = {};
+            this.classList = new ClassList(this);
+            this.value = '';
+            this.disabled = false;
+            this.checked = false;
+            this.hidden = false;
+            this.scrollTop = 0;
+            this.scrollLeft = 0;
+            for (const [name, value] of Object.entries(attrs)) this.setAttribute(name, value);
+        }
+        get children() { return this.childNodes.filter((child) => child instanceof Element); }
+        get firstElementChild() { return this.children[0] || null; }
+        get lastElementChild() { const children = this.children; return children[children.length - 1] || null; }
+        get innerHTML() { return this.textContent; }
+        set innerHTML(value) { this.textContent = String(value).replace(/<[^>]*>/g, ''); }
+        get outerHTML() { return `<${this.tagName.toLowerCase()}>${this.innerHTML}</${this.tagName.toLowerCase()}>`; }
+        get innerText() { return this.textContent; }
+        set innerText(value) { this.textContent = value; }
+        get offsetWidth() { return Number(this._attrs.width) || (this === documentObject.body ? sandbox.innerWidth : 100); }
+        get offsetHeight() { return Number(this._attrs.height) || (this === documentObject.body ? sandbox.innerHeight : 30); }
+        get clientWidth() { return this.offsetWidth; }
+        get clientHeight() { return this.offsetHeight; }
+        setAttribute(name, value) {
+            name = String(name).toLowerCase();
+            value = String(value);
+            this._attrs[name] = value;
+            if (name === 'id') this.id = value;
+            else if (name === 'class') this.className = value;
+            else if (name === 'value') this.value = value;
+            else if (name === 'disabled') this.disabled = true;
+            else if (name === 'checked') this.checked = true;
+            else if (name === 'hidden') this.hidden = true;
+            else if (name.startsWith('data-')) this.dataset[name.slice(5).replace(/-(\w)/g, (m, c) => c.toUpperCase())] = value;
+        }
+        getAttribute(name) {
+            name = String(name).toLowerCase();
+            if (name === 'id') return this.id || null;
+            if (name === 'class') return this.className || null;
+            return name in this._attrs ? this._attrs[name] : null;
+        }
+        hasAttribute(name) { return this.getAttribute(name) !== null; }
+        removeAttribute(name) {
+            name = String(name).toLowerCase();
+            delete this._attrs[name];
+            if (name === 'disabled') this.disabled = false;
+            if (name === 'hidden') this.hidden = false;
+        }
+        getBoundingClientRect() {
+            const width = this.offsetWidth;
+            const height = this.offsetHeight;
+            return { x: 0, y: 0, left: 0, top: 0, right: width, bottom: height, width, height };
+        }
+        getClientRects() { return [this.getBoundingClientRect()]; }
+        querySelector(selector) { return querySelectorAll(this, selector)[0] || null; }
+        querySelectorAll(selector) { return querySelectorAll(this, selector); }
+        getElementsByTagName(tag) { return querySelectorAll(this, String(tag)); }
+        getElementsByClassName(name) { return querySelectorAll(this, '.' + String(name).trim().split(/\s+/).join('.')); }
+        matches(selector) { return matchesSelector(this, selector); }
+        closest(selector) {
+            for (let node = this; node instanceof Element; node = node.parentNode) if (matchesSelector(node, selector)) return node;
+            return null;
+        }
+        click() {
+            if (this.disabled) return;
+            this.dispatchEvent(new MouseEvent('click', { bubbles: true, button: 0, clientX: 0, clientY: 0 }));
+        }
+        focus() { documentObject.activeElement = this; }
+        blur() { if (documentObject.activeElement === this) documentObject.activeElement = documentObject.body; }
+        scrollIntoView() {}
+        requestFullscreen() { return Promise.resolve(); }
+        requestPointerLock() {}
+        setPointerCapture() {}
+        releasePointerCapture() {}
+        animate() { return { finished: Promise.resolve(), cancel() {}, onfinish: null }; }
+    }
+
+    class HTMLCanvasElement extends Element {
+        constructor(tag, attrs) {
+            super(tag, attrs);
+            this.width = Number(this._attrs.width) || 300;
+            this.height = Number(this._attrs.height) || 150;
+            this._context = null;
+        }
+        setAttribute(name, value) {
+            super.setAttribute(name, value);
+            if (String(name).toLowerCase() === 'width') this.width = Number(value) || 0;
+            if (String(name).toLowerCase() === 'height') this.height = Number(value) || 0;
+        }
+        get offsetWidth() { return this.width; }
+        get offsetHeight() { return this.height; }
+        getContext(type) {
+            if (type !== '2d') return null;
+            if (!this._context) this._context = new CanvasRenderingContext2D(this);
+            return this._context;
+        }
+        toDataURL() { return 'data:image/png;base64,'; }
+        toBlob(callback) { addTimer(() => callback(null), 0, [], false); }
+    }
+
+    // ---------------- 选择器（#id、.class、标签及其组合，空格表示后代） ----------------
+
+    const COMPOUND = /^([a-zA-Z][\w-]*|\*)?((?:[#.][\w-]+)*)$/;
+
+    function matchesCompound(element, compound) {
+        const match = COMPOUND.exec(compound);
+        if (!match) return false;
+        if (match[1] && match[1] !== '*' && element.tagName !== match[1].toUpperCase()) return false;
+        for (const part of match[2].match(/[#.][\w-]+/g) || []) {
+            if (part[0] === '#' && element.id !== part.slice(1)) return false;
+            if (part[0] === '.' && !element.classList.contains(part.slice(1))) return false;
+        }
+        return true;
+    }
+
+    function matchesSelector(element, selector) {
+        return String(selector).split(',').some((single) => {
+            const parts = single.trim().split(/\s*>\s*|\s+/).filter(Boolean);
+            if (!parts.length || !matchesCompound(element, parts[parts.length - 1])) return false;
+            let node = element.parentNode;
+            for (let i = parts.length - 2; i >= 0; i--) {
+                while (node instanceof Element && !matchesCompound(node, parts[i])) node = node.parentNode;
+                if (!(node instanceof Element)) return false;
+                node = node.parentNode;
+            }
+            return true;
+        });
+    }
+
+    function querySelectorAll(root, selector) {
+        const found = [];
+        const visit = (node) => {
+            for (const child of node.childNodes) {
+                if (!(child instanceof Element)) continue;
+                if (matchesSelector(child, selector)) found.push(child);
+                visit(child);
+            }
+        };
+        visit(root);
+        return found;
+    }
+
+    // ---------------- 媒体 ----------------
+
+    function resourceExists(src) {
+        src = String(src);
+        if (!src || /^(data:|blob:|https?:|\/\/)/.test(src)) return true;
+        const path = src.replace(/^\.\//, '').replace(/[?#].*$/, '');
+        return files.has(decodeURIComponent(path));
+    }
+
+    class HTMLImageElement extends Element {
+        constructor(width, height) {
+            super('img');
+            this.width = width || 0;
+            this.height = height || 0;
+            this.naturalWidth = 0;
+            this.naturalHeight = 0;
+            this.complete = true;
+            this._src = '';
+        }
+        get src() { return this._src; }
+        set src(value) {
+            this._src = String(value);
+            this.complete = false;
+            addTimer(() => {
+                this.complete = true;
+                if (resourceExists(this._src)) {
+                    this.naturalWidth = this.width = this.width || 32;
+                    this.naturalHeight = this.height = this.height || 32;
+                    this.dispatchEvent(new Event('load'));
+                } else {
+                    hooks.warn(`图片资源不存在: ${this._src}`);
+                    this.dispatchEvent(new Event('error'));
+                }
+            }, 0, [], false);
+        }
+        decode() { return Promise.resolve(); }
+    }
+
+    class HTMLAudioElement extends Element {
+        constructor(src) {
+            super('audio');
+            this.src = src || '';
+            this.currentTime = 0;
+            this.duration = 1;
+            this.volume = 1;
+            this.loop = false;
+            this.muted = false;
+            this.paused = true;
+            this.readyState = 4;
+        }
+        play() { this.paused = false; return Promise.resolve(); }
+        pause() { this.paused = true; }
+        load() {}
+        cloneNode() { return new HTMLAudioElement(this.src); }
+        canPlayType() { return 'maybe'; }
+    }
+
+    function audioParam(value) {
+        return {
+            value,
+            setValueAtTime() { return this; },
+            linearRampToValueAtTime() { return this; },
+            exponentialRampToValueAtTime() { return this; },
+            setTargetAtTime() { return this; },
+            cancelScheduledValues() { return this; }
+        };
+    }
+
+    function audioNode(extra) {
+        return Object.assign({
+            connect(target) { return target; },
+            disconnect() {},
+            start() {},
+            stop() {},
+            onended: null,
+            type: 'sine',
+            buffer: null,
+            loop: false,
+            frequency: audioParam(440),
+            detune: audioParam(0),
+            gain: audioParam(1),
+            Q: audioParam(1),
+            pan: audioParam(0),
+            playbackRate: audioParam(1)
+        }, extra);
+    }
+
+    class AudioContext {
+        constructor() {
+            this.state = 'running';
+            this.sampleRate = 44100;
+            this.destination = audioNode();
+        }
+        get currentTime() { return clock.now / 1000; }
+        createOscillator() { return audioNode(); }
+        createGain() { return audioNode(); }
+        createBufferSource() { return audioNode(); }
+        createBiquadFilter() { return audioNode(); }
+        createStereoPanner() { return audioNode(); }
+        createDynamicsCompressor() { return audioNode(); }
+        createAnalyser() { return audioNode({ fftSize: 2048, getByteFrequencyData() {}, getByteTimeDomainData() {} }); }
+        createBuffer(channels, length, sampleRate) {
+            const data = new Float32Array(Math.min(length, 1 << 20));
+            return { numberOfChannels: channels, length, sampleRate, duration: length / sampleRate, getChannelData: () => data };
+        }
+        decodeAudioData() { return Promise.resolve(this.createBuffer(1, 1, this.sampleRate)); }
+        resume() { this.state = 'running'; return Promise.resolve(); }
+        suspend() { this.state = 'suspended'; return Promise.resolve(); }
+        close() { this.state = 'closed'; return Promise.resolve(); }
+    }
+
+    class Storage {
+        constructor() { this._items = new Map(); }
+        get length() { return this._items.size; }
+        key(index) { return Array.from(this._items.keys())[index] ?? null; }
+        getItem(key) { return this._items.has(String(key)) ? this._items.get(String(key)) : null; }
+        setItem(key, value) { this._items.set(String(key), String(value)); }
+        removeItem(key) { this._items.delete(String(key)); }
+        clear() { this._items.clear(); }
+    }
+
+    // ---------------- 虚拟时钟和定时器 ----------------
+
+    const timers = new Map();
+    let nextTimer = 1;
+    let animationFrames = new Map();
+    let nextFrame = 1;
+
+    function addTimer(callback, delay, args, repeat) {
+        const id = nextTimer++;
+        const interval = Math.max(MIN_TIMER_DELAY, Number(delay) || 0);
+        timers.set(id, { callback, args, due: clock.now + interval, interval: repeat ? interval : 0 });
+        return id;
+    }
+
+    function runTimers(until) {
+        for (;;) {
+            let next = null;
+            for (const [id, timer] of timers) {
+                if (timer.due <= until && (next === null || timer.due < timers.get(next).due)) next = id;
+            }
+            if (next === null) break;
+            const timer = timers.get(next);
+            clock.now = Math.max(clock.now, timer.due);
+            if (timer.interval) timer.due += timer.interval;
+            else timers.delete(next);
+            stats.timerCallbacks++;
+            try {
+                if (typeof timer.callback === 'function') timer.callback(...timer.args);
+                else if (typeof timer.callback === 'string') hooks.warn('setTimeout/setInterval 使用了字符串代码，已忽略');
+            } catch (e) {
+                hooks.error(e);
+            }
+        }
+        clock.now = until;
+    }
+
+    // ---------------- window / document ----------------
+
+    windowTarget = new EventTarget();
+    documentObject = new Node();
+    documentObject.nodeType = 9;
+    documentObject.nodeName = '#document';
+
+    function createElement(tag, attrs) {
+        const name = String(tag).toLowerCase();
+        if (name === 'canvas') return new HTMLCanvasElement(name, attrs);
+        if (name === 'img') {
+            const image = new HTMLImageElement();
+            for (const [key, value] of Object.entries(attrs || {})) {
+                if (key === 'src') image.src = value;
+                else image.setAttribute(key, value);
+            }
+            return image;
+        }
+        if (name === 'audio') return new HTMLAudioElement((attrs || {}).src);
+        return new Element(name, attrs);
+    }
+
+    Object.assign(documentObject, {
+        readyState: 'loading',
+        hidden: false,
+        visibilityState: 'visible',
+        title: '',
+        cookie: '',
+        referrer: '',
+        fonts: { ready: Promise.resolve(), load: () => Promise.resolve([]), check: () => true },
+        createElement: (tag) => createElement(tag, {}),
+        createElementNS: (ns, tag) => createElement(tag, {}),
+        createTextNode: (data) => new Text(data),
+        createDocumentFragment: () => new Element('#fragment'),
+        createEvent: () => new Event(''),
+        getElementById: (id) => querySelectorAll(documentObject, '*').find((element) => element.id === String(id)) || null,
+        querySelector: (selector) => querySelectorAll(documentObject, selector)[0] || null,
+        querySelectorAll: (selector) => querySelectorAll(documentObject, selector),
+        getElementsByTagName: (tag) => querySelectorAll(documentObject, String(tag)),
+        getElementsByClassName: (name) => querySelectorAll(documentObject, '.' + String(name).trim().split(/\s+/).join('.')),
+        hasFocus: () => true,
+        exitFullscreen: () => Promise.resolve(),
+        exitPointerLock: () => {},
+        execCommand: () => false
+    });
+
+    // 按 index.html 建立元素树
+    const created = [];
+    for (const spec of page.elements || []) {
+        const element = createElement(spec.tag, spec.attrs || {});
+        if (spec.text) element.appendChild(new Text(spec.text));
+        const parent = spec.parent >= 0 ? created[spec.parent] : documentObject;
+        (parent || documentObject).appendChild(element);
+        created.push(element);
+    }
+    let html = documentObject.childNodes.find((node) => node.tagName === 'HTML');
+    if (!html) {
+        html = createElement('html', {});
+        for (const child of documentObject.childNodes.slice()) html.appendChild(child);
+        documentObject.appendChild(html);
+    }
+    const head = html.children.find((node) => node.tagName === 'HEAD') || html.insertBefore(createElement('head', {}), html.firstChild);
+    const body = html.children.find((node) => node.tagName === 'BODY') || html.appendChild(createElement('body', {}));
+    documentObject.documentElement = html;
+    documentObject.head = head;
+    documentObject.body = body;
+    documentObject.activeElement = body;
+
+    const width = page.width || 1280;
+    const height = page.height || 720;
+    const sandbox = {
+        document: documentObject,
+        console: {
+            log: (...args) => hooks.console('log', args),
+            info: (...args) => hooks.console('log', args),
+            debug: (...args) => hooks.console('log', args),
+            warn: (...args) => hooks.console('warn', args),
+            error: (...args) => hooks.console('error', args),
+            table: (...args) => hooks.console('log', args),
+            trace: () => {},
+            group: () => {},
+            groupEnd: () => {},
+            time: () => {},
+            timeEnd: () => {},
+            assert: (condition, ...args) => { if (!condition) hooks.console('error', ['Assertion failed:', ...args]); }
+        },
+        innerWidth: width,
+        innerHeight: height,
+        outerWidth: width,
+        outerHeight: height,
+        devicePixelRatio: 1,
+        scrollX: 0,
+        scrollY: 0,
+        screen: { width, height, availWidth: width, availHeight: height, orientation: { type: 'landscape-primary', angle: 0 } },
+        location: { href: 'file:///index.html', protocol: 'file:', host: '', hostname: '', pathname: '/index.html', search: '', hash: '', origin: 'null', reload() { hooks.warn('游戏调用了 location.reload()'); } },
+        navigator: { userAgent: 'Mozilla/5.0 (headless smoke test)', language: 'zh-CN', languages: ['zh-CN'], platform: 'Linux', maxTouchPoints: 0, onLine: true, getGamepads: () => [], vibrate: () => true },
+        history: { length: 1, pushState() {}, replaceState() {}, back() {} },
+        performance: { now: () => clock.now, mark() {}, measure() {}, timeOrigin: 0 },
+        localStorage: new Storage(),
+        sessionStorage: new Storage(),
+        setTimeout: (callback, delay, ...args) => addTimer(callback, delay, args, false),
+        setInterval: (callback, delay, ...args) => addTimer(callback, delay, args, true),
+        clearTimeout: (id) => { timers.delete(id); },
+        clearInterval: (id) => { timers.delete(id); },
+        requestAnimationFrame: (callback) => {
+            if (typeof callback !== 'function') {
+                throw new TypeError("Failed to execute 'requestAnimationFrame' on 'Window': The callback provided as parameter 1 is not a function.");
+            }
+            const id = nextFrame++;
+            animationFrames.set(id, callback);
+            return id;
+        },
+        cancelAnimationFrame: (id) => { animationFrames.delete(id); },
+        queueMicrotask,
+        addEventListener: (...args) => windowTarget.addEventListener(...args),
+        removeEventListener: (...args) => windowTarget.removeEventListener(...args),
+        dispatchEvent: (event) => windowTarget.dispatchEvent(event),
+        getComputedStyle: (element) => Object.assign({ getPropertyValue: () => '' }, element && element.style),
+        matchMedia: (query) => ({ matches: false, media: String(query), addListener() {}, removeListener() {}, addEventListener() {}, removeEventListener() {} }),
+        alert: (message) => hooks.console('log', ['[alert]', message]),
+        confirm: () => true,
+        prompt: (message, value) => (value === undefined ? '' : String(value)),
+        open: () => null,
+        focus: () => {},
+        blur: () => {},
+        scrollTo: () => {},
+        scrollBy: () => {},
+        fetch: () => Promise.reject(new TypeError('Failed to fetch')),
+        Event, UIEvent, KeyboardEvent, MouseEvent, PointerEvent, WheelEvent, TouchEvent, FocusEvent, CustomEvent, EventTarget,
+        Node, Text, Element, HTMLElement: Element, HTMLCanvasElement, HTMLImageElement, HTMLAudioElement,
+        CanvasRenderingContext2D, CanvasGradient, Storage,
+        Image: HTMLImageElement,
+        Audio: HTMLAudioElement,
+        AudioContext,
+        webkitAudioContext: AudioContext
+    };
+
+    // ---------------- 测试驱动 ----------------
+
+    function firstButton() {
+        const buttons = querySelectorAll(documentObject, 'button');
+        const label = (button) => `${button.id} ${button.className} ${button.textContent}`;
+        return buttons.find((button) => /start|play|begin|开始/i.test(label(button)) && !/pause|restart|暂停|重新/i.test(label(button)))
+            || null;
+    }
+
+    function target() {
+        return querySelectorAll(documentObject, 'canvas')[0] || body;
+    }
+
+    function key(type, name) {
+        const [code, keyCode] = KEY_CODES[name];
+        const event = new KeyboardEvent(type, { bubbles: true, key: name, code, keyCode, which: keyCode, repeat: false });
+        documentObject.activeElement.dispatchEvent(event);
+    }
+
+    function mouse(type, element, x, y) {
+        const init = { bubbles: true, button: 0, buttons: type === 'mousedown' ? 1 : 0, clientX: x, clientY: y, offsetX: x, offsetY: y, pageX: x, pageY: y };
+        const EventClass = type.startsWith('pointer') ? PointerEvent : MouseEvent;
+        element.dispatchEvent(new EventClass(type, init));
+    }
+
+    const KEY_SEQUENCE = ['ArrowRight', 'ArrowUp', 'ArrowLeft', 'ArrowDown', ' ', 'w', 'a', 's', 'd'];
+
+    return {
+        sandbox,
+        stats,
+        /** 所有脚本执行后触发 DOMContentLoaded 和 load */
+        load() {
+            documentObject.readyState = 'interactive';
+            documentObject.dispatchEvent(new Event('DOMContentLoaded', { bubbles: true }));
+            documentObject.readyState = 'complete';
+            windowTarget.dispatchEvent(new Event('load'));
+        },
+        /** 模拟用户输入：点击开始按钮，之后轮流按方向键/空格/WASD，并在画布上点击 */
+        input(frame) {
+            if (frame === 0) {
+                const button = firstButton();
+                if (button) button.click();
+            } else if (frame === 1) {
+                key('keydown', 'Enter');
+                key('keydown', ' ');
+            } else if (frame === 3) {
+                key('keyup', 'Enter');
+                key('keyup', ' ');
+            }
+            if (frame >= 10 && frame % 8 === 2) key('keydown', KEY_SEQUENCE[((frame - 10) / 8) % KEY_SEQUENCE.length]);
+            if (frame >= 14 && frame % 8 === 6) key('keyup', KEY_SEQUENCE[((frame - 14) / 8) % KEY_SEQUENCE.length]);
+            if (frame >= 6 && frame % 12 === 6) {
+                const element = target();
+                const x = ((frame * 37) % 97 / 97) * (element.offsetWidth || width);
+                const y = ((frame * 53) % 89 / 89) * (element.offsetHeight || height);
+                for (const type of ['mousemove', 'pointerdown', 'mousedown', 'pointerup', 'mouseup', 'click']) mouse(type, element, x, y);
+            }
+        },
+        /** 推进一帧: 执行到期的定时器，然后执行本帧的 requestAnimationFrame 回调 */
+        frame() {
+            runTimers(clock.now + FRAME_MS);
+            const callbacks = animationFrames;
+            animationFrames = new Map();
+            for (const callback of callbacks.values()) {
+                stats.rafCallbacks++;
+                try {
+                    callback(clock.now);
+                } catch (e) {
+                    hooks.error(e);
+                }
+            }
+            return callbacks.size;
+        },
+        /** 当前是否还有待执行的动画帧或定时器 */
+        pending() {
+            return animationFrames.size + timers.size;
+        }
+    };
+}
+
+module.exports = { createEnvironment, FRAME_MS };
@@ -1,20 +1,22 @@
 """
 文件: tools/file_tool.py
 职责: 提供安全的文件读写操作工具
-依赖: utils/logger.py
-被依赖: Agent基类、各具体Agent
+依赖: utils/logger.py, utils/tracer.py
+被依赖: Agent基类、各具体Agent、tools/code_search_tool.py（写入监听）
 关键接口:
   - FileTool.read(file_path) -> 读取文件内容
   - FileTool.write(file_path, content) -> 写入文件
   - FileTool.exists(file_path) -> 检查文件是否存在
   - FileTool.list_directory(dir_path) -> 列出目录内容
+  - FileTool.add_write_listener(callback) -> 文件被写入/追加/删除后通知（代码符号索引据此增量更新）
 """
 
 import os
 import aiofiles
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
 from utils.logger import setup_logger
+from utils.tracer import trace_span
 
 logger = setup_logger("file_tool")
 
@@ -22,6 +24,29 @@ logger = setup_logger("file_tool")
 class FileTool:
     """文件操作工具 - 为Agent提供安全的文件读写能力"""
     
+    # 所有实例共享的写入监听器，参数为被修改文件的绝对路径
+    _write_listeners: List[Callable[[Path], None]] = []
+    
+    @classmethod
+    def add_write_listener(cls, callback: Callable[[Path], None]) -> None:
+        """注册写入监听器（写入、追加、删除文件后调用）"""
+        if callback not in cls._write_listeners:
+            cls._write_listeners.append(callback)
+    
+    @classmethod
+    def remove_write_listener(cls, callback: Callable[[Path], None]) -> None:
+        """移除写入监听器"""
+        if callback in cls._write_listeners:
+            cls._write_listeners.remove(callback)
+    
+    def _notify_write(self, path: Path) -> None:
+        """通知监听器文件已修改，监听器出错不影响文件操作"""
+        for callback in list(self._write_listeners):
+            try:
+                callback(path)
+            except Exception as e:
+                logger.warning(f"写入监听器处理失败 {path}: {e}")
+    
     def __init__(self, workspace_root: Optional[str] = None):
         """
         初始化文件工具
@@ -91,8 +116,10 @@ class FileTool:
             raise ValueError(f"不是文件: {file_path}")
         
         try:
-            async with aiofiles.open(path, mode='r', encoding='utf-8') as f:
-                content = await f.read()
+            with trace_span("file.read", "io", path=file_path) as span:
+                async with aiofiles.open(path, mode='r', encoding='utf-8') as f:
+                    content = await f.read()
+                span.set(chars=len(content))
             logger.info(f"成功读取文件: {file_path} ({len(content)} 字符)")
             return content
         except Exception as e:
@@ -119,8 +146,10 @@ class FileTool:
         path.parent.mkdir(parents=True, exist_ok=True)
         
         try:
-            async with aiofiles.open(path, mode='w', encoding='utf-8') as f:
-                await f.write(content)
+            with trace_span("file.write", "io", path=file_path, chars=len(content)):
+                async with aiofiles.open(path, mode='w', encoding='utf-8') as f:
+                    await f.write(content)
+            self._notify_write(path)
             logger.info(f"成功写入文件: {file_path} ({len(content)} 字符)")
             return True
         except Exception as e:
@@ -144,8 +173,10 @@ class FileTool:
         path.parent.mkdir(parents=True, exist_ok=True)
         
         try:
-            async with aiofiles.open(path, mode='a', encoding='utf-8') as f:
-                await f.write(content)
+            with trace_span("file.append", "io", path=file_path, chars=len(content)):
+                async with aiofiles.open(path, mode='a', encoding='utf-8') as f:
+                    await f.write(content)
+            self._notify_write(path)
             logger.info(f"成功追加到文件: {file_path} ({len(content)} 字符)")
             return True
         except Exception as e:
@@ -263,6 +294,7 @@ class FileTool:
         
         try:
             path.unlink()
+            self._notify_write(path)
             logger.info(f"成功删除文件: {file_path}")
             return True
         except Exception as e:
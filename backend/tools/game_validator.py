@@ -1,18 +1,24 @@
 """
 文件: tools/game_validator.py
 职责: 游戏验证工具 - 检查游戏文件完整性和代码质量
-依赖: tools/file_tool.py, tools/code_runner.py
+依赖: tools/file_tool.py, tools/code_runner.py, tools/js_parser.py, tools/validation_cache.py, utils/tracer.py
 被依赖: workflows/game_dev_workflow.py (可选)
 
 提供:
   - 检查游戏文件是否存在
   - 验证HTML和JavaScript语法
   - 检查游戏是否可以运行
+  - validate_project(project_dir) - 验证项目输出目录（每个文件只读取一次，检查按依赖关系并发执行，返回每项耗时；
+    文件内容未改变的检查复用缓存的结果）
+  - validate_code(js_code) - 验证单份JavaScript代码并打分（不落盘，用于多候选代码筛选）
 """
 
+import asyncio
+import functools
 import sys
+import time
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple, Callable, Awaitable
 import re
 
 # 添加 backend 到 Python 路径
@@ -21,7 +27,124 @@ sys.path.insert(0, str(backend_path))
 
 from tools.file_tool import FileTool
 from tools.code_runner import CodeRunner
+from tools.js_parser import parse_js
 from utils.logger import setup_logger
+from tools.validation_cache import get_validation_cache, hash_text
+from utils.tracer import trace_span
+
+# 游戏代码的必要组件: (标识符包含的文本, 名称)，只看代码中的标识符，注释和字符串中的文本不算
+REQUIRED_COMPONENTS = [
+    ("gameLoop", "游戏循环"),
+    ("update", "更新逻辑"),
+    ("render", "渲染函数"),
+    ("canvas", "Canvas引用"),
+    ("ctx", "绘图上下文")
+]
+
+# 验证器版本: 检查逻辑改变时加1，缓存的旧结果随之失效
+VALIDATOR_VERSION = 1
+
+_CLOSING = {")": "(", "]": "[", "}": "{"}
+# "/" 前面是这些符号（或位于开头、return之后）时是正则字面量而不是除号
+_REGEX_PREFIX = re.compile(r"(^|[(,=:\[!&|?{};+\-*%<>~^]|\breturn)\s*$")
+
+
+def check_brackets(code: str) -> Tuple[bool, str]:
+    """
+    检查括号是否配对（跳过字符串、模板字符串、正则字面量和注释）
+    
+    LLM输出被截断时最常见的症状是括号不闭合。
+    
+    Returns:
+        (是否配对, 说明)
+    """
+    stack: List[str] = []
+    i, n = 0, len(code)
+    line = 1
+    while i < n:
+        ch = code[i]
+        if ch == "\n":
+            line += 1
+        in_template = bool(stack) and stack[-1] == "`"
+        
+        if in_template:
+            if ch == "\\":
+                i += 2
+                continue
+            if ch == "`":
+                stack.pop()
+            elif code.startswith("${", i):
+                stack.append("{")
+                i += 2
+                continue
+            i += 1
+            continue
+        
+        if code.startswith("//", i):
+            end = code.find("\n", i)
+            i = n if end < 0 else end
+            continue
+        if code.startswith("/*", i):
+            end = code.find("*/", i + 2)
+            if end < 0:
+                return False, f"第{line}行的块注释未闭合"
+            line += code.count("\n", i, end)
+            i = end + 2
+            continue
+        if ch in ("'", '"'):
+            j = i + 1
+            while j < n and code[j] != ch and code[j] != "\n":
+                j += 2 if code[j] == "\\" else 1
+            if j >= n or code[j] != ch:
+                return False, f"第{line}行的字符串未闭合"
+            i = j + 1
+            continue
+        if ch == "/" and _REGEX_PREFIX.search(code[:i]):
+            # 正则字面量: 跳到结尾的 /（字符类中的 / 不算）
+            j, in_class = i + 1, False
+            while j < n and code[j] != "\n" and (code[j] != "/" or in_class):
+                if code[j] == "\\":
+                    j += 1
+                elif code[j] == "[":
+                    in_class = True
+                elif code[j] == "]":
+                    in_class = False
+                j += 1
+            i = j + 1
+            continue
+        if ch == "`" or ch in "([{":
+            stack.append(ch)
+        elif ch in _CLOSING:
+            if not stack or stack[-1] != _CLOSING[ch]:
+                return False, f"第{line}行出现多余的 '{ch}'"
+            stack.pop()
+        i += 1
+    
+    if stack:
+        return False, f"代码结尾有 {len(stack)} 个未闭合的括号（可能被截断）"
+    return True, "括号配对完整"
+
+
+class _ProjectFiles:
+    """项目输出目录中的文件，每个文件只读取一次（并发的检查共享同一次读取）"""
+    
+    def __init__(self, file_tool: FileTool, output_dir: Path):
+        self.file_tool = file_tool
+        self.output_dir = output_dir
+        self._reads: Dict[str, asyncio.Future] = {}
+        self._hashes: Dict[str, str] = {}
+    
+    async def read(self, file_name: str) -> str:
+        """读取文件内容（读取失败时每次都抛出同一个异常）"""
+        if file_name not in self._reads:
+            self._reads[file_name] = asyncio.ensure_future(self.file_tool.read(str(self.output_dir / file_name)))
+        return await asyncio.shield(self._reads[file_name])
+    
+    def hash(self, file_name: str) -> str:
+        """已读取的文件的内容哈希（只在读取成功后调用）"""
+        if file_name not in self._hashes:
+            self._hashes[file_name] = hash_text(self._reads[file_name].result())
+        return self._hashes[file_name]
 
 
 class GameValidator:
@@ -37,162 +160,188 @@ class GameValidator:
         self.code_runner = CodeRunner()
         self.logger = setup_logger("game_validator")
     
-    async def validate_project(self, project_dir: str) -> Dict[str, Any]:
+    def _project_checks(self) -> List[Tuple[str, Callable[..., Awaitable[Dict[str, Any]]], Tuple[str, ...], bool, Tuple[str, ...]]]:
+        """
+        项目验证的检查项: (名称, 检查函数, 依赖的检查, 未通过时是否为错误, 检查的文件)
+        
+        依赖的检查未通过时跳过该检查，依赖都已通过的检查并发执行。
+        检查的文件内容未改变时复用缓存的结果（没有列出文件的检查不缓存）。
+        """
+        return [
+            ("output_directory", self._check_directory_exists, (), True, ()),
+            ("html_file", functools.partial(self._check_file_exists, "index.html"), ("output_directory",), True, ()),
+            ("js_file", functools.partial(self._check_file_exists, "game.js"), ("output_directory",), True, ()),
+            ("html_structure", self._check_html_structure, ("html_file",), False, ("index.html",)),
+            ("js_syntax", self._check_javascript_syntax, ("js_file",), True, ("game.js",)),
+            ("game_executable", self._check_game_executable, ("html_file", "js_syntax"), True, ("index.html",)),
+            ("game_completeness", self._check_game_completeness, ("js_file",), False, ("game.js",))
+        ]
+    
+    async def validate_project(self, project_dir: str, use_cache: bool = True) -> Dict[str, Any]:
         """
         验证整个项目
         
+        index.html 和 game.js 各只读取一次，由所有检查共享；检查按依赖关系并发执行，
+        依赖的检查未通过时跳过（例如输出目录不存在时不再检查文件内容）。
+        检查的文件内容和验证器版本都没变时复用上次的结果（缓存在项目目录中，见 tools/validation_cache.py）。
+        
         Args:
             project_dir: 项目目录路径
+            use_cache: 是否使用验证结果缓存
         
         Returns:
-            验证结果字典
+            验证结果字典 {valid, errors, warnings, checks, skipped, cached, timings}
+            skipped: {检查名称: 跳过原因}
+            cached: 复用缓存结果的检查名称
+            timings: {检查名称: 耗时(毫秒)}，total 为总耗时
         """
         self.logger.info(f"开始验证项目: {project_dir}")
+        started = time.perf_counter()
         
         results = {
             "valid": True,
             "errors": [],
             "warnings": [],
-            "checks": {}
+            "checks": {},
+            "skipped": {},
+            "cached": [],
+            "timings": {}
         }
         
-        project_path = Path(project_dir)
-        output_dir = project_path / "output"
+        project_path = self.file_tool.workspace_root / project_dir
+        files = _ProjectFiles(self.file_tool, project_path / "output")
+        cache = get_validation_cache(project_path) if use_cache else None
+        pipeline = self._project_checks()
+        tasks: Dict[str, asyncio.Task] = {}
         
-        # 1. 检查输出目录是否存在
-        check_result = await self._check_directory_exists(output_dir)
-        results["checks"]["output_directory"] = check_result
-        if not check_result["passed"]:
-            results["valid"] = False
-            results["errors"].append(check_result["message"])
-            return results
+        async def run(name: str, check, depends: Tuple[str, ...], artifacts: Tuple[str, ...]) -> bool:
+            for dependency in depends:
+                if not await tasks[dependency]:
+                    results["skipped"][name] = f"{dependency} 未通过"
+                    return False
+            check_started = time.perf_counter()
+            check_result = None
+            hashes = None
+            if cache is not None and artifacts:
+                hashes = {artifact: files.hash(artifact) for artifact in artifacts}
+                check_result = cache.get(name, VALIDATOR_VERSION, hashes)
+                if check_result is not None:
+                    results["cached"].append(name)
+            if check_result is None:
+                try:
+                    check_result = await check(files)
+                    if hashes is not None:
+                        cache.put(name, VALIDATOR_VERSION, hashes, check_result)
+                except Exception as e:
+                    check_result = {"passed": False, "message": f"{name} 检查失败: {str(e)}", "details": []}
+            results["timings"][name] = round((time.perf_counter() - check_started) * 1000, 2)
+            results["checks"][name] = check_result
+            return check_result["passed"]
         
-        # 2. 检查index.html是否存在
-        html_path = output_dir / "index.html"
-        check_result = await self._check_file_exists(html_path, "index.html")
-        results["checks"]["html_file"] = check_result
-        if not check_result["passed"]:
-            results["valid"] = False
-            results["errors"].append(check_result["message"])
-        
-        # 3. 检查game.js是否存在
-        js_path = output_dir / "game.js"
-        check_result = await self._check_file_exists(js_path, "game.js")
-        results["checks"]["js_file"] = check_result
-        if not check_result["passed"]:
-            results["valid"] = False
-            results["errors"].append(check_result["message"])
-        
-        # 如果基础文件不存在，直接返回
-        if not results["valid"]:
-            return results
+        with trace_span("validate_project", "check", project=str(project_dir)) as span:
+            for name, check, depends, _, artifacts in pipeline:
+                tasks[name] = asyncio.ensure_future(run(name, check, depends, artifacts))
+            await asyncio.gather(*tasks.values())
+            
+            # 按检查项的顺序整理结果（与完成顺序无关）
+            order = [name for name, _, _, _, _ in pipeline]
+            results["checks"] = {name: results["checks"][name] for name in order if name in results["checks"]}
+            results["skipped"] = {name: results["skipped"][name] for name in order if name in results["skipped"]}
+            results["cached"] = [name for name in order if name in results["cached"]]
+            for name, _, _, is_error, _ in pipeline:
+                check_result = results["checks"].get(name)
+                if check_result is None or check_result["passed"]:
+                    continue
+                if is_error:
+                    results["valid"] = False
+                    results["errors"].append(check_result["message"])
+                else:
+                    results["warnings"].append(check_result["message"])
+            results["timings"]["total"] = round((time.perf_counter() - started) * 1000, 2)
+            span.set(valid=results["valid"], skipped=len(results["skipped"]), cached=len(results["cached"]))
         
-        # 4. 检查HTML文件结构
-        check_result = await self._check_html_structure(html_path)
-        results["checks"]["html_structure"] = check_result
-        if not check_result["passed"]:
-            results["warnings"].append(check_result["message"])
-        
-        # 5. 检查JavaScript语法
-        check_result = await self._check_javascript_syntax(js_path)
-        results["checks"]["js_syntax"] = check_result
-        if not check_result["passed"]:
-            results["valid"] = False
-            results["errors"].append(check_result["message"])
-        
-        # 6. 检查游戏是否可以运行
-        check_result = await self._check_game_executable(html_path)
-        results["checks"]["game_executable"] = check_result
-        if not check_result["passed"]:
-            results["valid"] = False
-            results["errors"].append(check_result["message"])
-        
-        # 7. 检查游戏代码完整性
-        check_result = await self._check_game_completeness(js_path)
-        results["checks"]["game_completeness"] = check_result
-        if not check_result["passed"]:
-            results["warnings"].append(check_result["message"])
-        
-        self.logger.info(f"项目验证完成: valid={results['valid']}")
+        self.logger.info(f"项目验证完成: valid={results['valid']}，耗时 {results['timings']['total']:.0f}ms")
         return results
     
-    async def _check_directory_exists(self, dir_path: Path) -> Dict[str, Any]:
+    async def _check_directory_exists(self, files: "_ProjectFiles") -> Dict[str, Any]:
         """检查目录是否存在"""
-        exists = self.file_tool.is_directory(str(dir_path))
+        exists = self.file_tool.is_directory(str(files.output_dir))
         return {
             "passed": exists,
-            "message": f"输出目录存在" if exists else f"输出目录不存在: {dir_path}",
-            "path": str(dir_path)
+            "message": f"输出目录存在" if exists else f"输出目录不存在: {files.output_dir}",
+            "path": str(files.output_dir)
         }
     
-    async def _check_file_exists(self, file_path: Path, file_name: str) -> Dict[str, Any]:
-        """检查文件是否存在"""
-        exists = self.file_tool.exists(str(file_path))
-        
-        if exists:
-            # 检查文件是否为空
-            try:
-                content = await self.file_tool.read(str(file_path))
-                if not content or len(content.strip()) < 50:
-                    return {
-                        "passed": False,
-                        "message": f"{file_name}存在但内容过少（可能是空文件）",
-                        "path": str(file_path)
-                    }
-            except:
-                pass
+    async def _check_file_exists(self, file_name: str, files: "_ProjectFiles") -> Dict[str, Any]:
+        """检查文件是否存在且有内容"""
+        file_path = files.output_dir / file_name
+        try:
+            content = await files.read(file_name)
+        except FileNotFoundError:
+            return {
+                "passed": False,
+                "message": f"{file_name}不存在: {file_path}",
+                "path": str(file_path)
+            }
+        except Exception as e:
+            return {
+                "passed": False,
+                "message": f"读取{file_name}失败: {str(e)}",
+                "path": str(file_path)
+            }
+        
+        if not content or len(content.strip()) < 50:
+            return {
+                "passed": False,
+                "message": f"{file_name}存在但内容过少（可能是空文件）",
+                "path": str(file_path)
+            }
         
         return {
-            "passed": exists,
-            "message": f"{file_name}存在且有内容" if exists else f"{file_name}不存在: {file_path}",
+            "passed": True,
+            "message": f"{file_name}存在且有内容",
             "path": str(file_path)
         }
     
-    async def _check_html_structure(self, html_path: Path) -> Dict[str, Any]:
+    async def _check_html_structure(self, files: "_ProjectFiles") -> Dict[str, Any]:
         """检查HTML文件结构"""
-        try:
-            content = await self.file_tool.read(str(html_path))
-            
-            # 检查必要的HTML元素
-            required_elements = [
-                ("<!DOCTYPE", "DOCTYPE声明"),
-                ("<html", "html标签"),
-                ("<head", "head标签"),
-                ("<body", "body标签"),
-                ("<canvas", "canvas标签"),
-                ("<script", "script标签")
-            ]
-            
-            missing_elements = []
-            for pattern, name in required_elements:
-                if pattern not in content:
-                    missing_elements.append(name)
-            
-            if missing_elements:
-                return {
-                    "passed": False,
-                    "message": f"HTML结构不完整，缺少: {', '.join(missing_elements)}",
-                    "details": missing_elements
-                }
-            
-            return {
-                "passed": True,
-                "message": "HTML结构完整",
-                "details": []
-            }
-            
-        except Exception as e:
+        content = await files.read("index.html")
+        
+        # 检查必要的HTML元素
+        required_elements = [
+            ("<!DOCTYPE", "DOCTYPE声明"),
+            ("<html", "html标签"),
+            ("<head", "head标签"),
+            ("<body", "body标签"),
+            ("<canvas", "canvas标签"),
+            ("<script", "script标签")
+        ]
+        
+        missing_elements = []
+        for pattern, name in required_elements:
+            if pattern not in content:
+                missing_elements.append(name)
+        
+        if missing_elements:
             return {
                 "passed": False,
-                "message": f"读取HTML文件失败: {str(e)}",
-                "details": []
+                "message": f"HTML结构不完整，缺少: {', '.join(missing_elements)}",
+                "details": missing_elements
             }
+        
+        return {
+            "passed": True,
+            "message": "HTML结构完整",
+            "details": []
+        }
     
-    async def _check_javascript_syntax(self, js_path: Path) -> Dict[str, Any]:
+    async def _check_javascript_syntax(self, files: "_ProjectFiles") -> Dict[str, Any]:
         """检查JavaScript语法"""
+        return await self._check_javascript_code(await files.read("game.js"))
+    
+    async def _check_javascript_code(self, content: str) -> Dict[str, Any]:
+        """检查JavaScript代码的语法"""
         try:
-            content = await self.file_tool.read(str(js_path))
-            
             # 使用code_runner验证语法
             result = await self.code_runner.validate_syntax(content, "javascript")
             
@@ -205,8 +354,8 @@ class GameValidator:
             else:
                 return {
                     "passed": False,
-                    "message": f"JavaScript语法错误: {result.get('error', '未知错误')}",
-                    "details": [result.get('error', '')]
+                    "message": f"JavaScript语法错误: {result.get('error') or '未知错误'}",
+                    "details": [self.code_runner.format_syntax_error(e) for e in result.get("errors", [])]
                 }
                 
         except Exception as e:
@@ -216,10 +365,10 @@ class GameValidator:
                 "details": []
             }
     
-    async def _check_game_executable(self, html_path: Path) -> Dict[str, Any]:
+    async def _check_game_executable(self, files: "_ProjectFiles") -> Dict[str, Any]:
         """检查游戏是否可以执行"""
         try:
-            content = await self.file_tool.read(str(html_path))
+            content = await files.read("index.html")
             
             # 使用code_runner执行HTML（仅检查语法）
             result = await self.code_runner.execute_html(content, timeout=10.0, check_only=True)
@@ -245,44 +394,79 @@ class GameValidator:
                 "details": []
             }
     
-    async def _check_game_completeness(self, js_path: Path) -> Dict[str, Any]:
+    async def _check_game_completeness(self, files: "_ProjectFiles") -> Dict[str, Any]:
         """检查游戏代码完整性"""
-        try:
-            content = await self.file_tool.read(str(js_path))
-            
-            # 检查必要的游戏组件
-            required_components = [
-                ("gameLoop", "游戏循环"),
-                ("update", "更新逻辑"),
-                ("render", "渲染函数"),
-                ("canvas", "Canvas引用"),
-                ("ctx", "绘图上下文")
-            ]
-            
-            missing_components = []
-            for pattern, name in required_components:
-                if pattern not in content:
-                    missing_components.append(name)
-            
-            if missing_components:
-                return {
-                    "passed": False,
-                    "message": f"游戏代码可能不完整，缺少: {', '.join(missing_components)}",
-                    "details": missing_components
-                }
-            
-            return {
-                "passed": True,
-                "message": "游戏代码包含必要组件",
-                "details": []
-            }
-            
-        except Exception as e:
+        return self._check_completeness_code(await files.read("game.js"))
+    
+    @staticmethod
+    def _check_completeness_code(content: str) -> Dict[str, Any]:
+        """检查游戏代码是否包含必要组件（使用缓存的解析结果，同一份代码只解析一次）"""
+        module = parse_js(content)
+        missing_components = [name for pattern, name in REQUIRED_COMPONENTS if not module.has_identifier(pattern)]
+        
+        if missing_components:
             return {
                 "passed": False,
-                "message": f"检查游戏完整性失败: {str(e)}",
-                "details": []
+                "message": f"游戏代码可能不完整，缺少: {', '.join(missing_components)}",
+                "details": missing_components
             }
+        
+        return {
+            "passed": True,
+            "message": "游戏代码包含必要组件",
+            "details": []
+        }
+    
+    async def validate_code(self, js_code: str) -> Dict[str, Any]:
+        """
+        验证单份JavaScript代码并打分（不写入项目目录，用于多候选代码筛选）
+        
+        Args:
+            js_code: JavaScript代码
+        
+        Returns:
+            {valid, passed_all, score, errors, warnings, checks}
+            valid: 语法正确且括号配对；passed_all: 所有检查都通过；
+            score: 0~100，语法和括号各30分，必要组件共30分，代码量最多10分
+        """
+        results = {
+            "valid": True,
+            "passed_all": True,
+            "score": 0.0,
+            "errors": [],
+            "warnings": [],
+            "checks": {}
+        }
+        
+        if not js_code or len(js_code.strip()) < 50:
+            results.update(valid=False, passed_all=False)
+            results["errors"].append("代码为空或内容过少")
+            return results
+        
+        balanced, message = check_brackets(js_code)
+        checks = {
+            "js_syntax": await self._check_javascript_code(js_code),
+            "brackets": {"passed": balanced, "message": message, "details": []},
+            "game_completeness": self._check_completeness_code(js_code)
+        }
+        results["checks"] = checks
+        
+        for name in ("js_syntax", "brackets"):
+            if checks[name]["passed"]:
+                results["score"] += 30
+            else:
+                results["valid"] = False
+                results["errors"].append(checks[name]["message"])
+        
+        missing = len(checks["game_completeness"]["details"])
+        results["score"] += 30 * (len(REQUIRED_COMPONENTS) - missing) / len(REQUIRED_COMPONENTS)
+        if missing:
+            results["warnings"].append(checks["game_completeness"]["message"])
+        
+        results["score"] += min(len(js_code) / 8000, 1.0) * 10
+        results["score"] = round(results["score"], 1)
+        results["passed_all"] = results["valid"] and not missing
+        return results
     
     def generate_report(self, results: Dict[str, Any]) -> str:
         """
@@ -305,9 +489,18 @@ class GameValidator:
         
         # 详细检查项
         report_lines.append("详细检查:")
+        timings = results.get("timings", {})
         for check_name, check_result in results["checks"].items():
             status_icon = "✅" if check_result["passed"] else "❌"
-            report_lines.append(f"  {status_icon} {check_name}: {check_result['message']}")
+            if check_name in results.get("cached", []):
+                timing = " (缓存)"
+            else:
+                timing = f" ({timings[check_name]:.1f}ms)" if check_name in timings else ""
+            report_lines.append(f"  {status_icon} {check_name}: {check_result['message']}{timing}")
+        for check_name, reason in results.get("skipped", {}).items():
+            report_lines.append(f"  ⏭️ {check_name}: 已跳过（{reason}）")
+        if "total" in timings:
+            report_lines.append(f"  总耗时: {timings['total']:.1f}ms")
         
         # 错误信息
         if results["errors"]:
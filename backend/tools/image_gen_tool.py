@@ -1,11 +1,11 @@
 """
 文件: tools/image_gen_tool.py
 职责: AI图片生成工具 - 封装Gemini 2.5 Flash Image API
-依赖: google-genai, Pillow, config.py, utils/logger.py
+依赖: google-genai, Pillow, config.py, tools/asset_store.py, utils/logger.py, utils/tracer.py
 被依赖: agents/artist_agent.py, tool_registry.py
 关键接口:
   - ImageGenTool.generate(prompt, aspect_ratio, save_path) -> 生成图片
-  - ImageGenTool.generate_game_asset(asset_spec, project_dir) -> 生成游戏素材
+  - ImageGenTool.generate_game_asset(asset_spec, project_dir) -> 生成游戏素材（先查素材库，命中时不调用API、不占用项目配额）
 """
 
 import io
@@ -18,7 +18,9 @@ from google.genai import types
 from PIL import Image
 
 from config import Config
+from tools.asset_store import get_asset_store
 from utils.logger import setup_logger
+from utils.tracer import trace_span
 
 logger = setup_logger("image_gen_tool")
 
@@ -62,6 +64,7 @@ class ImageGenTool:
         self._stats = {
             "total_generated": 0,
             "total_failed": 0,
+            "cache_hits": 0,  # 素材库命中次数
             "project_counts": {}  # project_id -> count
         }
     
@@ -120,12 +123,13 @@ class ImageGenTool:
                 )
             
             # 调用 Gemini Image API（同步API，用线程包装）
-            response = await asyncio.to_thread(
-                self.client.models.generate_content,
-                model=self.model,
-                contents=[prompt],
-                config=gen_config,
-            )
+            with trace_span("image.generate", "image", model=self.model, prompt=prompt[:60]):
+                response = await asyncio.to_thread(
+                    self.client.models.generate_content,
+                    model=self.model,
+                    contents=[prompt],
+                    config=gen_config,
+                )
             
             result = {
                 "success": False,
@@ -154,6 +158,8 @@ class ImageGenTool:
                         save_path_obj.parent.mkdir(
                             parents=True, exist_ok=True
                         )
+                        # 先删除旧文件：它可能是素材库图片的硬链接，直接覆盖会改写素材库
+                        save_path_obj.unlink(missing_ok=True)
                         image.save(str(save_path_obj))
                         result["path"] = str(save_path_obj)
                         logger.info(f"图片已保存: {save_path_obj}")
@@ -202,24 +208,17 @@ class ImageGenTool:
                 "asset_name": "素材名称",
                 "path": "保存路径",
                 "prompt": "使用的Prompt",
-                "error": "错误信息（如有）"
+                "error": "错误信息（如有）",
+                "retryable": 失败后重试是否有意义（达到项目图片上限或未配置Key时为False）,
+                "cached": 是否来自素材库,
+                "provenance": 素材来源（成功时）{"source": "cache"/"generated", "key", "model", ...}
             }
         """
         name = asset_spec.get("name", "unnamed_asset")
         description = asset_spec.get("description", "")
         style = asset_spec.get("style", "pixel art")
-        
-        # 检查项目图片数量限制
+        size = str(asset_spec.get("size") or "1:1")
         project_id = Path(project_dir).name
-        count = self._stats["project_counts"].get(project_id, 0)
-        if count >= MAX_IMAGES_PER_PROJECT:
-            return {
-                "success": False,
-                "asset_name": name,
-                "path": None,
-                "prompt": None,
-                "error": f"项目已达到图片上限({MAX_IMAGES_PER_PROJECT}张)"
-            }
         
         # 构建英文Prompt
         prompt = self._build_asset_prompt(
@@ -233,23 +232,76 @@ class ImageGenTool:
             Path(project_dir) / "output" / "assets" / f"{name}.png"
         )
         
-        # 生成图片
-        result = await self.generate(
-            prompt=prompt,
-            aspect_ratio="1:1",
-            save_path=save_path
-        )
+        # 素材库中已有相同的素材时直接使用（不调用API、不占用项目配额）
+        store = get_asset_store()
+        if store is not None:
+            entry = store.lookup(prompt, self.model, size)
+            if entry is not None:
+                try:
+                    method = store.materialize(entry, Path(save_path))
+                except OSError as e:
+                    logger.warning(f"素材库图片复制失败，重新生成: {e}")
+                else:
+                    self._stats["cache_hits"] += 1
+                    logger.info(f"素材库命中: {name}（{method}，首次生成于 {entry['project']}）")
+                    return {
+                        "success": True,
+                        "asset_name": name,
+                        "path": save_path,
+                        "prompt": prompt,
+                        "error": None,
+                        "retryable": False,
+                        "cached": True,
+                        "provenance": {
+                            "source": "cache",
+                            "key": entry["key"],
+                            "model": entry["model"],
+                            "origin_project": entry["project"],
+                            "created_at": entry["created_at"],
+                        }
+                    }
+        
+        # 检查项目图片数量限制（先占用名额，并发生成时不会超出上限）
+        count = self._stats["project_counts"].get(project_id, 0)
+        if count >= MAX_IMAGES_PER_PROJECT:
+            return {
+                "success": False,
+                "asset_name": name,
+                "path": None,
+                "prompt": None,
+                "error": f"项目已达到图片上限({MAX_IMAGES_PER_PROJECT}张)",
+                "retryable": False
+            }
+        self._stats["project_counts"][project_id] = count + 1
+        
+        # 生成图片（失败或被取消时归还名额）
+        result = {"success": False}
+        try:
+            result = await self.generate(
+                prompt=prompt,
+                aspect_ratio="1:1",
+                save_path=save_path
+            )
+        finally:
+            if not result["success"]:
+                self._stats["project_counts"][project_id] -= 1
         
-        # 更新项目计数
+        provenance = None
         if result["success"]:
-            self._stats["project_counts"][project_id] = count + 1
+            key = None
+            if store is not None and result["path"]:
+                key = store.put(prompt, self.model, size, Path(result["path"]), project_id)
+            provenance = {"source": "generated", "key": key, "model": self.model}
         
         return {
             "success": result["success"],
             "asset_name": name,
             "path": result["path"],
             "prompt": prompt,
-            "error": result.get("error")
+            "error": result.get("error"),
+            "retryable": not result["success"] and self.client is not None,
+            "cached": False,
+            "provenance": provenance
         }
     
     def _build_asset_prompt(
@@ -290,6 +342,7 @@ class ImageGenTool:
             {
                 "total_generated": 已生成数量,
                 "total_failed": 失败数量,
+                "cache_hits": 素材库命中数量,
                 "project_counts": {项目ID: 数量}
             }
         """
@@ -300,5 +353,6 @@ class ImageGenTool:
         self._stats = {
             "total_generated": 0,
             "total_failed": 0,
+            "cache_hits": 0,
             "project_counts": {}
         }
@@ -0,0 +1,644 @@
+"""
+文件: tools/js_parser.py
+职责: JavaScript 解析层 - 词法分析（正确跳过注释、字符串、模板字符串和正则字面量）并提取声明结构，
+      按内容哈希缓存解析结果，代码搜索、完整性检查和接口校验共用同一次解析
+依赖: 无（Python标准库）
+被依赖: tools/symbol_index.py, tools/game_validator.py, tools/module_bundler.py
+
+关键接口:
+  - parse_js(code) -> JsModule（同一内容只解析一次）
+  - tokenize(code) -> (词法单元列表, 错误列表)
+  - JsModule.declarations - 声明列表 [{name, kind, line, end_line, parent, top_level, decl}]
+  - JsModule.top_level_names() - 顶层声明的名称（包括 window.xxx = 赋值）
+  - JsModule.identifiers - 代码中出现的标识符（不含注释和字符串中的文本）
+  - check_syntax(code) -> 轻量语法检查的错误列表 [{line, column, message}]（没有Node时的后备检查）
+  - parse_cache_info() - 缓存命中统计
+
+声明类型 kind:
+  function（函数声明，以及 const/let/var 赋值为函数或箭头函数）、class、variable、
+  method（类方法、箭头函数类字段、对象方法、X.prototype.y = function）、field（类的非函数字段）
+
+说明:
+  不是完整的 ECMAScript 解析器: 只识别声明结构，不构建表达式树；check_syntax 只能发现
+  未闭合的字符串/注释/正则和括号不配对（完整的语法检查见 CodeRunner.validate_syntax）。
+  声明可以跨多行，注释和字符串中的文本不会被误认。
+"""
+
+import hashlib
+import re
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+# 解析结果缓存的条目数
+PARSE_CACHE_SIZE = 128
+
+_IDENT = re.compile(r"#?[A-Za-z_$\u00c0-\uffff][\w$\u00c0-\uffff]*")
+_NUMBER = re.compile(r"(?:0[xXbBoO][\da-fA-F_]+|(?:\d[\d_]*\.?[\d_]*|\.\d[\d_]*)(?:[eE][+-]?\d+)?)n?")
+_SPACE = re.compile(r"[ \t\r\f\v\u00a0\ufeff]+")
+_OPERATORS = sorted([
+    ">>>=", "===", "!==", "**=", "...", "<<=", ">>=", ">>>", "&&=", "||=", "??=",
+    "=>", "==", "!=", "<=", ">=", "&&", "||", "??", "?.", "++", "--", "+=", "-=",
+    "*=", "/=", "%=", "&=", "|=", "^=", "**", "<<", ">>"
+], key=len, reverse=True)
+
+# 这些关键字之后的 "/" 是正则字面量而不是除号
+_REGEX_AFTER_KEYWORDS = {
+    "return", "typeof", "instanceof", "in", "of", "new", "delete", "void", "throw",
+    "case", "do", "else", "yield", "await"
+}
+# 类成员和对象方法的修饰词
+_MEMBER_MODIFIERS = {"static", "async", "get", "set"}
+# 出现在行首时表示新语句开始（用于在没有分号时结束 const/let/var 声明）
+_STATEMENT_KEYWORDS = {
+    "const", "let", "var", "function", "class", "if", "for", "while", "do", "return",
+    "switch", "try", "throw", "export", "import", "async"
+}
+# 这些符号结尾的行会延续到下一行（下一行不是新的类成员）
+_CONTINUATION = {
+    "=", "(", "[", "{", ",", ".", "?.", ":", "?", "=>", "+", "-", "*", "/", "%", "**",
+    "&&", "||", "??", "&", "|", "^", "<", ">", "<=", ">=", "==", "===", "!=", "!==", "!"
+}
+
+
+class Token(NamedTuple):
+    """词法单元: kind 为 name/number/string/template/regex/punct，offset 为在代码中的起始位置"""
+    kind: str
+    value: str
+    line: int
+    offset: int
+
+
+def position(code: str, offset: int) -> Tuple[int, int]:
+    """代码中某个位置的 (行号, 列号)，都从1开始"""
+    return code.count("\n", 0, offset) + 1, offset - code.rfind("\n", 0, offset)
+
+
+def tokenize(code: str) -> Tuple[List[Token], List[Dict[str, Any]]]:
+    """
+    词法分析
+
+    Returns:
+        (词法单元列表, 错误列表 [{line, column, message}])，模板字符串的 ${} 中的代码照常切分，
+        注释不产生词法单元
+    """
+    tokens: List[Token] = []
+    errors: List[Dict[str, Any]] = []
+    braces: List[str] = []  # "{" 或 "${"，用于判断 "}" 是否回到模板字符串
+    i, n, line = 0, len(code), 1
+
+    def error(message: str, offset: int) -> None:
+        error_line, column = position(code, offset)
+        errors.append({"line": error_line, "column": column, "message": message})
+
+    def scan_template(start: int, start_line: int) -> Tuple[int, int, bool]:
+        """从模板字符串内部扫描到结尾的 ` 或 ${，返回 (位置, 行号, 是否进入 ${})"""
+        j, current = start, start_line
+        while j < n:
+            ch = code[j]
+            if ch == "\\":
+                j += 2
+                continue
+            if ch == "`":
+                return j + 1, current, False
+            if code.startswith("${", j):
+                return j + 2, current, True
+            if ch == "\n":
+                current += 1
+            j += 1
+        error("模板字符串未闭合", code.rfind("`", 0, start))
+        return n, current, False
+
+    while i < n:
+        ch = code[i]
+        if ch == "\n":
+            line += 1
+            i += 1
+            continue
+        match = _SPACE.match(code, i)
+        if match:
+            i = match.end()
+            continue
+
+        if code.startswith("//", i):
+            end = code.find("\n", i)
+            i = n if end < 0 else end
+            continue
+        if code.startswith("/*", i):
+            end = code.find("*/", i + 2)
+            if end < 0:
+                error("块注释未闭合", i)
+                break
+            line += code.count("\n", i, end)
+            i = end + 2
+            continue
+
+        match = _IDENT.match(code, i)
+        if match:
+            tokens.append(Token("name", match.group(), line, i))
+            i = match.end()
+            continue
+        if ch.isdigit() or (ch == "." and i + 1 < n and code[i + 1].isdigit()):
+            match = _NUMBER.match(code, i)
+            end = match.end() if match and match.end() > i else i + 1
+            tokens.append(Token("number", code[i:end], line, i))
+            i = end
+            continue
+
+        if ch in ("'", '"'):
+            j = i + 1
+            chars = []
+            while j < n and code[j] != ch and code[j] != "\n":
+                if code[j] == "\\" and j + 1 < n:
+                    if code[j + 1] == "\n":
+                        line += 1
+                    else:
+                        chars.append(code[j + 1])
+                    j += 2
+                    continue
+                chars.append(code[j])
+                j += 1
+            if j >= n or code[j] != ch:
+                error("字符串未闭合", i)
+            tokens.append(Token("string", "".join(chars), line, i))
+            i = j + 1
+            continue
+        if ch == "`":
+            tokens.append(Token("template", "`", line, i))
+            i, line, in_expr = scan_template(i + 1, line)
+            if in_expr:
+                braces.append("${")
+            continue
+        if ch == "}" and braces and braces[-1] == "${":
+            braces.pop()
+            i, line, in_expr = scan_template(i + 1, line)
+            if in_expr:
+                braces.append("${")
+            else:
+                tokens.append(Token("template", "`", line, i - 1))
+            continue
+
+        if ch == "/" and _regex_allowed(tokens[-1] if tokens else None):
+            j, in_class = i + 1, False
+            while j < n and code[j] != "\n" and (code[j] != "/" or in_class):
+                if code[j] == "\\":
+                    j += 1
+                elif code[j] == "[":
+                    in_class = True
+                elif code[j] == "]":
+                    in_class = False
+                j += 1
+            if j >= n or code[j] != "/":
+                error("正则表达式未闭合", i)
+            j += 1
+            while j < n and code[j].isalpha():
+                j += 1
+            tokens.append(Token("regex", code[i:j], line, i))
+            i = j
+            continue
+
+        operator = next((op for op in _OPERATORS if code.startswith(op, i)), ch)
+        if operator == "{":
+            braces.append("{")
+        elif operator == "}" and braces:
+            braces.pop()
+        tokens.append(Token("punct", operator, line, i))
+        i += len(operator)
+
+    return tokens, errors
+
+
+def _regex_allowed(previous: Optional[Token]) -> bool:
+    """根据前一个词法单元判断 "/" 是否开始正则字面量"""
+    if previous is None:
+        return True
+    if previous.kind == "punct":
+        return previous.value not in (")", "]", "}", "++", "--")
+    if previous.kind == "name":
+        return previous.value in _REGEX_AFTER_KEYWORDS
+    return False
+
+
+class _Frame:
+    """一层花括号: kind 为 class/function/object/block"""
+
+    __slots__ = ("kind", "owner", "declaration", "paren", "expect_member")
+
+    def __init__(self, kind: str, owner: Optional[str], declaration: Optional[Dict[str, Any]], paren: int):
+        self.kind = kind
+        self.owner = owner
+        self.declaration = declaration
+        self.paren = paren
+        self.expect_member = True
+
+
+class _Parser:
+    """从词法单元中提取声明（一次线性扫描，向前查看只用于判断赋值的右侧）"""
+
+    def __init__(self, tokens: List[Token]):
+        self.tokens = tokens
+        self.declarations: List[Dict[str, Any]] = []
+        self.frames: List[_Frame] = []
+        self.paren = 0
+        # 下一个 "{" 开始的函数体/类体: (类型, 名称, 声明, 括号深度)
+        self.pending: Optional[Tuple[str, Optional[str], Optional[Dict[str, Any]], int]] = None
+        # 已由 const/let/var 或赋值语句记录的 function/class/=> 词法单元位置 -> (名称, 声明)
+        self.claimed: Dict[int, Tuple[str, Dict[str, Any]]] = {}
+
+    # ==================== 辅助 ====================
+
+    def _token(self, index: int) -> Optional[Token]:
+        return self.tokens[index] if 0 <= index < len(self.tokens) else None
+
+    def _is(self, index: int, value: str) -> bool:
+        token = self._token(index)
+        return token is not None and token.kind in ("punct", "name") and token.value == value
+
+    def _kind(self, index: int) -> Optional[str]:
+        token = self._token(index)
+        return token.kind if token is not None else None
+
+    def _parent(self) -> Optional[str]:
+        return next((frame.owner for frame in reversed(self.frames) if frame.owner), None)
+
+    def _add(self, name: str, kind: str, line: int, decl: Optional[str] = None,
+             parent: Optional[str] = None, top_level: Optional[bool] = None) -> Dict[str, Any]:
+        declaration = {
+            "name": name,
+            "kind": kind,
+            "line": line,
+            "end_line": line,
+            "parent": parent if parent is not None else self._parent(),
+            "top_level": (not self.frames) if top_level is None else top_level,
+            "decl": decl
+        }
+        self.declarations.append(declaration)
+        return declaration
+
+    def _matching(self, index: int) -> int:
+        """与 index 处的左括号配对的右括号位置，找不到时返回末尾"""
+        pairs = {"(": ")", "[": "]", "{": "}"}
+        opener = self.tokens[index].value
+        depth = 0
+        for k in range(index, len(self.tokens)):
+            token = self.tokens[k]
+            if token.kind != "punct":
+                continue
+            if token.value == opener:
+                depth += 1
+            elif token.value == pairs[opener]:
+                depth -= 1
+                if depth == 0:
+                    return k
+        return len(self.tokens) - 1
+
+    def _function_value(self, index: int) -> Optional[Tuple[str, int]]:
+        """
+        判断从 index 开始的表达式是否是函数或类
+
+        Returns:
+            ("function", function关键字位置) / ("arrow", => 位置) / ("class", class关键字位置) / None
+        """
+        if self._is(index, "async"):
+            index += 1
+        token = self._token(index)
+        if token is None:
+            return None
+        if token.kind == "name" and token.value == "function":
+            return "function", index
+        if token.kind == "name" and token.value == "class":
+            return "class", index
+        if token.kind == "name" and self._is(index + 1, "=>"):
+            return "arrow", index + 1
+        if token.kind == "punct" and token.value == "(":
+            close = self._matching(index)
+            if self._is(close + 1, "=>"):
+                return "arrow", close + 1
+        return None
+
+    def _claim(self, value: Optional[Tuple[str, int]], name: str, declaration: Dict[str, Any]) -> None:
+        if value:
+            self.claimed[value[1]] = (name, declaration)
+
+    # ==================== 声明 ====================
+
+    def _variable_declaration(self, index: int) -> None:
+        """const/let/var 声明（支持一条语句多个声明和解构）"""
+        keyword = self.tokens[index].value
+        k = index + 1
+        while k < len(self.tokens):
+            token = self.tokens[k]
+            if token.kind == "punct" and token.value in ("{", "["):
+                close = self._matching(k)
+                for name_index in range(k + 1, close):
+                    name = self.tokens[name_index]
+                    before, after = self.tokens[name_index - 1], self._token(name_index + 1)
+                    if (name.kind == "name" and before.value not in (".", "=")
+                            and after is not None and after.value in (",", "}", "]", "=")):
+                        self._add(name.value, "variable", name.line, keyword)
+                k = close + 1
+            elif token.kind == "name":
+                value = self._function_value(k + 2) if self._is(k + 1, "=") else None
+                kind = "variable" if value is None else ("class" if value[0] == "class" else "function")
+                declaration = self._add(token.value, kind, token.line, keyword)
+                self._claim(value, token.value, declaration)
+                k += 1
+            else:
+                return
+
+            # 跳过初始化表达式，直到同一层的 ","（下一个声明）或语句结束
+            depth = 0
+            while k < len(self.tokens):
+                token = self.tokens[k]
+                if token.kind == "punct":
+                    if token.value in ("(", "[", "{"):
+                        depth += 1
+                    elif token.value in (")", "]", "}"):
+                        if depth == 0:
+                            return
+                        depth -= 1
+                    elif depth == 0 and token.value == ";":
+                        return
+                    elif depth == 0 and token.value == ",":
+                        k += 1
+                        break
+                elif (depth == 0 and token.kind == "name" and token.value in _STATEMENT_KEYWORDS
+                      and token.line > self.tokens[k - 1].line):
+                    return
+                k += 1
+            else:
+                return
+
+    def _class_member(self, index: int) -> None:
+        """类体中成员的开头: 方法、箭头函数字段或普通字段"""
+        frame = self.frames[-1]
+        frame.expect_member = False
+        k = index
+        while self._token(k) and self.tokens[k].value in _MEMBER_MODIFIERS and (
+                self._kind(k + 1) == "name" or self._is(k + 1, "*")):
+            k += 1
+        if self._is(k, "*"):
+            k += 1
+        token = self._token(k)
+        if token is None or token.kind != "name":
+            return
+        if self._is(k + 1, "("):
+            declaration = self._add(token.value, "method", token.line, parent=frame.owner, top_level=False)
+            self.pending = ("function", token.value, declaration, self.paren)
+        elif self._is(k + 1, "="):
+            value = self._function_value(k + 2)
+            kind = "field" if value is None or value[0] == "class" else "method"
+            declaration = self._add(token.value, kind, token.line, parent=frame.owner, top_level=False)
+            self._claim(value, token.value, declaration)
+        elif self._is(k + 1, ";") or (self._token(k + 1) and self.tokens[k + 1].line > token.line):
+            self._add(token.value, "field", token.line, parent=frame.owner, top_level=False)
+
+    def _object_member(self, index: int) -> bool:
+        """对象字面量中的方法: name: function / name: () => / name() {}，识别到时返回True"""
+        frame = self.frames[-1]
+        k = index
+        while self._token(k) and self.tokens[k].value in _MEMBER_MODIFIERS and self._kind(k + 1) == "name":
+            k += 1
+        if self._is(k, "*"):
+            k += 1
+        token = self._token(k)
+        if token is None or token.kind not in ("name", "string"):
+            return False
+        if self._is(k + 1, ":"):
+            value = self._function_value(k + 2)
+            if value and value[0] != "class":
+                declaration = self._add(token.value, "method", token.line, parent=frame.owner, top_level=False)
+                self._claim(value, token.value, declaration)
+                return True
+        elif self._is(k + 1, "("):
+            close = self._matching(k + 1)
+            if self._is(close + 1, "{"):
+                declaration = self._add(token.value, "method", token.line, parent=frame.owner, top_level=False)
+                self.pending = ("function", token.value, declaration, self.paren)
+                return True
+        return False
+
+    def _assignment(self, index: int) -> None:
+        """window.name = ... 和 Class.prototype.name = function 形式的声明"""
+        token = self.tokens[index]
+        if token.value == "window" and self._is(index + 1, ".") and self._is(index + 3, "="):
+            name = self.tokens[index + 2]
+            if name.kind == "name":
+                value = self._function_value(index + 4)
+                kind = "variable" if value is None else ("class" if value[0] == "class" else "function")
+                declaration = self._add(name.value, kind, name.line, parent=None, top_level=True)
+                self._claim(value, name.value, declaration)
+        elif self._is(index + 1, ".") and self._is(index + 2, "prototype") and self._is(index + 3, ".") \
+                and self._is(index + 5, "="):
+            name = self.tokens[index + 4]
+            value = self._function_value(index + 6)
+            if name.kind == "name" and value and value[0] != "class":
+                declaration = self._add(name.value, "method", name.line, parent=token.value, top_level=False)
+                self._claim(value, name.value, declaration)
+
+    # ==================== 扫描 ====================
+
+    def _open_brace(self, index: int) -> None:
+        previous = self._token(index - 1)
+        if self.pending and self.pending[3] == self.paren:
+            kind, owner, declaration, _ = self.pending
+            self.pending = None
+            self.frames.append(_Frame(kind, owner, declaration, self.paren))
+            return
+        if previous is not None and previous.value == "=>":
+            owner, declaration = self.claimed.get(index - 1, (None, None))
+            self.frames.append(_Frame("function", owner, declaration, self.paren))
+            return
+        object_context = previous is not None and (
+            (previous.kind == "punct" and previous.value in ("=", "(", ",", ":", "[", "?", "||", "&&", "??", "...", "=>"))
+            or (previous.kind == "name" and previous.value in ("return", "yield", "await"))
+        )
+        if object_context:
+            before = self._token(index - 2)
+            owner = before.value if before is not None and before.kind in ("name", "string") \
+                and previous.value in ("=", ":") else None
+            self.frames.append(_Frame("object", owner, None, self.paren))
+        else:
+            self.frames.append(_Frame("block", None, None, self.paren))
+
+    def _close_brace(self, token: Token) -> None:
+        if not self.frames:
+            return
+        frame = self.frames.pop()
+        if frame.declaration is not None:
+            frame.declaration["end_line"] = token.line
+        if self.frames and self.frames[-1].kind == "class":
+            self.frames[-1].expect_member = True
+
+    def parse(self) -> List[Dict[str, Any]]:
+        tokens = self.tokens
+        for index, token in enumerate(tokens):
+            previous = tokens[index - 1] if index else None
+            frame = self.frames[-1] if self.frames else None
+
+            if token.kind == "punct":
+                value = token.value
+                if value in ("(", "["):
+                    self.paren += 1
+                elif value in (")", "]"):
+                    self.paren = max(self.paren - 1, 0)
+                elif value == "{":
+                    self._open_brace(index)
+                elif value == "}":
+                    self._close_brace(token)
+                elif value == ";" and frame is not None and frame.kind == "class":
+                    frame.expect_member = True
+                continue
+
+            if frame is not None and frame.kind == "class" and self.paren == frame.paren:
+                new_line = previous is not None and token.line > previous.line and previous.value not in _CONTINUATION
+                if token.kind == "name" and (frame.expect_member or new_line):
+                    self._class_member(index)
+                elif token.kind == "name" and token.value in ("function", "class"):
+                    # 字段初始化中的函数/类表达式
+                    self._function_or_class(index)
+                continue
+
+            if frame is not None and frame.kind == "object" and self.paren == frame.paren \
+                    and previous is not None and previous.value in ("{", ",") and self._object_member(index):
+                continue
+
+            if token.kind != "name" or (previous is not None and previous.value in (".", "?.")):
+                continue
+            value = token.value
+            if value in ("const", "let", "var"):
+                self._variable_declaration(index)
+            elif value in ("function", "class"):
+                self._function_or_class(index)
+            else:
+                self._assignment(index)
+        return self.declarations
+
+    def _function_or_class(self, index: int) -> None:
+        """function/class 关键字: 声明或（已被赋值语句记录的）表达式，之后的 "{" 是函数体/类体"""
+        token = self.tokens[index]
+        kind = "function" if token.value == "function" else "class"
+        k = index + 1
+        if self._is(k, "*"):
+            k += 1
+        name_token = self._token(k)
+        named = name_token is not None and name_token.kind == "name" and name_token.value != "extends"
+
+        if index in self.claimed:
+            owner, declaration = self.claimed[index]
+        elif named:
+            owner = name_token.value
+            declaration = self._add(owner, kind, name_token.line)
+        else:
+            owner, declaration = None, None
+
+        # 函数体/类体是回到当前括号深度后的第一个 "{"（参数中的解构和默认值在更深一层）
+        self.pending = (kind, owner, declaration, self.paren)
+
+
+class JsModule:
+    """一份 JavaScript 代码的解析结果（只读，可在多处共享）"""
+
+    __slots__ = ("hash", "declarations", "identifiers", "calls", "strings", "errors", "line_count")
+
+    def __init__(self, code: str, digest: str):
+        tokens, errors = tokenize(code)
+        self.hash = digest
+        self.declarations: List[Dict[str, Any]] = _Parser(tokens).parse()
+        self.identifiers: FrozenSet[str] = frozenset(t.value for t in tokens if t.kind == "name")
+        self.calls: FrozenSet[str] = frozenset(
+            t.value for k, t in enumerate(tokens[:-1])
+            if t.kind == "name" and tokens[k + 1].kind == "punct" and tokens[k + 1].value == "("
+        )
+        self.strings: FrozenSet[str] = frozenset(t.value for t in tokens if t.kind == "string")
+        self.errors: List[Dict[str, Any]] = sorted(
+            errors + _bracket_errors(code, tokens), key=lambda e: (e["line"], e["column"])
+        )
+        self.line_count = code.count("\n") + 1
+
+    def top_level_names(self) -> Set[str]:
+        """顶层声明的函数、类和变量名（包括 window.xxx = 赋值）"""
+        return {d["name"] for d in self.declarations if d["top_level"]}
+
+    def find(self, name: str, kinds: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """按名称查找声明"""
+        kinds = set(kinds) if kinds is not None else None
+        return [d for d in self.declarations if d["name"] == name and (kinds is None or d["kind"] in kinds)]
+
+    def has_identifier(self, fragment: str) -> bool:
+        """代码（不含注释和字符串）中是否有包含该文本的标识符"""
+        return any(fragment in name for name in self.identifiers)
+
+
+_OPENING = {"(": ")", "[": "]", "{": "}"}
+_CLOSING = {")": "(", "]": "[", "}": "{"}
+
+
+def _bracket_errors(code: str, tokens: List[Token]) -> List[Dict[str, Any]]:
+    """括号配对检查: 多余或不匹配的右括号，以及未闭合的左括号（LLM输出被截断时最常见）"""
+    errors = []
+    stack: List[Token] = []
+    for token in tokens:
+        if token.kind != "punct":
+            continue
+        if token.value in _OPENING:
+            stack.append(token)
+        elif token.value in _CLOSING:
+            if stack and stack[-1].value == _CLOSING[token.value]:
+                stack.pop()
+                continue
+            line, column = position(code, token.offset)
+            if stack:
+                opener = stack[-1]
+                message = f"'{token.value}' 与第{opener.line}行的 '{opener.value}' 不匹配"
+            else:
+                message = f"多余的 '{token.value}'"
+            errors.append({"line": line, "column": column, "message": message})
+            # 只报告第一处不匹配，之后的括号关系已不可信
+            return errors
+    for token in stack[-3:]:
+        line, column = position(code, token.offset)
+        errors.append({"line": line, "column": column, "message": f"'{token.value}' 没有闭合（代码可能被截断）"})
+    return errors
+
+
+def check_syntax(code: str) -> List[Dict[str, Any]]:
+    """
+    轻量语法检查（使用缓存的解析结果）
+
+    Returns:
+        错误列表 [{line, column, message}]，按位置排序，没有错误时为空
+    """
+    return list(parse_js(code).errors)
+
+
+_cache: "OrderedDict[str, JsModule]" = OrderedDict()
+_cache_stats = {"hits": 0, "misses": 0}
+
+
+def parse_js(code: str) -> JsModule:
+    """
+    解析 JavaScript 代码（按内容哈希缓存，同一版本的文件只解析一次）
+
+    Args:
+        code: 代码内容
+
+    Returns:
+        JsModule（调用方不应修改其中的声明）
+    """
+    digest = hashlib.sha1(code.encode("utf-8", "surrogatepass")).hexdigest()
+    module = _cache.get(digest)
+    if module is not None:
+        _cache.move_to_end(digest)
+        _cache_stats["hits"] += 1
+        return module
+    _cache_stats["misses"] += 1
+    module = JsModule(code, digest)
+    _cache[digest] = module
+    if len(_cache) > PARSE_CACHE_SIZE:
+        _cache.popitem(last=False)
+    return module
+
+
+def parse_cache_info() -> Dict[str, int]:
+    """解析缓存统计 {hits, misses, size}"""
+    return dict(_cache_stats, size=len(_cache))
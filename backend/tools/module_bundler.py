@@ -0,0 +1,302 @@
+"""
+文件: tools/module_bundler.py
+职责: 模块化代码生成的辅助工具 - 解析模块规划、校验跨模块接口、打包成单个game.js
+依赖: tools/game_validator.py, tools/js_parser.py
+被依赖: agents/programmer_agent.py
+
+关键接口:
+  - ModuleBundler.parse_plan(text, registry) -> 解析LLM给出的模块规划(JSON)
+  - ModuleBundler.verify(plan, codes, registry) -> 校验各模块，返回 {模块名: [问题]}
+  - ModuleBundler.bundle(plan, codes) -> 按依赖顺序打包成 game.js
+  - ModuleBundler.unbundle(bundle) -> 把打包的 game.js 拆回各模块（补丁修复后同步模块源文件）
+  - ModuleBundler.build_registry(plan, codes) -> 生成 api_registry.yaml 的 modules 部分
+  - extract_top_level_names(code) -> 顶层声明的函数/类/变量名
+
+约定:
+  - 每个模块是一个普通脚本（不使用 import/export），顶层声明即对其它模块公开的接口
+  - 模块文件写入 output/js/<模块名>.js，打包后的 game.js 按依赖顺序拼接各模块，
+    index.html 仍只加载 game.js
+  - 注册表格式与 CodeSearchTool.get_api_registry 一致:
+      modules: {"js/<模块名>.js": {"description": ..., "exports": [{"name": ...}]}}
+"""
+
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from tools.game_validator import check_brackets
+from tools.js_parser import parse_js
+
+# 模块名只允许小写字母、数字和下划线（用作文件名）
+_MODULE_NAME = re.compile(r"^[a-z][a-z0-9_]*$")
+
+# 打包后每个模块前的分隔行
+_MODULE_MARKER = re.compile(r"^// ===== 模块: ([a-z][a-z0-9_]*) \((js/[a-z0-9_]+\.js)\) =====$", re.M)
+
+
+def extract_top_level_names(code: str) -> Set[str]:
+    """
+    提取顶层声明的函数、类和变量名（包括 window.xxx = 赋值）
+
+    使用 js_parser 的解析结果: 跨行的声明也能识别，嵌套在函数或代码块中的声明、
+    注释和字符串中的文本不算。
+    """
+    return parse_js(code).top_level_names()
+
+
+def strip_module_syntax(code: str) -> str:
+    """去掉ES模块语法（import 语句和 export 前缀），打包后各模块共享全局作用域"""
+    code = re.sub(r"^\s*import\s+[^;\n]*;?\s*$", "", code, flags=re.M)
+    code = re.sub(r"^export\s+default\s+(?=(?:async\s+)?function|class)", "", code, flags=re.M)
+    code = re.sub(r"^export\s+(?=(?:async\s+)?function|class|const|let|var)", "", code, flags=re.M)
+    code = re.sub(r"^export\s*\{[^}]*\};?\s*$", "", code, flags=re.M)
+    return code
+
+
+class ModuleBundler:
+    """
+    模块化代码生成的规划、校验与打包
+
+    不调用LLM，只处理文本，便于单独测试。
+    """
+
+    def __init__(self, max_modules: int = 8):
+        """
+        Args:
+            max_modules: 规划中最多保留的模块数
+        """
+        self.max_modules = max_modules
+
+    def parse_plan(self, text: str, registry: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        解析LLM给出的模块规划
+
+        规划格式（可包在 ```json 代码块中）:
+            {"modules": [{"name": "input", "description": "...", "exports": ["handleKey"],
+                          "depends_on": ["config"]}]}
+        注册表中已登记的模块接口会并入对应模块的 exports。
+
+        Args:
+            text: LLM回复
+            registry: api_registry.yaml 的内容
+
+        Returns:
+            按依赖顺序排列的模块列表 [{name, file, description, exports, depends_on}]
+
+        Raises:
+            ValueError: 规划无法解析、模块名非法、依赖不存在或有环
+        """
+        match = re.search(r"\{.*\}", text, re.S)
+        if not match:
+            raise ValueError("模块规划中没有JSON对象")
+        try:
+            data = json.loads(match.group(0))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"模块规划不是合法的JSON: {e}") from None
+
+        entries = data.get("modules") if isinstance(data, dict) else None
+        if not isinstance(entries, list) or not entries:
+            raise ValueError("模块规划缺少 modules 列表")
+        if len(entries) > self.max_modules:
+            raise ValueError(f"模块数 {len(entries)} 超过上限 {self.max_modules}")
+
+        registered = self.registered_exports(registry or {})
+        plan: Dict[str, Dict[str, Any]] = {}
+        for entry in entries:
+            name = str(entry.get("name", "")).strip().lower()
+            if not _MODULE_NAME.match(name):
+                raise ValueError(f"非法的模块名: {name!r}")
+            if name in plan:
+                raise ValueError(f"模块名重复: {name}")
+            file = f"js/{name}.js"
+            exports = [str(e) for e in entry.get("exports") or [] if str(e).strip()]
+            for extra in registered.get(file, []):
+                if extra not in exports:
+                    exports.append(extra)
+            plan[name] = {
+                "name": name,
+                "file": file,
+                "description": str(entry.get("description", "")),
+                "exports": exports,
+                "depends_on": [str(d).strip().lower() for d in entry.get("depends_on") or []]
+            }
+
+        for module in plan.values():
+            missing = [d for d in module["depends_on"] if d not in plan]
+            if missing:
+                raise ValueError(f"模块 {module['name']} 依赖了不存在的模块: {missing}")
+
+        return [plan[name] for name in self._topological_order(plan)]
+
+    @staticmethod
+    def _topological_order(plan: Dict[str, Dict[str, Any]]) -> List[str]:
+        """按依赖排序（被依赖的模块在前），保持规划中的原有顺序"""
+        order: List[str] = []
+        visiting: Set[str] = set()
+
+        def visit(name: str) -> None:
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"模块依赖存在环: {name}")
+            visiting.add(name)
+            for dependency in plan[name]["depends_on"]:
+                visit(dependency)
+            visiting.discard(name)
+            order.append(name)
+
+        for name in plan:
+            visit(name)
+        return order
+
+    @staticmethod
+    def registered_exports(registry: Dict[str, Any]) -> Dict[str, List[str]]:
+        """注册表中各模块文件登记的接口名 {file: [name]}"""
+        modules = registry.get("modules") if isinstance(registry, dict) else None
+        if not isinstance(modules, dict):
+            return {}
+        result = {}
+        for file, info in modules.items():
+            exports = (info or {}).get("exports") or []
+            result[file] = [e["name"] if isinstance(e, dict) else str(e) for e in exports if e]
+        return result
+
+    def verify(
+        self,
+        plan: List[Dict[str, Any]],
+        codes: Dict[str, str],
+        registry: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, List[str]]:
+        """
+        校验各模块的代码
+
+        检查项:
+          1. 代码非空且括号配对（未被截断）
+          2. 规划和注册表中登记的接口都已在顶层声明
+          3. 顶层名称不与其它模块冲突（打包后共享全局作用域）
+
+        Args:
+            plan: parse_plan() 的结果
+            codes: {模块名: 代码}
+            registry: api_registry.yaml 的内容
+
+        Returns:
+            {模块名: [问题描述]}，只包含有问题的模块
+        """
+        registered = self.registered_exports(registry or {})
+        declared = {name: extract_top_level_names(strip_module_syntax(code)) for name, code in codes.items()}
+        owners: Dict[str, str] = {}
+        for module in plan:
+            for export in module["exports"]:
+                owners.setdefault(export, module["name"])
+
+        problems: Dict[str, List[str]] = {}
+        for module in plan:
+            name = module["name"]
+            code = codes.get(name)
+            issues: List[str] = []
+            if not code or not code.strip():
+                problems[name] = ["模块代码为空"]
+                continue
+
+            balanced, message = check_brackets(code)
+            if not balanced:
+                issues.append(message)
+
+            required = set(module["exports"]) | set(registered.get(module["file"], []))
+            missing = sorted(required - declared[name])
+            if missing:
+                issues.append(f"缺少约定的接口: {', '.join(missing)}")
+
+            for other in plan:
+                if other["name"] == name or other["name"] not in declared:
+                    continue
+                clashes = sorted(
+                    n for n in declared[name] & declared[other["name"]]
+                    # 冲突的名称归属规划中声明它的模块，由另一个模块重新生成
+                    if owners.get(n) != name
+                )
+                if clashes:
+                    issues.append(f"与模块 {other['name']} 的顶层名称冲突: {', '.join(clashes)}")
+
+            if issues:
+                problems[name] = issues
+        return problems
+
+    @staticmethod
+    def bundle(plan: List[Dict[str, Any]], codes: Dict[str, str]) -> str:
+        """
+        按依赖顺序把各模块打包成一个脚本
+
+        Args:
+            plan: parse_plan() 的结果（已按依赖排序）
+            codes: {模块名: 代码}
+
+        Returns:
+            game.js 内容
+        """
+        parts = [
+            "// ==========================================",
+            f"// game.js - 由 {len(plan)} 个模块打包生成（源文件见 js/ 目录）",
+            f"// 模块顺序: {' → '.join(m['name'] for m in plan)}",
+            "// ==========================================",
+            ""
+        ]
+        for module in plan:
+            parts.append(f"// ===== 模块: {module['name']} ({module['file']}) =====")
+            parts.append(strip_module_syntax(codes.get(module["name"], "")).strip())
+            parts.append("")
+        return "\n".join(parts)
+
+    @staticmethod
+    def unbundle(bundle: str) -> Optional[Tuple[List[Dict[str, Any]], Dict[str, str]]]:
+        """
+        把 bundle() 打包的 game.js 拆回各模块
+
+        Args:
+            bundle: game.js 内容
+
+        Returns:
+            (plan, codes)，plan 只包含 name 和 file，可以直接传给 bundle() 重新打包；
+            不是打包生成的文件或模块分隔行被改动（模块名重复、与文件名不符）时返回None
+        """
+        markers = list(_MODULE_MARKER.finditer(bundle))
+        if not markers:
+            return None
+
+        plan: List[Dict[str, Any]] = []
+        codes: Dict[str, str] = {}
+        for index, marker in enumerate(markers):
+            name, file = marker.group(1), marker.group(2)
+            if name in codes or file != f"js/{name}.js":
+                return None
+            end = markers[index + 1].start() if index + 1 < len(markers) else len(bundle)
+            plan.append({"name": name, "file": file})
+            codes[name] = bundle[marker.end():end].strip()
+        return plan, codes
+
+    @staticmethod
+    def build_registry(plan: List[Dict[str, Any]], codes: Dict[str, str]) -> Dict[str, Any]:
+        """
+        根据生成的代码构建注册表的 modules 部分
+
+        Returns:
+            {"js/<模块名>.js": {"description", "depends_on", "exports": [{"name"}]}}
+        """
+        return {
+            module["file"]: {
+                "description": module["description"],
+                "depends_on": [f"js/{d}.js" for d in module["depends_on"]],
+                "exports": [
+                    {"name": name}
+                    for name in sorted(extract_top_level_names(strip_module_syntax(codes.get(module["name"], ""))))
+                ]
+            }
+            for module in plan
+        }
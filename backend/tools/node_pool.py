@@ -0,0 +1,244 @@
+"""
+文件: tools/node_pool.py
+职责: 常驻的 Node.js 工作进程池 - 复用进程执行和编译JavaScript，避免每次调用都启动新的 node 进程
+依赖: config.py, utils/logger.py, tools/node_worker.js, tools/dom_shim.js
+被依赖: tools/code_runner.py
+
+关键接口:
+  - find_node() -> Node.js 可执行文件路径（进程内只查找一次），没有时为None
+  - get_node_pool() -> 当前事件循环的进程池（没有Node或未启用时为None）
+  - NodeWorkerPool.run(code, timeout) -> 在全新的 vm 上下文中执行代码
+  - NodeWorkerPool.check(code, timeout) -> 只编译不执行（语法检查）
+  - NodeWorkerPool.smoke(page, scripts, frames, timeout) -> 在模拟的浏览器环境中运行游戏若干帧
+  - NodeWorkerPool.close() - 结束所有工作进程
+
+说明:
+  - 工作进程通过 stdin/stdout 逐行传递JSON（协议见 node_worker.js），每个进程同一时间只执行一个任务
+  - 工作进程按需启动，执行 NODE_POOL_MAX_JOBS 个任务或堆内存接近上限后替换为新进程
+  - 任务超时（代码中的死循环等）或进程异常退出（超出内存限制等）时结束该进程，不影响其它任务
+  - asyncio 的子进程绑定在创建它的事件循环上，每个事件循环使用各自的进程池
+"""
+
+import asyncio
+import itertools
+import json
+import shutil
+import time
+import weakref
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import Config
+from utils.logger import setup_logger
+
+logger = setup_logger("node_pool")
+
+WORKER_SCRIPT = Path(__file__).parent / "node_worker.js"
+
+# 进程池在任务超时之外额外等待的时间（秒），超过后认为工作进程卡死
+_KILL_GRACE = 2.0
+# 单行响应的最大字节数（输出已在工作进程中截断到1MB字符）
+_READ_LIMIT = 16 * 1024 * 1024
+
+_node_path: Optional[str] = None
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, NodeWorkerPool]" = weakref.WeakKeyDictionary()
+
+
+def find_node() -> Optional[str]:
+    """查找Node.js可执行文件（进程内只查找一次）"""
+    global _node_path
+    if _node_path is None:
+        _node_path = shutil.which("node") or ""
+        if not _node_path:
+            logger.warning("未找到 Node.js，JavaScript 将不会被执行，语法检查使用内置检查")
+    return _node_path or None
+
+
+def get_node_pool() -> Optional["NodeWorkerPool"]:
+    """当前事件循环的进程池（首次调用时创建），没有Node或未启用进程池时为None"""
+    if not Config.NODE_POOL_ENABLED:
+        return None
+    node = find_node()
+    if node is None:
+        return None
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None or pool.closed:
+        pool = NodeWorkerPool(node, Config.NODE_POOL_SIZE, Config.NODE_POOL_MAX_JOBS, Config.NODE_WORKER_MEMORY_MB)
+        _pools[loop] = pool
+    return pool
+
+
+class _Worker:
+    """一个工作进程"""
+
+    __slots__ = ("process", "jobs")
+
+    def __init__(self, process: asyncio.subprocess.Process):
+        self.process = process
+        self.jobs = 0
+
+
+class NodeWorkerPool:
+    """Node.js 工作进程池"""
+
+    def __init__(self, node_path: str, size: int = 2, max_jobs: int = 200, memory_mb: int = 256):
+        """
+        Args:
+            node_path: node 可执行文件
+            size: 最多同时运行的工作进程数（即同时执行的任务数）
+            max_jobs: 每个工作进程执行多少个任务后替换
+            memory_mb: 每个工作进程的堆内存上限（--max-old-space-size）
+        """
+        self.node_path = node_path
+        self.size = max(1, size)
+        self.max_jobs = max(1, max_jobs)
+        self.memory_mb = memory_mb
+        self.closed = False
+        self._slots = asyncio.Semaphore(self.size)
+        self._idle: List[_Worker] = []
+        self._workers: set = set()
+        self._ids = itertools.count(1)
+        self.stats = {"jobs": 0, "spawned": 0, "recycled": 0, "killed": 0, "crashed": 0}
+
+    async def _spawn(self) -> _Worker:
+        process = await asyncio.create_subprocess_exec(
+            self.node_path,
+            f"--max-old-space-size={self.memory_mb}",
+            str(WORKER_SCRIPT),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=_READ_LIMIT
+        )
+        worker = _Worker(process)
+        self._workers.add(worker)
+        self.stats["spawned"] += 1
+        return worker
+
+    async def _acquire(self) -> _Worker:
+        """占用一个执行位置，取空闲的工作进程，没有空闲进程时启动新进程"""
+        if self.closed:
+            raise RuntimeError("Node进程池已关闭")
+        await self._slots.acquire()
+        try:
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.process.returncode is None:
+                    return worker
+                self._workers.discard(worker)
+            return await self._spawn()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, worker: _Worker, reusable: bool) -> None:
+        """归还工作进程；不可复用时结束它（之后按需启动新进程）"""
+        self._slots.release()
+        if reusable and not self.closed:
+            self._idle.append(worker)
+            return
+        self._workers.discard(worker)
+        if worker.process.returncode is None:
+            try:
+                worker.process.kill()
+            except ProcessLookupError:
+                pass
+
+    async def run(self, code: str, timeout: float = 10.0, filename: str = "script.js") -> Dict[str, Any]:
+        """
+        在全新的 vm 上下文中执行代码（没有 require/process，console 输出被收集）
+
+        Returns:
+            {ok, output, error, timed_out, duration_ms, heap_mb}
+            error: {name, message, stack, file, line, column} 或 None
+        """
+        return await self._submit({"type": "run", "code": code, "filename": filename}, timeout)
+
+    async def check(self, code: str, timeout: float = 10.0, filename: str = "script.js") -> Dict[str, Any]:
+        """只编译不执行，返回格式同 run()"""
+        return await self._submit({"type": "check", "code": code, "filename": filename}, timeout)
+
+    async def smoke(self, page: Dict[str, Any], scripts: List[Dict[str, str]], frames: int, timeout: float = 30.0) -> Dict[str, Any]:
+        """
+        冒烟测试: 在模拟的浏览器环境中加载脚本并运行 frames 帧（见 node_worker.js 的 smoke 任务）
+
+        Args:
+            page: {elements, files}，见 tools/smoke_harness.load_page()
+            scripts: 按页面顺序执行的脚本 [{filename, code}]
+
+        Returns:
+            同 run()，另有 smoke: {frames, raf_frames, frames_with_draws, draw_calls, frame_time_ms,
+            exceptions, console_errors, warnings}
+        """
+        return await self._submit({"type": "smoke", "page": page, "scripts": scripts, "frames": frames}, timeout)
+
+    async def _submit(self, job: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        worker = await self._acquire()
+        job = dict(job, id=next(self._ids), timeout_ms=int(timeout * 1000))
+        reusable = False
+        started = time.perf_counter()
+        try:
+            worker.process.stdin.write((json.dumps(job, ensure_ascii=False) + "\n").encode("utf-8"))
+            await worker.process.stdin.drain()
+            line = await asyncio.wait_for(worker.process.stdout.readline(), timeout + _KILL_GRACE)
+            if not line:
+                return await self._crashed(worker, job["id"], started)
+
+            result = json.loads(line)
+            worker.jobs += 1
+            self.stats["jobs"] += 1
+            reusable = worker.jobs < self.max_jobs and result.get("heap_mb", 0) < self.memory_mb * 0.75
+            if not reusable:
+                self.stats["recycled"] += 1
+            return result
+        except asyncio.TimeoutError:
+            # 工作进程卡在同步代码中（如定时器回调里的死循环），结束它
+            self.stats["killed"] += 1
+            logger.warning(f"Node工作进程执行超时 ({timeout}秒)，已结束该进程")
+            return self._failure(job["id"], "TimeoutError", f"执行超时 ({timeout}秒)", started, timed_out=True)
+        except (BrokenPipeError, ConnectionResetError):
+            return await self._crashed(worker, job["id"], started)
+        finally:
+            self._release(worker, reusable)
+
+    async def _crashed(self, worker: _Worker, job_id: int, started: float) -> Dict[str, Any]:
+        """工作进程异常退出（通常是超出内存限制）"""
+        self.stats["crashed"] += 1
+        detail = ""
+        try:
+            await asyncio.wait_for(worker.process.wait(), 1.0)
+            detail = (await worker.process.stderr.read()).decode("utf-8", errors="replace").strip()
+        except (asyncio.TimeoutError, OSError):
+            pass
+        message = "Node工作进程异常退出（可能超出内存限制）"
+        if detail:
+            message += ": " + detail.splitlines()[-1][:200]
+        logger.warning(message)
+        return self._failure(job_id, "WorkerCrashed", message, started)
+
+    @staticmethod
+    def _failure(job_id: int, name: str, message: str, started: float, timed_out: bool = False) -> Dict[str, Any]:
+        return {
+            "id": job_id,
+            "ok": False,
+            "output": "",
+            "error": {"name": name, "message": message, "stack": "", "file": None, "line": None, "column": None},
+            "timed_out": timed_out,
+            "duration_ms": (time.perf_counter() - started) * 1000,
+            "heap_mb": 0.0
+        }
+
+    async def close(self) -> None:
+        """结束所有工作进程（关闭stdin后工作进程自行退出）"""
+        self.closed = True
+        workers, self._workers = list(self._workers), set()
+        for worker in workers:
+            if worker.process.returncode is None:
+                worker.process.stdin.close()
+        for worker in workers:
+            try:
+                await asyncio.wait_for(worker.process.wait(), 2.0)
+            except asyncio.TimeoutError:
+                worker.process.kill()
+                await worker.process.wait()
@@ -0,0 +1,370 @@
+/**
+ * Node.js 常驻工作进程（由 tools/node_pool.py 启动）
+ *
+ * 协议: stdin/stdout 上逐行传递 JSON，一行一个请求/响应，同一进程内的任务依次执行
+ *   请求: {id, type: "run" | "check" | "smoke", code, filename, timeout_ms}
+ *         smoke 任务另有 {page, scripts: [{filename, code}], frames}
+ *   响应: {id, ok, output, error, timed_out, duration_ms, heap_mb}，smoke 任务另有 smoke 统计
+ *     error: {name, message, stack, file, line, column}（没有错误时为 null）
+ *
+ * run: 在全新的 vm 上下文中执行代码（没有 require/process），等待其中的定时器执行完或超时
+ * check: 只编译不执行，用于语法检查
+ * smoke: 在模拟的浏览器环境（dom_shim.js）中加载游戏脚本，按虚拟时钟运行若干帧并模拟输入，
+ *        收集异常、console.error、绘制调用次数和每帧耗时
+ */
+
+'use strict';
+
+const vm = require('vm');
+const readline = require('readline');
+const { createEnvironment } = require('./dom_shim');
+
+// 每个任务最多收集的输出字符数
+const MAX_OUTPUT = 1 << 20;
+// smoke 任务最多记录的不同异常数
+const MAX_EXCEPTIONS = 20;
+// 调用栈中属于工作进程自身的部分
+const INTERNAL_FRAME = /^\s+at .*(node:|node_worker\.js|dom_shim\.js|smoke-harness)/;
+
+// smoke 任务通过这个脚本在 vm 上下文中调用测试驱动函数，使 runInContext 的超时同样作用于游戏回调
+const HARNESS = Symbol.for('smoke.harness');
+const HARNESS_STEP = new vm.Script('globalThis[Symbol.for("smoke.harness")]()', { filename: 'smoke-harness' });
+
+// 当前任务的未捕获 Promise 拒绝处理函数，任务依次执行，同一时间只有一个
+let onUnhandled = null;
+
+process.on('unhandledRejection', (reason) => {
+    if (onUnhandled) onUnhandled(reason);
+});
+
+function send(message) {
+    process.stdout.write(JSON.stringify(message) + '\n');
+}
+
+function escapeRegExp(text) {
+    return text.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+}
+
+/**
+ * 把异常转换为可序列化的描述，并从堆栈中找出在用户代码（filenames 中的文件）中的位置
+ */
+function describe(error, filenames) {
+    if (error === null || (typeof error !== 'object' && typeof error !== 'function')) {
+        return { name: 'Error', message: String(error), stack: '', file: null, line: null, column: null };
+    }
+    const stack = String(error.stack || '');
+    const result = {
+        name: String(error.name || 'Error'),
+        message: String(error.message !== undefined ? error.message : error),
+        // 只保留用户代码中的调用位置，去掉 vm 和工作进程自身的调用栈
+        stack: stack.split('\n').filter((text) => !INTERNAL_FRAME.test(text)).slice(0, 12).join('\n'),
+        file: null,
+        line: null,
+        column: null
+    };
+    const names = [].concat(filenames).filter(Boolean).map(escapeRegExp);
+    if (names.length === 0) return result;
+    const name = '(' + names.join('|') + ')';
+    const position = stack.match(new RegExp(name + ':(\\d+):(\\d+)'));
+    if (position) {
+        result.file = position[1];
+        result.line = Number(position[2]);
+        result.column = Number(position[3]);
+        return result;
+    }
+    // 语法错误的堆栈: "文件名:行号\n代码行\n    ^\n\nSyntaxError: ..."
+    const lines = stack.split('\n');
+    const header = lines[0].match(new RegExp('^' + name + ':(\\d+)$'));
+    if (header) {
+        result.file = header[1];
+        result.line = Number(header[2]);
+        result.column = lines[2] && lines[2].includes('^') ? lines[2].indexOf('^') + 1 : 1;
+    }
+    return result;
+}
+
+function isTimeout(error) {
+    return !!error && error.code === 'ERR_SCRIPT_EXECUTION_TIMEOUT';
+}
+
+function timeoutError(message) {
+    return { name: 'TimeoutError', message, stack: '', file: null, line: null, column: null };
+}
+
+function formatValue(value) {
+    if (typeof value === 'string') return value;
+    try {
+        return typeof value === 'object' && value !== null ? JSON.stringify(value) : String(value);
+    } catch (e) {
+        return String(value);
+    }
+}
+
+function sleep(ms) {
+    return new Promise((resolve) => setTimeout(resolve, ms));
+}
+
+async function runJob(job) {
+    const filename = job.filename || 'script.js';
+    const timeout = Math.max(1, Number(job.timeout_ms) || 10000);
+    const deadline = Date.now() + timeout;
+
+    if (job.type === 'smoke') return runSmoke(job, deadline);
+
+    if (job.type === 'check') {
+        try {
+            new vm.Script(String(job.code), { filename });
+            return { ok: true, output: '', error: null, timed_out: false };
+        } catch (e) {
+            return { ok: false, output: '', error: describe(e, filename), timed_out: false };
+        }
+    }
+
+    const output = [];
+    let size = 0;
+    const write = (...args) => {
+        if (size >= MAX_OUTPUT) return;
+        const text = args.map(formatValue).join(' ');
+        output.push(text);
+        size += text.length + 1;
+    };
+
+    const errors = [];
+    onUnhandled = (reason) => errors.push(reason);
+    const timers = new Map();
+    let nextTimer = 1;
+    const addTimer = (callback, delay, args, repeat) => {
+        const id = nextTimer++;
+        const wrapped = () => {
+            if (!repeat) timers.delete(id);
+            try {
+                if (typeof callback === 'function') callback(...args);
+            } catch (e) {
+                errors.push(e);
+            }
+        };
+        const handle = repeat ? setInterval(wrapped, delay) : setTimeout(wrapped, delay);
+        timers.set(id, { handle, repeat });
+        return id;
+    };
+    const clearTimer = (id) => {
+        const timer = timers.get(id);
+        if (!timer) return;
+        (timer.repeat ? clearInterval : clearTimeout)(timer.handle);
+        timers.delete(id);
+    };
+
+    const sandbox = {
+        console: { log: write, info: write, warn: write, error: write, debug: write },
+        setTimeout: (callback, delay, ...args) => addTimer(callback, delay, args, false),
+        setInterval: (callback, delay, ...args) => addTimer(callback, delay, args, true),
+        clearTimeout: clearTimer,
+        clearInterval: clearTimer,
+        queueMicrotask
+    };
+
+    let error = null;
+    let timedOut = false;
+    try {
+        const context = vm.createContext(sandbox, { codeGeneration: { strings: true, wasm: false } });
+        new vm.Script(String(job.code), { filename }).runInContext(context, { timeout });
+        // 让 Promise 回调先执行，再等待定时器
+        await new Promise((resolve) => setImmediate(resolve));
+        while (timers.size > 0 && errors.length === 0) {
+            if (Date.now() >= deadline) {
+                timedOut = true;
+                break;
+            }
+            await sleep(Math.min(5, deadline - Date.now()));
+        }
+    } catch (e) {
+        if (isTimeout(e)) {
+            timedOut = true;
+        } else {
+            error = describe(e, filename);
+        }
+    } finally {
+        for (const id of Array.from(timers.keys())) clearTimer(id);
+        onUnhandled = null;
+    }
+    if (!error && errors.length > 0) error = describe(errors[0], filename);
+    if (timedOut && !error) {
+        error = timeoutError(`执行超时 (${timeout / 1000}秒)`);
+    }
+    return { ok: !error, output: output.join('\n'), error, timed_out: timedOut };
+}
+
+function percentile(sorted, ratio) {
+    if (sorted.length === 0) return 0;
+    return sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * ratio))];
+}
+
+function round(value) {
+    return Math.round(value * 1000) / 1000;
+}
+
+/**
+ * 冒烟测试: 依次执行页面中的脚本，触发 load 事件，然后推进 job.frames 帧
+ * 每一步都通过 HARNESS_STEP 在 vm 上下文中执行，死循环会按剩余时间超时
+ */
+async function runSmoke(job, deadline) {
+    const scripts = job.scripts || [];
+    const filenames = scripts.map((script) => script.filename);
+    const frames = Math.max(0, Number(job.frames) || 0);
+
+    const output = [];
+    let size = 0;
+    const consoleErrors = [];
+    const warnings = [];
+    const exceptions = new Map();
+    // 当前所处的帧，-1 表示加载阶段
+    let frame = -1;
+
+    const record = (e) => {
+        const error = describe(e, filenames);
+        const key = `${error.name}|${error.message}|${error.file}|${error.line}`;
+        const seen = exceptions.get(key);
+        if (seen) seen.count++;
+        else if (exceptions.size < MAX_EXCEPTIONS) exceptions.set(key, Object.assign(error, { count: 1, frame }));
+    };
+    const hooks = {
+        error: record,
+        console: (level, args) => {
+            const text = args.map(formatValue).join(' ');
+            if (size < MAX_OUTPUT) {
+                output.push(text);
+                size += text.length + 1;
+            }
+            if (level === 'error' && consoleErrors.length < 50) consoleErrors.push(text);
+        },
+        warn: (message) => {
+            if (warnings.length < 50 && !warnings.includes(message)) warnings.push(message);
+        }
+    };
+
+    const env = createEnvironment(job.page || {}, hooks);
+    let pending = null;
+    env.sandbox[HARNESS] = () => pending();
+    const context = vm.createContext(env.sandbox, { codeGeneration: { strings: true, wasm: false } });
+    vm.runInContext('globalThis.window = globalThis.self = globalThis.top = globalThis.parent = globalThis;', context);
+
+    const remaining = () => Math.max(1, deadline - Date.now());
+    const step = async (fn) => {
+        pending = fn;
+        HARNESS_STEP.runInContext(context, { timeout: remaining() });
+        await new Promise((resolve) => setImmediate(resolve));
+        if (Date.now() >= deadline) {
+            const error = new Error('timeout');
+            error.code = 'ERR_SCRIPT_EXECUTION_TIMEOUT';
+            throw error;
+        }
+    };
+
+    const frameTimes = [];
+    let rafFrames = 0;
+    let framesWithDraws = 0;
+    let framesRun = 0;
+    let timedOut = false;
+    onUnhandled = record;
+    try {
+        for (const script of scripts) {
+            try {
+                new vm.Script(String(script.code), { filename: script.filename }).runInContext(context, { timeout: remaining() });
+            } catch (e) {
+                if (isTimeout(e)) throw e;
+                // 和浏览器一样，一个脚本出错不影响后面的脚本
+                record(e);
+            }
+            await new Promise((resolve) => setImmediate(resolve));
+        }
+        await step(() => env.load());
+
+        for (frame = 0; frame < frames; frame++) {
+            const drawsBefore = env.stats.drawCalls;
+            let callbacks = 0;
+            let elapsed = 0;
+            await step(() => {
+                const start = process.hrtime.bigint();
+                env.input(frame);
+                callbacks = env.frame();
+                elapsed = Number(process.hrtime.bigint() - start) / 1e6;
+            });
+            framesRun++;
+            frameTimes.push(elapsed);
+            if (callbacks > 0) rafFrames++;
+            if (env.stats.drawCalls > drawsBefore) framesWithDraws++;
+        }
+    } catch (e) {
+        if (!isTimeout(e)) throw e;
+        timedOut = true;
+    } finally {
+        onUnhandled = null;
+    }
+
+    if (rafFrames === 0 && env.stats.timerCallbacks === 0) {
+        hooks.warn('游戏没有调用 requestAnimationFrame 或定时器，游戏循环可能没有启动');
+    }
+    if (env.stats.drawCalls === 0) hooks.warn('画布上没有任何绘制');
+
+    const errors = Array.from(exceptions.values());
+    let error = errors[0] || null;
+    if (timedOut) {
+        const stage = frame < 0 ? '加载脚本时' : `第${frame}帧`;
+        error = timeoutError(`${stage}执行超时 (${(Number(job.timeout_ms) || 0) / 1000}秒)，可能存在死循环`);
+    }
+    const sorted = frameTimes.slice().sort((a, b) => a - b);
+    const total = frameTimes.reduce((sum, value) => sum + value, 0);
+    return {
+        ok: !error,
+        output: output.join('\n'),
+        error,
+        timed_out: timedOut,
+        smoke: {
+            frames: framesRun,
+            raf_frames: rafFrames,
+            frames_with_draws: framesWithDraws,
+            draw_calls: env.stats.drawCalls,
+            timer_callbacks: env.stats.timerCallbacks,
+            events: env.stats.events,
+            frame_time_ms: {
+                avg: round(frameTimes.length ? total / frameTimes.length : 0),
+                p95: round(percentile(sorted, 0.95)),
+                max: round(sorted.length ? sorted[sorted.length - 1] : 0)
+            },
+            exceptions: errors,
+            console_errors: consoleErrors,
+            warnings
+        }
+    };
+}
+
+const input = readline.createInterface({ input: process.stdin, crlfDelay: Infinity });
+let queue = Promise.resolve();
+
+input.on('line', (line) => {
+    if (!line.trim()) return;
+    let job;
+    try {
+        job = JSON.parse(line);
+    } catch (e) {
+        send({ id: null, ok: false, output: '', error: describe(e, []), timed_out: false });
+        return;
+    }
+    queue = queue.then(async () => {
+        const start = process.hrtime.bigint();
+        let result;
+        try {
+            result = await runJob(job);
+        } catch (e) {
+            result = { ok: false, output: '', error: describe(e, job.filename || ''), timed_out: false };
+        }
+        result.id = job.id;
+        result.duration_ms = Number(process.hrtime.bigint() - start) / 1e6;
+        result.heap_mb = process.memoryUsage().heapUsed / (1024 * 1024);
+        send(result);
+    });
+});
+
+input.on('close', () => {
+    queue.then(() => process.exit(0));
+});
@@ -0,0 +1,258 @@
+"""
+文件: tools/scratch_space.py
+职责: 代码执行的临时工作目录 - 每个任务使用独立的目录，结束后自动清理，按策略保留用于排查，并限制磁盘占用
+依赖: config.py, utils/logger.py
+被依赖: tools/code_runner.py
+
+关键接口:
+  - get_scratch_space() -> 进程内共享的 ScratchSpace（按根目录缓存）
+  - ScratchSpace.job(kind) -> 上下文管理器，得到一个 ScratchJob
+  - ScratchJob.write_text(name, text) -> 在任务目录中写入执行需要的文件
+  - ScratchJob.attach(name, text) -> 登记只在保留任务目录时才写入的文件（代码、页面等）
+  - ScratchJob.finish(result) -> 记录执行结果，按保留策略决定是否保留，返回保留的目录
+  - ScratchSpace.cleanup() -> 删除所有保留的任务目录
+
+说明:
+  - 根目录默认在 /dev/shm（tmpfs）下，不可用时使用系统临时目录；CODE_RUNNER_SCRATCH_DIR 可指定
+  - 任务目录由 mkdtemp 创建，同一进程内的并发任务和多个进程之间互不覆盖
+  - 保留策略 CODE_RUNNER_KEEP_JOBS: none（不保留）/ failed（保留失败的任务）/ all
+  - 保留的目录中有 .kept 标记，超过 CODE_RUNNER_KEEP_MAX 个或总大小超过 CODE_RUNNER_SCRATCH_MAX_MB 时删除最旧的；
+    没有标记且超过一天的目录是异常退出的进程遗留的，同样删除
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import Config
+from utils.logger import setup_logger
+
+logger = setup_logger("scratch_space")
+
+_KEPT_MARKER = ".kept"
+# 没有保留标记的目录超过这个时间（秒）视为遗留目录
+_STALE_AFTER = 24 * 3600
+# 旧版本使用的固定文件名
+_LEGACY_PATTERNS = ("test_*.html", "test_*.js")
+
+_spaces: Dict[str, "ScratchSpace"] = {}
+
+
+def default_root() -> Path:
+    """临时目录的根目录: 配置的目录，否则优先使用 tmpfs（/dev/shm）"""
+    if Config.CODE_RUNNER_SCRATCH_DIR:
+        return Path(Config.CODE_RUNNER_SCRATCH_DIR)
+    shm = Path("/dev/shm")
+    if shm.is_dir() and os.access(shm, os.W_OK):
+        return shm / "ai_company_code_runner"
+    return Path(tempfile.gettempdir()) / "ai_company_code_runner"
+
+
+def get_scratch_space() -> "ScratchSpace":
+    """获取进程内共享的临时空间（按根目录缓存）"""
+    root = default_root()
+    space = _spaces.get(str(root))
+    if space is None:
+        space = ScratchSpace(root, Config.CODE_RUNNER_KEEP_JOBS, Config.CODE_RUNNER_KEEP_MAX, Config.CODE_RUNNER_SCRATCH_MAX_MB)
+        _spaces[str(root)] = space
+    return space
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for current, _, names in os.walk(path):
+        for name in names:
+            try:
+                total += os.lstat(os.path.join(current, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class ScratchJob:
+    """一个任务的临时目录（第一次写入文件时才创建）"""
+
+    def __init__(self, space: "ScratchSpace", kind: str):
+        self.space = space
+        self.kind = kind
+        self.path: Optional[Path] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.kept = False
+        self._attachments: Dict[str, str] = {}
+        self._written = 0
+
+    def _ensure_dir(self) -> Path:
+        if self.path is None:
+            self.space.root.mkdir(parents=True, exist_ok=True)
+            self.path = Path(tempfile.mkdtemp(prefix=f"{self.kind}_", dir=self.space.root))
+            self.space._active.add(self.path.name)
+        return self.path
+
+    def write_text(self, name: str, text: str) -> Path:
+        """
+        写入文件（超过磁盘占用上限时先删除旧的保留目录，仍然不够则抛出 OSError）
+        """
+        size = len(text.encode("utf-8", "surrogatepass"))
+        self.space._reserve(size)
+        path = self._ensure_dir() / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+        self._written += size
+        self.space._active_bytes += size
+        return path
+
+    def attach(self, name: str, text: str) -> None:
+        """登记排查用的文件，只在任务目录被保留时写入"""
+        self._attachments[name] = text
+
+    def finish(self, result: Dict[str, Any], force: bool = False) -> Optional[Path]:
+        """
+        记录执行结果并按保留策略决定是否保留任务目录
+
+        Args:
+            result: 执行结果
+            force: 不论保留策略都保留（如没有Node时需要在浏览器中手动测试的页面）
+
+        Returns:
+            保留时为任务目录，否则为None（目录在任务结束时删除）
+        """
+        self.result = result
+        if not force and not self.space.should_keep(result):
+            return None
+        try:
+            for name, text in self._attachments.items():
+                if self.path is None or not (self.path / name).exists():
+                    self.write_text(name, text)
+            self.write_text("result.json", json.dumps(result, ensure_ascii=False, indent=2, default=str))
+            (self._ensure_dir() / _KEPT_MARKER).write_text(str(time.time()), encoding="utf-8")
+        except OSError as e:
+            logger.warning(f"保留任务目录失败: {e}")
+            return None
+        self.kept = True
+        return self.path
+
+
+class ScratchSpace:
+    """代码执行的临时空间"""
+
+    def __init__(self, root: Path, keep: str = "none", keep_max: int = 20, max_mb: float = 256):
+        """
+        Args:
+            root: 根目录
+            keep: 保留策略 none / failed / all
+            keep_max: 最多保留的任务目录数
+            max_mb: 根目录的磁盘占用上限（MB）
+        """
+        self.root = Path(root)
+        self.keep = keep.lower()
+        self.keep_max = keep_max
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._active: set = set()
+        # 正在执行的任务已写入的字节数
+        self._active_bytes = 0
+        self._lock = threading.Lock()
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._remove_legacy_files()
+        self.prune()
+
+    def should_keep(self, result: Dict[str, Any]) -> bool:
+        if self.keep == "all":
+            return True
+        return self.keep == "failed" and not result.get("success", True)
+
+    @contextmanager
+    def job(self, kind: str) -> Iterator[ScratchJob]:
+        """
+        一个任务的临时目录，结束时删除（按保留策略保留的除外）
+
+        用法:
+            with space.job("js") as job:
+                path = job.write_text("script.js", code)
+                ...
+                file_path = job.finish(result)
+        """
+        job = ScratchJob(self, kind)
+        try:
+            yield job
+        finally:
+            if job.path is not None:
+                self._active.discard(job.path.name)
+                self._active_bytes -= job._written
+                if not job.kept:
+                    shutil.rmtree(job.path, ignore_errors=True)
+                else:
+                    self.prune()
+
+    def _kept_dirs(self) -> List[Tuple[float, Path]]:
+        """保留的任务目录，按保留时间从旧到新；同时删除遗留的目录"""
+        kept = []
+        now = time.time()
+        try:
+            entries = list(os.scandir(self.root))
+        except FileNotFoundError:
+            return []
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False) or entry.name in self._active:
+                continue
+            marker = Path(entry.path) / _KEPT_MARKER
+            try:
+                kept.append((marker.stat().st_mtime, Path(entry.path)))
+            except FileNotFoundError:
+                try:
+                    if now - entry.stat().st_mtime > _STALE_AFTER:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                except FileNotFoundError:
+                    pass
+        kept.sort()
+        return kept
+
+    def prune(self, extra_bytes: int = 0) -> int:
+        """
+        删除最旧的保留目录，直到数量和总大小（加上 extra_bytes）都不超过上限
+
+        Returns:
+            删除后保留目录的总大小加上 extra_bytes
+        """
+        with self._lock:
+            kept = self._kept_dirs()
+            sizes = {path: _dir_size(path) for _, path in kept}
+            total = sum(sizes.values()) + extra_bytes
+            removed = 0
+            while kept and (len(kept) > self.keep_max or total > self.max_bytes):
+                _, path = kept.pop(0)
+                shutil.rmtree(path, ignore_errors=True)
+                total -= sizes[path]
+                removed += 1
+            if removed:
+                logger.info(f"删除了 {removed} 个保留的任务目录")
+            return total
+
+    def _reserve(self, size: int) -> None:
+        """确保还能写入 size 字节（计入正在执行的任务已写入的文件），必要时删除旧的保留目录"""
+        if self.prune(extra_bytes=self._active_bytes + size) > self.max_bytes:
+            raise OSError(f"临时文件超过磁盘占用上限 ({self.max_bytes // (1024 * 1024)}MB)")
+
+    def cleanup(self) -> int:
+        """删除所有保留的任务目录（正在使用的目录除外）"""
+        with self._lock:
+            kept = self._kept_dirs()
+            for _, path in kept:
+                shutil.rmtree(path, ignore_errors=True)
+        return len(kept) + self._remove_legacy_files()
+
+    def _remove_legacy_files(self) -> int:
+        count = 0
+        for pattern in _LEGACY_PATTERNS:
+            for file in self.root.glob(pattern):
+                try:
+                    file.unlink()
+                    count += 1
+                except OSError:
+                    pass
+        return count
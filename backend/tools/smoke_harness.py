@@ -0,0 +1,221 @@
+"""
+文件: tools/smoke_harness.py
+职责: 游戏冒烟测试的准备和报告 - 解析 index.html 得到元素树和脚本，汇总无头运行的结果
+依赖: 无
+被依赖: tools/code_runner.py, agents/tester_agent.py
+
+关键接口:
+  - load_page(html, base_dir) -> 冒烟测试任务需要的页面描述 {page, scripts, errors, warnings}
+  - summarize(job, page) -> 把工作进程返回的 smoke 结果整理为 {success, error, output, report}
+  - fingerprint(base_dir) -> 冒烟测试结果所依赖的内容的哈希（页面和脚本的内容、其它文件是否存在）
+
+说明:
+  - 实际运行在 Node 工作进程中完成（tools/node_worker.js 的 smoke 任务，浏览器环境见 tools/dom_shim.js）
+  - 外部脚本按 base_dir 读取；缺失的本地脚本算作错误（浏览器中同样不会执行），网络脚本和ES模块只给出警告
+"""
+
+import hashlib
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# 没有结束标签的元素
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+# 按普通脚本执行的 type
+_SCRIPT_TYPES = {"", "text/javascript", "application/javascript", "text/ecmascript"}
+# 传给工作进程的资源文件数上限（用于判断图片等能否加载）
+_MAX_FILES = 2000
+# 报告中最多列出的异常数
+_MAX_REPORTED = 5
+# 冒烟测试版本: 模拟环境或判定规则改变时加1，缓存的测试结果随之失效
+HARNESS_VERSION = 1
+# 内容会影响冒烟测试结果的文件（其它文件只影响"是否存在"）
+_CODE_SUFFIXES = (".html", ".js")
+
+
+class _PageParser(HTMLParser):
+    """把HTML解析为扁平的元素列表（记录父元素下标）和按顺序出现的脚本"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.elements: List[Dict[str, Any]] = []
+        self.scripts: List[Dict[str, Any]] = []
+        self._stack: List[int] = []
+        self._script: Optional[Dict[str, Any]] = None
+        self._skip_text = False
+
+    def handle_starttag(self, tag, attrs):
+        attributes = {name: value if value is not None else "" for name, value in attrs}
+        parent = self._stack[-1] if self._stack else -1
+        self.elements.append({"tag": tag, "attrs": attributes, "text": "", "parent": parent})
+        if tag == "script":
+            self._script = {"src": attributes.get("src"), "type": attributes.get("type", "").lower(), "code": ""}
+            self.scripts.append(self._script)
+        self._skip_text = tag in ("script", "style")
+        if tag not in _VOID_TAGS:
+            self._stack.append(len(self.elements) - 1)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS:
+            self._stack.pop()
+
+    def handle_endtag(self, tag):
+        for depth in range(len(self._stack) - 1, -1, -1):
+            if self.elements[self._stack[depth]]["tag"] == tag:
+                del self._stack[depth:]
+                break
+        if tag == "script":
+            self._script = None
+        self._skip_text = False
+
+    def handle_data(self, data):
+        if self._script is not None:
+            self._script["code"] += data
+        elif not self._skip_text and self._stack and data.strip():
+            self.elements[self._stack[-1]]["text"] += data.strip()
+
+
+def _list_files(base_dir: Path) -> List[str]:
+    """游戏目录中的文件（相对路径）"""
+    files = []
+    for path in base_dir.rglob("*"):
+        if "node_modules" in path.parts or not path.is_file():
+            continue
+        files.append(path.relative_to(base_dir).as_posix())
+        if len(files) >= _MAX_FILES:
+            break
+    return files
+
+
+def fingerprint(base_dir: Path) -> str:
+    """
+    冒烟测试结果所依赖的内容的哈希: HTML和脚本的内容，以及其它文件（图片、音频等）的路径
+
+    图片等资源只需要知道是否存在，不读取内容，内容改变不影响哈希
+    """
+    digest = hashlib.sha256()
+    for relative in sorted(_list_files(base_dir)):
+        digest.update(relative.encode("utf-8"))
+        digest.update(b"\0")
+        if relative.endswith(_CODE_SUFFIXES):
+            digest.update(hashlib.sha256((base_dir / relative).read_bytes()).hexdigest().encode("ascii"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def load_page(html: str, base_dir: Optional[Path] = None) -> Dict[str, Any]:
+    """
+    解析HTML并读取其中引用的脚本
+
+    Args:
+        html: index.html 的内容
+        base_dir: 游戏目录（用于读取 <script src> 和判断资源是否存在），None 时只执行内联脚本
+
+    Returns:
+        {page: {elements, files}, scripts: [{filename, code}], errors: [...], warnings: [...]}
+    """
+    parser = _PageParser()
+    parser.feed(html)
+    parser.close()
+
+    scripts, errors, warnings = [], [], []
+    inline = 0
+    for script in parser.scripts:
+        src = script["src"]
+        if script["type"] not in _SCRIPT_TYPES:
+            if script["type"] == "module":
+                warnings.append(f"ES模块脚本未执行: {src or '内联脚本'}")
+            continue
+        if not src:
+            inline += 1
+            scripts.append({"filename": f"index.html#inline{inline}", "code": script["code"]})
+            continue
+        if src.startswith(("http:", "https:", "//")):
+            warnings.append(f"网络脚本未加载: {src}")
+            continue
+        relative = src.split("?")[0].split("#")[0]
+        relative = relative[2:] if relative.startswith("./") else relative.lstrip("/")
+        if base_dir is None:
+            warnings.append(f"未提供游戏目录，脚本未加载: {src}")
+            continue
+        path = (base_dir / relative).resolve()
+        if not path.is_file():
+            errors.append({"name": "ScriptLoadError", "message": f"脚本文件不存在: {src}", "file": "index.html"})
+            continue
+        scripts.append({"filename": relative, "code": path.read_text(encoding="utf-8", errors="replace")})
+
+    page = {"elements": parser.elements, "files": _list_files(base_dir) if base_dir is not None else []}
+    return {"page": page, "scripts": scripts, "errors": errors, "warnings": warnings}
+
+
+def format_exception(error: Dict[str, Any]) -> str:
+    """把一个运行时异常格式化为一行: 类型: 说明 (文件 第N行第M列，第K帧，共C次)"""
+    where = []
+    if error.get("file"):
+        position = f"{error['file']}"
+        if error.get("line"):
+            position += f" 第{error['line']}行第{error.get('column') or 1}列"
+        where.append(position)
+    frame = error.get("frame")
+    if frame is not None:
+        where.append("加载时" if frame < 0 else f"第{frame}帧")
+    if error.get("count", 1) > 1:
+        where.append(f"共{error['count']}次")
+    text = f"{error['name']}: {error['message']}"
+    return f"{text} ({'，'.join(where)})" if where else text
+
+
+def summarize(job: Dict[str, Any], page: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    汇总冒烟测试结果
+
+    Args:
+        job: NodeWorkerPool.smoke() 的返回值
+        page: load_page() 的返回值
+
+    Returns:
+        {success, error, output, report}
+        report: {frames, raf_frames, frames_with_draws, draw_calls, frame_time_ms, exceptions,
+                 console_errors, warnings, timed_out}
+    """
+    smoke = job.get("smoke") or {}
+    exceptions = [dict(error, frame=-1) for error in page["errors"]] + list(smoke.get("exceptions", []))
+    if not smoke and job.get("error"):
+        # 工作进程超时被结束或异常退出，没有统计结果
+        exceptions.append(job["error"])
+
+    report = {
+        "frames": smoke.get("frames", 0),
+        "raf_frames": smoke.get("raf_frames", 0),
+        "frames_with_draws": smoke.get("frames_with_draws", 0),
+        "draw_calls": smoke.get("draw_calls", 0),
+        "frame_time_ms": smoke.get("frame_time_ms", {"avg": 0, "p95": 0, "max": 0}),
+        "exceptions": exceptions,
+        "console_errors": smoke.get("console_errors", []),
+        "warnings": page["warnings"] + smoke.get("warnings", []),
+        "timed_out": bool(job.get("timed_out"))
+    }
+
+    problems = [format_exception(error) for error in exceptions[:_MAX_REPORTED]]
+    if len(exceptions) > _MAX_REPORTED:
+        problems.append(f"... 另有 {len(exceptions) - _MAX_REPORTED} 个异常")
+    if job.get("timed_out") and smoke:
+        problems.append(f"{job['error']['name']}: {job['error']['message']}")
+
+    timing = report["frame_time_ms"]
+    lines = [
+        f"运行了 {report['frames']} 帧（{report['raf_frames']} 帧有动画回调，{report['frames_with_draws']} 帧有绘制），"
+        f"绘制调用 {report['draw_calls']} 次，帧耗时 平均{timing['avg']:.2f}ms / p95 {timing['p95']:.2f}ms / 最大{timing['max']:.2f}ms"
+    ]
+    lines += [f"⚠️ {warning}" for warning in report["warnings"]]
+    lines += [f"console.error: {text}" for text in report["console_errors"][:_MAX_REPORTED]]
+    if job.get("output"):
+        lines.append(job["output"][-2000:])
+
+    return {
+        "success": not problems,
+        "error": "\n".join(problems) if problems else None,
+        "output": "\n".join(lines),
+        "report": report
+    }
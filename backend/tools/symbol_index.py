@@ -0,0 +1,417 @@
+"""
+文件: tools/symbol_index.py
+职责: 持久化的代码符号索引 - 记录函数、类、变量和方法定义的位置，按文件 mtime/大小/哈希 增量更新
+依赖: sqlite3（Python标准库）, tools/js_parser.py, utils/logger.py
+被依赖: tools/code_search_tool.py
+
+关键接口:
+  - SymbolIndex(db_path, workspace_root) - 打开（必要时创建）索引
+  - SymbolIndex.refresh(directory, file_pattern) - 增量更新目录下匹配的文件（只stat未变化的文件）
+  - SymbolIndex.update_file(path) - 重新索引单个文件（FileTool 写文件后调用）
+  - SymbolIndex.lookup(name, kinds, directory, file_pattern) - 精确查找
+  - SymbolIndex.search_prefix(prefix, ...) / search_fuzzy(query, ...) - 前缀、模糊查找
+  - extract_symbols(content, filename) - 从代码中提取定义（JavaScript 文件使用 js_parser 的解析结果）
+
+说明:
+  - 按名称查找走 SQLite B 树索引（O(log n)），前缀查找用范围查询
+  - 模糊查找在内存中的去重名称列表上进行（名称数远小于符号数）
+  - 符号类型: function / class / variable / method / field；const/let/var 声明的函数同时记录声明方式，
+    按变量搜索时也能找到；方法和字段记录所属的类或对象（parent）
+  - 提取规则变化时提高 _SCHEMA_VERSION，已有的索引会被清空重建
+"""
+
+import difflib
+import fnmatch
+import hashlib
+import os
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from tools.js_parser import parse_js
+from utils.logger import setup_logger
+
+logger = setup_logger("symbol_index")
+
+_NAME = r"[A-Za-z_$][\w$]*"
+
+# 非 JavaScript 文件按行匹配定义的正则，按顺序匹配，每行只记录第一个匹配: (类型, 正则)，带声明方式的正则第一组是 const/let/var
+_DEFINITIONS: List[Tuple[str, "re.Pattern[str]"]] = [
+    ("class", re.compile(rf"^\s*(?:export\s+(?:default\s+)?)?class\s+({_NAME})")),
+    ("function", re.compile(rf"^\s*(?:export\s+(?:default\s+)?)?(?:async\s+)?function\s*\*?\s*({_NAME})\s*\(")),
+    ("function", re.compile(
+        rf"^\s*(?:export\s+)?(const|let|var)\s+({_NAME})\s*=\s*(?:async\s+)?"
+        rf"(?:function\b|\([^)]*\)\s*=>|{_NAME}\s*=>)"
+    )),
+    ("variable", re.compile(rf"^\s*(?:export\s+)?(const|let|var)\s+({_NAME})\s*=")),
+    ("method", re.compile(rf"^\s*({_NAME})\s*:\s*(?:async\s+)?function\b")),
+    ("method", re.compile(rf"^\s*(?:static\s+)?(?:async\s+)?(?:get\s+|set\s+)?({_NAME})\s*\([^)]*\)\s*\{{")),
+]
+
+# 方法简写的正则会匹配到控制语句，需要排除
+_KEYWORDS = {"if", "for", "while", "switch", "catch", "function", "return", "with", "else", "do", "try"}
+
+# 遍历目录时跳过的目录
+_SKIP_DIRS = {".git", "node_modules", "__pycache__", ".code_index", ".venv", "venv"}
+
+# 表结构或提取规则的版本（记录在 PRAGMA user_version 中）
+_SCHEMA_VERSION = 2
+
+# 用 js_parser 提取定义的文件，其它文件按行匹配
+_JS_SUFFIXES = (".js", ".mjs", ".cjs")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS symbols (
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    decl TEXT,
+    parent TEXT,
+    file TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_symbols_name ON symbols(name);
+CREATE INDEX IF NOT EXISTS idx_symbols_name_lower ON symbols(name_lower);
+CREATE INDEX IF NOT EXISTS idx_symbols_file ON symbols(file);
+"""
+
+
+def extract_symbols(content: str, filename: str = "game.js") -> List[Dict[str, Any]]:
+    """
+    提取代码中的定义
+
+    JavaScript 文件使用 js_parser 的解析结果（支持跨行声明和箭头函数类字段，不会误认注释和字符串），
+    其它文件按行匹配声明的开头。
+
+    Args:
+        content: 代码内容
+        filename: 文件名（决定提取方式）
+
+    Returns:
+        [{name, kind, decl, parent, line, content}]，decl 为 const/let/var 或 None
+    """
+    if filename.endswith(_JS_SUFFIXES):
+        lines = content.split("\n")
+        return [
+            {
+                "name": d["name"],
+                "kind": d["kind"],
+                "decl": d["decl"],
+                "parent": d["parent"],
+                "line": d["line"],
+                "content": lines[d["line"] - 1].strip()[:200]
+            }
+            for d in parse_js(content).declarations
+        ]
+
+    symbols = []
+    for number, line in enumerate(content.split("\n"), start=1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith(("//", "*", "/*")):
+            continue
+        for kind, pattern in _DEFINITIONS:
+            match = pattern.match(line)
+            if not match:
+                continue
+            if pattern.groups == 2:
+                decl, name = match.group(1), match.group(2)
+            else:
+                decl, name = None, match.group(1)
+            if kind == "method" and name in _KEYWORDS:
+                continue
+            symbols.append({
+                "name": name, "kind": kind, "decl": decl, "parent": None, "line": number, "content": stripped[:200]
+            })
+            break
+    return symbols
+
+
+class SymbolIndex:
+    """
+    代码符号索引（SQLite）
+
+    只在事件循环线程中使用；所有写操作在事务中完成。
+    """
+
+    def __init__(self, db_path: str, workspace_root: Path, refresh_interval: float = 2.0):
+        """
+        Args:
+            db_path: 数据库文件路径，":memory:" 表示不持久化
+            workspace_root: 工作空间根目录（索引中的路径相对于它）
+            refresh_interval: 同一目录两次增量更新的最小间隔（秒），期间的写入由 update_file 同步
+        """
+        self.workspace_root = Path(workspace_root).resolve()
+        self.refresh_interval = refresh_interval
+        if db_path != ":memory:":
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+            # 旧版本的索引直接重建（文件会在下次查询时重新解析）
+            self.conn.executescript("DROP TABLE IF EXISTS files; DROP TABLE IF EXISTS symbols;")
+            self.conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+        self._last_refresh: Dict[Tuple[str, str], float] = {}
+        self._patterns: set = set()
+        self._names: Optional[List[str]] = None
+        self.stats = {"refreshes": 0, "files_indexed": 0, "files_skipped": 0, "files_removed": 0, "queries": 0}
+
+    # ==================== 更新 ====================
+
+    def _relative(self, path: Path) -> Optional[str]:
+        """工作空间内的相对路径（posix），在工作空间外时为None"""
+        try:
+            return Path(path).resolve().relative_to(self.workspace_root).as_posix()
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _prefix_range(directory: str) -> Tuple[str, str]:
+        """目录下所有文件路径的范围 [low, high)（'0' 是 '/' 的下一个字符）"""
+        return directory + "/", directory + "0"
+
+    def refresh(self, directory: str = ".", file_pattern: str = "*.js", force: bool = False) -> None:
+        """
+        增量更新目录下匹配的文件
+
+        只有 mtime 或大小变化的文件才会被读取，内容哈希未变时只更新 mtime；已删除的文件从索引中移除。
+
+        Args:
+            directory: 目录（相对于工作空间）
+            file_pattern: 文件名匹配模式
+            force: 忽略更新间隔
+        """
+        search_dir = (self.workspace_root / directory).resolve()
+        relative_dir = self._relative(search_dir)
+        if relative_dir is None or not search_dir.is_dir():
+            return
+        key = (relative_dir, file_pattern)
+        now = time.monotonic()
+        if not force and now - self._last_refresh.get(key, float("-inf")) < self.refresh_interval:
+            return
+        self._last_refresh[key] = now
+        self._patterns.add(file_pattern)
+
+        known = self._known_files(relative_dir, file_pattern)
+        seen = set()
+        for root, dirs, files in os.walk(search_dir):
+            dirs[:] = [d for d in dirs if d not in _SKIP_DIRS]
+            for filename in files:
+                if not fnmatch.fnmatch(filename, file_pattern):
+                    continue
+                path = Path(root) / filename
+                relative = self._relative(path)
+                if relative is None:
+                    continue
+                seen.add(relative)
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                record = known.get(relative)
+                if record and record[0] == stat.st_mtime_ns and record[1] == stat.st_size:
+                    self.stats["files_skipped"] += 1
+                    continue
+                self._index_file(path, relative, stat, record[2] if record else None)
+
+        removed = [path for path in known if path not in seen]
+        for path in removed:
+            self._remove_file(path)
+        self.stats["files_removed"] += len(removed)
+        self.stats["refreshes"] += 1
+        self.conn.commit()
+
+    def _known_files(self, relative_dir: str, file_pattern: str) -> Dict[str, Tuple[int, int, str]]:
+        """索引中目录下匹配的文件 {path: (mtime_ns, size, hash)}"""
+        if relative_dir == ".":
+            rows = self.conn.execute("SELECT path, mtime_ns, size, hash FROM files")
+        else:
+            low, high = self._prefix_range(relative_dir)
+            rows = self.conn.execute(
+                "SELECT path, mtime_ns, size, hash FROM files WHERE path >= ? AND path < ?", (low, high)
+            )
+        return {
+            path: (mtime, size, digest)
+            for path, mtime, size, digest in rows
+            if fnmatch.fnmatch(path.rsplit("/", 1)[-1], file_pattern)
+        }
+
+    def _index_file(self, path: Path, relative: str, stat: os.stat_result, old_hash: Optional[str]) -> None:
+        """读取并重新索引一个文件（内容未变时只更新 mtime）"""
+        try:
+            content = path.read_text(encoding="utf-8")
+        except Exception as e:
+            logger.warning(f"读取文件失败 {path}: {e}")
+            return
+        digest = hashlib.sha1(content.encode("utf-8")).hexdigest()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files (path, mtime_ns, size, hash) VALUES (?, ?, ?, ?)",
+            (relative, stat.st_mtime_ns, stat.st_size, digest)
+        )
+        if digest == old_hash:
+            self.stats["files_skipped"] += 1
+            return
+        self.conn.execute("DELETE FROM symbols WHERE file = ?", (relative,))
+        self.conn.executemany(
+            "INSERT INTO symbols (name, name_lower, kind, decl, parent, file, line, content) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (s["name"], s["name"].lower(), s["kind"], s["decl"], s["parent"], relative, s["line"], s["content"])
+                for s in extract_symbols(content, path.name)
+            ]
+        )
+        self.stats["files_indexed"] += 1
+        self._names = None
+
+    def _remove_file(self, relative: str) -> None:
+        self.conn.execute("DELETE FROM files WHERE path = ?", (relative,))
+        self.conn.execute("DELETE FROM symbols WHERE file = ?", (relative,))
+        self._names = None
+
+    def update_file(self, path: str) -> None:
+        """
+        重新索引单个文件（文件被写入后调用，文件不存在时从索引中移除）
+
+        只处理匹配已查询过的文件模式的文件，避免索引无关文件。
+        """
+        file_path = Path(path)
+        if not file_path.is_absolute():
+            file_path = self.workspace_root / file_path
+        relative = self._relative(file_path)
+        if relative is None or not any(fnmatch.fnmatch(file_path.name, p) for p in self._patterns):
+            return
+        if not file_path.is_file():
+            self._remove_file(relative)
+        else:
+            row = self.conn.execute("SELECT hash FROM files WHERE path = ?", (relative,)).fetchone()
+            self._index_file(file_path, relative, file_path.stat(), row[0] if row else None)
+        self.conn.commit()
+
+    # ==================== 查询 ====================
+
+    def _query(
+        self,
+        where: str,
+        params: Iterable[Any],
+        kinds: Optional[Iterable[str]],
+        directory: str,
+        file_pattern: Optional[str],
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """按条件查询符号，并按种类、目录、文件模式过滤"""
+        self.stats["queries"] += 1
+        sql = f"SELECT name, kind, decl, parent, file, line, content FROM symbols WHERE {where}"
+        params = list(params)
+        if kinds is not None:
+            kinds = list(kinds)
+            sql += f" AND kind IN ({', '.join('?' * len(kinds))})"
+            params.extend(kinds)
+        relative_dir = self._relative(self.workspace_root / directory)
+        if relative_dir is None:
+            return []
+        if relative_dir != ".":
+            low, high = self._prefix_range(relative_dir)
+            sql += " AND file >= ? AND file < ?"
+            params.extend([low, high])
+        sql += " ORDER BY file, line"
+
+        results = []
+        for name, kind, decl, parent, file, line, content in self.conn.execute(sql, params):
+            if file_pattern and not fnmatch.fnmatch(file.rsplit("/", 1)[-1], file_pattern):
+                continue
+            results.append({
+                "name": name, "kind": kind, "decl": decl, "parent": parent,
+                "file": file, "line": line, "content": content
+            })
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+    def lookup(
+        self,
+        name: str,
+        kinds: Optional[Iterable[str]] = None,
+        directory: str = ".",
+        file_pattern: Optional[str] = None,
+        include_declared: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        精确查找
+
+        Args:
+            name: 名称（大小写敏感）
+            kinds: 只返回这些类型
+            directory: 只返回该目录下的定义
+            file_pattern: 只返回文件名匹配的定义
+            include_declared: 同时返回 const/let/var 声明的其它类型（按变量搜索时使用）
+        """
+        if include_declared and kinds is not None:
+            kinds = list(kinds)
+            where = f"name = ? AND (kind IN ({', '.join('?' * len(kinds))}) OR decl IS NOT NULL)"
+            return self._query(where, [name, *kinds], None, directory, file_pattern)
+        return self._query("name = ?", [name], kinds, directory, file_pattern)
+
+    def search_prefix(
+        self,
+        prefix: str,
+        kinds: Optional[Iterable[str]] = None,
+        directory: str = ".",
+        file_pattern: Optional[str] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """前缀查找（忽略大小写），走索引范围查询"""
+        low = prefix.lower()
+        if not low:
+            return []
+        high = low[:-1] + chr(ord(low[-1]) + 1)
+        return self._query("name_lower >= ? AND name_lower < ?", [low, high], kinds, directory, file_pattern, limit)
+
+    def search_fuzzy(
+        self,
+        query: str,
+        kinds: Optional[Iterable[str]] = None,
+        directory: str = ".",
+        file_pattern: Optional[str] = None,
+        limit: int = 20,
+        cutoff: float = 0.6
+    ) -> List[Dict[str, Any]]:
+        """
+        模糊查找（忽略大小写）: 包含查询串的名称优先，其次按相似度
+
+        Returns:
+            按匹配程度排序的定义列表，每项带 score（0~1）
+        """
+        query = query.lower()
+        if not query:
+            return []
+        if self._names is None:
+            self._names = [row[0] for row in self.conn.execute("SELECT DISTINCT name_lower FROM symbols")]
+
+        scored: Dict[str, float] = {}
+        for name in self._names:
+            if query in name:
+                scored[name] = 1.0 if name == query else 0.9 - 0.1 * (len(name) - len(query)) / len(name)
+        for name in difflib.get_close_matches(query, self._names, n=limit, cutoff=cutoff):
+            scored.setdefault(name, difflib.SequenceMatcher(None, query, name).ratio() * 0.9)
+
+        results = []
+        for name, score in sorted(scored.items(), key=lambda item: item[1], reverse=True):
+            for symbol in self._query("name_lower = ?", [name], kinds, directory, file_pattern):
+                symbol["score"] = round(score, 3)
+                results.append(symbol)
+            if len(results) >= limit:
+                break
+        return results[:limit]
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,133 @@
+"""
+文件: tools/validation_cache.py
+职责: 验证结果缓存 - 按文件内容哈希和验证器版本缓存检查结果，文件未改变时直接复用（跨进程、续跑后仍有效）
+依赖: config.py, utils/logger.py
+被依赖: tools/game_validator.py, agents/tester_agent.py
+
+关键接口:
+  - get_validation_cache(project_dir) -> 项目的缓存（同一项目在进程内共享一个实例）
+  - ValidationCache.get(kind, version, hashes) -> 缓存的结果，没有时为None
+  - ValidationCache.put(kind, version, hashes, result) - 记录结果并写入磁盘
+  - hash_text(text) -> 文本内容的哈希
+
+说明:
+  - 缓存文件: projects/<项目>/checkpoints/validation_cache.json（原子写入）
+  - 键 = 结果类型 + 验证器版本 + 参与检查的文件的内容哈希；检查逻辑改变时提高版本号，旧结果自然失效
+  - 超过 VALIDATION_CACHE_MAX_ENTRIES 条时删除最久未使用的
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from config import Config
+from utils.logger import setup_logger
+
+logger = setup_logger("validation_cache")
+
+CACHE_FILE = Path("checkpoints") / "validation_cache.json"
+
+_caches: Dict[str, "ValidationCache"] = {}
+
+
+def hash_text(text: str) -> str:
+    """文本内容的sha256"""
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+
+def get_validation_cache(project_dir: Path) -> "ValidationCache":
+    """项目的验证结果缓存（同一项目共享一个实例，避免多个实例互相覆盖缓存文件）"""
+    key = str(Path(project_dir).resolve())
+    cache = _caches.get(key)
+    if cache is None:
+        cache = ValidationCache(Path(key), Config.VALIDATION_CACHE_MAX_ENTRIES)
+        _caches[key] = cache
+    return cache
+
+
+class ValidationCache:
+    """项目的验证结果缓存"""
+
+    def __init__(self, project_dir: Path, max_entries: int = 200):
+        """
+        Args:
+            project_dir: 项目目录
+            max_entries: 最多缓存的结果数
+        """
+        self.path = Path(project_dir) / CACHE_FILE
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            self._entries = OrderedDict(json.loads(self.path.read_text(encoding="utf-8")))
+        except (OSError, ValueError) as e:
+            logger.warning(f"验证结果缓存读取失败，将重新建立: {e}")
+
+    def _save(self) -> None:
+        """原子写入（先写临时文件再替换）"""
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".json.tmp")
+            tmp_path.write_text(json.dumps(self._entries, ensure_ascii=False, default=str), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"验证结果缓存写入失败: {e}")
+
+    @staticmethod
+    def _key(kind: str, version: Any, hashes: Dict[str, Optional[str]]) -> str:
+        parts = [kind, str(version)] + [f"{name}={hashes[name]}" for name in sorted(hashes)]
+        return hash_text("\n".join(parts))
+
+    def get(self, kind: str, version: Any, hashes: Dict[str, Optional[str]]) -> Optional[Any]:
+        """
+        查询缓存的结果
+
+        Args:
+            kind: 结果类型（如检查名称）
+            version: 验证器版本
+            hashes: {文件名: 内容哈希}，参与该检查的所有文件
+
+        Returns:
+            缓存的结果，没有时为None
+        """
+        if not Config.VALIDATION_CACHE_ENABLED:
+            return None
+        key = self._key(kind, version, hashes)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(result)
+
+    def put(self, kind: str, version: Any, hashes: Dict[str, Optional[str]], result: Any) -> None:
+        """记录结果并写入磁盘，参数同 get()"""
+        if not Config.VALIDATION_CACHE_ENABLED:
+            return
+        key = self._key(kind, version, hashes)
+        with self._lock:
+            self._entries[key] = copy.deepcopy(result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._save()
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._save()
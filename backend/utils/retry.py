@@ -1,7 +1,7 @@
 """
 文件: utils/retry.py
 职责: 重试机制工具，支持指数退避策略
-依赖: asyncio（Python标准库）
+依赖: asyncio（Python标准库）, utils/tracer.py
 被依赖: llm_client.py 等需要重试的模块
 """
 
@@ -12,6 +12,8 @@ import functools
 from typing import Callable, Type, Tuple
 import logging
 
+from utils.tracer import trace_span
+
 # 设置控制台编码为 UTF-8（Windows 兼容）
 if sys.platform == "win32":
     try:
@@ -96,7 +98,8 @@ def async_retry(
                     )
                     
                     # 等待后重试
-                    await asyncio.sleep(delay)
+                    with trace_span("retry_backoff", "sleep", function=func.__name__, attempt=attempt):
+                        await asyncio.sleep(delay)
             
             # 理论上不应该执行到这里
             raise last_exception
@@ -0,0 +1,297 @@
+"""
+文件: utils/tracer.py
+职责: 基于span的耗时追踪 - 记录工作流各阶段、Agent处理、LLM调用、各类等待、文件读写和图片生成的耗时，
+      导出 Chrome Trace / Perfetto 可直接打开的JSON
+依赖: 无（Python标准库）
+被依赖: workflows/game_dev_workflow.py, workflows/task_dag.py, engine/agent.py, engine/agent_manager.py, tools/code_runner.py,
+        engine/llm_client.py, engine/message_bus.py, tools/file_tool.py, tools/image_gen_tool.py, utils/retry.py
+
+关键接口:
+  - Tracer(name, max_spans) - 一次工作流运行的追踪记录
+  - activate_tracer(tracer) / deactivate_tracer(token) - 在当前协程及其之后创建的任务中启用追踪
+  - trace_span(name, category, **args) - 记录一段耗时（未启用追踪时几乎没有开销）
+  - Tracer.summary() - 按阶段、Agent、等待类型汇总耗时
+  - Tracer.export(path) - 导出 Chrome Trace JSON（chrome://tracing 或 ui.perfetto.dev 打开）
+
+说明:
+  - 追踪器通过 ContextVar 传递，同一进程中并发运行的项目各自记录，互不混淆
+  - 每个asyncio任务对应trace中的一条轨道（tid），轨道名取任务名，同一任务内的span严格嵌套
+  - span会继承父span的 agent 参数，LLM调用、文件读写等耗时可以归到发起它的Agent
+"""
+
+import asyncio
+import json
+import os
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# 计入等待耗时的类别: 等待Agent回复、消息/请求排队、等待老板决策、固定休眠和重试退避
+WAIT_CATEGORIES = ("wait", "queue", "boss", "sleep")
+
+_active_tracer: ContextVar[Optional["Tracer"]] = ContextVar("active_tracer", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """一段进行中的耗时记录"""
+
+    __slots__ = ("name", "category", "args", "start", "parent", "agent", "discarded")
+
+    def __init__(self, name: str, category: str, args: Dict[str, Any], parent: Optional["Span"]):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = time.perf_counter()
+        self.parent = parent
+        self.agent = args.get("agent") or (parent.agent if parent else None)
+        self.discarded = False
+
+    def set(self, **args: Any) -> None:
+        """补充span参数（如结果大小）"""
+        self.args.update(args)
+
+    def discard(self) -> None:
+        """不记录这个span（如没有收到消息的轮询）"""
+        self.discarded = True
+
+
+class _NullSpan:
+    """未启用追踪时使用的空span"""
+
+    def set(self, **args: Any) -> None:
+        pass
+
+    def discard(self) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """
+    一次工作流运行的追踪记录
+
+    只在事件循环线程中记录，不需要加锁。
+    """
+
+    def __init__(self, name: str, max_spans: int = 100000):
+        """
+        Args:
+            name: 追踪名称（项目名）
+            max_spans: 最多保留的span数，超出后只计数不记录
+        """
+        self.name = name
+        self.max_spans = max_spans
+        self.started_at = datetime.now()
+        self._origin = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.dropped = 0
+        self.export_path: Optional[Path] = None
+        self._tids: "weakref.WeakKeyDictionary[asyncio.Task, int]" = weakref.WeakKeyDictionary()
+        self._track_names: Dict[int, str] = {0: "main"}
+
+    def _track_of_current_task(self) -> int:
+        """当前asyncio任务对应的轨道ID，不在任务中时为0"""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        if task is None:
+            return 0
+        tid = self._tids.get(task)
+        if tid is None:
+            tid = len(self._track_names)
+            self._tids[task] = tid
+            self._track_names[tid] = task.get_name()
+        return tid
+
+    @contextmanager
+    def span(self, name: str, category: str, **args: Any) -> Iterator[Span]:
+        """记录一段耗时，结束（包括异常退出）时写入"""
+        span = Span(name, category, args, _current_span.get())
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.args["error"] = type(e).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            if not span.discarded:
+                self.record(span.name, span.category, span.start, time.perf_counter(),
+                            **dict(span.args, agent=span.agent))
+
+    def record(self, name: str, category: str, start: float, end: float, **args: Any) -> None:
+        """
+        写入一段已结束的耗时
+
+        Args:
+            name: 名称
+            category: 类别（phase/agent/llm/wait/queue/boss/sleep/bus/io/image/check/workflow）
+            start: 开始时间（time.perf_counter()）
+            end: 结束时间（time.perf_counter()）
+            **args: 附加参数，agent 参数用于按Agent汇总
+        """
+        if len(self.spans) >= self.max_spans:
+            self.dropped += 1
+            return
+        self.spans.append({
+            "name": name,
+            "cat": category,
+            "ts": (start - self._origin) * 1e6,
+            "dur": max(end - start, 0.0) * 1e6,
+            "tid": self._track_of_current_task(),
+            "args": {k: v for k, v in args.items() if v is not None}
+        })
+
+    def summary(self, top: int = 10) -> Dict[str, Any]:
+        """
+        按类别、阶段、Agent和等待类型汇总耗时（秒）
+
+        Returns:
+            {spans, dropped, wall_time, by_category, by_phase, by_agent, waits, slowest, export_path}
+        """
+        by_category: Dict[str, Dict[str, float]] = {}
+        by_phase: Dict[str, float] = {}
+        by_agent: Dict[str, Dict[str, float]] = {}
+        waits: Dict[str, Dict[str, float]] = {}
+
+        for span in self.spans:
+            seconds = span["dur"] / 1e6
+            category = span["cat"]
+            _accumulate(by_category, category, seconds)
+
+            if category == "phase":
+                title = span["args"].get("title", span["name"])
+                by_phase[title] = round(by_phase.get(title, 0.0) + seconds, 3)
+            if category in WAIT_CATEGORIES:
+                _accumulate(waits, span["name"], seconds)
+
+            agent = span["args"].get("agent")
+            if agent:
+                stats = by_agent.setdefault(agent, {"messages": 0, "busy": 0.0, "llm_calls": 0, "llm": 0.0})
+                if span["name"].startswith("handle:"):
+                    stats["messages"] += 1
+                    stats["busy"] = round(stats["busy"] + seconds, 3)
+                elif category == "llm":
+                    stats["llm_calls"] += 1
+                    stats["llm"] = round(stats["llm"] + seconds, 3)
+
+        wall_time = max((s["ts"] + s["dur"] for s in self.spans), default=0.0) / 1e6
+        slowest = sorted(
+            (s for s in self.spans if s["cat"] not in ("workflow", "phase")),
+            key=lambda s: s["dur"], reverse=True
+        )[:top]
+        return {
+            "spans": len(self.spans),
+            "dropped": self.dropped,
+            "wall_time": round(wall_time, 3),
+            "by_category": by_category,
+            "by_phase": by_phase,
+            "by_agent": by_agent,
+            "waits": dict(sorted(waits.items(), key=lambda item: item[1]["total"], reverse=True)),
+            "slowest": [
+                {"name": s["name"], "category": s["cat"], "duration": round(s["dur"] / 1e6, 3),
+                 "agent": s["args"].get("agent")}
+                for s in slowest
+            ],
+            "export_path": str(self.export_path) if self.export_path else None
+        }
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """转换为 Chrome Trace Event 格式（每个span一个完整事件 ph=X）"""
+        events: List[Dict[str, Any]] = [
+            {"name": "process_name", "ph": "M", "pid": 1, "tid": 0, "args": {"name": self.name}}
+        ]
+        events.extend(
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+            for tid, name in self._track_names.items()
+        )
+        events.extend(
+            {
+                "name": s["name"],
+                "cat": s["cat"],
+                "ph": "X",
+                "ts": round(s["ts"], 1),
+                "dur": round(s["dur"], 1),
+                "pid": 1,
+                "tid": s["tid"],
+                "args": s["args"]
+            }
+            for s in self.spans
+        )
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "name": self.name,
+                "started_at": self.started_at.isoformat(),
+                "dropped_spans": self.dropped
+            }
+        }
+
+    def export(self, path: Path) -> Path:
+        """
+        导出 Chrome Trace JSON（先写临时文件再替换）
+
+        Args:
+            path: 导出路径
+
+        Returns:
+            导出路径
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+        self.export_path = path
+        return path
+
+
+def _accumulate(table: Dict[str, Dict[str, float]], key: str, seconds: float) -> None:
+    """累加次数、总耗时和最大耗时"""
+    stats = table.setdefault(key, {"count": 0, "total": 0.0, "max": 0.0})
+    stats["count"] += 1
+    stats["total"] = round(stats["total"] + seconds, 3)
+    stats["max"] = round(max(stats["max"], seconds), 3)
+
+
+def activate_tracer(tracer: Optional[Tracer]) -> Token:
+    """在当前协程（及之后从中创建的任务）中启用追踪器"""
+    return _active_tracer.set(tracer)
+
+
+def deactivate_tracer(token: Token) -> None:
+    """恢复启用追踪器之前的状态"""
+    _active_tracer.reset(token)
+
+
+def current_tracer() -> Optional[Tracer]:
+    """当前协程的追踪器，未启用时为None"""
+    return _active_tracer.get()
+
+
+@contextmanager
+def trace_span(name: str, category: str, **args: Any) -> Iterator[Any]:
+    """
+    记录一段耗时，未启用追踪时不做任何事
+
+    用法:
+        with trace_span("file.read", "io", path=file_path) as span:
+            content = ...
+            span.set(chars=len(content))
+    """
+    tracer = _active_tracer.get()
+    if tracer is None:
+        yield _NULL_SPAN
+        return
+    with tracer.span(name, category, **args) as span:
+        yield span
@@ -0,0 +1,310 @@
+"""
+文件: workflows/batch_runner.py
+职责: 批量运行 - 从任务文件(JSONL)读取游戏创意，在有界并发池中无人值守地运行多个项目
+依赖: config.py, workflows/game_dev_workflow.py, workflows/boss_decision.py, engine/llm_client.py
+被依赖: 命令行入口
+
+关键接口:
+  - load_jobs(path) - 读取任务文件，每行一个 {"idea": "...", "project_name": "...", "resume": false}
+  - BatchRunner(jobs, concurrency, summary_path, project_timeout) - 创建批量运行器
+  - async run() - 运行所有项目，返回汇总（同时写入汇总文件）
+  - python backend/workflows/batch_runner.py jobs.jsonl --concurrency 3 - 命令行运行
+
+共享与隔离:
+  - 所有项目运行在同一进程中，共享消息总线的频率限制、工具实例、上下文缓存、
+    LLM模型实例和LLM请求并发上限（LLM_MAX_CONCURRENT_REQUESTS）
+  - 各项目的Agent按项目作用域订阅消息总线，互不串线
+  - 老板决策全部自动批准（默认选项），运行中不需要人工操作
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from pathlib import Path
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from config import Config
+from utils.logger import setup_logger
+from workflows.boss_decision import DecisionPolicy
+
+# 任务文件中游戏创意可用的字段名（与 /project/start 的 game_idea 兼容）
+IDEA_FIELDS = ("idea", "game_idea", "description")
+
+
+def load_jobs(path: Path) -> List[Dict[str, Any]]:
+    """
+    读取任务文件
+
+    每行一个JSON对象，空行和 # 开头的行被忽略。未指定 project_name 时按行号生成，
+    重复的项目名自动加序号，保证每个项目有独立的项目目录。
+
+    Args:
+        path: JSONL任务文件路径
+
+    Returns:
+        [{"project_name", "idea", "resume"}]
+
+    Raises:
+        ValueError: 某行不是JSON对象或缺少游戏创意
+    """
+    jobs = []
+    used_names = set()
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"第{line_no}行不是合法的JSON: {e}") from None
+            if not isinstance(entry, dict):
+                raise ValueError(f"第{line_no}行应为JSON对象")
+
+            idea = next((entry[field] for field in IDEA_FIELDS if entry.get(field)), None)
+            if not isinstance(idea, str) or not idea.strip():
+                raise ValueError(f"第{line_no}行缺少游戏创意（字段: {'/'.join(IDEA_FIELDS)}）")
+
+            # 项目名用作目录名，只保留安全字符
+            name = re.sub(r"[^\w\-]", "_", str(entry.get("project_name") or f"batch_{line_no:03d}"))
+            unique = name
+            suffix = 2
+            while unique in used_names:
+                unique = f"{name}_{suffix}"
+                suffix += 1
+            used_names.add(unique)
+
+            jobs.append({
+                "project_name": unique,
+                "idea": idea.strip(),
+                "resume": bool(entry.get("resume", False))
+            })
+
+    return jobs
+
+
+class BatchRunner:
+    """
+    批量运行器
+
+    在最多 concurrency 个并发项目的池中运行任务文件里的所有项目；
+    每个项目结束后立即更新汇总文件，批量运行中途中断也能看到已完成项目的结果。
+    """
+
+    def __init__(
+        self,
+        jobs: List[Dict[str, Any]],
+        concurrency: Optional[int] = None,
+        summary_path: Optional[Path] = None,
+        project_timeout: Optional[float] = None,
+        workflow_factory: Optional[Callable[..., Any]] = None
+    ):
+        """
+        初始化批量运行器
+
+        Args:
+            jobs: load_jobs() 返回的任务列表
+            concurrency: 同时运行的项目数，None表示使用 BATCH_MAX_CONCURRENT
+            summary_path: 汇总文件路径，None表示 projects/batch_runs/batch_<时间>.json
+            project_timeout: 单个项目的最长运行时间(秒)，None表示使用 BATCH_PROJECT_TIMEOUT，0表示不限制
+            workflow_factory: 创建工作流的函数 (project_name, idea, decision_policy)，默认为 GameDevWorkflow
+        """
+        self.jobs = jobs
+        self.concurrency = max(1, concurrency or Config.BATCH_MAX_CONCURRENT)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.summary_path = Path(summary_path or Config.PROJECTS_DIR / "batch_runs" / f"batch_{timestamp}.json")
+        self.project_timeout = Config.BATCH_PROJECT_TIMEOUT if project_timeout is None else project_timeout
+
+        if workflow_factory is None:
+            from workflows.game_dev_workflow import GameDevWorkflow
+            workflow_factory = GameDevWorkflow
+        self.workflow_factory = workflow_factory
+
+        # 无人值守: 所有决策使用默认选项
+        self.decision_policy = DecisionPolicy("auto")
+
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self._started_at: Optional[str] = None
+        self._start_time = 0.0
+        self._active = 0
+        self._peak_active = 0
+
+        self.logger = setup_logger("batch_runner")
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        运行所有项目
+
+        Returns:
+            汇总字典（与汇总文件内容相同）
+        """
+        self._started_at = datetime.now().isoformat()
+        self._start_time = time.monotonic()
+        self.results = {
+            job["project_name"]: {"project_name": job["project_name"], "idea": job["idea"], "status": "等待中"}
+            for job in self.jobs
+        }
+        self.logger.info(f"📦 批量运行 {len(self.jobs)} 个项目 (并发 {self.concurrency})，汇总: {self.summary_path}")
+        self._write_summary()
+
+        slots = asyncio.Semaphore(self.concurrency)
+        await asyncio.gather(*(self._run_job(job, slots) for job in self.jobs))
+
+        summary = self._write_summary()
+        self.logger.info(
+            f"📦 批量运行结束: 完成 {summary['completed']}/{summary['jobs']}，"
+            f"耗时 {summary['wall_time']:.1f}s"
+        )
+        return summary
+
+    async def _run_job(self, job: Dict[str, Any], slots: asyncio.Semaphore) -> None:
+        """在并发池中运行一个项目并记录指标"""
+        name = job["project_name"]
+        result = self.results[name]
+
+        async with slots:
+            self._active += 1
+            self._peak_active = max(self._peak_active, self._active)
+            result["status"] = "运行中"
+            result["started_at"] = datetime.now().isoformat()
+            start = time.monotonic()
+            workflow = None
+
+            try:
+                workflow = self.workflow_factory(name, job["idea"], decision_policy=self.decision_policy)
+                run = workflow.resume() if job.get("resume") else workflow.start()
+                if self.project_timeout > 0:
+                    await asyncio.wait_for(run, timeout=self.project_timeout)
+                else:
+                    await run
+                result["status"] = "已完成"
+            except asyncio.TimeoutError:
+                result["status"] = "超时"
+                result["error"] = f"超过 {self.project_timeout:.0f}s 未完成"
+            except Exception as e:
+                result["status"] = "失败"
+                result["error"] = str(e)
+            finally:
+                self._active -= 1
+
+            result["duration"] = round(time.monotonic() - start, 3)
+            result["finished_at"] = datetime.now().isoformat()
+            if workflow is not None:
+                result.update(self._collect_metrics(workflow))
+
+        log = self.logger.info if result["status"] == "已完成" else self.logger.error
+        log(f"[{name}] {result['status']} ({result['duration']:.1f}s){' - ' + result['error'] if 'error' in result else ''}")
+        self._write_summary()
+
+    @staticmethod
+    def _collect_metrics(workflow: Any) -> Dict[str, Any]:
+        """从工作流状态中提取项目指标"""
+        try:
+            status = workflow.get_status()
+        except Exception as e:
+            return {"metrics_error": str(e)}
+
+        schedule = status.get("schedule") or {}
+        decisions = status.get("decisions") or {}
+        return {
+            "output_dir": str(getattr(workflow, "output_dir", "")),
+            "phase_name": status.get("phase_name"),
+            "schedule": {
+                "wall_time": schedule.get("wall_time"),
+                "parallelism": schedule.get("parallelism"),
+                "critical_path": (schedule.get("critical_path") or {}).get("path")
+            },
+            "token_stats": status.get("token_stats"),
+            "decisions": {
+                key: decisions.get(key)
+                for key in ("requested", "auto", "timeouts", "human_wait_seconds")
+            },
+            "errors": status.get("error_history") or []
+        }
+
+    def _build_summary(self) -> Dict[str, Any]:
+        """汇总所有项目的结果"""
+        from engine.llm_client import get_llm_request_stats
+
+        projects = list(self.results.values())
+        finished = [p for p in projects if "duration" in p]
+        return {
+            "started_at": self._started_at,
+            "updated_at": datetime.now().isoformat(),
+            "wall_time": round(time.monotonic() - self._start_time, 3),
+            "concurrency": self.concurrency,
+            "peak_concurrency": self._peak_active,
+            "jobs": len(projects),
+            "completed": sum(1 for p in projects if p["status"] == "已完成"),
+            "failed": sum(1 for p in projects if p["status"] in ("失败", "超时")),
+            # 各项目耗时之和 / 批量总耗时，反映并发带来的加速
+            "project_seconds": round(sum(p["duration"] for p in finished), 3),
+            "llm_requests": get_llm_request_stats(),
+            "projects": projects
+        }
+
+    def _write_summary(self) -> Dict[str, Any]:
+        """原子写入汇总文件"""
+        summary = self._build_summary()
+        self.summary_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.summary_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp_path, self.summary_path)
+        return summary
+
+
+async def _main(args: argparse.Namespace) -> int:
+    """命令行入口，返回退出码（有项目未完成时为1）"""
+    from engine.message_bus import MessageBus
+
+    jobs = load_jobs(Path(args.jobs))
+    if args.resume:
+        for job in jobs:
+            job["resume"] = True
+
+    # 跨进程部署时连接消息代理（WebSocket网关节点可旁观批量运行）
+    if Config.MESSAGE_BUS_TRANSPORT != "memory":
+        await MessageBus().connect_transport()
+
+    runner = BatchRunner(
+        jobs,
+        concurrency=args.concurrency,
+        summary_path=Path(args.summary) if args.summary else None,
+        project_timeout=args.timeout
+    )
+    try:
+        summary = await runner.run()
+    finally:
+        if Config.MESSAGE_BUS_TRANSPORT != "memory":
+            await MessageBus().disconnect_transport()
+
+    print(f"\n汇总文件: {runner.summary_path}")
+    print(f"完成 {summary['completed']}/{summary['jobs']}，失败 {summary['failed']}，总耗时 {summary['wall_time']:.1f}s")
+    return 0 if summary["completed"] == summary["jobs"] else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AI Company 批量运行游戏项目")
+    parser.add_argument("jobs", help="任务文件(JSONL)，每行一个 {\"idea\": \"...\", \"project_name\": \"...\"}")
+    parser.add_argument("--concurrency", type=int, default=None, help="同时运行的项目数（默认 BATCH_MAX_CONCURRENT）")
+    parser.add_argument("--summary", default=None, help="汇总文件路径（默认 projects/batch_runs/batch_<时间>.json）")
+    parser.add_argument("--timeout", type=float, default=None, help="单个项目的最长运行时间(秒)，0表示不限制")
+    parser.add_argument("--resume", action="store_true", help="所有项目从检查点续跑")
+    args = parser.parse_args()
+
+    if not Config.validate():
+        sys.exit(1)
+
+    sys.exit(asyncio.run(_main(args)))
@@ -0,0 +1,310 @@
+"""
+文件: workflows/boss_decision.py
+职责: 老板决策 - 按策略处理决策请求：等待老板、推测执行或自动批准
+依赖: config.py, utils/logger.py
+被依赖: workflows/game_dev_workflow.py
+
+关键接口:
+  - DecisionPolicy(mode, auto_approve, timeout, headless_timeout) - 决策策略
+  - DecisionPolicy.from_config() - 从配置读取策略
+  - BossDecisionManager(policy, on_resolved, on_override) - 决策管理器
+  - async request(title, question, options, context, notify, has_clients) - 发起决策
+  - submit(decision_id, choice) - 提交老板的选择
+  - async settle(timeout) - 等待推测中的决策全部有结果（交付前调用）
+
+决策模式:
+  - interactive: 阻塞等待老板选择，超时使用默认选项（第一个选项）
+  - speculative: 立即按默认选项继续，老板之后的选择若与默认不同，
+                 由 on_override 处理（如选择取消项目时终止工作流）
+  - auto: 立即使用默认选项，不打扰老板（无人值守的批量运行）
+
+auto_approve 中列出的阶段（"*" 表示全部）总是自动批准；
+没有前端连接且 headless_timeout 为0时同样自动批准，无人值守运行不包含等待时间。
+"""
+
+import asyncio
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+from pathlib import Path
+import sys
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from config import Config
+from utils.logger import setup_logger
+
+DECISION_MODES = ("interactive", "speculative", "auto")
+
+
+class DecisionPolicy:
+    """决策策略：决定一个决策请求是等待、推测执行还是自动批准"""
+
+    def __init__(
+        self,
+        mode: str = "interactive",
+        auto_approve: Iterable[str] = (),
+        timeout: float = 300.0,
+        headless_timeout: float = 10.0
+    ):
+        """
+        初始化决策策略
+
+        Args:
+            mode: interactive / speculative / auto
+            auto_approve: 自动批准的阶段（决策context中的phase），"*" 表示全部
+            timeout: 等待老板选择的超时(秒)
+            headless_timeout: 没有前端连接时的等待时间(秒)，0表示直接使用默认选项
+
+        Raises:
+            ValueError: 未知的决策模式
+        """
+        if mode not in DECISION_MODES:
+            raise ValueError(f"未知的决策模式: {mode}，可选: {DECISION_MODES}")
+        self.mode = mode
+        self.auto_approve: Set[str] = {phase.strip() for phase in auto_approve if phase.strip()}
+        self.timeout = timeout
+        self.headless_timeout = headless_timeout
+
+    @classmethod
+    def from_config(cls) -> "DecisionPolicy":
+        """从 Config 读取决策策略"""
+        return cls(
+            mode=Config.BOSS_DECISION_MODE,
+            auto_approve=Config.BOSS_AUTO_APPROVE.split(","),
+            timeout=Config.BOSS_DECISION_TIMEOUT,
+            headless_timeout=Config.BOSS_HEADLESS_TIMEOUT
+        )
+
+    def resolve(self, phase: Optional[str], has_clients: bool) -> str:
+        """
+        确定决策的处理方式
+
+        Args:
+            phase: 决策所属阶段
+            has_clients: 是否有前端连接
+
+        Returns:
+            "wait" / "speculate" / "auto"
+        """
+        if self.mode == "auto" or "*" in self.auto_approve or (phase and phase in self.auto_approve):
+            return "auto"
+        if not has_clients and self.headless_timeout <= 0:
+            return "auto"
+        return "speculate" if self.mode == "speculative" else "wait"
+
+    def wait_timeout(self, has_clients: bool) -> float:
+        """等待老板选择的超时时间"""
+        return self.timeout if has_clients else self.headless_timeout
+
+
+class PendingDecision:
+    """一个决策请求"""
+
+    def __init__(
+        self,
+        title: str,
+        question: str,
+        options: List[str],
+        context: Dict[str, Any],
+        handling: str
+    ):
+        self.decision_id = str(uuid.uuid4())
+        self.title = title
+        self.question = question
+        self.options = options
+        self.context = context
+        self.handling = handling
+        self.default = options[0] if options else "继续"
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self.created_at = time.monotonic()
+        self.requested_at = datetime.now().isoformat()
+
+    @property
+    def phase(self) -> Optional[str]:
+        return self.context.get("phase")
+
+
+class BossDecisionManager:
+    """
+    老板决策管理器
+
+    推测执行时决策请求照常发给前端，工作流按默认选项继续；
+    老板的选择在后台等待，与默认不同时回调 on_override。
+    """
+
+    def __init__(
+        self,
+        policy: Optional[DecisionPolicy] = None,
+        on_resolved: Optional[Callable[[PendingDecision, str, bool], Awaitable[None]]] = None,
+        on_override: Optional[Callable[[PendingDecision, str], Awaitable[None]]] = None,
+        name: str = "boss_decision"
+    ):
+        """
+        初始化决策管理器
+
+        Args:
+            policy: 决策策略，None表示从配置读取
+            on_resolved: 决策有结果时回调 (pending, choice, timeout)，用于记录日志
+            on_override: 推测执行的决策被老板改选时回调 (pending, choice)
+            name: 日志器名称
+        """
+        self.policy = policy or DecisionPolicy.from_config()
+        self.on_resolved = on_resolved
+        self.on_override = on_override
+        self.pending: Dict[str, PendingDecision] = {}
+        self._watchers: Set[asyncio.Task] = set()
+
+        # 统计信息
+        self._stats = {
+            "requested": 0,
+            "auto": 0,
+            "speculated": 0,
+            "overridden": 0,
+            "timeouts": 0,
+            "human_wait_seconds": 0.0
+        }
+
+        self.logger = setup_logger(name)
+
+    async def request(
+        self,
+        title: str,
+        question: str,
+        options: List[str],
+        context: Optional[Dict[str, Any]] = None,
+        notify: Optional[Callable[[str, str, List[str]], Awaitable[None]]] = None,
+        has_clients: bool = False
+    ) -> str:
+        """
+        发起决策
+
+        Args:
+            title: 决策标题
+            question: 问题描述
+            options: 选项列表（第一个为默认选项）
+            context: 上下文信息（phase 字段用于匹配自动批准策略）
+            notify: 把决策请求推送给前端的函数 (decision_id, question, options)
+            has_clients: 是否有前端连接
+
+        Returns:
+            用于继续执行的选项（推测执行和自动批准时为默认选项）
+        """
+        context = context or {}
+        handling = self.policy.resolve(context.get("phase"), has_clients)
+        pending = PendingDecision(title, question, options, context, handling)
+        self._stats["requested"] += 1
+
+        if handling == "auto":
+            self._stats["auto"] += 1
+            self.logger.info(f"🤖 自动批准: {title} -> {pending.default}")
+            await self._resolved(pending, pending.default, False)
+            return pending.default
+
+        self.pending[pending.decision_id] = pending
+        if notify is not None:
+            await notify(pending.decision_id, f"{title}: {question}", options)
+
+        timeout = self.policy.wait_timeout(has_clients)
+        if handling == "speculate":
+            self._stats["speculated"] += 1
+            self.logger.info(f"🔮 推测执行: {title} -> {pending.default}（老板可随时改选）")
+            watcher = asyncio.create_task(self._watch(pending, timeout))
+            self._watchers.add(watcher)
+            watcher.add_done_callback(self._watchers.discard)
+            return pending.default
+
+        self.logger.info(f"⏳ 等待老板决策: {title}")
+        choice, timed_out = await self._await_choice(pending, timeout)
+        await self._resolved(pending, choice, timed_out)
+        return choice
+
+    async def _await_choice(self, pending: PendingDecision, timeout: float) -> tuple:
+        """等待老板选择，返回 (选择, 是否超时)"""
+        try:
+            choice = await asyncio.wait_for(asyncio.shield(pending.future), timeout=timeout)
+            return choice, False
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            self.logger.warning(f"⏰ 决策超时，使用默认选项: {pending.title} -> {pending.default}")
+            return pending.default, True
+        finally:
+            # 推测执行的等待不阻塞工作流，不计入等待时间
+            if pending.handling == "wait":
+                self._stats["human_wait_seconds"] += time.monotonic() - pending.created_at
+            self.pending.pop(pending.decision_id, None)
+
+    async def _watch(self, pending: PendingDecision, timeout: float) -> None:
+        """后台等待推测执行的决策，改选时回调 on_override"""
+        choice, timed_out = await self._await_choice(pending, timeout)
+        await self._resolved(pending, choice, timed_out)
+        if choice != pending.default:
+            self._stats["overridden"] += 1
+            self.logger.warning(f"↩️ 老板改选: {pending.title} -> {choice}（推测为 {pending.default}）")
+            if self.on_override is not None:
+                try:
+                    await self.on_override(pending, choice)
+                except Exception as e:
+                    self.logger.error(f"处理改选失败: {e}", exc_info=True)
+
+    async def _resolved(self, pending: PendingDecision, choice: str, timed_out: bool) -> None:
+        """决策有结果时回调 on_resolved"""
+        if self.on_resolved is None:
+            return
+        try:
+            await self.on_resolved(pending, choice, timed_out)
+        except Exception as e:
+            self.logger.error(f"记录决策失败: {e}", exc_info=True)
+
+    def submit(self, decision_id: str, choice: str) -> bool:
+        """
+        提交老板的选择
+
+        Returns:
+            是否提交成功（决策不存在或已有结果时返回False）
+        """
+        pending = self.pending.get(decision_id)
+        if pending is None or pending.future.done():
+            return False
+        pending.future.set_result(choice)
+        self.logger.info(f"✅ 决策已提交: {pending.title} -> {choice}")
+        return True
+
+    async def settle(self, timeout: Optional[float] = None) -> None:
+        """
+        等待所有推测执行中的决策有结果（在不可撤销的步骤前调用）
+
+        Args:
+            timeout: 最长等待时间(秒)，None表示使用策略的超时
+        """
+        if not self._watchers:
+            return
+        self.logger.info(f"等待 {len(self._watchers)} 个推测中的决策确认...")
+        start = time.monotonic()
+        await asyncio.wait(list(self._watchers), timeout=timeout or self.policy.timeout)
+        self._stats["human_wait_seconds"] += time.monotonic() - start
+
+    def cancel_all(self) -> None:
+        """取消所有未完成的决策（工作流结束时调用）"""
+        for watcher in list(self._watchers):
+            watcher.cancel()
+        for pending in self.pending.values():
+            if not pending.future.done():
+                pending.future.cancel()
+        self.pending.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取决策统计"""
+        return {
+            "mode": self.policy.mode,
+            "auto_approve": sorted(self.policy.auto_approve),
+            "pending": [
+                {"id": p.decision_id, "title": p.title, "default": p.default, "handling": p.handling}
+                for p in self.pending.values()
+            ],
+            **self._stats,
+            "human_wait_seconds": round(self._stats["human_wait_seconds"], 3)
+        }
@@ -0,0 +1,374 @@
+"""
+文件: workflows/checkpoint.py
+职责: 工作流检查点 - 持久化已完成阶段、子步骤、老板决策、Agent上下文和文件哈希，支持断点续跑和增量重建
+依赖: workflows/task_dag.py, utils/logger.py
+被依赖: workflows/game_dev_workflow.py, api/http_routes.py
+
+关键接口:
+  - WorkflowCheckpoint(project_dir) - 项目的检查点（projects/{项目}/checkpoints/workflow_checkpoint.json）
+  - load() / save() / reset() - 读取、原子写入、重新开始
+  - record_task(name, outputs, duration, reads) - 阶段完成后记录（含阶段实际读取的文档）
+  - record_step(task, step, value) / get_step(task, step) - 阶段内子步骤
+  - plan_resume(dag) - 计算续跑/增量重建时可以跳过的阶段（原因见 last_plan）
+  - rollback(since) - 撤销某个时间之后完成的阶段（推测执行被老板否决时）
+
+增量重建（类似构建系统）:
+  - 跟踪 shared_knowledge/ 和 output/ 下所有文件的内容哈希，每次记录时刷新快照
+  - 阶段的依赖文件 = 输入产出物对应的文件 + 阶段运行时读取过的文档
+  - 快照之后被外部修改（老板编辑GDD、提交反馈等）的文件使依赖它的阶段失效
+  - 阶段可跳过 = 已完成 且 所有上游阶段可跳过 且 依赖文件未被外部修改 且 完成时的产出文件仍存在
+  - 工作流自己写的文件（如Bug修复改写game.js）会刷新快照，不会导致重跑
+"""
+
+import fnmatch
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+from pathlib import Path
+import sys
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from utils.logger import setup_logger
+
+CHECKPOINT_VERSION = 2
+
+# 产出物对应的文件（相对项目目录，支持通配符）；不在表中的产出物只以"已完成"标记
+ARTIFACT_FILES: Dict[str, List[str]] = {
+    "gdd": ["shared_knowledge/game_design_doc.md"],
+    "tdd": ["shared_knowledge/tech_design_doc.md"],
+    "test_plan": ["shared_knowledge/test_plan.md"],
+    "game_code": ["output/index.html", "output/game.js", "output/js/*.js"],
+    "art_assets": ["output/assets/*.png"],
+    "integrated_build": ["output/index.html", "output/*.js", "output/js/*.js", "output/assets/*"],
+    "test_report": ["shared_knowledge/bug_tracker.yaml"],
+    "release_candidate": ["shared_knowledge/bug_tracker.yaml"],
+}
+
+# 参与依赖跟踪的目录（相对项目目录）
+TRACKED_DIRS = ("shared_knowledge", "output")
+
+# 只由工作流追加、不作为任何阶段输入的文件
+UNTRACKED_FILES = {"shared_knowledge/decision_log.yaml"}
+
+
+def _hash_bytes(path: Path) -> str:
+    """计算文件内容的sha256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def artifact_matches(artifact: str, relative_path: str) -> bool:
+    """文件是否属于某个产出物"""
+    return any(fnmatch.fnmatchcase(relative_path, pattern) for pattern in ARTIFACT_FILES.get(artifact, ()))
+
+
+def hash_artifact(project_dir: Path, artifact: str) -> Optional[str]:
+    """
+    计算产出物的内容哈希
+
+    Args:
+        project_dir: 项目目录
+        artifact: 产出物名称
+
+    Returns:
+        sha256十六进制字符串；非文件产出物返回""；文件全部缺失返回None
+    """
+    patterns = ARTIFACT_FILES.get(artifact)
+    if not patterns:
+        return ""
+
+    files: Set[Path] = set()
+    for pattern in patterns:
+        files.update(p for p in project_dir.glob(pattern) if p.is_file())
+    if not files:
+        return None
+
+    digest = hashlib.sha256()
+    for path in sorted(files):
+        digest.update(path.relative_to(project_dir).as_posix().encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(_hash_bytes(path).encode("ascii"))
+    return digest.hexdigest()
+
+
+class WorkflowCheckpoint:
+    """
+    工作流检查点
+
+    每个阶段完成后记录阶段产出物哈希和读取过的文档，同时保存全部跟踪文件的最新哈希快照。
+    续跑时，当前哈希与快照不同的文件视为被外部修改，依赖它的阶段需要重跑；
+    工作流自己对文件的修改（如Bug修复改写game.js）会更新快照，不会导致重跑。
+    """
+
+    def __init__(self, project_dir: Path):
+        """
+        初始化检查点
+
+        Args:
+            project_dir: 项目目录
+        """
+        self.project_dir = Path(project_dir)
+        self.path = self.project_dir / "checkpoints" / "workflow_checkpoint.json"
+        self.data: Dict[str, Any] = self._empty()
+        # 最近一次 plan_resume 的结果: {阶段名: 跳过/重跑原因}
+        self.last_plan: Dict[str, str] = {}
+        # 文件哈希缓存: {相对路径: (mtime_ns, size, sha256)}，未改动的文件不重复计算
+        self._hash_cache: Dict[str, tuple] = {}
+        self.logger = setup_logger("workflow_checkpoint")
+
+    @staticmethod
+    def _empty(project_name: str = "", project_description: str = "") -> Dict[str, Any]:
+        """空检查点"""
+        return {
+            "version": CHECKPOINT_VERSION,
+            "project_name": project_name,
+            "project_description": project_description,
+            "status": "未开始",
+            "failed_task": None,
+            "updated_at": datetime.now().isoformat(),
+            "completed": {},
+            "steps": {},
+            "files": {},
+            "decisions": [],
+            "agent_contexts": {}
+        }
+
+    def exists(self) -> bool:
+        """检查点文件是否存在"""
+        return self.path.exists()
+
+    def load(self) -> bool:
+        """
+        从磁盘读取检查点
+
+        Returns:
+            是否读取成功（文件不存在、损坏或版本不符时返回False）
+        """
+        if not self.path.exists():
+            return False
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            self.logger.warning(f"检查点读取失败，将重新开始: {e}")
+            return False
+        if data.get("version") != CHECKPOINT_VERSION:
+            self.logger.warning(f"检查点版本不符 ({data.get('version')})，将重新开始")
+            return False
+
+        self.data = self._empty()
+        self.data.update(data)
+        return True
+
+    def save(self) -> None:
+        """原子写入检查点（先写临时文件再替换，中途崩溃不会留下半个文件）"""
+        self.data["updated_at"] = datetime.now().isoformat()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".json.tmp")
+        tmp_path.write_text(
+            json.dumps(self.data, ensure_ascii=False, indent=2, default=str),
+            encoding="utf-8"
+        )
+        os.replace(tmp_path, self.path)
+
+    def reset(self, project_name: str, project_description: str) -> None:
+        """重新开始：清空所有记录并写入磁盘"""
+        self.data = self._empty(project_name, project_description)
+        self.save()
+
+    # ==========================================
+    # 记录
+    # ==========================================
+
+    def set_status(self, status: str, failed_task: Optional[str] = None) -> None:
+        """记录工作流状态并保存"""
+        self.data["status"] = status
+        self.data["failed_task"] = failed_task
+        self.save()
+
+    def scan_files(self) -> Dict[str, str]:
+        """
+        计算所有跟踪文件的当前哈希
+
+        Returns:
+            {相对路径: sha256}
+        """
+        files: Dict[str, str] = {}
+        for directory in TRACKED_DIRS:
+            root = self.project_dir / directory
+            if not root.exists():
+                continue
+            for path in root.rglob("*"):
+                if not path.is_file():
+                    continue
+                relative = path.relative_to(self.project_dir).as_posix()
+                if relative in UNTRACKED_FILES:
+                    continue
+                stat = path.stat()
+                cached = self._hash_cache.get(relative)
+                if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+                    files[relative] = cached[2]
+                    continue
+                digest = _hash_bytes(path)
+                self._hash_cache[relative] = (stat.st_mtime_ns, stat.st_size, digest)
+                files[relative] = digest
+        return files
+
+    def refresh_files(self) -> None:
+        """刷新跟踪文件的哈希快照（不保存）"""
+        self.data["files"] = self.scan_files()
+
+    def record_task(
+        self,
+        name: str,
+        outputs: Iterable[str],
+        duration: Optional[float] = None,
+        reads: Iterable[str] = ()
+    ) -> None:
+        """
+        记录阶段完成并保存
+
+        Args:
+            name: 阶段名
+            outputs: 阶段的产出物
+            duration: 耗时(秒)
+            reads: 阶段运行时读取的文件（相对项目目录）
+        """
+        self.refresh_files()
+        self.data["completed"][name] = {
+            "completed_at": datetime.now().isoformat(),
+            "duration": round(duration, 3) if duration is not None else None,
+            "outputs": {artifact: hash_artifact(self.project_dir, artifact) for artifact in outputs},
+            "reads": sorted(set(reads))
+        }
+        # 阶段已完成，子步骤不再需要
+        self.data["steps"].pop(name, None)
+        self.save()
+
+    def record_step(self, task: str, step: str, value: Any) -> None:
+        """记录阶段内的子步骤并保存（同时刷新文件快照）"""
+        self.refresh_files()
+        self.data["steps"].setdefault(task, {})[step] = value
+        self.save()
+
+    def get_step(self, task: str, step: str, default: Any = None) -> Any:
+        """读取阶段内的子步骤"""
+        return self.data["steps"].get(task, {}).get(step, default)
+
+    def record_decision(self, decision: Dict[str, Any]) -> None:
+        """记录老板决策并保存"""
+        self.data["decisions"].append(decision)
+        self.save()
+
+    def rollback(self, since: str) -> List[str]:
+        """
+        撤销某个时间点之后完成的阶段并保存，续跑时这些阶段会重新执行
+
+        Args:
+            since: ISO格式时间，completed_at 不早于它的阶段被撤销
+
+        Returns:
+            被撤销的阶段名
+        """
+        rolled_back = [
+            name for name, record in self.data["completed"].items()
+            if record.get("completed_at", "") >= since
+        ]
+        for name in rolled_back:
+            del self.data["completed"][name]
+        if rolled_back:
+            self.logger.info(f"已撤销推测执行的阶段: {rolled_back}")
+        self.save()
+        return rolled_back
+
+    def record_agent_contexts(self, contexts: Dict[str, List[Dict[str, str]]]) -> None:
+        """记录各Agent主线程上下文（不保存，随下一次record_*写入）"""
+        self.data["agent_contexts"] = contexts
+
+    # ==========================================
+    # 续跑
+    # ==========================================
+
+    def changed_files(self) -> Set[str]:
+        """自上次记录后被外部修改、新增或删除的跟踪文件"""
+        recorded = self.data["files"]
+        current = self.scan_files()
+        return {
+            path for path in set(recorded) | set(current)
+            if recorded.get(path) != current.get(path)
+        }
+
+    def _dirty_inputs(self, task, changed: Set[str]) -> List[str]:
+        """阶段依赖的文件中被修改过的部分"""
+        record = self.data["completed"].get(task.name, {})
+        dirty = set(changed) & set(record.get("reads", ()))
+        for artifact in task.inputs:
+            dirty.update(path for path in changed if artifact_matches(artifact, path))
+        return sorted(dirty)
+
+    def plan_resume(self, dag) -> Set[str]:
+        """
+        计算续跑/增量重建时可以跳过的阶段，并清理需要重跑的阶段的子步骤
+
+        Args:
+            dag: TaskDAG 任务依赖图
+
+        Returns:
+            可跳过的阶段名集合（每个阶段的原因记录在 last_plan）
+        """
+        changed = self.changed_files()
+        skip: Set[str] = set()
+        plan: Dict[str, str] = {}
+
+        for name in dag.order:
+            task = dag.tasks[name]
+            rerun_upstream = sorted(dag.upstream[name] - skip)
+            dirty = self._dirty_inputs(task, changed)
+
+            if rerun_upstream or dirty:
+                # 前置条件变了，之前的子步骤进度作废
+                self.data["steps"].pop(name, None)
+                plan[name] = f"输入已修改: {dirty}" if dirty else f"上游重跑: {rerun_upstream}"
+                continue
+            record = self.data["completed"].get(name)
+            if record is None:
+                plan[name] = "未完成"
+                continue
+            # 完成时存在的产出文件被删除了，需要重跑
+            missing = [
+                artifact for artifact in task.outputs
+                if record["outputs"].get(artifact) is not None
+                and hash_artifact(self.project_dir, artifact) is None
+            ]
+            if missing:
+                plan[name] = f"产出缺失: {missing}"
+                continue
+            skip.add(name)
+            plan[name] = "跳过"
+
+        self.last_plan = plan
+        if changed:
+            self.logger.info(f"检测到被修改的文件: {sorted(changed)}")
+        for name in dag.order:
+            self.logger.info(f"  {name}: {plan[name]}")
+        self.logger.info(f"可跳过 {len(skip)}/{len(dag.tasks)} 个阶段")
+        return skip
+
+    def get_summary(self) -> Dict[str, Any]:
+        """检查点摘要（用于状态查询）"""
+        return {
+            "status": self.data["status"],
+            "failed_task": self.data["failed_task"],
+            "completed": list(self.data["completed"].keys()),
+            "steps": self.data["steps"],
+            "decisions": len(self.data["decisions"]),
+            "last_plan": self.last_plan,
+            "updated_at": self.data["updated_at"]
+        }
@@ -1,29 +1,39 @@
 """
 文件: workflows/game_dev_workflow.py
-职责: 游戏开发工作流 - 定义完整的7个阶段流程
-依赖: engine/agent_manager.py, tools/file_tool.py
-被依赖: api/http_routes.py (未来P5实现)
+职责: 游戏开发工作流 - 以任务依赖图(DAG)定义开发流程，就绪任务并发执行
+依赖: engine/agent_manager.py, tools/file_tool.py, workflows/task_dag.py, workflows/checkpoint.py,
+      workflows/boss_decision.py, utils/tracer.py
+被依赖: api/http_routes.py (未来P5实现), workflows/batch_runner.py
 
 关键接口:
-  - GameDevWorkflow(project_name, project_description) - 创建工作流
-  - async start() - 启动工作流
+  - GameDevWorkflow(project_name, project_description, decision_policy) - 创建工作流
+  - build_task_graph(workflow=None) - 开发流程的任务依赖图（不传工作流时只用于查看依赖关系）
+  - async start() - 启动工作流（从头开始，重置检查点）
+  - async resume() - 从检查点续跑，跳过已完成且输入未变的阶段
   - async get_status() - 获取当前状态
+
+性能追踪（TRACE_ENABLED）:
+  每次运行记录各阶段、Agent处理、LLM调用、消息/决策等待、文件读写和图片生成的耗时，
+  结束时导出到 projects/<项目>/traces/trace_<时间>.json（Chrome Trace 格式），
+  汇总见 get_status()["trace"]
 """
 
 import asyncio
-from typing import Dict, Any, Optional, List
+import time
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, List, Set
 from pathlib import Path
 import sys
 from datetime import datetime
-import uuid
 
 # 添加 backend 到 Python 路径
 backend_path = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_path))
 
 from config import Config
+from engine.agent import MAIN_THREAD
 from engine.agent_manager import AgentManager
-from engine.message_bus import MessageBus
+from engine.message_bus import MessageBus, scoped_agent_id
 from tools.file_tool import FileTool
 from agents.pm_agent import PMAgent
 from agents.planner_agent import PlannerAgent
@@ -31,6 +41,10 @@ from agents.programmer_agent import ProgrammerAgent
 from agents.artist_agent import ArtistAgent
 from agents.tester_agent import TesterAgent
 from utils.logger import setup_logger
+from utils.tracer import Tracer, activate_tracer, deactivate_tracer, trace_span
+from workflows.task_dag import DagTask, TaskDAG, DagExecutor
+from workflows.checkpoint import WorkflowCheckpoint, hash_artifact
+from workflows.boss_decision import BossDecisionManager, DecisionPolicy, PendingDecision
 
 # P11: 导入缓存管理器
 try:
@@ -45,6 +59,9 @@ from tools.code_search_tool import CodeSearchTool
 from tools.image_gen_tool import ImageGenTool
 from tools.tool_registry import ToolRegistry
 
+# 当前协程所属的DAG任务（并发阶段各自记录读取的文档）
+_current_task: ContextVar[Optional[str]] = ContextVar("workflow_current_task", default=None)
+
 # 导入WebSocket广播函数（延迟导入以避免循环依赖）
 from api.websocket_handler import (
     broadcast_agent_message,
@@ -55,27 +72,79 @@ from api.websocket_handler import (
 )
 
 
+# 开发流程的任务定义: (任务名, 处理方法, 输入, 产出, 显示名称)
+#   - 技术设计、测试计划、美术素材都只依赖GDD
+#   - 编码依赖GDD和TDD，可与美术素材、测试计划同时进行
+#   - 测试同时依赖整合结果和测试计划
+TASK_SPECS = [
+    ("initiation", "_phase_1_initiation", [], ["requirements"], "立项"),
+    ("planning", "_phase_2_planning", ["requirements"], ["gdd"], "策划"),
+    ("tech_design", "_phase_3_tech_design", ["gdd"], ["tdd"], "技术设计"),
+    ("art_assets", "_phase_4_artist_assets", ["gdd"], ["art_assets"], "美术素材"),
+    ("test_planning", "_phase_test_planning", ["gdd"], ["test_plan"], "测试计划"),
+    ("coding", "_phase_4_programmer_coding", ["gdd", "tdd"], ["game_code"], "编码"),
+    ("dev_review", "_phase_4_dev_review", ["game_code", "art_assets"], ["dev_approved"], "开发验收"),
+    ("integration", "_phase_5_integration", ["dev_approved"], ["integrated_build"], "整合"),
+    ("testing", "_phase_6_testing", ["integrated_build", "test_plan"], ["test_report"], "测试"),
+    ("bug_fixing", "_phase_6_5_bug_fixing", ["test_report"], ["release_candidate"], "Bug修复"),
+    ("delivery", "_phase_7_delivery", ["release_candidate"], ["delivered"], "交付"),
+]
+
+
+async def _graph_only_handler() -> None:
+    raise RuntimeError("未绑定工作流的任务图只能用于查看依赖关系，不能执行")
+
+
+def build_task_graph(workflow: Optional["GameDevWorkflow"] = None) -> TaskDAG:
+    """
+    构建开发流程的任务依赖图
+    
+    每个任务声明输入和产出，所有输入就绪的任务会被并发执行（见 TASK_SPECS）。
+    
+    Args:
+        workflow: 提供各阶段处理方法的工作流；为None时只构建依赖关系
+                  （如预览增量重建计划），无需创建工作流和Agent
+    
+    Returns:
+        TaskDAG 任务依赖图
+    """
+    return TaskDAG([
+        DagTask(
+            name,
+            getattr(workflow, handler) if workflow is not None else _graph_only_handler,
+            inputs=inputs, outputs=outputs, title=title
+        )
+        for name, handler, inputs, outputs, title in TASK_SPECS
+    ])
+
+
 class GameDevWorkflow:
     """
     游戏开发工作流
     
-    实现完整的7个阶段:
+    实现完整的开发流程（按任务依赖图调度，见 build_task_graph）:
     1. 立项 - PM接收需求
     2. 策划 - 策划编写GDD
-    3. 技术设计 - 程序员设计架构
-    4. 并行开发 - 程序员+美术同时工作
-    5. 整合 - 程序员整合代码和素材
-    6. 测试 - 测试运行游戏
+    3. 技术设计 / 测试计划 / 美术素材 - 只依赖GDD，三者并发
+    4. 编码 - 依赖GDD和TDD，与美术素材、测试计划并发
+    5. 开发验收、整合 - 程序员整合代码和素材
+    6. 测试、Bug修复 - 测试运行游戏
     7. 交付 - PM汇报项目完成
     """
     
-    def __init__(self, project_name: str, project_description: str):
+    def __init__(
+        self,
+        project_name: str,
+        project_description: str,
+        decision_policy: Optional[DecisionPolicy] = None
+    ):
         """
         初始化工作流
         
         Args:
             project_name: 项目名称（如"snake_game"）
             project_description: 项目描述（用户输入的需求）
+            decision_policy: 老板决策策略，None表示从配置读取（批量运行时传入自动批准策略）
         """
         self.project_name = project_name
         self.project_description = project_description
@@ -87,11 +156,16 @@ class GameDevWorkflow:
         self.knowledge_base_dir = self.project_dir / "shared_knowledge"
         self.output_dir = self.project_dir / "output"
         self.logs_dir = self.project_dir / "logs"
+        self.traces_dir = self.project_dir / "traces"
         
         # 核心组件
-        self.agent_manager = AgentManager()
+        # Agent按项目作用域订阅消息总线，同一进程中并发运行的项目互不串线
+        self.agent_manager = AgentManager(namespace=project_name)
         self.message_bus = MessageBus()
+        # workflow接收Agent回复的队列地址（Agent仍回复给"workflow"，由总线按项目投递）
+        self.inbox = scoped_agent_id("workflow", project_name)
         self.file_tool = FileTool()
+        self._websocket_callback = None
         
         # 日志器
         self.logger = setup_logger(f"workflow_{project_name}")
@@ -99,8 +173,16 @@ class GameDevWorkflow:
         # Agent 实例
         self.agents: Dict[str, Any] = {}
         
-        # 决策等待存储 - 存储待决策的请求和结果
-        self.pending_decisions: Dict[str, asyncio.Future] = {}
+        # 老板决策: 按配置的策略等待、推测执行或自动批准（见 workflows/boss_decision.py）
+        self.decisions = BossDecisionManager(
+            decision_policy,
+            on_resolved=self._on_decision_resolved,
+            on_override=self._on_decision_override,
+            name=f"decisions_{project_name}"
+        )
+        # 老板否决推测执行时终止工作流的原因，以及正在执行工作流的协程
+        self._abort_reason: Optional[str] = None
+        self._run_task: Optional[asyncio.Task] = None
         
         # P11: 缓存管理器
         self._cache_manager = get_cache_manager() if CACHE_AVAILABLE else None
@@ -120,17 +202,31 @@ class GameDevWorkflow:
         self._failed_phase: Optional[int] = None
         self._error_history: List[Dict[str, Any]] = []
         
-        # 阶段定义
+        # 阶段定义: 任务依赖图，phases 按拓扑顺序列出（用于状态查询）
+        self.task_graph = self._build_task_graph()
         self.phases = [
-            {"name": "立项", "handler": self._phase_1_initiation},
-            {"name": "策划", "handler": self._phase_2_planning},
-            {"name": "技术设计", "handler": self._phase_3_tech_design},
-            {"name": "并行开发", "handler": self._phase_4_parallel_dev},
-            {"name": "整合", "handler": self._phase_5_integration},
-            {"name": "测试", "handler": self._phase_6_testing},
-            {"name": "Bug修复", "handler": self._phase_6_5_bug_fixing},
-            {"name": "交付", "handler": self._phase_7_delivery}
+            {
+                "id": name,
+                "name": self.task_graph.tasks[name].title,
+                "handler": self.task_graph.tasks[name].handler
+            }
+            for name in self.task_graph.order
         ]
+        self._executor: Optional[DagExecutor] = None
+        self._last_phase_name = "未开始"
+        
+        # 等待Agent回复时收到的其它Agent的回复: {agent_id: [message]}
+        self._pending_replies: Dict[str, List[Dict[str, Any]]] = {}
+        
+        # 检查点: 每个阶段/子步骤完成后写入项目目录，用于断点续跑
+        self.checkpoint = WorkflowCheckpoint(self.project_dir)
+        self._resuming = False
+        self._resume_skip: Set[str] = set()
+        # 各阶段运行时读取的文档（相对项目目录），作为增量重建的依赖
+        self._task_reads: Dict[str, Set[str]] = {}
+        
+        # 性能追踪: 最近一次运行的span记录（start()时创建）
+        self.tracer: Optional[Tracer] = None
         
         self.logger.info(f"工作流初始化成功: {project_name}")
     
@@ -141,31 +237,98 @@ class GameDevWorkflow:
         # 获取工具注册表单例
         registry = ToolRegistry()
         
-        # 注册file工具（使用已有的self.file_tool）
-        registry.register_tool("file", self.file_tool)
-        self.logger.info("  ✓ file工具已注册")
-        
-        # 注册code_runner工具
-        code_runner = CodeRunner()
-        registry.register_tool("code_runner", code_runner)
-        self.logger.info("  ✓ code_runner工具已注册")
-        
-        # 注册code_search工具
-        code_search = CodeSearchTool()
-        registry.register_tool("code_search", code_search)
-        self.logger.info("  ✓ code_search工具已注册")
-        
-        # 注册图片生成工具（P9新增 - Gemini 2.5 Flash Image）
-        image_gen = ImageGenTool()
-        registry.register_tool("image_gen", image_gen)
-        self.logger.info("  ✓ image_gen工具已注册")
+        # 工具不保存项目状态，同一进程中并发运行的项目共用已注册的实例
+        tool_factories = {
+            "file": lambda: self.file_tool,  # 使用已有的self.file_tool
+            "code_runner": CodeRunner,
+            "code_search": CodeSearchTool,
+            "image_gen": ImageGenTool,  # P9新增 - Gemini 2.5 Flash Image
+        }
+        for name, factory in tool_factories.items():
+            if registry.has_tool(name):
+                self.logger.info(f"  ✓ {name}工具已存在，复用")
+                continue
+            registry.register_tool(name, factory())
+            self.logger.info(f"  ✓ {name}工具已注册")
         
         self.logger.info("全局工具注册完成")
         
         # 让workflow自己也订阅消息总线，用于接收Agent的回复
-        self.message_bus.subscribe("workflow", lambda msg: None)  # 不需要回调，只需要队列
+        self.message_bus.subscribe(self.inbox, lambda msg: None)  # 不需要回调，只需要队列
         self.logger.info("  ✓ workflow已订阅消息总线")
     
+    def _build_task_graph(self) -> TaskDAG:
+        """构建绑定到本工作流各阶段处理方法的任务依赖图（见 build_task_graph）"""
+        return build_task_graph(self)
+    
+    async def _on_task_start(self, task: DagTask) -> None:
+        """DAG任务启动时更新当前阶段并广播到前端"""
+        # on_start 与任务处理函数在同一个协程中执行，之后的文档读取都记到该任务
+        _current_task.set(task.name)
+        self._task_reads[task.name] = set()
+        
+        self.current_phase = self.task_graph.index_of(task.name) + 1
+        done = len(self._executor.completed) if self._executor else 0
+        progress = (done / len(self.phases)) * 100
+        
+        self.logger.info("")
+        self.logger.info("="*60)
+        self.logger.info(f"阶段 {self.current_phase}/{len(self.phases)}: {task.title}")
+        self.logger.info("="*60)
+        
+        await broadcast_phase_change(
+            project_id=self.project_name,
+            old_phase=self._last_phase_name,
+            new_phase=task.title,
+            progress=progress
+        )
+        self._last_phase_name = task.title
+    
+    async def _on_task_finish(self, task: DagTask) -> None:
+        """DAG任务完成时记录日志并写入检查点"""
+        self.logger.info(f"✅ 阶段完成: {task.title}")
+        
+        try:
+            self.checkpoint.record_agent_contexts(self._snapshot_agent_contexts())
+            duration = self._executor.timings.get(task.name, {}).get("duration") if self._executor else None
+            self.checkpoint.record_task(
+                task.name, task.outputs, duration,
+                reads=self._task_reads.pop(task.name, ())
+            )
+        except Exception as e:
+            self.logger.error(f"写入检查点失败: {e}", exc_info=True)
+    
+    def _record_read(self, path: Path) -> None:
+        """记录当前阶段读取了某个文件（用于增量重建的依赖跟踪）"""
+        task_name = _current_task.get()
+        if task_name is None or task_name not in self._task_reads:
+            return
+        try:
+            self._task_reads[task_name].add(Path(path).relative_to(self.project_dir).as_posix())
+        except ValueError:
+            pass
+    
+    def _snapshot_agent_contexts(self) -> Dict[str, List[Dict[str, str]]]:
+        """获取各Agent主线程上下文的快照"""
+        contexts = {}
+        for agent_id, agent in self.agents.items():
+            with agent.conversation_thread(MAIN_THREAD):
+                contexts[agent_id] = agent.context_manager.get_messages()
+        return contexts
+    
+    def _restore_agent_contexts(self, contexts: Dict[str, List[Dict[str, str]]]) -> None:
+        """把检查点中的上下文恢复到各Agent主线程"""
+        for agent_id, messages in contexts.items():
+            agent = self.agents.get(agent_id)
+            if agent is None:
+                continue
+            with agent.conversation_thread(MAIN_THREAD):
+                context = agent.context_manager
+                context.clear()
+                for message in messages:
+                    context.add_message(message["role"], message["content"])
+            self.logger.info(f"  ✓ 已恢复 {agent_id} 的上下文 ({len(messages)}条消息)")
+    
     def _create_task_message(self, to: str, content: str, context: str, priority: str = "normal") -> Dict:
         """
         创建任务消息的辅助函数
@@ -187,6 +350,7 @@ class GameDevWorkflow:
             "context": context,
             "priority": priority,
             "reply_to": "workflow",  # 回复给workflow而不是pm
+            "project": self.project_name,  # 用于项目级频率限制和路由
             "timestamp": datetime.now().isoformat()
         }
     
@@ -235,8 +399,11 @@ class GameDevWorkflow:
             directory.mkdir(parents=True, exist_ok=True)
             self.logger.info(f"  ✓ {directory.relative_to(Config.PROJECTS_DIR)}")
         
-        # 创建初始知识库文件
-        await self._create_initial_knowledge_base()
+        # 创建初始知识库文件（续跑时保留已有文件）
+        if self._resuming and (self.knowledge_base_dir / "project_rules.yaml").exists():
+            self.logger.info("续跑: 保留已有知识库文件")
+        else:
+            await self._create_initial_knowledge_base()
         
         self.logger.info("项目目录结构创建完成")
     
@@ -397,8 +564,11 @@ class GameDevWorkflow:
             except Exception as e:
                 self.logger.error(f"WebSocket推送失败: {e}", exc_info=True)
         
-        # 订阅消息总线
-        self.message_bus.subscribe_websocket(websocket_callback)
+        # 通过消息总线的出站推送管道订阅本项目的消息（后台批量推送，前端处理慢时丢弃最早的消息，不阻塞消息路由）
+        if self._websocket_callback is not None:
+            self.message_bus.unsubscribe_websocket(self._websocket_callback)
+        self._websocket_callback = websocket_callback
+        self.message_bus.subscribe_websocket(websocket_callback, project=self.project_name)
         
         self.logger.info("✓ WebSocket集成已完成")
     
@@ -409,37 +579,46 @@ class GameDevWorkflow:
         self.logger.info("="*60)
         
         self.status = "运行中"
+        self._abort_reason = None
+        self._run_task = asyncio.current_task()
+        self._executor = None
+        
+        # 之后创建的Agent工作循环、阶段任务都继承这个追踪器
+        self.tracer = Tracer(self.project_name, Config.TRACE_MAX_SPANS) if Config.TRACE_ENABLED else None
+        trace_token = activate_tracer(self.tracer)
+        trace_start = time.perf_counter()
         
         try:
             # 初始化环境
-            await self.initialize()
+            with trace_span("initialize", "workflow"):
+                await self.initialize()
             
-            # 逐个执行7个阶段
-            for i, phase in enumerate(self.phases):
-                old_phase = self.phases[self.current_phase - 1]["name"] if self.current_phase > 0 else "未开始"
-                self.current_phase = i + 1
-                new_phase = phase['name']
-                progress = (self.current_phase / len(self.phases)) * 100
-                
-                self.logger.info("")
-                self.logger.info("="*60)
-                self.logger.info(f"阶段 {self.current_phase}/{len(self.phases)}: {new_phase}")
-                self.logger.info("="*60)
-                
-                # 广播阶段变化到前端
-                await broadcast_phase_change(
-                    project_id=self.project_name,
-                    old_phase=old_phase,
-                    new_phase=new_phase,
-                    progress=progress
-                )
-                
-                # 执行阶段处理函数
-                await phase["handler"]()
-                
-                self.logger.info(f"✅ 阶段 {self.current_phase} 完成: {new_phase}")
+            if self._resuming:
+                self._restore_agent_contexts(self.checkpoint.data.get("agent_contexts", {}))
+            else:
+                self.checkpoint.reset(self.project_name, self.project_description)
+            self.checkpoint.set_status("运行中")
+            
+            # 按任务依赖图执行，所有输入就绪的阶段并发运行
+            self._executor = DagExecutor(
+                self.task_graph,
+                on_start=self._on_task_start,
+                on_finish=self._on_task_finish,
+                skip=self._resume_skip
+            )
+            try:
+                await self._executor.run()
+            except asyncio.CancelledError:
+                # 老板否决了推测执行的决策: 转为普通失败，走下面的失败处理
+                if self._abort_reason is None:
+                    raise
+                if hasattr(self._run_task, "uncancel"):
+                    self._run_task.uncancel()
+                raise Exception(self._abort_reason) from None
             
             self.status = "已完成"
+            self.checkpoint.set_status("已完成")
+            self._log_schedule_report()
             self.logger.info("")
             self.logger.info("="*60)
             self.logger.info("🎉 工作流执行完成！")
@@ -448,7 +627,7 @@ class GameDevWorkflow:
             # 广播最终阶段变化（100%完成）
             await broadcast_phase_change(
                 project_id=self.project_name,
-                old_phase=self.phases[-1]["name"],
+                old_phase=self._last_phase_name,
                 new_phase="完成",
                 progress=100.0
             )
@@ -472,12 +651,20 @@ class GameDevWorkflow:
             
         except Exception as e:
             self.status = "失败"
-            self._failed_phase = self.current_phase
+            
+            # 失败的阶段: 抛出异常的任务（并发执行时 current_phase 只是最后启动的任务）；
+            # 不是由任务抛出时（如初始化失败、老板否决）取最后启动的阶段
+            failed_task = self._executor.failed_task if self._executor is not None else None
+            if failed_task is not None:
+                self._failed_phase = self.task_graph.index_of(failed_task) + 1
+            else:
+                self._failed_phase = self.current_phase
+                failed_task = self.phases[self.current_phase - 1]["id"] if self.current_phase > 0 else None
             
             # P11: 记录错误历史
             error_record = {
-                "phase": self.current_phase,
-                "phase_name": self.phases[self.current_phase - 1]["name"] if self.current_phase > 0 else "unknown",
+                "phase": self._failed_phase,
+                "phase_name": self.task_graph.tasks[failed_task].title if failed_task else "unknown",
                 "error": str(e),
                 "timestamp": datetime.now().isoformat()
             }
@@ -485,6 +672,12 @@ class GameDevWorkflow:
             
             self.logger.error(f"工作流执行失败: {e}", exc_info=True)
             
+            # 记录失败阶段，续跑时从这里继续
+            try:
+                self.checkpoint.set_status("失败", failed_task)
+            except Exception as checkpoint_error:
+                self.logger.error(f"写入检查点失败: {checkpoint_error}")
+            
             # 广播错误到前端
             from api.websocket_handler import broadcast_error_alert
             await broadcast_error_alert(
@@ -504,8 +697,50 @@ class GameDevWorkflow:
             
             raise
         finally:
-            # 停止所有Agent
+            self.decisions.cancel_all()
+            self._run_task = None
+            
+            # 停止所有Agent，释放本项目的消息队列
             await self.agent_manager.stop_all()
+            self.agent_manager.unregister_all()
+            self.message_bus.unsubscribe(self.inbox, drop_queue=True)
+            
+            # 取消本项目的WebSocket推送订阅
+            if self._websocket_callback is not None:
+                self.message_bus.unsubscribe_websocket(self._websocket_callback)
+                self._websocket_callback = None
+            
+            deactivate_tracer(trace_token)
+            self._export_trace(trace_start)
+    
+    async def resume(self):
+        """
+        从检查点续跑工作流
+        
+        已完成、上游未重跑且输入产出物未被修改的阶段会被跳过；
+        没有可用检查点时等同于 start()。
+        """
+        if not self.checkpoint.load():
+            self.logger.info("没有可用的检查点，从头开始")
+            return await self.start()
+        
+        self._resuming = True
+        self._resume_skip = self.checkpoint.plan_resume(self.task_graph)
+        self._error_history.clear()
+        self._failed_phase = None
+        
+        # 按已跳过的最后一个阶段初始化进度显示
+        skipped = [name for name in self.task_graph.order if name in self._resume_skip]
+        if skipped:
+            self._last_phase_name = self.task_graph.tasks[skipped[-1]].title
+        
+        self.logger.info(f"♻️ 从检查点续跑: 跳过 {len(skipped)}/{len(self.phases)} 个阶段")
+        try:
+            return await self.start()
+        finally:
+            # 之后在同一工作流上调用 start() 时从头执行，不沿用本次的跳过集合
+            self._resuming = False
+            self._resume_skip = set()
     
     async def _phase_1_initiation(self):
         """阶段1: 立项 - PM接收需求"""
@@ -567,11 +802,11 @@ class GameDevWorkflow:
             "content": f"项目启动！项目名称: {self.project_name}。需求: {self.project_description}",
             "context": "全员会议",
             "priority": "normal",
+            "project": self.project_name,
             "timestamp": datetime.now().isoformat()
         }
         
         await self.message_bus.send(meeting_message)
-        await asyncio.sleep(2)  # 等待消息传递
         
         # PM任务完成，状态更新为空闲
         await broadcast_agent_status(
@@ -875,24 +1110,8 @@ output/
                 current_task=""
             )
     
-    async def _phase_4_parallel_dev(self):
-        """阶段4: 并行开发 - 程序员+美术同时工作"""
-        self.logger.info("程序员和美术并行开发...")
-        
-        # P9版本: 程序员生成代码文件 + 美术Agent生成图片素材
-        # 两者并行执行，提高效率
-        
-        # 并行启动程序员编码和美术生成
-        programmer_task = asyncio.create_task(
-            self._phase_4_programmer_coding()
-        )
-        artist_task = asyncio.create_task(
-            self._phase_4_artist_assets()
-        )
-        
-        # 等待两者都完成
-        await asyncio.gather(programmer_task, artist_task)
-        
+    async def _phase_4_dev_review(self):
+        """阶段4验收: 代码和素材都完成后请求老板验收"""
         # 【决策点3】开发验收 - 代码和素材生成完成后,请求老板验收
         self.logger.info("🤔 请求老板决策: 开发验收")
         
@@ -927,8 +1146,14 @@ output/
         )
         
         if "看看" in decision:
-            self.logger.info("⏸️ 老板选择先查看代码,等待5秒后继续...")
-            await asyncio.sleep(5)  # 给老板时间查看
+            # 等老板看完后点击继续，而不是固定等待
+            self.logger.info("⏸️ 老板选择先查看代码,等待老板确认后继续...")
+            await self._request_boss_decision(
+                title="🔍 代码查看中",
+                question="查看完代码后点击继续进入测试阶段",
+                options=["✅ 看完了,进入测试"],
+                context={"phase": "development_review", "output_dir": str(self.output_dir)}
+            )
     
     async def _phase_4_programmer_coding(self):
         """阶段4子任务: 程序员编码"""
@@ -1017,6 +1242,15 @@ output/
                     file_type="code",
                     summary="游戏主逻辑代码"
                 )
+                # 模块化生成时 game.js 由 output/js/ 下的模块打包而成
+                for module_path in sorted((self.output_dir / "js").glob("*.js")):
+                    await broadcast_agent_output(
+                        project_id=self.project_name,
+                        agent_id="programmer",
+                        file_path=f"output/js/{module_path.name}",
+                        file_type="code",
+                        summary=f"游戏代码模块 {module_path.stem}"
+                    )
             else:
                 self.logger.warning("⚠️ 游戏代码文件未完全生成")
             
@@ -1091,15 +1325,8 @@ output/
             current_task=f"正在生成{len(asset_list)}个游戏素材..."
         )
         
-        # 批量生成素材
-        project_dir = str(self.project_dir)
-        result = await artist.generate_assets_from_spec(
-            asset_list=asset_list,
-            project_dir=project_dir
-        )
-        
-        # 广播每个成功的素材
-        for asset in result.get("assets", []):
+        # 每个素材生成完成时立即推送到前端
+        async def on_asset(asset: Dict[str, Any], done: int, total: int):
             if asset.get("success") and asset.get("path"):
                 await broadcast_agent_output(
                     project_id=self.project_name,
@@ -1108,6 +1335,20 @@ output/
                     file_type="image",
                     summary=f"游戏素材: {asset.get('asset_name')}"
                 )
+            await broadcast_agent_status(
+                project_id=self.project_name,
+                agent_id="artist",
+                status="working",
+                current_task=f"正在生成游戏素材（已完成{done}/{total}）..."
+            )
+        
+        # 批量生成素材（并发生成）
+        project_dir = str(self.project_dir)
+        result = await artist.generate_assets_from_spec(
+            asset_list=asset_list,
+            project_dir=project_dir,
+            on_asset=on_asset
+        )
         
         self.logger.info(
             f"🎨 美术素材生成完成: "
@@ -1189,6 +1430,54 @@ output/
             }
         ]
     
+    async def _phase_test_planning(self):
+        """测试计划: 测试工程师根据GDD提前编写测试用例（与编码并行）"""
+        self.logger.info("测试工程师根据策划文档编写测试计划...")
+        
+        await broadcast_agent_status(
+            project_id=self.project_name,
+            agent_id="tester",
+            status="thinking",
+            current_task="根据策划文档编写测试计划..."
+        )
+        
+        tester = self.agents["tester"]
+        
+        gdd = await self._load_and_cache_document("game_design_doc.md")
+        
+        # 在独立会话线程中编写，避免与后续测试任务的上下文交错
+        with tester.conversation_thread("test_planning"):
+            tester.load_file_to_context("game_design_doc.md", gdd)
+            test_plan = await tester.think_and_respond(
+                f"""请根据游戏策划文档编写测试计划。
+游戏描述: {self.project_description}
+
+列出5-10条可执行的测试用例，每条包含: 编号、测试点、操作步骤、预期结果。
+使用Markdown列表输出，不要其他内容。"""
+            )
+        
+        await self.file_tool.write(
+            str(self.knowledge_base_dir / "test_plan.md"),
+            f"# {self.project_name} 测试计划\n\n{test_plan}\n\n---\n创建时间: {datetime.now().isoformat()}\n创建人: 测试Agent\n"
+        )
+        
+        self.logger.info("✓ 测试计划已保存")
+        
+        await broadcast_agent_output(
+            project_id=self.project_name,
+            agent_id="tester",
+            file_path="shared_knowledge/test_plan.md",
+            file_type="document",
+            summary="测试计划已完成"
+        )
+        
+        await broadcast_agent_status(
+            project_id=self.project_name,
+            agent_id="tester",
+            status="idle",
+            current_task=""
+        )
+    
     async def _phase_5_integration(self):
         """阶段5: 整合 - 确认代码和素材都已到位"""
         self.logger.info("整合代码和素材...")
@@ -1210,7 +1499,6 @@ output/
                 self.logger.info(f"  - {f.name}")
         
         self.logger.info("✓ 整合检查完成")
-        await asyncio.sleep(1)
     
     async def _phase_6_testing(self):
         """阶段6: 测试 - 测试运行游戏"""
@@ -1233,6 +1521,11 @@ output/
         gdd = await self._load_and_cache_document("game_design_doc.md")
         tester.load_file_to_context("game_design_doc.md", gdd)
         
+        # 加载测试计划阶段产出的测试用例
+        test_plan = await self._load_and_cache_document("test_plan.md")
+        if test_plan:
+            tester.load_file_to_context("test_plan.md", test_plan)
+        
         # PM分配测试任务
         await broadcast_agent_status(
             project_id=self.project_name,
@@ -1297,7 +1590,13 @@ output/
         max_iterations = 3  # 最多循环3次
         bug_tracker_path = self.knowledge_base_dir / "bug_tracker.yaml"
         
-        for iteration in range(max_iterations):
+        # 续跑时从上次完成的修复轮次之后继续
+        first_iteration = self.checkpoint.get_step("bug_fixing", "iterations_done", 0)
+        if first_iteration:
+            self.logger.info(f"续跑: 已完成{first_iteration}次修复，从第{first_iteration + 1}次继续")
+        iteration = first_iteration - 1
+        
+        for iteration in range(first_iteration, max_iterations):
             self.logger.info(f"Bug修复循环 第{iteration + 1}次...")
             
             # 1. 检查是否有未修复的Bug
@@ -1324,9 +1623,11 @@ output/
                 )
                 
                 programmer = self.agents["programmer"]
+                code_hash = hash_artifact(self.project_dir, "game_code")
                 
                 # 加载Bug追踪文件到程序员上下文
                 programmer.load_file_to_context("bug_tracker.yaml", bug_content)
+                programmer.last_patch_report = None
                 
                 fix_message = self._create_task_message(
                     to="programmer",
@@ -1359,6 +1660,14 @@ output/
                 if response:
                     self.logger.info(f"程序员修复回复: {response['content'][:150]}...")
                 
+                patch_report = programmer.last_patch_report
+                if patch_report:
+                    self.logger.info(
+                        f"补丁修复统计: 输出 {patch_report['output_chars']} 字符 / "
+                        f"文件 {patch_report['file_chars']} 字符，"
+                        f"{'已写入' if patch_report['written'] else '未写入'}"
+                    )
+                
                 # 程序员任务完成
                 await broadcast_agent_status(
                     project_id=self.project_name,
@@ -1367,7 +1676,13 @@ output/
                     current_task=""
                 )
                 
-                # 4. 重新测试
+                # 4. 代码和修复前完全相同时，重新测试的结果不会变，直接进入下一次修复
+                if hash_artifact(self.project_dir, "game_code") == code_hash:
+                    self.logger.warning("⚠️ 程序员没有修改游戏代码，跳过重新测试")
+                    self.checkpoint.record_step("bug_fixing", "iterations_done", iteration + 1)
+                    continue
+                
+                # 5. 重新测试（测试工程师对测试过的同一份代码直接复用结果）
                 self.logger.info("重新运行测试...")
                 
                 await broadcast_agent_status(
@@ -1402,8 +1717,8 @@ output/
                     current_task=""
                 )
                 
-                # 5. 等待一小段时间让Bug tracker更新
-                await asyncio.sleep(2)
+                # 6. 测试工程师回复前已更新Bug tracker，无需额外等待
+                self.checkpoint.record_step("bug_fixing", "iterations_done", iteration + 1)
                 
             except Exception as e:
                 self.logger.error(f"Bug修复循环出错: {e}", exc_info=True)
@@ -1459,6 +1774,9 @@ output/
     
     async def _phase_7_delivery(self):
         """阶段7: 交付 - PM汇报项目完成"""
+        # 交付不可撤销: 先等推测执行中的决策全部确认（老板否决时工作流在此终止）
+        await self.decisions.settle()
+        
         self.logger.info("PM汇报项目完成...")
         
         # 广播PM状态：准备交付
@@ -1479,6 +1797,7 @@ output/
             "content": f"项目 {self.project_name} 开发完成！输出目录: {self.output_dir}",
             "context": "项目交付",
             "priority": "normal",
+            "project": self.project_name,
             "timestamp": datetime.now().isoformat()
         }
         
@@ -1502,64 +1821,73 @@ output/
         context: Dict[str, Any] = None
     ) -> str:
         """
-        请求老板决策，阻塞等待用户响应
+        请求老板决策
+        
+        按决策策略处理（Config.BOSS_DECISION_MODE / BOSS_AUTO_APPROVE）:
+        - interactive: 阻塞等待老板选择，超时使用第一个选项
+        - speculative: 立即按第一个选项继续，老板改选取消/放弃时终止工作流
+        - auto / 自动批准的阶段: 直接使用第一个选项
         
         Args:
             title: 决策标题
             question: 决策问题描述
-            options: 可选项列表
-            context: 上下文信息
+            options: 可选项列表（第一个为默认选项）
+            context: 上下文信息（phase 用于匹配自动批准策略）
             
         Returns:
-            用户选择的选项
+            用于继续执行的选项
         """
-        decision_id = str(uuid.uuid4())
-        self.logger.info(f"🤔 请求老板决策: {title} (ID: {decision_id})")
+        self.logger.info(f"🤔 请求老板决策: {title}")
         
-        # 创建Future对象用于等待决策结果
-        decision_future = asyncio.Future()
-        self.pending_decisions[decision_id] = decision_future
+        # 检查是否有WebSocket客户端连接（无连接时按无人值守处理）
+        from api.websocket_handler import manager as ws_manager
+        has_clients = len(ws_manager.active_connections) > 0
         
-        # 通过WebSocket发送决策请求到前端
-        await request_boss_decision(
-            project_id=self.project_name,
-            decision_id=decision_id,
-            agent_id="pm",
-            question=f"{title}: {question}",
-            options=options
-        )
+        async def notify(decision_id: str, full_question: str, choices: List[str]):
+            # 通过WebSocket发送决策请求到前端
+            await request_boss_decision(
+                project_id=self.project_name,
+                decision_id=decision_id,
+                agent_id="pm",
+                question=full_question,
+                options=choices
+            )
         
-        self.logger.info(f"⏳ 等待老板决策...")
+        with trace_span("boss_decision", "boss", title=title, mode=self.decisions.policy.mode):
+            return await self.decisions.request(
+                title, question, options, context,
+                notify=notify,
+                has_clients=has_clients
+            )
+    
+    @property
+    def pending_decisions(self) -> Dict[str, asyncio.Future]:
+        """等待老板选择的决策: {decision_id: Future}"""
+        return {decision_id: pending.future for decision_id, pending in self.decisions.pending.items()}
+    
+    async def _on_decision_resolved(self, pending: PendingDecision, choice: str, timeout: bool) -> None:
+        """决策有结果时记录到决策日志和检查点"""
+        self.logger.info(f"✅ 老板决策: {pending.title} -> {choice}")
+        await self._log_boss_decision(
+            pending.decision_id, pending.title, pending.question,
+            pending.options, choice, pending.context, timeout=timeout
+        )
+    
+    async def _on_decision_override(self, pending: PendingDecision, choice: str) -> None:
+        """
+        推测执行的决策被老板改选
         
-        try:
-            # 检查是否有WebSocket客户端连接（无连接时缩短超时）
-            from api.websocket_handler import manager as ws_manager
-            has_clients = len(ws_manager.active_connections) > 0
-            timeout_seconds = 300.0 if has_clients else 10.0
-            
-            if not has_clients:
-                self.logger.info(f"无前端连接，自动决策超时设为{timeout_seconds}秒")
-            
-            # 等待决策结果
-            decision = await asyncio.wait_for(decision_future, timeout=timeout_seconds)
-            self.logger.info(f"✅ 收到老板决策: {decision}")
-            
-            # 记录决策到日志文件
-            await self._log_boss_decision(decision_id, title, question, options, decision, context)
-            
-            return decision
-            
-        except asyncio.TimeoutError:
-            self.logger.warning("⏰ 决策请求超时，使用默认选项")
-            # 超时则返回第一个选项作为默认值
-            default_decision = options[0] if options else "继续"
-            await self._log_boss_decision(decision_id, title, question, options, default_decision, context, timeout=True)
-            return default_decision
-            
-        finally:
-            # 清理pending_decisions
-            if decision_id in self.pending_decisions:
-                del self.pending_decisions[decision_id]
+        选择取消/放弃时撤销决策之后推测完成的阶段并终止工作流；
+        其它改选与阻塞模式下的处理一致（当前版本按默认流程继续）。
+        """
+        if "取消" in choice or "放弃" in choice:
+            self._abort_reason = f"老板{choice.lstrip('❌ ').strip()}（{pending.title}）"
+            self.logger.error(f"❌ {self._abort_reason}，终止推测执行")
+            self.checkpoint.rollback(pending.requested_at)
+            if self._run_task is not None and not self._run_task.done():
+                self._run_task.cancel()
+        else:
+            self.logger.warning(f"⚠️ 老板改选为 {choice}，当前版本不支持该选项，按默认流程继续")
     
     async def _log_boss_decision(
         self,
@@ -1613,6 +1941,16 @@ output/
             # 保存日志
             await self.file_tool.write(str(decision_log_path), log_content)
             
+            self.checkpoint.record_decision({
+                "id": decision_id,
+                "title": title,
+                "options": options,
+                "decision": decision,
+                "timeout": timeout,
+                "context": context or {},
+                "timestamp": datetime.now().isoformat()
+            })
+            
         except Exception as e:
             self.logger.error(f"记录决策日志失败: {e}", exc_info=True)
     
@@ -1624,13 +1962,7 @@ output/
             decision_id: 决策ID
             choice: 用户选择
         """
-        if decision_id in self.pending_decisions:
-            future = self.pending_decisions[decision_id]
-            if not future.done():
-                future.set_result(choice)
-                self.logger.info(f"✅ 决策已提交: {decision_id} -> {choice}")
-                return True
-        return False
+        return self.decisions.submit(decision_id, choice)
     
     async def _wait_for_response(self, agent_id: str, timeout: float = 30.0) -> Optional[Dict]:
         """
@@ -1643,12 +1975,26 @@ output/
         Returns:
             消息字典，如果超时则返回None
         """
+        with trace_span(f"wait:{agent_id}", "wait", target=agent_id) as span:
+            message = await self._receive_reply(agent_id, timeout)
+            span.set(timed_out=message is None)
+            return message
+    
+    async def _receive_reply(self, agent_id: str, timeout: float) -> Optional[Dict]:
+        """从workflow队列中取出指定Agent的回复，超时返回None"""
         start_time = asyncio.get_event_loop().time()
         
         # workflow监听自己的消息队列（Agent的回复应发给"workflow"）
-        # 过滤出from=agent_id的消息，忽略其他来源的消息
+        # 过滤出from=agent_id的消息；并发阶段中其它Agent的回复暂存，留给对应的等待者
         
         while True:
+            # 先检查其它等待者暂存的回复
+            buffered = self._pending_replies.get(agent_id)
+            if buffered:
+                message = buffered.pop(0)
+                self.logger.info(f"收到 {agent_id} 的回复 (type={message.get('type', '')})")
+                return message
+            
             # 检查是否超时
             elapsed = asyncio.get_event_loop().time() - start_time
             if elapsed > timeout:
@@ -1658,8 +2004,8 @@ output/
             remaining = timeout - elapsed
             recv_timeout = min(2.0, remaining)
             
-            # 尝试从"workflow"的队列接收消息
-            message = await self.message_bus.receive("workflow", timeout=recv_timeout)
+            # 尝试从本项目workflow的队列接收消息
+            message = await self.message_bus.receive(self.inbox, timeout=recv_timeout)
             
             if message:
                 msg_from = message.get("from", "")
@@ -1670,9 +2016,10 @@ output/
                     self.logger.info(f"收到 {agent_id} 的回复 (type={msg_type})")
                     return message
                 else:
-                    # 不是目标Agent的消息，记录并跳过
+                    # 不是目标Agent的消息，暂存给可能在并发等待它的阶段
+                    self._pending_replies.setdefault(msg_from, []).append(message)
                     self.logger.debug(
-                        f"跳过非目标消息: from={msg_from} type={msg_type} "
+                        f"暂存非目标消息: from={msg_from} type={msg_type} "
                         f"(等待来自 {agent_id} 的消息)"
                     )
     
@@ -1693,9 +2040,52 @@ output/
             "cache_stats": self._cache_manager.get_stats() if self._cache_manager else None,
             # P11: 新增错误历史
             "failed_phase": self._failed_phase,
-            "error_history": self._error_history
+            "error_history": self._error_history,
+            # 任务依赖图调度: 正在并发执行的阶段、各阶段耗时和关键路径
+            "running_phases": [
+                self.task_graph.tasks[name].title for name in sorted(self._executor.running)
+            ] if self._executor else [],
+            "schedule": self._executor.get_report() if self._executor else None,
+            # 检查点: 已完成阶段和子步骤（续跑依据）
+            "checkpoint": self.checkpoint.get_summary(),
+            # 老板决策: 模式、待决策、推测/自动批准次数和人工等待时间
+            "decisions": self.decisions.get_stats(),
+            # 性能追踪: 按阶段、Agent、等待类型的耗时汇总
+            "trace": self.tracer.summary() if self.tracer else None
         }
     
+    def _export_trace(self, trace_start: float) -> None:
+        """记录整个运行的span，导出 Chrome Trace JSON 并输出等待耗时汇总"""
+        if self.tracer is None:
+            return
+        self.tracer.record("workflow", "workflow", trace_start, time.perf_counter(),
+                           project=self.project_name, status=self.status)
+        try:
+            path = self.tracer.export(
+                self.traces_dir / f"trace_{self.tracer.started_at.strftime('%Y%m%d_%H%M%S')}.json"
+            )
+        except Exception as e:
+            self.logger.error(f"导出性能追踪失败: {e}")
+            return
+        
+        summary = self.tracer.summary(top=3)
+        waits = ", ".join(f"{name} {stats['total']:.1f}s" for name, stats in list(summary["waits"].items())[:3])
+        self.logger.info(f"⏱️ 性能追踪已导出: {path} ({summary['spans']} 个span)")
+        if waits:
+            self.logger.info(f"⏱️ 等待耗时最多: {waits}")
+    
+    def _log_schedule_report(self) -> None:
+        """输出调度报告: 总耗时、并行度和关键路径"""
+        report = self._executor.get_report()
+        critical = report["critical_path"]
+        titles = [self.task_graph.tasks[name].title for name in critical["path"]]
+        
+        self.logger.info(
+            f"⏱️ 调度报告: 总耗时 {report['wall_time']:.1f}s, "
+            f"任务累计 {report['total_task_time']:.1f}s, 并行度 {report['parallelism']:.2f}"
+        )
+        self.logger.info(f"⏱️ 关键路径 ({critical['duration']:.1f}s): {' → '.join(titles)}")
+    
     # ==================== P11新增: 文档缓存方法 ====================
     
     async def _load_and_cache_document(self, filename: str) -> str:
@@ -1711,6 +2101,8 @@ output/
         Returns:
             文档内容
         """
+        self._record_read(self.knowledge_base_dir / filename)
+        
         if filename in self._document_cache:
             self._token_stats["cache_hits"] += 1
             self.logger.debug(f"文档缓存命中: {filename}")
@@ -0,0 +1,289 @@
+"""
+文件: workflows/task_dag.py
+职责: 任务依赖图(DAG)调度 - 按输入/产出声明依赖，就绪的任务并发执行，并报告关键路径
+依赖: utils/logger.py, utils/tracer.py
+被依赖: workflows/game_dev_workflow.py
+
+关键接口:
+  - DagTask(name, handler, inputs, outputs) - 声明一个任务及其输入/产出
+  - TaskDAG(tasks, initial_artifacts) - 构建依赖图（校验缺失输入和环）
+  - DagExecutor(dag) - 执行器
+  - async run() - 并发执行所有就绪任务，直到全部完成
+  - get_report() - 各任务耗时、关键路径和并行度
+  - DagExecutor.failed_task - 失败的任务名
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set
+from pathlib import Path
+import sys
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_path))
+
+from utils.logger import setup_logger
+from utils.tracer import trace_span
+
+
+class DagTask:
+    """
+    DAG中的一个任务
+
+    任务之间的依赖由产出物(artifact)推导：任务的每个输入都必须由
+    某个上游任务产出（或在初始产出物中）。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[], Awaitable[Any]],
+        inputs: Iterable[str] = (),
+        outputs: Iterable[str] = (),
+        title: Optional[str] = None
+    ):
+        """
+        初始化任务
+
+        Args:
+            name: 任务唯一标识
+            handler: 无参数的异步处理函数
+            inputs: 依赖的产出物名称
+            outputs: 完成后产出的产出物名称
+            title: 显示名称（前端阶段名），默认为name
+        """
+        self.name = name
+        self.handler = handler
+        self.inputs: List[str] = list(inputs)
+        self.outputs: List[str] = list(outputs)
+        self.title = title or name
+
+    def __repr__(self) -> str:
+        return f"DagTask({self.name}: {self.inputs} -> {self.outputs})"
+
+
+class TaskDAG:
+    """
+    任务依赖图
+
+    根据输入/产出计算每个任务的上游任务，构建时校验：
+    - 任务名和产出物不重复
+    - 每个输入都有来源
+    - 不存在环
+    """
+
+    def __init__(self, tasks: Iterable[DagTask], initial_artifacts: Iterable[str] = ()):
+        """
+        构建依赖图
+
+        Args:
+            tasks: 任务列表（列表顺序作为同时就绪时的启动顺序）
+            initial_artifacts: 开始前已经存在的产出物
+
+        Raises:
+            ValueError: 任务重名、产出物重复、输入缺失或存在环
+        """
+        self.tasks: Dict[str, DagTask] = {}
+        self.initial_artifacts: Set[str] = set(initial_artifacts)
+        producers: Dict[str, str] = {}
+
+        for task in tasks:
+            if task.name in self.tasks:
+                raise ValueError(f"任务重名: {task.name}")
+            self.tasks[task.name] = task
+            for artifact in task.outputs:
+                if artifact in producers or artifact in self.initial_artifacts:
+                    raise ValueError(f"产出物 {artifact} 被重复产出 ({producers.get(artifact, '初始')}, {task.name})")
+                producers[artifact] = task.name
+
+        # 上游/下游关系
+        self.upstream: Dict[str, Set[str]] = {name: set() for name in self.tasks}
+        self.downstream: Dict[str, Set[str]] = {name: set() for name in self.tasks}
+        for task in self.tasks.values():
+            for artifact in task.inputs:
+                if artifact in self.initial_artifacts:
+                    continue
+                if artifact not in producers:
+                    raise ValueError(f"任务 {task.name} 的输入 {artifact} 没有任何任务产出")
+                producer = producers[artifact]
+                self.upstream[task.name].add(producer)
+                self.downstream[producer].add(task.name)
+
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        """拓扑排序（同层保持声明顺序），存在环时抛出ValueError"""
+        remaining = {name: len(deps) for name, deps in self.upstream.items()}
+        order: List[str] = []
+        ready = [name for name in self.tasks if remaining[name] == 0]
+
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for child in self.tasks:
+                if child in self.downstream[name]:
+                    remaining[child] -= 1
+                    if remaining[child] == 0:
+                        ready.append(child)
+
+        if len(order) != len(self.tasks):
+            cyclic = sorted(name for name in self.tasks if name not in order)
+            raise ValueError(f"任务依赖存在环: {cyclic}")
+        return order
+
+    def index_of(self, name: str) -> int:
+        """任务在拓扑顺序中的位置（从0开始）"""
+        return self.order.index(name)
+
+
+class DagExecutor:
+    """
+    DAG执行器
+
+    所有上游任务完成后任务即就绪，就绪任务立即并发启动。
+    任一任务失败时取消其它运行中的任务并抛出该异常，失败的任务名记录在 failed_task。
+    """
+
+    def __init__(
+        self,
+        dag: TaskDAG,
+        on_start: Optional[Callable[[DagTask], Awaitable[None]]] = None,
+        on_finish: Optional[Callable[[DagTask], Awaitable[None]]] = None,
+        skip: Iterable[str] = ()
+    ):
+        """
+        初始化执行器
+
+        Args:
+            dag: 任务依赖图
+            on_start: 任务启动前的回调（如广播阶段变化）
+            on_finish: 任务完成后的回调
+            skip: 视为已完成、不再执行的任务名
+        """
+        self.dag = dag
+        self.on_start = on_start
+        self.on_finish = on_finish
+        self.skip: Set[str] = set(skip)
+
+        self.completed: List[str] = []
+        self.running: Set[str] = set()
+        self.failed_task: Optional[str] = None  # 抛出异常的任务（并发执行时不一定是最后启动的任务）
+        self.timings: Dict[str, Dict[str, float]] = {}
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+
+        self.logger = setup_logger("task_dag")
+
+    async def run(self) -> None:
+        """
+        执行所有任务
+
+        Raises:
+            Exception: 第一个失败任务的异常
+        """
+        self._started_at = time.monotonic()
+        done: Set[str] = set(self.skip)
+        self.completed.extend(name for name in self.dag.order if name in self.skip)
+        running: Dict[asyncio.Task, str] = {}
+
+        def launch_ready() -> None:
+            for name in self.dag.order:
+                if name in done or name in self.running:
+                    continue
+                if self.dag.upstream[name] <= done:
+                    self.running.add(name)
+                    task = asyncio.create_task(self._run_task(self.dag.tasks[name]), name=f"phase:{name}")
+                    running[task] = name
+
+        try:
+            launch_ready()
+            while running:
+                finished, _ = await asyncio.wait(running.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    name = running.pop(task)
+                    self.running.discard(name)
+                    if not task.cancelled() and task.exception() is not None:
+                        self.failed_task = name
+                    task.result()  # 失败时抛出异常
+                    done.add(name)
+                    self.completed.append(name)
+                launch_ready()
+        except BaseException:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            self.running.clear()
+            raise
+        finally:
+            self._finished_at = time.monotonic()
+
+    async def _run_task(self, task: DagTask) -> None:
+        """执行单个任务并记录耗时"""
+        if self.on_start is not None:
+            await self.on_start(task)
+
+        start = time.monotonic()
+        self.timings[task.name] = {"start": start - self._started_at}
+        self.logger.info(f"▶ 任务开始: {task.title} ({task.name})")
+
+        with trace_span(task.title, "phase", task=task.name, title=task.title):
+            await task.handler()
+
+        end = time.monotonic()
+        self.timings[task.name].update({"end": end - self._started_at, "duration": end - start})
+        self.logger.info(f"✔ 任务完成: {task.title} ({task.name}) 用时 {end - start:.1f}s")
+
+        if self.on_finish is not None:
+            await self.on_finish(task)
+
+    def critical_path(self) -> Dict[str, Any]:
+        """
+        按实际耗时计算关键路径（最长的依赖链）
+
+        Returns:
+            {"path": [任务名...], "duration": 关键路径总耗时}
+        """
+        finish: Dict[str, float] = {}
+        previous: Dict[str, Optional[str]] = {}
+
+        for name in self.dag.order:
+            duration = self.timings.get(name, {}).get("duration", 0.0)
+            best_parent = max(self.dag.upstream[name], key=lambda p: finish[p], default=None)
+            finish[name] = (finish[best_parent] if best_parent else 0.0) + duration
+            previous[name] = best_parent
+
+        if not finish:
+            return {"path": [], "duration": 0.0}
+
+        tail = max(finish, key=finish.get)
+        path = []
+        while tail is not None:
+            path.append(tail)
+            tail = previous[tail]
+        path.reverse()
+        return {"path": path, "duration": round(finish[path[-1]], 3)}
+
+    def get_report(self) -> Dict[str, Any]:
+        """
+        获取调度报告
+
+        Returns:
+            {wall_time, total_task_time, parallelism, critical_path, tasks}
+        """
+        end = self._finished_at or time.monotonic()
+        wall_time = (end - self._started_at) if self._started_at is not None else 0.0
+        total_task_time = sum(t.get("duration", 0.0) for t in self.timings.values())
+
+        return {
+            "wall_time": round(wall_time, 3),
+            "total_task_time": round(total_task_time, 3),
+            "parallelism": round(total_task_time / wall_time, 2) if wall_time > 0 else 0.0,
+            "critical_path": self.critical_path(),
+            "completed": list(self.completed),
+            "running": sorted(self.running),
+            "tasks": {
+                name: {key: round(value, 3) for key, value in timing.items()}
+                for name, timing in self.timings.items()
+            }
+        }
@@ -0,0 +1,153 @@
+"""
+Agent并发处理测试
+验证会话线程隔离、线程内顺序和跨线程并行（使用假LLM，无需真实API Key）
+
+使用方法:
+    python tests/test_agent_concurrency.py
+"""
+
+import asyncio
+import contextlib
+import os
+import sys
+from pathlib import Path
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+# LLMClient 初始化需要Key，测试中不会真正调用API
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from engine.agent import Agent, MAIN_THREAD
+from engine.agent_manager import AgentManager
+from engine.message_bus import MessageBus
+
+
+class SlowFakeAgent:
+    """模拟Agent：主线程任务很慢，其它消息很快，并记录处理顺序"""
+
+    def __init__(self, agent_id: str):
+        self.agent_id = agent_id
+        self.handled = []
+
+    async def process_message(self, message):
+        delay = message.get("delay", 0.0)
+        await asyncio.sleep(delay)
+        self.handled.append(message["content"])
+        return f"done:{message['content']}"
+
+    def conversation_thread(self, thread_id):
+        return contextlib.nullcontext()
+
+    def get_status(self):
+        return {"agent_id": self.agent_id}
+
+
+async def test_parallel_threads():
+    """测试不同会话线程并行、同一线程按顺序"""
+    print("\n" + "=" * 60)
+    print("测试1: 跨线程并行与线程内顺序")
+    print("=" * 60)
+
+    bus = MessageBus()
+    bus.subscribe("conc_tester", lambda m: None)
+    bus.subscribe("workflow", lambda m: None)
+
+    manager = AgentManager()
+    agent = SlowFakeAgent("conc_programmer")
+    manager.register_agent(agent, max_parallel=2)
+    await manager.start_all()
+    try:
+        # 工作流下发的长任务（主线程）
+        await bus.send({"from": "pm", "to": "conc_programmer", "type": "request_review",
+                        "content": "长任务", "reply_to": "workflow", "delay": 1.0,
+                        "priority": "urgent"})
+        await asyncio.sleep(0.1)
+
+        # 测试员的问题（测试员线程），不应等待长任务
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await bus.send({"from": "conc_tester", "to": "conc_programmer", "type": "question",
+                        "content": "问题", "priority": "urgent"})
+        reply = await bus.receive("conc_tester", timeout=3.0)
+        elapsed = loop.time() - start
+        assert reply is not None and reply["content"] == "done:问题"
+        assert elapsed < 0.8, f"问题被长任务阻塞了 {elapsed:.2f}s"
+        print(f"✅ 独立问题在 {elapsed * 1000:.0f}ms 内得到回复，未等待长任务")
+
+        long_reply = await bus.receive("workflow", timeout=3.0)
+        assert long_reply is not None and long_reply["content"] == "done:长任务"
+        print("✅ 主线程长任务完成")
+
+        # 同一线程内按到达顺序处理（即使前面的消息更慢）
+        agent.handled.clear()
+        for i, delay in enumerate([0.3, 0.0, 0.1]):
+            await bus.send({"from": "conc_tester", "to": "conc_programmer", "type": "question",
+                            "content": f"q{i}", "delay": delay, "priority": "urgent"})
+        replies = [(await bus.receive("conc_tester", timeout=3.0))["content"] for _ in range(3)]
+        assert agent.handled == ["q0", "q1", "q2"], f"线程内顺序错误: {agent.handled}"
+        assert replies == ["done:q0", "done:q1", "done:q2"]
+        print("✅ 同一线程内保持顺序")
+
+        concurrency = manager.get_summary()["concurrency"]["conc_programmer"]
+        assert concurrency["max_parallel"] == 2 and concurrency["processed"] == 5
+        print("✅ 并发统计正常")
+    finally:
+        await manager.stop_all()
+
+
+async def test_thread_contexts():
+    """测试会话线程的上下文隔离"""
+    print("\n" + "=" * 60)
+    print("测试2: 会话线程上下文隔离")
+    print("=" * 60)
+
+    agent = Agent("conc_ctx_agent", "测试员工", "你是测试员工")
+
+    async def fake_generate(messages, system_prompt=None):
+        await asyncio.sleep(0.05)
+        return f"回复({len(messages)}条上下文)"
+
+    agent.llm_client.generate_response = fake_generate
+
+    agent.load_file_to_context("rules.yaml", "规则内容")
+
+    async def turn(thread_id, text):
+        with agent.conversation_thread(thread_id):
+            return await agent.think_and_respond(text)
+
+    # 两个线程并行对话，各自只看到主线程的文件和自己的消息
+    await asyncio.gather(turn("tester", "问题A"), turn("artist", "问题B"))
+    with agent.conversation_thread("tester"):
+        tester_contents = [m["content"] for m in agent.context_manager.get_messages()]
+    with agent.conversation_thread("artist"):
+        artist_contents = [m["content"] for m in agent.context_manager.get_messages()]
+
+    assert any("规则内容" in c for c in tester_contents), "新线程应继承主线程文件"
+    assert "问题A" in tester_contents and "问题B" not in tester_contents
+    assert "问题B" in artist_contents and "问题A" not in artist_contents
+    main_contents = [m["content"] for m in agent.context_manager.get_messages()]
+    assert "问题A" not in main_contents and "问题B" not in main_contents
+    assert set(agent.get_threads()) == {MAIN_THREAD, "tester", "artist"}
+    print("✅ 并行对话不会混入同一个上下文")
+
+    # 超过线程上限时淘汰最久未使用的线程
+    agent.max_threads = 2
+    with agent.conversation_thread("pm"):
+        agent.context_manager.add_message("user", "x")
+    assert set(agent.get_threads()) == {MAIN_THREAD, "artist", "pm"}, agent.get_threads()
+    print("✅ 线程数上限淘汰正常")
+
+    agent.reset_context()
+    assert agent.get_threads() == [MAIN_THREAD]
+    print("✅ 重置上下文清理所有线程")
+
+
+if __name__ == "__main__":
+    print("\n🚀 开始Agent并发测试\n")
+
+    asyncio.run(test_parallel_threads())
+    asyncio.run(test_thread_contexts())
+
+    print("\n✅ 所有测试完成！")
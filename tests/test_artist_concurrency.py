@@ -0,0 +1,173 @@
+"""
+美术素材并发生成测试
+验证素材并发生成且同时进行的请求数受限、结果顺序与素材清单相同、逐个回调、失败重试，
+以及并发生成时项目图片上限仍然有效（使用假的图片生成工具，无需真实API Key）
+
+使用方法:
+    python tests/test_artist_concurrency.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+# LLMClient 初始化需要Key，测试中不会真正调用API
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from config import Config
+from tools.file_tool import FileTool
+from tools.tool_registry import ToolRegistry
+
+DELAY = 0.2
+
+
+class FakeImageGen:
+    """假的图片生成工具: 每张图耗时 DELAY 秒；flaky 第一次失败，broken 总是失败，capped 不可重试"""
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self.calls = {}
+
+    async def generate_game_asset(self, asset_spec, project_dir):
+        name = asset_spec["name"]
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(DELAY * (0.5 if name.endswith("_fast") else 1))
+        finally:
+            self.running -= 1
+        result = {"success": True, "asset_name": name, "path": f"{project_dir}/output/assets/{name}.png", "prompt": name, "error": None}
+        if name == "flaky" and self.calls[name] == 1 or name == "broken":
+            result.update(success=False, path=None, error="API错误", retryable=True)
+        if name == "capped":
+            result.update(success=False, path=None, error="项目已达到图片上限", retryable=False)
+        return result
+
+
+def setup_tools(image_gen) -> None:
+    registry = ToolRegistry()
+    if not registry.has_tool("file"):
+        registry.register_tool("file", FileTool())
+    if registry.has_tool("image_gen"):
+        registry.unregister_tool("image_gen")
+    registry.register_tool("image_gen", image_gen)
+
+
+async def test_concurrent_generation(project: Path):
+    """测试并发生成、结果顺序和逐个回调"""
+    print("\n" + "=" * 60)
+    print("测试1: 并发生成")
+    print("=" * 60)
+
+    from agents.artist_agent import ArtistAgent
+
+    image_gen = FakeImageGen()
+    setup_tools(image_gen)
+    artist = ArtistAgent()
+    names = ["player", "enemy", "coin_fast", "background", "heart_fast", "bullet"]
+    finished = []
+
+    async def on_asset(result, done, total):
+        finished.append((result["asset_name"], done, total))
+        if done == 1:
+            raise RuntimeError("回调出错不影响生成")
+
+    Config.ARTIST_MAX_CONCURRENT = 3
+    started = time.perf_counter()
+    summary = await artist.generate_assets_from_spec(
+        [{"name": name, "description": name} for name in names], str(project), on_asset=on_asset
+    )
+    elapsed = time.perf_counter() - started
+
+    assert summary["success"] == 6 and summary["failed"] == 0
+    assert [asset["asset_name"] for asset in summary["assets"]] == names, "结果顺序与素材清单相同"
+    assert image_gen.max_running == 3, image_gen.max_running
+    assert elapsed < DELAY * 6 * 0.6, f"应当并发生成: {elapsed:.2f}秒"
+    assert [done for _, done, _ in finished] == [1, 2, 3, 4, 5, 6] and all(total == 6 for _, _, total in finished)
+    assert finished[0][0] == "coin_fast", "先完成的先回调"
+    listing = (project / "knowledge_base" / "art_asset_list.yaml").read_text(encoding="utf-8")
+    assert [listing.index(f"name: {name}") for name in names] == sorted(listing.index(f"name: {name}") for name in names)
+    print(f"✅ 6 个素材用时 {elapsed:.2f} 秒（逐个生成约 {DELAY * 5:.1f} 秒），同时最多 3 个，清单顺序不变")
+
+
+async def test_retry(project: Path):
+    """测试失败重试"""
+    print("\n" + "=" * 60)
+    print("测试2: 失败重试")
+    print("=" * 60)
+
+    from agents.artist_agent import ArtistAgent
+
+    image_gen = FakeImageGen()
+    setup_tools(image_gen)
+    artist = ArtistAgent()
+    Config.ARTIST_ASSET_RETRIES = 2
+    Config.ARTIST_RETRY_BASE_DELAY = 0.01
+
+    summary = await artist.generate_assets_from_spec(
+        [{"name": name} for name in ["flaky", "broken", "capped", "ok"]], str(project)
+    )
+    flaky, broken, capped, ok = summary["assets"]
+    assert flaky["success"] and flaky["attempts"] == 2
+    assert not broken["success"] and broken["attempts"] == 3 and image_gen.calls["broken"] == 3
+    assert not capped["success"] and capped["attempts"] == 1, "不可重试的失败不重试"
+    assert ok["success"] and ok["attempts"] == 1
+    assert summary["success"] == 2 and summary["failed"] == 2
+    print("✅ 失败后重试成功，最多重试 2 次，不可重试的失败直接返回")
+
+
+async def test_project_limit():
+    """测试并发生成时项目图片上限仍然有效"""
+    print("\n" + "=" * 60)
+    print("测试3: 项目图片上限")
+    print("=" * 60)
+
+    from tools import image_gen_tool
+    from tools.image_gen_tool import ImageGenTool
+
+    tool = ImageGenTool()
+
+    async def generate(prompt, aspect_ratio="1:1", save_path=None):
+        await asyncio.sleep(0.01)
+        return {"success": "fail" not in prompt, "path": save_path, "prompt": prompt, "error": None}
+
+    tool.generate = generate
+    results = await asyncio.gather(*(
+        tool.generate_game_asset({"name": f"asset_{i}"}, "projects/limit_check") for i in range(image_gen_tool.MAX_IMAGES_PER_PROJECT + 5)
+    ))
+    assert sum(r["success"] for r in results) == image_gen_tool.MAX_IMAGES_PER_PROJECT
+    assert sum("上限" in (r["error"] or "") and r["retryable"] is False for r in results) == 5
+
+    tool.reset_stats()
+    await tool.generate_game_asset({"name": "fail"}, "projects/limit_check")
+    assert tool.get_generation_stats()["project_counts"]["limit_check"] == 0, "失败时归还名额"
+    print("✅ 并发生成不超过上限，失败不占用名额")
+
+
+async def main():
+    max_concurrent, retries, delay = Config.ARTIST_MAX_CONCURRENT, Config.ARTIST_ASSET_RETRIES, Config.ARTIST_RETRY_BASE_DELAY
+    Config.PROJECTS_DIR.mkdir(parents=True, exist_ok=True)
+    try:
+        with tempfile.TemporaryDirectory(dir=Config.PROJECTS_DIR) as tmp:
+            await test_concurrent_generation(Path(tmp))
+            await test_retry(Path(tmp))
+        await test_project_limit()
+    finally:
+        Config.ARTIST_MAX_CONCURRENT, Config.ARTIST_ASSET_RETRIES, Config.ARTIST_RETRY_BASE_DELAY = max_concurrent, retries, delay
+
+
+if __name__ == "__main__":
+    print("\n🚀 开始美术素材并发生成测试\n")
+
+    asyncio.run(main())
+
+    print("\n✅ 所有测试完成！")
@@ -0,0 +1,194 @@
+"""
+图片素材库测试
+验证相同的素材跨项目复用（不调用API、不占用项目配额）、Prompt 规范化、硬链接的素材不会被改写、
+按总大小删除最久未使用的图片、图片缺失时重新生成，以及素材清单中记录的来源
+（替换 Gemini 客户端，无需真实API Key）
+
+使用方法:
+    python tests/test_asset_store.py
+"""
+
+import asyncio
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+# LLMClient 初始化需要Key，测试中不会真正调用API
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from PIL import Image
+
+from config import Config
+from tools.asset_store import AssetStore, asset_key
+from tools.file_tool import FileTool
+from tools.image_gen_tool import ImageGenTool
+from tools.tool_registry import ToolRegistry
+
+
+def fake_image_gen() -> ImageGenTool:
+    """替换 Gemini 客户端: 每次调用返回一张颜色不同的图片，记录调用的Prompt"""
+    tool = ImageGenTool()
+    tool.calls = []
+
+    def generate_content(model, contents, config):
+        tool.calls.append(contents[0])
+        buffer = io.BytesIO()
+        Image.new("RGB", (8, 8), (len(tool.calls) * 40 % 256, 0, 0)).save(buffer, format="PNG")
+        image = SimpleNamespace(text=None, inline_data=SimpleNamespace(data=buffer.getvalue()))
+        return SimpleNamespace(parts=[image])
+
+    tool.client = SimpleNamespace(models=SimpleNamespace(generate_content=generate_content))
+    return tool
+
+
+async def test_cross_project(first: Path, second: Path):
+    """测试相同的素材跨项目复用"""
+    print("\n" + "=" * 60)
+    print("测试1: 跨项目复用")
+    print("=" * 60)
+
+    tool = fake_image_gen()
+    spec = {"name": "player", "description": "a blue knight", "style": "pixel art"}
+
+    generated = await tool.generate_game_asset(spec, str(first))
+    assert generated["success"] and not generated["cached"] and len(tool.calls) == 1
+    assert generated["provenance"]["source"] == "generated" and generated["provenance"]["key"]
+
+    reused = await tool.generate_game_asset(dict(spec, description="A  Blue\tKnight"), str(second))
+    assert reused["success"] and reused["cached"] and len(tool.calls) == 1, "大小写和空白不同的Prompt同样命中"
+    assert reused["provenance"]["source"] == "cache" and reused["provenance"]["origin_project"] == first.name
+    assert reused["provenance"]["key"] == generated["provenance"]["key"]
+    assert Path(reused["path"]).read_bytes() == Path(generated["path"]).read_bytes()
+    stats = tool.get_generation_stats()
+    assert stats["cache_hits"] == 1 and stats["project_counts"].get(second.name, 0) == 0, "命中时不占用项目配额"
+    print("✅ 第二个项目直接使用素材库中的图片，没有调用API，不占用配额")
+
+    # 不同的尺寸或模型不命中
+    await tool.generate_game_asset(dict(spec, size="16:9"), str(second))
+    tool.model = "another-image-model"
+    await tool.generate_game_asset(spec, str(second))
+    assert len(tool.calls) == 3
+    print("✅ 尺寸或模型不同时重新生成")
+
+
+async def test_hard_link(first: Path, second: Path):
+    """测试硬链接的素材不会被项目中的重新生成改写"""
+    print("\n" + "=" * 60)
+    print("测试2: 硬链接")
+    print("=" * 60)
+
+    tool = fake_image_gen()
+    spec = {"name": "coin", "description": "a gold coin"}
+    generated = await tool.generate_game_asset(spec, str(first))
+    reused = await tool.generate_game_asset(spec, str(second))
+    store_path = next(Path(Config.ASSET_CACHE_DIR, "objects").rglob(f"{generated['provenance']['key']}.png"))
+    original = store_path.read_bytes()
+    if os.stat(reused["path"]).st_ino == store_path.stat().st_ino:
+        print("✅ 项目中的素材是素材库图片的硬链接")
+    else:
+        print("⚠️ 文件系统不支持硬链接，已复制")
+
+    # 素材库关闭时在同一路径重新生成，素材库中的图片不变
+    Config.ASSET_CACHE_ENABLED = False
+    try:
+        regenerated = await tool.generate_game_asset(spec, str(second))
+    finally:
+        Config.ASSET_CACHE_ENABLED = True
+    assert regenerated["provenance"] == {"source": "generated", "key": None, "model": tool.model}
+    assert Path(reused["path"]).read_bytes() != original and store_path.read_bytes() == original
+    print("✅ 重新生成时先删除旧文件，素材库中的图片不受影响")
+
+
+def test_eviction(root: Path):
+    """测试按总大小删除最久未使用的图片"""
+    print("\n" + "=" * 60)
+    print("测试3: 按总大小淘汰")
+    print("=" * 60)
+
+    store = AssetStore(root / "evict", max_mb=0.1)
+    source = root / "image.png"
+    source.write_bytes(b"x" * 40000)
+    for name in ["a", "b"]:
+        store.put(name, "model", "1:1", source, "p")
+        time.sleep(0.01)
+    assert store.lookup("a", "model", "1:1") is not None
+    time.sleep(0.01)
+    store.put("c", "model", "1:1", source, "p")
+
+    assert store.lookup("b", "model", "1:1") is None, "最久未使用的 b 被删除"
+    assert store.lookup("a", "model", "1:1") and store.lookup("c", "model", "1:1")
+    assert store.total_bytes() == 80000 and store.stats["evicted"] == 1
+    assert not list((root / "evict" / "objects").rglob(f"{asset_key('b', 'model', '1:1')}*"))
+    print("✅ 超过上限时删除最久未使用的图片")
+
+    # 图片被删除后记录失效
+    Path(store.lookup("a", "model", "1:1")["path"]).unlink()
+    assert store.lookup("a", "model", "1:1") is None and store.total_bytes() == 40000
+    print("✅ 图片缺失时记录失效")
+
+    # 重新打开后仍然有效
+    store.close()
+    reopened = AssetStore(root / "evict", max_mb=0.1)
+    assert reopened.lookup("c", "model", "1:1")["hits"] == 2
+    reopened.close()
+    print("✅ 素材库重新打开后仍然有效")
+
+
+async def test_asset_list(project: Path):
+    """测试素材清单中记录的来源"""
+    print("\n" + "=" * 60)
+    print("测试4: 素材清单")
+    print("=" * 60)
+
+    from agents.artist_agent import ArtistAgent
+
+    registry = ToolRegistry()
+    if not registry.has_tool("file"):
+        registry.register_tool("file", FileTool())
+    if registry.has_tool("image_gen"):
+        registry.unregister_tool("image_gen")
+    tool = fake_image_gen()
+    registry.register_tool("image_gen", tool)
+
+    # player 在测试1中生成过
+    summary = await ArtistAgent().generate_assets_from_spec(
+        [{"name": "player", "description": "a blue knight"}, {"name": "enemy", "description": "a red slime"}],
+        str(project)
+    )
+    assert summary["success"] == 2 and len(tool.calls) == 1
+    listing = (project / "knowledge_base" / "art_asset_list.yaml").read_text(encoding="utf-8")
+    assert "source: cache" in listing and "source: generated" in listing
+    print("✅ 素材清单记录每个素材的来源")
+
+
+async def main():
+    enabled, cache_dir = Config.ASSET_CACHE_ENABLED, Config.ASSET_CACHE_DIR
+    Config.PROJECTS_DIR.mkdir(parents=True, exist_ok=True)
+    try:
+        with tempfile.TemporaryDirectory() as store_dir, \
+                tempfile.TemporaryDirectory(dir=Config.PROJECTS_DIR) as first, \
+                tempfile.TemporaryDirectory(dir=Config.PROJECTS_DIR) as second, \
+                tempfile.TemporaryDirectory(dir=Config.PROJECTS_DIR) as third:
+            Config.ASSET_CACHE_ENABLED, Config.ASSET_CACHE_DIR = True, store_dir
+            await test_cross_project(Path(first), Path(second))
+            await test_hard_link(Path(first), Path(second))
+            test_eviction(Path(store_dir))
+            await test_asset_list(Path(third))
+    finally:
+        Config.ASSET_CACHE_ENABLED, Config.ASSET_CACHE_DIR = enabled, cache_dir
+
+
+if __name__ == "__main__":
+    print("\n🚀 开始图片素材库测试\n")
+
+    asyncio.run(main())
+
+    print("\n✅ 所有测试完成！")
@@ -0,0 +1,223 @@
+"""
+批量运行测试
+验证任务文件解析、有界并发池、汇总文件和同一进程中多个项目的消息隔离（无需LLM）
+
+使用方法:
+    python tests/test_batch_runner.py
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+# 工作流导入时会初始化LLM相关模块，测试中不会真正调用API
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from engine.agent_manager import AgentManager
+from engine.message_bus import MessageBus, scoped_agent_id
+from workflows.batch_runner import BatchRunner, load_jobs
+
+
+class EchoAgent:
+    """模拟Agent：回复自己所属的项目"""
+
+    def __init__(self, agent_id: str, project: str):
+        self.agent_id = agent_id
+        self.project = project
+        self.handled = []
+
+    async def process_message(self, message):
+        self.handled.append(message["content"])
+        return f"{self.project}:{message['content']}"
+
+    def conversation_thread(self, thread_id):
+        return contextlib.nullcontext()
+
+    def get_status(self):
+        return {"agent_id": self.agent_id}
+
+
+class FakeWorkflow:
+    """模拟工作流：记录同时运行的项目数"""
+
+    running = 0
+    peak = 0
+
+    def __init__(self, project_name, idea, decision_policy=None):
+        self.project_name = project_name
+        self.idea = idea
+        self.policy = decision_policy
+        self.output_dir = Path("/tmp") / project_name
+
+    async def start(self):
+        FakeWorkflow.running += 1
+        FakeWorkflow.peak = max(FakeWorkflow.peak, FakeWorkflow.running)
+        try:
+            await asyncio.sleep(5 if "卡住" in self.idea else 0.1)
+            if "失败" in self.idea:
+                raise RuntimeError("编码阶段失败")
+        finally:
+            FakeWorkflow.running -= 1
+
+    async def resume(self):
+        await self.start()
+
+    def get_status(self):
+        return {
+            "phase_name": "交付",
+            "schedule": {"wall_time": 0.1, "parallelism": 1.0, "critical_path": {"path": ["initiation"]}},
+            "token_stats": {"total_input_tokens": 10},
+            "decisions": {"mode": self.policy.mode, "requested": 3, "auto": 3},
+            "error_history": []
+        }
+
+
+def test_load_jobs():
+    """测试任务文件解析"""
+    print("\n" + "=" * 60)
+    print("测试1: 任务文件解析")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "jobs.jsonl"
+        path.write_text("\n".join([
+            "# 原型批次",
+            json.dumps({"idea": "贪吃蛇", "project_name": "snake"}, ensure_ascii=False),
+            "",
+            json.dumps({"game_idea": "打砖块", "project_name": "snake"}, ensure_ascii=False),
+            json.dumps({"description": "飞机大战", "project_name": "../plane", "resume": True}, ensure_ascii=False),
+            json.dumps({"idea": "俄罗斯方块"}, ensure_ascii=False),
+        ]), encoding="utf-8")
+        jobs = load_jobs(path)
+        assert [job["project_name"] for job in jobs] == ["snake", "snake_2", "___plane", "batch_006"], jobs
+        assert [job["idea"] for job in jobs] == ["贪吃蛇", "打砖块", "飞机大战", "俄罗斯方块"]
+        assert [job["resume"] for job in jobs] == [False, False, True, False]
+
+        for bad in ['{"project_name": "x"}', "[1, 2]", "{broken"]:
+            path.write_text(bad, encoding="utf-8")
+            try:
+                load_jobs(path)
+                assert False, f"应报错: {bad}"
+            except ValueError as e:
+                assert "第1行" in str(e)
+    print("✅ 注释/空行跳过、字段别名、重名和非法行处理正常")
+
+
+async def test_bounded_pool():
+    """测试有界并发池和汇总文件"""
+    print("\n" + "=" * 60)
+    print("测试2: 有界并发池与汇总文件")
+    print("=" * 60)
+
+    jobs = [{"project_name": f"p{i}", "idea": "普通游戏", "resume": False} for i in range(5)]
+    jobs.append({"project_name": "bad", "idea": "会失败的游戏", "resume": False})
+    jobs.append({"project_name": "stuck", "idea": "会卡住的游戏", "resume": True})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        summary_path = Path(tmp) / "summary.json"
+        runner = BatchRunner(jobs, concurrency=2, summary_path=summary_path,
+                             project_timeout=0.5, workflow_factory=FakeWorkflow)
+        summary = await runner.run()
+
+        assert FakeWorkflow.peak == 2, f"并发数应受限为2: {FakeWorkflow.peak}"
+        assert summary["peak_concurrency"] == 2
+        assert summary["jobs"] == 7 and summary["completed"] == 5 and summary["failed"] == 2
+        by_name = {p["project_name"]: p for p in summary["projects"]}
+        assert by_name["bad"]["status"] == "失败" and "编码阶段失败" in by_name["bad"]["error"]
+        assert by_name["stuck"]["status"] == "超时"
+        assert by_name["p0"]["decisions"]["auto"] == 3
+        assert by_name["p0"]["schedule"]["critical_path"] == ["initiation"]
+        # 5个0.1s的项目在2个并发槽中约0.3s，加上超时项目0.5s，远小于串行
+        assert summary["wall_time"] < summary["project_seconds"], summary
+
+        on_disk = json.loads(summary_path.read_text(encoding="utf-8"))
+        assert on_disk["completed"] == 5 and len(on_disk["projects"]) == 7
+        assert not list(Path(tmp).glob("*.tmp")), "不应残留临时文件"
+    print(f"✅ 峰值并发 {summary['peak_concurrency']}，完成 {summary['completed']}/{summary['jobs']}，"
+          f"总耗时 {summary['wall_time']:.2f}s (项目耗时合计 {summary['project_seconds']:.2f}s)")
+
+
+async def test_project_isolation():
+    """测试同一进程中两个项目的同名Agent互不串线"""
+    print("\n" + "=" * 60)
+    print("测试3: 项目作用域的消息路由")
+    print("=" * 60)
+
+    bus = MessageBus()
+    managers, agents = {}, {}
+    for project in ("iso_a", "iso_b"):
+        managers[project] = AgentManager(namespace=project)
+        agents[project] = EchoAgent("iso_programmer", project)
+        managers[project].register_agent(agents[project])
+        bus.subscribe(scoped_agent_id("workflow", project), lambda m: None)
+        await managers[project].start_all()
+
+    try:
+        for project in ("iso_a", "iso_b"):
+            await bus.send({"from": "pm", "to": "iso_programmer", "type": "request_review",
+                            "content": "写代码", "reply_to": "workflow", "project": project,
+                            "priority": "urgent"})
+
+        for project in ("iso_a", "iso_b"):
+            reply = await bus.receive(scoped_agent_id("workflow", project), timeout=3.0)
+            assert reply is not None and reply["content"] == f"{project}:写代码", reply
+            assert reply["project"] == project
+            assert agents[project].handled == ["写代码"]
+        print("✅ 同名Agent只处理本项目的消息，回复回到本项目的workflow")
+
+        # 广播只发给本项目作用域和未分项目的Agent
+        bus.subscribe("iso_observer", lambda m: None)
+        await bus.send({"from": "pm", "to": "all", "type": "notification", "content": "全员会议",
+                        "project": "iso_a", "priority": "urgent"})
+        assert (await bus.receive("iso_observer", timeout=1.0))["content"] == "全员会议"
+        await asyncio.sleep(0.2)
+        assert agents["iso_a"].handled == ["写代码", "全员会议"], agents["iso_a"].handled
+        assert agents["iso_b"].handled == ["写代码"], agents["iso_b"].handled
+        assert await bus.receive(scoped_agent_id("workflow", "iso_b"), timeout=0.2) is None
+        print("✅ 广播不会发给其它项目")
+    finally:
+        for project, manager in managers.items():
+            await manager.stop_all()
+            manager.unregister_all()
+            bus.unsubscribe(scoped_agent_id("workflow", project), drop_queue=True)
+        bus.unsubscribe("iso_observer", drop_queue=True)
+
+    assert not any(agent_id.endswith(("@iso_a", "@iso_b")) for agent_id in bus.message_queues)
+    print("✅ 项目结束后释放作用域队列")
+
+
+def test_workflow_scoping():
+    """测试工作流使用项目作用域地址和注入的决策策略"""
+    print("\n" + "=" * 60)
+    print("测试4: 工作流的项目作用域")
+    print("=" * 60)
+
+    from workflows.boss_decision import DecisionPolicy
+    from workflows.game_dev_workflow import GameDevWorkflow
+
+    workflow = GameDevWorkflow("batch_scope_check", "测试用", decision_policy=DecisionPolicy("auto"))
+    assert workflow.inbox == "workflow@batch_scope_check"
+    assert workflow.agent_manager.bus_id("pm") == "pm@batch_scope_check"
+    assert workflow.decisions.policy.mode == "auto"
+    from config import Config
+    assert GameDevWorkflow("batch_scope_default", "测试用").decisions.policy.mode == Config.BOSS_DECISION_MODE
+    print("✅ 工作流按项目订阅消息总线，批量运行时自动批准决策")
+
+
+if __name__ == "__main__":
+    print("\n🚀 开始批量运行测试\n")
+
+    test_load_jobs()
+    asyncio.run(test_bounded_pool())
+    asyncio.run(test_project_isolation())
+    test_workflow_scoping()
+
+    print("\n✅ 所有测试完成！")
@@ -0,0 +1,148 @@
+"""
+老板决策策略测试
+验证阻塞等待、推测执行、自动批准和推测被否决时终止工作流（无需LLM和前端）
+
+使用方法:
+    python tests/test_boss_decision.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+# 工作流导入时会初始化LLM相关模块，测试中不会真正调用API
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from workflows.boss_decision import BossDecisionManager, DecisionPolicy, PendingDecision
+from workflows.checkpoint import WorkflowCheckpoint
+
+OPTIONS = ["✅ 确认", "🔄 修改", "❌ 取消项目"]
+
+
+def test_policy():
+    """测试决策策略的处理方式"""
+    print("\n" + "=" * 60)
+    print("测试1: 决策策略")
+    print("=" * 60)
+
+    interactive = DecisionPolicy("interactive", auto_approve=["planning"], headless_timeout=10.0)
+    assert interactive.resolve("initiation", has_clients=True) == "wait"
+    assert interactive.resolve("planning", has_clients=True) == "auto"
+    assert interactive.resolve("initiation", has_clients=False) == "wait"
+    assert DecisionPolicy("interactive", headless_timeout=0).resolve("initiation", False) == "auto"
+    assert DecisionPolicy("speculative").resolve("initiation", True) == "speculate"
+    assert DecisionPolicy("interactive", auto_approve=["*"]).resolve("any", True) == "auto"
+    assert DecisionPolicy("auto").resolve(None, True) == "auto"
+    try:
+        DecisionPolicy("unknown")
+        assert False, "未知模式应报错"
+    except ValueError:
+        pass
+    print("✅ 等待/推测/自动批准的判定正确")
+
+
+async def test_modes():
+    """测试三种处理方式"""
+    print("\n" + "=" * 60)
+    print("测试2: 等待、自动批准与推测执行")
+    print("=" * 60)
+
+    resolved, overridden, notified = [], [], []
+
+    async def on_resolved(pending, choice, timeout):
+        resolved.append((pending.title, choice, timeout))
+
+    async def on_override(pending, choice):
+        overridden.append((pending.title, choice))
+
+    async def notify(decision_id, question, options):
+        notified.append(decision_id)
+
+    # 阻塞等待: 老板选择后返回老板的选项
+    manager = BossDecisionManager(DecisionPolicy("interactive"), on_resolved, on_override)
+    request = asyncio.create_task(manager.request("立项", "确认?", OPTIONS, {"phase": "initiation"},
+                                                  notify=notify, has_clients=True))
+    await asyncio.sleep(0.05)
+    assert len(manager.pending) == 1 and notified
+    decision_id = next(iter(manager.pending))
+    assert manager.submit(decision_id, "🔄 修改")
+    assert not manager.submit(decision_id, "✅ 确认"), "重复提交应失败"
+    assert await request == "🔄 修改"
+    assert manager.get_stats()["human_wait_seconds"] > 0
+    print("✅ interactive: 等待老板选择")
+
+    # 自动批准: 不通知前端，不等待
+    manager = BossDecisionManager(DecisionPolicy("auto"), on_resolved, on_override)
+    notified.clear()
+    start = time.monotonic()
+    assert await manager.request("策划", "批准?", OPTIONS, {"phase": "planning"}, notify=notify) == "✅ 确认"
+    assert time.monotonic() - start < 0.1 and not notified
+    assert manager.get_stats()["auto"] == 1 and manager.get_stats()["human_wait_seconds"] == 0
+    print("✅ auto: 立即使用默认选项，无等待")
+
+    # 推测执行: 立即返回默认选项；老板确认默认时不触发改选
+    manager = BossDecisionManager(DecisionPolicy("speculative"), on_resolved, on_override)
+    resolved.clear()
+    choice = await manager.request("验收", "进入测试?", OPTIONS, {"phase": "development"},
+                                   notify=notify, has_clients=True)
+    assert choice == "✅ 确认" and len(manager.pending) == 1
+    manager.submit(next(iter(manager.pending)), "✅ 确认")
+    await manager.settle(timeout=1.0)
+    assert resolved == [("验收", "✅ 确认", False)] and not overridden
+
+    # 老板改选时回调 on_override
+    await manager.request("交付", "确认交付?", OPTIONS, {"phase": "bug_fixing"}, notify=notify, has_clients=True)
+    manager.submit(next(iter(manager.pending)), "❌ 取消项目")
+    await manager.settle(timeout=1.0)
+    assert overridden == [("交付", "❌ 取消项目")]
+    stats = manager.get_stats()
+    assert stats["speculated"] == 2 and stats["overridden"] == 1 and stats["human_wait_seconds"] < 0.5
+    print("✅ speculative: 立即继续，改选时回调")
+
+
+async def test_workflow_abort():
+    """测试推测执行被否决时终止工作流并撤销推测完成的阶段"""
+    print("\n" + "=" * 60)
+    print("测试3: 推测被否决时终止工作流")
+    print("=" * 60)
+
+    from workflows.game_dev_workflow import GameDevWorkflow
+
+    workflow = GameDevWorkflow("decision_abort_check", "测试用")
+    with tempfile.TemporaryDirectory() as tmp:
+        workflow.checkpoint = WorkflowCheckpoint(Path(tmp))
+        workflow.checkpoint.reset("decision_abort_check", "测试用")
+        workflow.checkpoint.record_task("initiation", ["requirements"])
+
+        pending = PendingDecision("项目立项确认", "确认?", OPTIONS, {"phase": "initiation"}, "speculate")
+        await asyncio.sleep(0.01)
+        workflow.checkpoint.record_task("planning", ["gdd"])  # 推测执行完成的阶段
+
+        workflow._run_task = asyncio.create_task(asyncio.sleep(10))
+        await workflow._on_decision_override(pending, "🔄 修改需求")
+        assert not workflow._run_task.cancelled() and workflow._abort_reason is None
+
+        await workflow._on_decision_override(pending, "❌ 取消项目")
+        await asyncio.gather(workflow._run_task, return_exceptions=True)
+        assert workflow._run_task.cancelled()
+        assert "取消项目" in workflow._abort_reason
+        assert list(workflow.checkpoint.data["completed"]) == ["initiation"], workflow.checkpoint.data["completed"]
+    assert workflow.pending_decisions == {}
+    print("✅ 否决后终止工作流并撤销推测完成的阶段")
+
+
+if __name__ == "__main__":
+    print("\n🚀 开始老板决策策略测试\n")
+
+    test_policy()
+    asyncio.run(test_modes())
+    asyncio.run(test_workflow_abort())
+
+    print("\n✅ 所有测试完成！")
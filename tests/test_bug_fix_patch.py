@@ -0,0 +1,314 @@
+"""
+补丁式Bug修复测试
+验证补丁解析（SEARCH/REPLACE 和 unified diff）、容错应用、失败时重写代码块，
+程序员的补丁修复流程，以及模块打包的 game.js 打补丁后同步回模块文件（使用假LLM，无需真实API Key）
+
+使用方法:
+    python tests/test_bug_fix_patch.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+# LLMClient 初始化需要Key，测试中不会真正调用API
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from config import Config
+from tools.code_patcher import apply_edits, find_region, parse_edits, replace_region, top_level_blocks
+
+GAME_CODE = """// 贪吃蛇
+const canvas = document.getElementById('gameCanvas');
+const ctx = canvas.getContext('2d');
+const gameState = { running: true, score: 0, speed: 5 };
+
+// 更新游戏逻辑
+function update() {
+    gameState.score += 1;
+    if (gameState.score > 100) {
+        gameState.running = false;
+    }
+}
+
+function render() {
+    ctx.fillText('分数: ' + gameState.score, 10, 20);
+}
+
+function gameLoop() {
+    if (!gameState.running) return;
+    update();
+    render();
+    requestAnimationFrame(gameLoop);
+}
+
+gameLoop();
+"""
+
+PATCH_REPLY = """修复如下:
+
+<<<<<<< SEARCH
+    if (gameState.score > 100) {
+        gameState.running = false;
+=======
+    if (gameState.score >= 100) {
+        gameState.running = false;
+        alert('游戏结束');
+>>>>>>> REPLACE
+
+<<<<<<< SEARCH
+function render() {
+    ctx.fillText('分数: ' + gameState.score, 10, 20);
+=======
+function render() {
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+    ctx.fillText('分数: ' + gameState.score, 10, 20);
+>>>>>>> REPLACE
+"""
+
+
+def test_parse_and_apply():
+    """测试补丁解析和应用"""
+    print("\n" + "=" * 60)
+    print("测试1: 补丁解析与应用")
+    print("=" * 60)
+
+    edits = parse_edits(PATCH_REPLY)
+    assert len(edits) == 2
+    code, applied, failed = apply_edits(GAME_CODE, edits)
+    assert applied == [0, 1] and not failed
+    assert "score >= 100" in code and "alert('游戏结束');" in code and "clearRect" in code
+    print("✅ SEARCH/REPLACE 编辑精确应用")
+
+    diff = """```diff
+--- a/game.js
++++ b/game.js
+@@ -20,4 +20,5 @@ function gameLoop() {
+     if (!gameState.running) return;
+     update();
++    if (gameState.paused) return;
+     render();
+```"""
+    edits = parse_edits(diff)
+    assert edits == [{
+        "search": "    if (!gameState.running) return;\n    update();\n    render();\n",
+        "replace": "    if (!gameState.running) return;\n    update();\n    if (gameState.paused) return;\n    render();\n"
+    }], edits
+    code, applied, _ = apply_edits(GAME_CODE, edits)
+    assert applied == [0] and "    if (gameState.paused) return;\n    render();" in code
+    print("✅ unified diff 转换为编辑并应用")
+
+    # 缩进不一致时按行匹配，并调整新代码的缩进
+    edits = [{"search": "if (!gameState.running) return;\nupdate();", "replace": "if (!gameState.running) return;\nupdate();\nupdate();"}]
+    code, applied, _ = apply_edits(GAME_CODE, edits)
+    assert applied == [0] and "    update();\n    update();\n    render();" in code
+    # 找不到的编辑报告失败，不影响其它编辑
+    code, applied, failed = apply_edits(GAME_CODE, [{"search": "function missing() {}", "replace": ""}] + parse_edits(PATCH_REPLY))
+    assert applied == [1, 2] and failed[0]["index"] == 0
+    print("✅ 忽略缩进匹配，失败的编辑单独报告")
+
+    blocks = top_level_blocks(GAME_CODE)
+    lines = GAME_CODE.splitlines()
+    update_block = next(b for b in blocks if lines[b[0]].startswith("// 更新"))
+    assert lines[update_block[0] + 1] == "function update() {" and lines[update_block[1] - 1] == "}"
+    region = find_region(GAME_CODE, "function update() {\n    gameState.score += 2;\n    if (gameState.score > 100)")
+    assert region == update_block, (region, update_block)
+    replaced = replace_region(GAME_CODE, *region, "function update() {}")
+    assert "gameState.score += 1" not in replaced and "function render()" in replaced
+    assert find_region(GAME_CODE, "") is None
+    print("✅ 定位相关的顶层代码块并替换")
+
+
+async def test_programmer_patch_fix():
+    """测试程序员以补丁方式修复Bug"""
+    print("\n" + "=" * 60)
+    print("测试2: 程序员补丁修复流程")
+    print("=" * 60)
+
+    from agents.programmer_agent import ProgrammerAgent
+    from tools.tool_registry import ToolRegistry
+    from tools.file_tool import FileTool
+    if not ToolRegistry().has_tool("file"):
+        ToolRegistry().register_tool("file", FileTool())
+
+    Config.PROJECTS_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=Config.PROJECTS_DIR) as tmp:
+        project_name = Path(tmp).name
+        (Path(tmp) / "output").mkdir()
+        (Path(tmp) / "shared_knowledge").mkdir()
+        js_file = Path(tmp) / "output" / "game.js"
+        js_file.write_text(GAME_CODE, encoding="utf-8")
+        (Path(tmp) / "shared_knowledge" / "bug_tracker.yaml").write_text(
+            "bugs:\n  - id: bug_1\n    description: 分数到100时游戏没有结束\n    status: open\n", encoding="utf-8")
+
+        agent = ProgrammerAgent(project_name)
+        prompts = []
+        replies = []
+
+        async def fake_generate(messages, system_prompt=None, temperature=None):
+            prompts.append(messages[-1]["content"])
+            return replies.pop(0)
+
+        agent.llm_client.generate_response = fake_generate
+        message = {"type": "request_review", "content": "请修复bug_tracker.yaml中记录的Bug。", "context": "Bug修复"}
+
+        # 1. 补丁直接应用
+        replies[:] = [PATCH_REPLY]
+        reply = await agent.process_message(message)
+        report = agent.last_patch_report
+        assert "分数到100时游戏没有结束" in prompts[0] and "<<<<<<< SEARCH" in prompts[0]
+        assert report["applied"] == 2 and report["written"] and report["output_chars"] == len(PATCH_REPLY)
+        assert "clearRect" in js_file.read_text(encoding="utf-8")
+        assert "2/2 处编辑已应用" in reply
+        messages = agent.context_manager.get_messages()
+        assert messages[-1]["content"] == PATCH_REPLY and GAME_CODE not in messages[-2]["content"]
+        print(f"✅ 补丁已应用，输出 {report['output_chars']} 字符（文件 {report['file_chars']} 字符）")
+
+        # 2. SEARCH 对不上时只重写相关的代码块
+        js_file.write_text(GAME_CODE, encoding="utf-8")
+        prompts.clear()
+        replies[:] = [
+            "<<<<<<< SEARCH\nfunction update() {\n    gameState.score += 2;\n=======\nfunction update() {\n    gameState.score += 3;\n>>>>>>> REPLACE\n",
+            "```javascript\nfunction update() {\n    gameState.score += 3;\n}\n```"
+        ]
+        await agent.process_message(message)
+        report = agent.last_patch_report
+        assert report["failed"] == 1 and report["region_rewrites"] == 1 and report["written"]
+        assert "下面是 game.js 第6~12行的代码" in prompts[1] and "function render()" not in prompts[1]
+        code = js_file.read_text(encoding="utf-8")
+        assert "gameState.score += 3;" in code and "score > 100" not in code
+        assert "    gameState.score += 3;\n}\n\nfunction render()" in code, "代码块之间的空行应保留"
+        print("✅ 补丁无法应用时只重写相关代码块")
+
+        # 3. 改坏代码的补丁不写入
+        js_file.write_text(GAME_CODE, encoding="utf-8")
+        replies[:] = ["<<<<<<< SEARCH\nfunction render() {\n=======\nfunction render() {{\n>>>>>>> REPLACE\n"]
+        reply = await agent.process_message(message)
+        assert not agent.last_patch_report["written"] and js_file.read_text(encoding="utf-8") == GAME_CODE
+        assert "未写入" in reply
+        print("✅ 修改后代码无效时保留原文件")
+
+        # 4. rewrite 模式沿用原有的对话处理
+        Config.BUG_FIX_MODE = "rewrite"
+        try:
+            replies[:] = ["好的，我会修复"]
+            agent.last_patch_report = None
+            assert await agent.process_message(message) == "好的，我会修复"
+            assert agent.last_patch_report is None
+        finally:
+            Config.BUG_FIX_MODE = "patch"
+        print("✅ rewrite 模式不走补丁流程")
+
+        # 5. 用户的普通提问不走补丁流程
+        replies[:] = ["先看看分数的判断条件"]
+        agent.last_patch_report = None
+        question = {"type": "question", "content": "这个bug怎么修复?", "context": "用户提问"}
+        assert await agent.process_message(question) == "先看看分数的判断条件"
+        assert agent.last_patch_report is None
+        print("✅ 用户提问沿用对话回复")
+
+
+async def test_module_bundle_patch():
+    """测试模块打包生成的 game.js 打补丁后同步回模块文件"""
+    print("\n" + "=" * 60)
+    print("测试3: 模块打包文件的补丁修复")
+    print("=" * 60)
+
+    import yaml
+    from agents.programmer_agent import MODULES_STALE_MARKER, ProgrammerAgent
+    from tools.module_bundler import ModuleBundler
+    from tools.tool_registry import ToolRegistry
+    from tools.file_tool import FileTool
+    if not ToolRegistry().has_tool("file"):
+        ToolRegistry().register_tool("file", FileTool())
+
+    plan = [
+        {"name": "state", "file": "js/state.js", "description": "游戏状态", "depends_on": []},
+        {"name": "loop", "file": "js/loop.js", "description": "主循环", "depends_on": ["state"]},
+    ]
+    codes = {
+        "state": "export const gameState = { running: true, score: 0 };",
+        "loop": "function update() {\n    gameState.score += 1;\n}\n\nfunction gameLoop() {\n    update();\n}",
+    }
+    bundle = ModuleBundler.bundle(plan, codes)
+
+    Config.PROJECTS_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=Config.PROJECTS_DIR) as tmp:
+        project_name = Path(tmp).name
+        output = Path(tmp) / "output"
+        (output / "js").mkdir(parents=True)
+        (Path(tmp) / "shared_knowledge").mkdir()
+        js_file = output / "game.js"
+        js_file.write_text(bundle, encoding="utf-8")
+        for module in plan:
+            (output / module["file"]).write_text(codes[module["name"]], encoding="utf-8")
+        registry_file = Path(tmp) / "shared_knowledge" / "api_registry.yaml"
+        registry_file.write_text(
+            yaml.safe_dump({"modules": ModuleBundler.build_registry(plan, codes)}, allow_unicode=True),
+            encoding="utf-8"
+        )
+
+        agent = ProgrammerAgent(project_name)
+        replies = []
+
+        async def fake_generate(messages, system_prompt=None, temperature=None):
+            return replies.pop(0)
+
+        agent.llm_client.generate_response = fake_generate
+        message = {"type": "request_review", "content": "请修复Bug。", "context": "Bug修复"}
+
+        # 1. 修改写回所属的模块文件，注册表同步新增的函数
+        replies[:] = [
+            "<<<<<<< SEARCH\nfunction gameLoop() {\n    update();\n}\n=======\n"
+            "function reset() {\n    gameState.score = 0;\n}\n\nfunction gameLoop() {\n    update();\n}\n>>>>>>> REPLACE\n"
+        ]
+        reply = await agent.process_message(message)
+        report = agent.last_patch_report
+        assert report["written"] and report["modules_updated"] == ["js/loop.js"], report
+        assert "function reset()" in (output / "js" / "loop.js").read_text(encoding="utf-8")
+        assert (output / "js" / "state.js").read_text(encoding="utf-8") == codes["state"], "未修改的模块保持不变"
+        loop_codes = dict(codes, loop=(output / "js" / "loop.js").read_text(encoding="utf-8"))
+        assert js_file.read_text(encoding="utf-8") == ModuleBundler.bundle(plan, loop_codes), "重新打包结果与 game.js 一致"
+        registry = yaml.safe_load(registry_file.read_text(encoding="utf-8"))
+        loop_entry = registry["modules"]["js/loop.js"]
+        assert {"name": "reset"} in loop_entry["exports"] and loop_entry["description"] == "主循环"
+        assert "js/loop.js" in reply
+        print("✅ 补丁写回 js/loop.js，重新打包并更新注册表")
+
+        # 2. 补丁改动模块分隔行时标记模块源文件过期
+        replies[:] = ["<<<<<<< SEARCH\n// ===== 模块: loop (js/loop.js) =====\n=======\n// 主循环\n>>>>>>> REPLACE\n"]
+        await agent.process_message(message)
+        report = agent.last_patch_report
+        assert report["written"] and report.get("modules_stale")
+        assert "// 主循环" in js_file.read_text(encoding="utf-8")
+        assert (output / MODULES_STALE_MARKER).exists()
+
+        # 3. 过期后再打补丁只改 game.js，不按剩下的分隔行拆分
+        state_before = (output / "js" / "state.js").read_text(encoding="utf-8")
+        registry_before = registry_file.read_text(encoding="utf-8")
+        replies[:] = ["<<<<<<< SEARCH\n    gameState.score += 1;\n=======\n    gameState.score += 2;\n>>>>>>> REPLACE\n"]
+        await agent.process_message(message)
+        report = agent.last_patch_report
+        assert report["written"] and report.get("modules_stale") and not report.get("modules_updated")
+        assert "gameState.score += 2;" in js_file.read_text(encoding="utf-8")
+        assert "// 主循环" in js_file.read_text(encoding="utf-8"), "game.js 不应被重新打包"
+        assert (output / "js" / "state.js").read_text(encoding="utf-8") == state_before
+        assert registry_file.read_text(encoding="utf-8") == registry_before
+        await agent._clear_modules_stale(f"projects/{project_name}/output")
+        assert not (output / MODULES_STALE_MARKER).exists()
+        print("✅ 无法拆回模块时标记过期，之后不再拆分，重新生成模块后清除")
+
+
+if __name__ == "__main__":
+    print("\n🚀 开始补丁式Bug修复测试\n")
+
+    test_parse_and_apply()
+    asyncio.run(test_programmer_patch_fix())
+    asyncio.run(test_module_bundle_patch())
+
+    print("\n✅ 所有测试完成！")
@@ -0,0 +1,161 @@
+"""
+多候选代码生成测试
+验证候选并发生成、验证打分、提前停止和全部失败时的后备模板（使用假LLM，无需真实API Key）
+
+使用方法:
+    python tests/test_code_candidates.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+# LLMClient 初始化需要Key，测试中不会真正调用API
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from agents.programmer_agent import ProgrammerAgent
+from tools.game_validator import GameValidator, check_brackets
+
+GOOD_CODE = """
+const canvas = document.getElementById('gameCanvas');
+const ctx = canvas.getContext('2d');
+const gameState = { running: true, score: 0 };
+function update() { gameState.score += 1; }
+function render() { ctx.fillText(`分数: ${gameState.score}`, 10, 20); }
+function gameLoop() {
+    if (!gameState.running) return;
+    update();
+    render();
+    requestAnimationFrame(gameLoop);
+}
+gameLoop();
+"""
+
+# 被截断的代码: 括号不闭合
+TRUNCATED_CODE = GOOD_CODE.rsplit("requestAnimationFrame", 1)[0]
+
+# 语法完整但缺少游戏循环
+PARTIAL_CODE = """
+const canvas = document.getElementById('gameCanvas');
+const ctx = canvas.getContext('2d');
+function render() { ctx.fillRect(0, 0, 10, 10); }
+render();
+"""
+
+GAME_INFO = {"title": "测试游戏", "instructions": "方向键移动", "canvas_width": 800, "canvas_height": 600}
+
+
+def make_fake_llm(plan, calls):
+    """按温度返回预设代码和延迟: plan = {temperature: (delay, code 或 异常)}"""
+    async def fake_generate(messages, system_prompt=None, temperature=None):
+        calls.append(temperature)
+        delay, result = plan[temperature]
+        await asyncio.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return fake_generate
+
+
+def test_validate_code():
+    """测试候选代码的验证和打分"""
+    print("\n" + "=" * 60)
+    print("测试1: 候选代码验证与打分")
+    print("=" * 60)
+
+    assert check_brackets(GOOD_CODE)[0]
+    assert not check_brackets(TRUNCATED_CODE)[0]
+    assert check_brackets("const re = /[{(]/g; const s = '}'; // {")[0]
+
+    validator = GameValidator()
+    good = asyncio.run(validator.validate_code(GOOD_CODE))
+    truncated = asyncio.run(validator.validate_code(TRUNCATED_CODE))
+    partial = asyncio.run(validator.validate_code(PARTIAL_CODE))
+    assert good["passed_all"] and good["valid"]
+    assert not truncated["valid"] and len(truncated["errors"]) == 2, "语法检查和括号检查都应失败"
+    assert any("未闭合" in error for error in truncated["errors"])
+    assert partial["valid"] and not partial["passed_all"]
+    assert good["score"] > partial["score"] > truncated["score"], (good["score"], partial["score"], truncated["score"])
+    assert not asyncio.run(validator.validate_code(""))["valid"]
+    print(f"✅ 得分: 完整 {good['score']} > 缺组件 {partial['score']} > 截断 {truncated['score']}")
+
+
+async def test_early_stop():
+    """测试有候选通过全部检查时提前停止"""
+    print("\n" + "=" * 60)
+    print("测试2: 并发生成与提前停止")
+    print("=" * 60)
+
+    from config import Config
+    Config.CODE_CANDIDATE_TEMPERATURES = "0.7,0.4,1.0"
+
+    agent = ProgrammerAgent("candidate_check")
+    calls = []
+    agent.llm_client.generate_response = make_fake_llm({
+        0.7: (0.05, TRUNCATED_CODE),
+        0.4: (0.1, GOOD_CODE),
+        1.0: (2.0, PARTIAL_CODE),  # 很慢，应被取消
+    }, calls)
+
+    start = time.monotonic()
+    code = await agent._generate_javascript_candidates(GAME_INFO, "写游戏", 3)
+    elapsed = time.monotonic() - start
+
+    assert code == GOOD_CODE, "应选中通过全部检查的候选"
+    assert sorted(calls) == [0.4, 0.7, 1.0], "三个候选应并发发出"
+    assert elapsed < 1.0, f"应提前停止，不等待慢候选: {elapsed:.2f}s"
+    report = agent.last_candidate_report
+    assert report["selected"] == 1 and report["early_stop"] and report["cancelled"] == 1, report
+    # 候选生成不污染上下文，只记录选中的代码
+    messages = agent.context_manager.get_messages()
+    assert [m["role"] for m in messages[-2:]] == ["user", "model"] and messages[-1]["content"] == code
+    assert len(messages) == 2, f"上下文只应增加一轮对话: {len(messages)}"
+    assert "选用#1" in agent._format_candidate_report()
+    print(f"✅ {elapsed:.2f}s 内选中候选#1，取消 {report['cancelled']} 个慢候选")
+
+
+async def test_best_score_and_fallback():
+    """测试没有候选通过全部检查时选最高分，以及全部失败时使用后备模板"""
+    print("\n" + "=" * 60)
+    print("测试3: 选择最高分与后备模板")
+    print("=" * 60)
+
+    agent = ProgrammerAgent("candidate_check")
+    calls = []
+    agent.llm_client.generate_response = make_fake_llm({
+        0.7: (0.01, TRUNCATED_CODE),
+        0.4: (0.02, PARTIAL_CODE),
+        1.0: (0.03, RuntimeError("LLM API 调用失败")),
+    }, calls)
+    code = await agent._generate_javascript_candidates(GAME_INFO, "写游戏", 3)
+    report = agent.last_candidate_report
+    assert code == PARTIAL_CODE
+    assert report["selected"] == 1 and not report["early_stop"] and report["finished"] == 3
+    assert report["candidates"][2]["error"]
+    print("✅ 无候选全部通过时选中最高分的候选")
+
+    agent.llm_client.generate_response = make_fake_llm({
+        0.7: (0.01, "抱歉，我遇到了技术问题"),
+        0.4: (0.01, RuntimeError("超时")),
+        1.0: (0.01, RuntimeError("超时")),
+    }, [])
+    code = await agent._generate_javascript_candidates(GAME_INFO, "写游戏", 3)
+    assert "gameLoop" in code and agent.last_candidate_report["selected"] is None
+    assert agent._format_candidate_report() == ""
+    print("✅ 全部失败时使用后备模板")
+
+
+if __name__ == "__main__":
+    print("\n🚀 开始多候选代码生成测试\n")
+
+    test_validate_code()
+    asyncio.run(test_early_stop())
+    asyncio.run(test_best_score_and_fallback())
+
+    print("\n✅ 所有测试完成！")
@@ -0,0 +1,133 @@
+"""
+项目验证流水线测试
+验证每个文件只读取一次、检查并发执行、依赖的检查未通过时跳过、每项检查的耗时，以及验证报告
+
+使用方法:
+    python tests/test_game_validator.py
+"""
+
+import asyncio
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+from config import Config
+from prompts.code_generation_template import HTML5_GAME_TEMPLATE, JS_GAME_LOOP_TEMPLATE
+from tools.game_validator import GameValidator
+
+ALL_CHECKS = ["output_directory", "html_file", "js_file", "html_structure", "js_syntax", "game_executable", "game_completeness"]
+
+
+def write_project(project: Path, html: str = None, js: str = None) -> None:
+    """写入 output/index.html 和 output/game.js（默认使用代码生成模板）"""
+    fields = set(re.findall(r"\{(\w+)\}", HTML5_GAME_TEMPLATE))
+    values = {name: "600" if name.startswith("canvas") else "测试游戏" for name in fields}
+    output = project / "output"
+    output.mkdir(parents=True, exist_ok=True)
+    if html is None:
+        html = HTML5_GAME_TEMPLATE.format(**values)
+    if js is None:
+        js = JS_GAME_LOOP_TEMPLATE.format(game_title="测试游戏", timestamp="2026-01-01")
+    (output / "index.html").write_text(html, encoding="utf-8")
+    (output / "game.js").write_text(js, encoding="utf-8")
+
+
+def counting_validator(delay: float = 0.0) -> GameValidator:
+    """记录文件读取次数（可以给每次读取加上延迟）"""
+    validator = GameValidator()
+    validator.reads = []
+    read = validator.file_tool.read
+
+    async def slow_read(path):
+        validator.reads.append(Path(path).name)
+        await asyncio.sleep(delay)
+        return await read(path)
+
+    validator.file_tool.read = slow_read
+    return validator
+
+
+async def test_valid_project(tmp: Path):
+    """测试完整的项目"""
+    print("\n" + "=" * 60)
+    print("测试1: 完整的项目")
+    print("=" * 60)
+
+    write_project(tmp / "ok")
+    validator = counting_validator()
+    results = await validator.validate_project(str(tmp / "ok"))
+    assert results["valid"] and not results["errors"] and not results["skipped"], results
+    assert list(results["checks"]) == ALL_CHECKS, "检查结果按检查项的顺序排列"
+    assert sorted(validator.reads) == ["game.js", "index.html"], f"每个文件只读取一次: {validator.reads}"
+    assert set(results["timings"]) == set(ALL_CHECKS) | {"total"}
+    print(f"✅ 7 项检查全部通过，读取 {len(validator.reads)} 次，耗时 {results['timings']['total']:.1f}ms")
+
+
+async def test_concurrent_reads(tmp: Path):
+    """测试两个文件的读取和检查并发进行"""
+    print("\n" + "=" * 60)
+    print("测试2: 并发执行")
+    print("=" * 60)
+
+    validator = counting_validator(delay=0.3)
+    started = time.perf_counter()
+    results = await validator.validate_project(str(tmp / "ok"))
+    elapsed = time.perf_counter() - started
+    assert results["valid"] and len(validator.reads) == 2
+    assert elapsed < 0.55, f"两个文件应当同时读取: {elapsed:.2f}秒"
+    print(f"✅ 每次读取 0.3 秒，验证用时 {elapsed:.2f} 秒")
+
+
+async def test_short_circuit(tmp: Path):
+    """测试依赖的检查未通过时跳过"""
+    print("\n" + "=" * 60)
+    print("测试3: 跳过依赖未通过的检查")
+    print("=" * 60)
+
+    validator = counting_validator()
+    results = await validator.validate_project(str(tmp / "missing"))
+    assert not results["valid"] and list(results["checks"]) == ["output_directory"]
+    assert set(results["skipped"]) == set(ALL_CHECKS[1:]) and not validator.reads
+    print(f"✅ 输出目录不存在时跳过 {len(results['skipped'])} 项检查，没有读取文件")
+
+    # 语法错误: 不再检查能否运行，但HTML结构和代码完整性仍然检查
+    write_project(tmp / "syntax", js=JS_GAME_LOOP_TEMPLATE.format(game_title="测试", timestamp="") + "\nfunction broken( {\n")
+    results = await validator.validate_project(str(tmp / "syntax"))
+    assert not results["valid"] and not results["checks"]["js_syntax"]["passed"]
+    assert results["skipped"] == {"game_executable": "js_syntax 未通过"}, results["skipped"]
+    assert "html_structure" in results["checks"] and "game_completeness" in results["checks"]
+    assert results["errors"] == [results["checks"]["js_syntax"]["message"]]
+    print(f"✅ {results['errors'][0]}")
+
+    # 空的 game.js: HTML 相关的检查照常进行
+    write_project(tmp / "empty_js", js="")
+    results = await validator.validate_project(str(tmp / "empty_js"))
+    assert results["checks"]["js_file"]["message"] == "game.js存在但内容过少（可能是空文件）"
+    assert set(results["skipped"]) == {"js_syntax", "game_executable", "game_completeness"}
+    assert results["checks"]["html_structure"]["passed"]
+
+    report = validator.generate_report(results)
+    assert "⏭️ game_executable: 已跳过（js_syntax 未通过）" in report and "总耗时" in report
+    print("✅ 报告中列出跳过的检查和耗时")
+
+
+async def main():
+    Config.PROJECTS_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=Config.PROJECTS_DIR) as tmp:
+        await test_valid_project(Path(tmp))
+        await test_concurrent_reads(Path(tmp))
+        await test_short_circuit(Path(tmp))
+
+
+if __name__ == "__main__":
+    print("\n🚀 开始项目验证流水线测试\n")
+
+    asyncio.run(main())
+
+    print("\n✅ 所有测试完成！")
@@ -0,0 +1,146 @@
+"""
+JavaScript 解析层测试
+验证词法分析（注释、字符串、模板字符串、正则字面量）、声明提取（跨行声明、箭头函数类字段、
+对象方法、解构）、按内容哈希缓存，以及完整性检查不再被注释和字符串误导
+
+使用方法:
+    python tests/test_js_parser.py
+"""
+
+import sys
+from pathlib import Path
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+from tools.js_parser import parse_cache_info, parse_js, tokenize
+
+GAME_CODE = """// function commentedOut() {}
+const canvas = document.getElementById('gameCanvas');
+const ctx = canvas.getContext('2d');
+const label = "class FakeClass {}";
+const pattern = /function\\s+fake\\(/g;
+const banner = `score: ${ {value: 1}.value } function inTemplate() {}`;
+
+const updateWorld =
+    (dt) => {
+        world.time += dt / 1000;
+    };
+
+class Player extends Entity {
+    speed = 5;
+    onKey = (event) => {
+        this.keys[event.key] = true;
+    };
+    static create(options = {}) {
+        return new Player(options);
+    }
+    get alive() { return this.hp > 0; }
+}
+
+const input = {
+    pressed: function (key) { return false; },
+    reset() {}
+};
+
+const { width, height: h } = canvas, scale = 2;
+window.startGame = () => gameLoop();
+Player.prototype.respawn = function () {};
+
+function gameLoop() {
+    function step() {}
+    updateWorld(16);
+    requestAnimationFrame(gameLoop);
+}
+"""
+
+
+def declarations_by_name(module):
+    return {d["name"]: d for d in module.declarations}
+
+
+def test_tokenize():
+    """测试词法分析"""
+    print("\n" + "=" * 60)
+    print("测试1: 词法分析")
+    print("=" * 60)
+
+    tokens, errors = tokenize("a = b / c; r = /[/]}/g; t = `x${ {k: `y`}.k }z`; // }")
+    assert not errors
+    kinds = [(t.kind, t.value) for t in tokens]
+    assert ("punct", "/") in kinds and ("regex", "/[/]}/g") in kinds
+    assert [t.value for t in tokens if t.kind == "punct" and t.value in "{}"] == ["{", "}"], "模板中的 ${} 不产生括号"
+
+    _, errors = tokenize("const s = 'abc;\nconst t = 1;")
+    assert errors and errors[0]["message"] == "字符串未闭合" and (errors[0]["line"], errors[0]["column"]) == (1, 11)
+    tokens, _ = tokenize("/* 多行\n注释 */\nlet x = `a\nb`;\nlet y;")
+    assert next(t.line for t in tokens if t.value == "y") == 5
+    print("✅ 注释、字符串、模板字符串、正则字面量和行号正确")
+
+
+def test_declarations():
+    """测试声明提取"""
+    print("\n" + "=" * 60)
+    print("测试2: 声明提取")
+    print("=" * 60)
+
+    module = parse_js(GAME_CODE)
+    found = declarations_by_name(module)
+    for fake in ("commentedOut", "FakeClass", "fake", "inTemplate"):
+        assert fake not in found, f"注释/字符串/正则/模板中的 {fake} 不应被识别"
+
+    assert found["updateWorld"]["kind"] == "function" and found["updateWorld"]["decl"] == "const"
+    assert (found["updateWorld"]["line"], found["updateWorld"]["end_line"]) == (8, 11), "跨行的箭头函数"
+    assert found["Player"]["kind"] == "class" and found["Player"]["end_line"] == 22
+    assert found["onKey"]["kind"] == "method" and found["onKey"]["parent"] == "Player", "箭头函数类字段"
+    assert found["speed"]["kind"] == "field"
+    assert found["create"]["kind"] == "method" and found["alive"]["kind"] == "method"
+    assert found["pressed"]["parent"] == "input" and found["reset"]["kind"] == "method"
+    assert {"width", "h", "scale"} <= set(found) and "height" not in found, "解构和多个声明"
+    assert found["respawn"]["parent"] == "Player"
+    assert found["step"]["parent"] == "gameLoop" and not found["step"]["top_level"]
+
+    assert module.top_level_names() == {
+        "canvas", "ctx", "label", "pattern", "banner", "updateWorld", "Player", "input",
+        "width", "h", "scale", "startGame", "gameLoop"
+    }, module.top_level_names()
+    assert "requestAnimationFrame" in module.calls and "commentedOut" not in module.identifiers
+    assert "gameCanvas" in module.strings
+    print(f"✅ 提取到 {len(module.declarations)} 个声明")
+
+
+def test_cache_and_completeness():
+    """测试解析缓存，以及完整性检查只看代码中的标识符"""
+    print("\n" + "=" * 60)
+    print("测试3: 解析缓存与完整性检查")
+    print("=" * 60)
+
+    from tools.game_validator import GameValidator
+    from tools.module_bundler import extract_top_level_names
+
+    code = GAME_CODE + "\nfunction render() {}\nfunction update() {}\n"
+    before = parse_cache_info()
+    first = parse_js(code)
+    assert parse_js(code) is first
+    assert GameValidator._check_completeness_code(code)["passed"]
+    extract_top_level_names(code)
+    after = parse_cache_info()
+    assert after["misses"] - before["misses"] == 1 and after["hits"] - before["hits"] == 3, (before, after)
+    print(f"✅ 同一内容只解析一次: {after}")
+
+    # 只在注释和字符串中出现的组件名不算
+    fake = "// gameLoop update render\nconst canvas = 1; const ctx = 2;\nconst s = 'gameLoop update render';\n"
+    result = GameValidator._check_completeness_code(fake)
+    assert not result["passed"] and set(result["details"]) == {"游戏循环", "更新逻辑", "渲染函数"}
+    print("✅ 注释和字符串中的组件名不再被误认")
+
+
+if __name__ == "__main__":
+    print("\n🚀 开始JavaScript解析层测试\n")
+
+    test_tokenize()
+    test_declarations()
+    test_cache_and_completeness()
+
+    print("\n✅ 所有测试完成！")
@@ -0,0 +1,419 @@
+"""
+消息总线扩展性测试
+验证频率限制、队列背压等消息总线增强功能（无需LLM和API Key）
+
+使用方法:
+    python tests/test_message_bus_scaling.py
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+from config import Config
+from engine.rate_limiter import SlidingWindowRateLimiter
+from engine.agent_queue import AgentMessageQueue
+from engine.outbound_dispatcher import OutboundDispatcher
+from engine.message_bus import MessageBus
+from engine.message_broker import MessageBroker
+from engine.bus_transport import BrokerTransport
+from engine.topic_router import TopicRouter, TopicSubscription, message_topic, project_pattern
+
+
+class FakeClock:
+    """可手动推进的时钟（替代 time.monotonic）"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_rate_limiter():
+    """测试滑动窗口限流器"""
+    print("\n" + "=" * 60)
+    print("测试1: 滑动窗口限流器")
+    print("=" * 60)
+
+    clock = FakeClock()
+    limiter = SlidingWindowRateLimiter(
+        max_messages=10, window_seconds=60.0,
+        idle_ttl=120.0, sweep_interval=10.0, clock=clock
+    )
+
+    results = [limiter.allow(("a", "b")) for _ in range(12)]
+    assert results.count(True) == 10, f"应该允许10条，实际: {results.count(True)}"
+    assert limiter.get_stats()["rejected"] == 2
+    print("✅ 窗口内限额正常")
+
+    # 半个窗口后，上一窗口按50%加权: 10*0.5 = 5，还能发5条
+    clock.now += 90.0
+    allowed = sum(limiter.allow(("a", "b")) for _ in range(10))
+    assert allowed == 5, f"滑动窗口应允许5条，实际: {allowed}"
+    print("✅ 滑动窗口加权正常")
+
+    # 项目级限额覆盖
+    limiter.configure_scope("big_project", max_messages=50)
+    allowed = sum(limiter.allow(("a", "b"), scope="big_project") for _ in range(60))
+    assert allowed == 50, f"项目限额应允许50条，实际: {allowed}"
+    print("✅ 项目级限额正常")
+
+    # 空闲key清理
+    clock.now += 1000.0
+    limiter.allow(("x", "y"))
+    stats = limiter.get_stats()
+    assert stats["tracked_keys"] == 1, f"空闲key应被清理，实际: {stats['tracked_keys']}"
+    assert stats["evicted"] == 2
+    print("✅ 空闲key清理正常")
+
+
+def _msg(content, priority="normal", msg_type="task", sender="pm", context=None):
+    """构造测试消息"""
+    return {"from": sender, "to": "programmer", "type": msg_type,
+            "content": content, "priority": priority, "context": context}
+
+
+async def test_agent_queue():
+    """测试有界优先级队列和溢出策略"""
+    print("\n" + "=" * 60)
+    print("测试2: Agent有界队列")
+    print("=" * 60)
+
+    # 优先级出队
+    queue = AgentMessageQueue(maxsize=10)
+    await queue.put(_msg("n1"))
+    await queue.put(_msg("b1", priority="blocking"))
+    await queue.put(_msg("u1", priority="urgent"))
+    order = [(await queue.get())["content"] for _ in range(3)]
+    assert order == ["u1", "b1", "n1"], f"出队顺序错误: {order}"
+    print("✅ 优先级出队正常")
+
+    # drop_oldest: 队满时丢弃最早的非紧急消息，紧急消息保留
+    queue = AgentMessageQueue(maxsize=3, overflow="drop_oldest")
+    await queue.put(_msg("u1", priority="urgent"))
+    for i in range(5):
+        await queue.put(_msg(f"n{i}"))
+    stats = queue.get_stats()
+    assert stats["depth"] == 3 and stats["high_water"] == 3
+    assert stats["dropped"] == 3, f"应丢弃3条，实际: {stats['dropped']}"
+    contents = [queue.get_nowait()["content"] for _ in range(3)]
+    assert contents == ["u1", "n3", "n4"], f"保留的消息错误: {contents}"
+    print("✅ drop_oldest 策略正常（紧急消息不丢）")
+
+    # 全是紧急消息时，普通消息被拒绝
+    queue = AgentMessageQueue(maxsize=2, overflow="drop_oldest")
+    await queue.put(_msg("u1", priority="urgent"))
+    await queue.put(_msg("u2", priority="urgent"))
+    assert await queue.put(_msg("n1")) is False
+    assert queue.qsize() == 2
+    print("✅ 紧急消息占满时拒绝普通消息")
+
+    # 只挤掉优先级不高于新消息的消息
+    queue = AgentMessageQueue(maxsize=2, overflow="drop_oldest")
+    await queue.put(_msg("b1", priority="blocking"))
+    await queue.put(_msg("b2", priority="blocking"))
+    assert await queue.put(_msg("n1")) is False, "普通消息不能挤掉blocking消息"
+    assert await queue.put(_msg("b3", priority="blocking")) is True
+    assert await queue.put(_msg("u1", priority="urgent")) is True
+    contents = [queue.get_nowait()["content"] for _ in range(2)]
+    assert contents == ["u1", "b3"], f"保留的消息错误: {contents}"
+    assert queue.get_stats()["dropped"] == 3
+    print("✅ 新消息只挤掉优先级不高于它的消息")
+
+    # 紧急消息不会被挤掉: 队中全是紧急消息时，新的紧急消息等待出队（put_nowait 则被拒绝）
+    queue = AgentMessageQueue(maxsize=2, overflow="drop_oldest")
+    await queue.put(_msg("u1", priority="urgent"))
+    await queue.put(_msg("u2", priority="urgent"))
+    assert queue.put_nowait(_msg("u3", priority="urgent")) is False
+    waiting = asyncio.create_task(queue.put(_msg("u4", priority="urgent")))
+    await asyncio.sleep(0.05)
+    assert not waiting.done() and queue.get_stats()["blocked_puts"] == 1
+    assert queue.get_nowait()["content"] == "u1"
+    assert await asyncio.wait_for(waiting, timeout=1.0) is True
+    contents = [queue.get_nowait()["content"] for _ in range(2)]
+    assert contents == ["u2", "u4"], f"保留的消息错误: {contents}"
+    assert queue.get_stats()["dropped"] == 1
+    print("✅ 紧急消息不被挤掉，队中全是紧急消息时新的紧急消息等待")
+
+    # coalesce: 同一发送者同一上下文的report被合并
+    queue = AgentMessageQueue(maxsize=5, overflow="coalesce")
+    for i in range(20):
+        await queue.put(_msg(f"进度{i}", msg_type="report", sender="artist", context="assets"))
+    await queue.put(_msg("其它", msg_type="report", sender="tester", context="assets"))
+    stats = queue.get_stats()
+    assert stats["depth"] == 2 and stats["coalesced"] == 19, f"合并统计错误: {stats}"
+    assert queue.get_nowait()["content"] == "进度19"
+    print("✅ coalesce 策略正常")
+
+    # block: 队满时发送者等待，消费后继续
+    queue = AgentMessageQueue(maxsize=1, overflow="block")
+    await queue.put(_msg("first"))
+    blocked = asyncio.ensure_future(queue.put(_msg("second")))
+    await asyncio.sleep(0.01)
+    assert not blocked.done(), "队满时put应该等待"
+    assert (await queue.get())["content"] == "first"
+    assert await asyncio.wait_for(blocked, 1.0) is True
+    assert queue.get_stats()["blocked_puts"] == 1
+    print("✅ block 策略背压正常")
+
+
+async def test_websocket_decoupling():
+    """测试WebSocket推送与消息路由解耦"""
+    print("\n" + "=" * 60)
+    print("测试3: WebSocket推送解耦")
+    print("=" * 60)
+
+    bus = MessageBus()
+    bus.subscribe("ws_sender", lambda m: None)
+    bus.subscribe("ws_receiver", lambda m: None)
+
+    pushed = []
+
+    async def slow_viewer(message):
+        await asyncio.sleep(0.5)
+        pushed.append(message)
+
+    bus.subscribe_websocket(slow_viewer)
+    try:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await bus.send({"from": "ws_sender", "to": "ws_receiver", "type": "question",
+                        "content": "hello", "priority": "urgent"})
+        received = await bus.receive("ws_receiver", timeout=1.0)
+        elapsed = loop.time() - start
+        assert received is not None and received["content"] == "hello"
+        assert elapsed < 0.2, f"慢连接不应阻塞路由，实际耗时: {elapsed:.2f}s"
+        print(f"✅ 慢连接下消息路由耗时 {elapsed * 1000:.1f}ms")
+
+        assert await bus.flush_websockets(timeout=2.0), "推送缓冲区应能清空"
+        assert len(pushed) == 1
+        print("✅ 后台推送完成")
+    finally:
+        bus.unsubscribe_websocket(slow_viewer)
+
+    # 缓冲区满时丢弃最早的消息，批量回调一次收到多条
+    dispatcher = OutboundDispatcher(max_buffer=5, batch_size=3, callback_timeout=1.0)
+    batches = []
+
+    async def batch_viewer(messages):
+        batches.append([m["content"] for m in messages])
+
+    dispatcher.add_callback(batch_viewer, batch=True)
+    for i in range(8):
+        dispatcher.enqueue({"content": i})
+    await dispatcher.flush(timeout=1.0)
+    stats = dispatcher.get_stats()
+    assert stats["dropped"] == 3, f"应丢弃3条，实际: {stats['dropped']}"
+    assert batches == [[3, 4, 5], [6, 7]], f"批量推送结果错误: {batches}"
+    print("✅ 缓冲区丢弃策略和批量推送正常")
+
+    # 超时的回调不影响其它回调
+    dispatcher = OutboundDispatcher(max_buffer=10, batch_size=10, callback_timeout=0.1)
+    fast = []
+
+    async def hung_viewer(message):
+        await asyncio.sleep(10)
+
+    async def fast_viewer(message):
+        fast.append(message)
+
+    dispatcher.add_callback(hung_viewer)
+    dispatcher.add_callback(fast_viewer)
+    dispatcher.enqueue({"content": "x"})
+    await dispatcher.flush(timeout=1.0)
+    assert len(fast) == 1 and dispatcher.get_stats()["callback_timeouts"] == 1
+    await dispatcher.stop()
+    print("✅ 回调超时隔离正常")
+
+    # 按项目过滤: 工作流只收到本项目的消息
+    dispatcher = OutboundDispatcher(max_buffer=10, batch_size=10, callback_timeout=1.0)
+    snake_only = []
+
+    async def snake_viewer(message):
+        snake_only.append(message["content"])
+
+    dispatcher.add_callback(snake_viewer, project="snake")
+    for project in ["snake", "tetris", None, "snake"]:
+        dispatcher.enqueue({"content": project, "project": project})
+    await dispatcher.flush(timeout=1.0)
+    assert snake_only == ["snake", "snake"], snake_only
+    await dispatcher.stop()
+    print("✅ 按项目过滤推送正常")
+
+
+# 远端进程脚本: 订阅 remote_worker，收到消息后回复发送者
+REMOTE_NODE_SCRIPT = """
+import asyncio, sys
+sys.path.insert(0, sys.argv[1])
+from engine.message_bus import MessageBus
+from engine.bus_transport import BrokerTransport
+from engine.topic_router import TopicRouter, TopicSubscription, message_topic, project_pattern
+
+async def main():
+    bus = MessageBus()
+    bus.subscribe("remote_worker", lambda m: None)
+    await bus.use_transport(BrokerTransport(port=int(sys.argv[2]), node_id="worker-process"))
+    print("READY", flush=True)
+    message = await bus.receive("remote_worker", timeout=10.0)
+    await bus.send({"from": "remote_worker", "to": message["from"], "type": "answer",
+                    "content": "echo:" + message["content"], "priority": "urgent"})
+    await asyncio.sleep(0.2)
+    await bus.disconnect_transport()
+
+asyncio.run(main())
+"""
+
+
+async def test_broker_transport():
+    """测试通过消息代理跨进程收发消息"""
+    print("\n" + "=" * 60)
+    print("测试4: 跨进程消息代理")
+    print("=" * 60)
+
+    broker = MessageBroker(port=0)
+    await broker.start()
+
+    bus = MessageBus()
+    bus.subscribe("local_pm", lambda m: None)
+    await bus.use_transport(BrokerTransport(port=broker.port, node_id="api-process"))
+
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-c", REMOTE_NODE_SCRIPT, str(backend_path), str(broker.port),
+        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+    )
+    try:
+        # 日志也输出到stdout，读到READY为止
+        line = b""
+        while line.strip() != b"READY":
+            line = await asyncio.wait_for(process.stdout.readline(), timeout=15.0)
+            assert line, "远端节点启动失败"
+        nodes = broker.get_stats()["nodes"]
+        assert "remote_worker" in nodes["worker-process"]["agents"]
+        print("✅ 远端进程已连接代理")
+
+        await bus.send({"from": "local_pm", "to": "remote_worker", "type": "question",
+                        "content": "ping", "priority": "urgent"})
+        reply = await bus.receive("local_pm", timeout=10.0)
+        assert reply is not None and reply["content"] == "echo:ping", f"回复错误: {reply}"
+        assert bus.get_summary()["transport"]["received"] >= 1
+        print("✅ 跨进程点对点消息往返正常")
+
+        await asyncio.wait_for(process.wait(), timeout=10.0)
+    finally:
+        if process.returncode is None:
+            process.kill()
+        await bus.disconnect_transport()
+        await broker.stop()
+    assert bus.transport.name == "memory"
+    print("✅ 断开后恢复进程内传输")
+
+
+async def test_topic_subscriptions():
+    """测试主题订阅和模式匹配"""
+    print("\n" + "=" * 60)
+    print("测试5: 主题订阅")
+    print("=" * 60)
+
+    topic = message_topic({"project": "snake", "to": "programmer", "type": "question"})
+    assert topic == "project.snake.agent.programmer.question", topic
+
+    router = TopicRouter()
+    patterns = {
+        "prog": "project.snake.agent.programmer.*",
+        "reports": "*.report",
+        "snake": project_pattern("snake"),
+        "exact": "project.snake.agent.programmer.question"
+    }
+    for sid, pattern in patterns.items():
+        router.add(TopicSubscription(pattern, AgentMessageQueue(), subscriber_id=sid))
+
+    def matched(t):
+        return sorted(sub.subscriber_id for sub in router.match(t))
+
+    assert matched("project.snake.agent.programmer.question") == ["exact", "prog", "snake"]
+    assert matched("project.tetris.agent.all.report") == ["reports"]
+    assert matched("project.snake.agent.artist.report") == ["reports", "snake"]
+    assert matched("project.tetris.agent.pm.task") == []
+    router.remove("snake")
+    assert matched("project.snake.agent.artist.report") == ["reports"]
+    print("✅ 通配符匹配正常")
+
+    bus = MessageBus()
+    bus.subscribe("topic_pm", lambda m: None)
+    bus.subscribe("topic_programmer", lambda m: None)
+
+    snake_reports = bus.subscribe_topic("project.snake.*.report")
+    all_reports = bus.subscribe_topic("*.report")
+    seen = []
+    callback_sub = bus.subscribe_topic(project_pattern("snake"), callback=lambda m: seen.append(m["content"]))
+    try:
+        await bus.send({"from": "topic_pm", "to": "topic_programmer", "type": "report",
+                        "content": "snake进度", "project": "snake", "priority": "urgent"})
+        await bus.send({"from": "topic_pm", "to": "topic_programmer", "type": "report",
+                        "content": "tetris进度", "project": "tetris", "priority": "urgent"})
+        await bus.send({"from": "topic_pm", "to": "topic_programmer", "type": "task",
+                        "content": "snake任务", "project": "snake", "priority": "urgent"})
+
+        assert (await snake_reports.get(timeout=1.0))["content"] == "snake进度"
+        assert await snake_reports.get(timeout=0.05) is None, "不应收到其它项目或其它类型的消息"
+        contents = [(await all_reports.get(timeout=1.0))["content"] for _ in range(2)]
+        assert contents == ["snake进度", "tetris进度"]
+        await asyncio.sleep(0.05)
+        assert seen == ["snake进度", "snake任务"], f"回调订阅结果错误: {seen}"
+        # 目标Agent的队列仍正常收到消息
+        assert (await bus.receive("topic_programmer", timeout=1.0))["content"] == "snake进度"
+        print("✅ 多订阅者独立队列和回调消费正常")
+    finally:
+        for sub in (snake_reports, all_reports, callback_sub):
+            bus.unsubscribe_topic(sub)
+    assert len(bus.topic_router) == 0
+    print("✅ 取消订阅正常")
+
+    # 慢订阅者不阻塞消息路由（即使Agent队列使用 block 策略），回调有超时保护
+    previous = (bus.queue_overflow, Config.WS_CALLBACK_TIMEOUT)
+    bus.queue_overflow, Config.WS_CALLBACK_TIMEOUT = "block", 0.1
+    handled = []
+
+    async def hung_observer(message):
+        handled.append(message["content"])
+        await asyncio.sleep(10)
+
+    slow_sub = bus.subscribe_topic(project_pattern("slow"), callback=hung_observer, maxsize=2)
+    try:
+        assert slow_sub.queue.overflow == "drop_oldest", "主题订阅不沿用Agent队列的溢出策略"
+        start = asyncio.get_running_loop().time()
+        for i in range(6):
+            await bus.send({"from": "topic_pm", "to": "topic_programmer", "type": "task",
+                            "content": f"slow{i}", "project": "slow", "priority": "urgent"})
+            await bus.receive("topic_programmer", timeout=1.0)
+        elapsed = asyncio.get_running_loop().time() - start
+        assert elapsed < 0.5, f"慢订阅者不应阻塞消息路由: {elapsed:.2f}s"
+        assert slow_sub.queue.get_stats()["dropped"] > 0
+        await asyncio.sleep(0.35)
+        assert slow_sub.callback_timeouts >= 2 and len(handled) >= 3, "回调超时后继续处理后续消息"
+        try:
+            bus.subscribe_topic("*.report", overflow="block")
+            raise AssertionError("主题订阅应当拒绝 block 策略")
+        except ValueError:
+            pass
+        print(f"✅ 慢订阅者不阻塞消息路由 ({elapsed * 1000:.1f}ms)，回调超时后继续处理")
+    finally:
+        bus.unsubscribe_topic(slow_sub)
+        bus.queue_overflow, Config.WS_CALLBACK_TIMEOUT = previous
+
+
+if __name__ == "__main__":
+    print("\n🚀 开始消息总线扩展性测试\n")
+
+    test_rate_limiter()
+    asyncio.run(test_agent_queue())
+    asyncio.run(test_websocket_decoupling())
+    asyncio.run(test_broker_transport())
+    asyncio.run(test_topic_subscriptions())
+
+    print("\n✅ 所有测试完成！")
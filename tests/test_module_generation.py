@@ -0,0 +1,172 @@
+"""
+模块化代码生成测试
+验证模块规划解析、跨模块接口校验、只重新生成失败模块和打包（使用假LLM，无需真实API Key）
+
+使用方法:
+    python tests/test_module_generation.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+# LLMClient 初始化需要Key，测试中不会真正调用API
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+import yaml
+
+from config import Config
+from tools.module_bundler import ModuleBundler, extract_top_level_names, strip_module_syntax
+
+PLAN = {"modules": [
+    {"name": "main", "description": "入口和游戏循环", "exports": ["gameLoop"], "depends_on": ["renderer", "config"]},
+    {"name": "config", "description": "游戏配置", "exports": ["CONFIG"], "depends_on": []},
+    {"name": "renderer", "description": "绘制", "exports": ["render"], "depends_on": ["config"]},
+]}
+
+MODULE_CODE = {
+    "config": "const CONFIG = { width: 800, height: 600 };\n",
+    "renderer": "function render(ctx) {\n    ctx.fillRect(0, 0, CONFIG.width, CONFIG.height);\n}\n",
+    "main": (
+        "const canvas = document.getElementById('gameCanvas');\n"
+        "const ctx = canvas.getContext('2d');\n"
+        "function update() {}\n"
+        "function gameLoop() {\n    update();\n    render(ctx);\n    requestAnimationFrame(gameLoop);\n}\n"
+        "gameLoop();\n"
+    ),
+}
+
+
+def test_plan_and_verify():
+    """测试规划解析、接口校验和打包"""
+    print("\n" + "=" * 60)
+    print("测试1: 模块规划、接口校验与打包")
+    print("=" * 60)
+
+    bundler = ModuleBundler(max_modules=5)
+    registry = {"modules": {"js/renderer.js": {"exports": [{"name": "drawScore"}]}}}
+    plan = bundler.parse_plan("好的，规划如下:\n```json\n" + json.dumps(PLAN) + "\n```", registry)
+    assert [m["name"] for m in plan] == ["config", "renderer", "main"], "应按依赖排序"
+    assert plan[1]["exports"] == ["render", "drawScore"], "注册表中登记的接口应并入规划"
+
+    for bad in ["没有JSON", '{"modules": []}', '{"modules": [{"name": "Main!"}]}',
+                '{"modules": [{"name": "a", "depends_on": ["b"]}]}',
+                '{"modules": [{"name": "a", "depends_on": ["b"]}, {"name": "b", "depends_on": ["a"]}]}']:
+        try:
+            bundler.parse_plan(bad)
+            assert False, f"应报错: {bad}"
+        except ValueError:
+            pass
+    print("✅ 规划解析、依赖排序、非法规划检测正常")
+
+    assert extract_top_level_names(MODULE_CODE["main"]) == {"canvas", "ctx", "update", "gameLoop"}
+    assert extract_top_level_names("export function a() {\n    function nested() {}\n}\nwindow.b = 1;") == {"a", "b"}
+    # 跨行声明、注释和字符串中的文本
+    assert extract_top_level_names("const c =\n    () => 1;\n// function d() {}\nconst s = 'class E {}';") == {"c", "s"}
+    assert strip_module_syntax("import { a } from './a.js';\nexport const b = 1;").strip() == "const b = 1;"
+
+    codes = dict(MODULE_CODE)
+    problems = bundler.verify(plan, codes, registry)
+    assert list(problems) == ["renderer"] and "drawScore" in problems["renderer"][0], problems
+
+    codes["renderer"] += "function drawScore() {}\n"
+    codes["main"] += "const CONFIG = {};\n"  # 与config模块冲突
+    codes["config"] = "const CONFIG = {\n    width: 800,\n"  # 被截断
+    problems = bundler.verify(plan, codes, registry)
+    assert set(problems) == {"config", "main"}, problems
+    assert "未闭合" in problems["config"][0]
+    assert "冲突" in problems["main"][0] and "CONFIG" in problems["main"][0]
+    print("✅ 校验发现缺失接口、截断和顶层名称冲突，冲突归给非所有者模块")
+
+    codes = dict(MODULE_CODE, renderer=MODULE_CODE["renderer"] + "function drawScore() {}\n")
+    bundle = bundler.bundle(plan, codes)
+    assert bundle.index("const CONFIG") < bundle.index("function render") < bundle.index("function gameLoop")
+    registry_modules = bundler.build_registry(plan, codes)
+    assert registry_modules["js/renderer.js"]["exports"] == [{"name": "drawScore"}, {"name": "render"}]
+    assert registry_modules["js/main.js"]["depends_on"] == ["js/renderer.js", "js/config.js"]
+    print("✅ 按依赖顺序打包，注册表记录实际接口")
+
+
+async def test_programmer_pipeline():
+    """测试程序员的模块化生成流程: 并发生成、只重新生成失败模块"""
+    print("\n" + "=" * 60)
+    print("测试2: 模块化生成流程")
+    print("=" * 60)
+
+    from agents.programmer_agent import ProgrammerAgent
+
+    Config.PROJECTS_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=Config.PROJECTS_DIR) as tmp:
+        project_name = Path(tmp).name
+        (Path(tmp) / "shared_knowledge").mkdir()
+        (Path(tmp) / "shared_knowledge" / "api_registry.yaml").write_text(
+            "# API接口注册表\n模块列表: []\n", encoding="utf-8")
+
+        # Agent创建时启用file工具，需先注册
+        from tools.tool_registry import ToolRegistry
+        from tools.file_tool import FileTool
+        if not ToolRegistry().has_tool("file"):
+            ToolRegistry().register_tool("file", FileTool())
+
+        agent = ProgrammerAgent(project_name)
+        calls = []
+        active = {"now": 0, "peak": 0}
+
+        async def fake_generate(messages, system_prompt=None, temperature=None):
+            prompt = messages[-1]["content"]
+            if "划分为" in prompt:
+                calls.append("plan")
+                return json.dumps(PLAN)
+            module = prompt.split("js/", 1)[1].split(".js", 1)[0]
+            calls.append(module)
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+            await asyncio.sleep(0.05)
+            active["now"] -= 1
+            # renderer 第一次被截断，收到反馈后修正
+            if module == "renderer" and "请修正" not in prompt:
+                return "function render(ctx) {\n    ctx.fillRect(0, 0,"
+            return MODULE_CODE[module]
+
+        agent.llm_client.generate_response = fake_generate
+        game_info = {"title": "测试游戏", "instructions": "", "canvas_width": 800, "canvas_height": 600}
+        output_dir = f"projects/{project_name}/output"
+
+        bundle = await agent._generate_javascript_modules(game_info, output_dir)
+        report = agent.last_module_report
+
+        assert calls[0] == "plan" and sorted(calls[1:4]) == ["config", "main", "renderer"]
+        assert calls[4:] == ["renderer"], f"只应重新生成失败的模块: {calls}"
+        assert active["peak"] == 3, "三个模块应并发生成"
+        assert report["rounds"] == 2 and report["regenerated"] == {"renderer": 1} and not report["unresolved"]
+        assert "function gameLoop" in bundle and "function render(ctx)" in bundle
+        for name in ("config", "renderer", "main"):
+            assert (Path(tmp) / "output" / "js" / f"{name}.js").read_text(encoding="utf-8") == MODULE_CODE[name]
+        registry = yaml.safe_load((Path(tmp) / "shared_knowledge" / "api_registry.yaml").read_text(encoding="utf-8"))
+        assert registry["modules"]["js/renderer.js"]["exports"] == [{"name": "render"}]
+        assert registry["模块列表"] == ["js/config.js", "js/renderer.js", "js/main.js"]
+        assert "重新生成: renderer×1" in agent._format_module_report()
+        print(f"✅ 3个模块并发生成，只重新生成了 renderer，共 {report['rounds']} 轮")
+
+        # 规划失败时返回None，由调用方退回单文件生成
+        async def bad_plan(messages, system_prompt=None, temperature=None):
+            return "我无法规划"
+        agent.llm_client.generate_response = bad_plan
+        assert await agent._generate_javascript_modules(game_info, output_dir) is None
+        print("✅ 规划失败时退回单文件生成")
+
+
+if __name__ == "__main__":
+    print("\n🚀 开始模块化代码生成测试\n")
+
+    test_plan_and_verify()
+    asyncio.run(test_programmer_pipeline())
+
+    print("\n✅ 所有测试完成！")
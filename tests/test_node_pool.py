@@ -0,0 +1,154 @@
+"""
+Node.js 工作进程池测试
+验证常驻工作进程执行代码（console 输出、运行时错误位置、定时器、死循环超时、沙箱隔离）、
+按任务数替换进程、编译检查，以及 CodeRunner 通过进程池执行的吞吐量
+
+使用方法:
+    python tests/test_node_pool.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from config import Config
+from tools.code_runner import CodeRunner
+from tools.node_pool import NodeWorkerPool, find_node
+
+
+async def test_run_jobs():
+    """测试在工作进程中执行代码"""
+    print("\n" + "=" * 60)
+    print("测试1: 执行代码")
+    print("=" * 60)
+
+    pool = NodeWorkerPool(find_node(), size=2, max_jobs=100, memory_mb=128)
+    try:
+        result = await pool.run("const sum = 1 + 2;\nconsole.log('1 + 2 =', sum, {a: 1});")
+        assert result["ok"] and result["output"] == '1 + 2 = 3 {"a":1}', result
+
+        result = await pool.run("let x = 1;\nx.y.z = 2;\n")
+        assert not result["ok"] and result["error"]["name"] == "TypeError"
+        assert (result["error"]["line"], result["error"]["column"]) == (2, 7), result["error"]
+        assert "node_worker.js" not in result["error"]["stack"]
+
+        result = await pool.run("setTimeout(() => console.log('later'), 20);\nPromise.resolve().then(() => console.log('micro'));")
+        assert result["ok"] and result["output"] == "micro\nlater", result
+
+        result = await pool.run("setTimeout(() => { throw new Error('boom'); }, 5);")
+        assert not result["ok"] and result["error"]["message"] == "boom"
+
+        # 每个任务都是全新的上下文，也无法访问 require/process
+        await pool.run("var leaked = 1; globalThis.other = 2;")
+        result = await pool.run("console.log(typeof leaked, typeof other, typeof require, typeof process);")
+        assert result["output"] == "undefined undefined undefined undefined", result
+        print("✅ 输出、错误位置、定时器和上下文隔离正确")
+
+        started = time.perf_counter()
+        result = await pool.run("while (true) {}", timeout=0.5)
+        assert result["timed_out"] and result["error"]["name"] == "TimeoutError"
+        result = await pool.run("setInterval(() => {}, 10);", timeout=0.3)
+        assert result["timed_out"]
+        result = await pool.run("setTimeout(() => { while (true) {} }, 0);", timeout=0.3)
+        assert result["timed_out"] and pool.stats["killed"] == 1, pool.stats
+        result = await pool.run("console.log('still ok')")
+        assert result["ok"] and result["output"] == "still ok"
+        print(f"✅ 死循环和未结束的定时器按超时处理 ({time.perf_counter() - started:.1f}秒)，卡死的进程被替换")
+
+        result = await pool.run("const a = []; while (true) a.push(new Array(1e6).fill(1));", timeout=20)
+        assert not result["ok"] and result["error"]["name"] == "WorkerCrashed", result
+        result = await pool.run("console.log('after crash')")
+        assert result["ok"], result
+        print(f"✅ 超出内存限制的进程退出后自动替换: {pool.stats}")
+    finally:
+        await pool.close()
+
+
+async def test_recycle_and_check():
+    """测试按任务数替换工作进程，以及编译检查"""
+    print("\n" + "=" * 60)
+    print("测试2: 替换进程与编译检查")
+    print("=" * 60)
+
+    pool = NodeWorkerPool(find_node(), size=1, max_jobs=5)
+    try:
+        for i in range(12):
+            result = await pool.run(f"console.log({i})")
+            assert result["output"] == str(i)
+        assert pool.stats["spawned"] == 3 and pool.stats["recycled"] == 2, pool.stats
+
+        result = await pool.check("function f() {\n  return 1 +;\n}")
+        assert not result["ok"] and result["error"]["name"] == "SyntaxError"
+        assert (result["error"]["line"], result["error"]["column"]) == (2, 13), result["error"]
+        result = await pool.check("while (true) {}")
+        assert result["ok"], "check 不执行代码"
+        print(f"✅ 每5个任务替换进程: {pool.stats}，编译检查报告位置")
+    finally:
+        await pool.close()
+    assert not pool._workers
+
+
+async def test_code_runner_throughput():
+    """测试 CodeRunner 通过进程池执行和检查"""
+    print("\n" + "=" * 60)
+    print("测试3: CodeRunner 吞吐量")
+    print("=" * 60)
+
+    runner = CodeRunner()
+    Config.JS_SYNTAX_CHECKER = "auto"
+
+    result = await runner.execute_js("console.log('hello')")
+    assert result["success"] and result["exit_code"] == 0 and result["output"] == "hello", result
+    result = await runner.execute_js("undefinedFunction();")
+    assert not result["success"] and result["exit_code"] == 1 and "ReferenceError" in result["error"]
+    result = await runner.execute_js("const x = ;", use_node=False)
+    assert not result["success"] and result["error"].startswith("第1行第11列")
+
+    # 与 node --check 的位置一致
+    result = await runner.validate_syntax("const ok = 1;\nfunction broken() { return 1 +; }\n", "javascript")
+    assert result["checker"] == "node" and result["errors"][0]["line"] == 2, result
+
+    jobs = 200
+    started = time.perf_counter()
+    results = await asyncio.gather(*(runner.execute_js(f"console.log({i} * 2)") for i in range(jobs)))
+    elapsed = time.perf_counter() - started
+    assert all(r["success"] and r["output"] == str(i * 2) for i, r in enumerate(results))
+    rate = jobs / elapsed
+    print(f"✅ 执行 {jobs} 段代码用时 {elapsed:.2f}秒 ({rate:.0f} 个/秒)")
+    assert rate > 50, f"吞吐量过低: {rate:.0f} 个/秒"
+
+    Config.NODE_POOL_ENABLED = False
+    try:
+        started = time.perf_counter()
+        for i in range(5):
+            result = await runner.execute_js(f"console.log({i})")
+            assert result["success"] and result["output"].strip() == str(i)
+        spawn_rate = 5 / (time.perf_counter() - started)
+        print(f"   每次启动 node 进程: {spawn_rate:.0f} 个/秒")
+    finally:
+        Config.NODE_POOL_ENABLED = True
+
+
+async def main():
+    if not find_node():
+        print("⚠️ 未安装 Node.js，跳过")
+        return
+    await test_run_jobs()
+    await test_recycle_and_check()
+    await test_code_runner_throughput()
+
+
+if __name__ == "__main__":
+    print("\n🚀 开始Node.js工作进程池测试\n")
+
+    asyncio.run(main())
+
+    print("\n✅ 所有测试完成！")
@@ -0,0 +1,189 @@
+"""
+代码执行临时目录测试
+验证并发执行互不覆盖、执行结束后自动清理、保留策略（failed/all）和保留数量上限、
+磁盘占用上限，以及遗留目录和旧版本文件的清理
+
+使用方法:
+    python tests/test_scratch_space.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+from config import Config
+from tools.code_runner import CodeRunner
+from tools.node_pool import find_node
+from tools.scratch_space import ScratchSpace
+
+
+class RecordingSpace(ScratchSpace):
+    """记录创建过的任务"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.jobs = []
+
+    @contextmanager
+    def job(self, kind):
+        with super().job(kind) as job:
+            self.jobs.append(job)
+            yield job
+
+
+def use_scratch(runner: CodeRunner, space: ScratchSpace) -> CodeRunner:
+    runner.scratch = space
+    runner.temp_dir = space.root
+    return runner
+
+
+async def test_concurrent_jobs(root: Path):
+    """测试并发执行各自使用独立目录，结束后自动删除"""
+    print("\n" + "=" * 60)
+    print("测试1: 并发执行")
+    print("=" * 60)
+
+    space = RecordingSpace(root / "concurrent", keep="none")
+    runner = use_scratch(CodeRunner(), space)
+    previous = Config.NODE_POOL_ENABLED
+    Config.NODE_POOL_ENABLED = False
+    try:
+        results = await asyncio.gather(*[
+            runner.execute_js(f"console.log('job-{i}')", timeout=10.0) for i in range(8)
+        ])
+    finally:
+        Config.NODE_POOL_ENABLED = previous
+
+    for i, result in enumerate(results):
+        assert result["success"] and result["output"].strip() == f"job-{i}", result
+        assert result["file_path"] is None
+    paths = {job.path for job in space.jobs}
+    assert len(paths) == 8 and None not in paths, "每个任务使用独立的目录"
+    assert not any(path.exists() for path in paths) and not list(space.root.iterdir()), "执行结束后目录被删除"
+    print("✅ 8 个并发任务输出正确，目录互不相同且已删除")
+
+    # 使用进程池时不需要写文件，不创建目录
+    space.jobs.clear()
+    result = await runner.execute_js("console.log('pool')", timeout=10.0)
+    assert result["success"] and space.jobs[0].path is None
+    print("✅ 进程池执行不创建目录")
+
+
+async def test_keep_failed(root: Path):
+    """测试只保留失败的任务，并限制保留数量"""
+    print("\n" + "=" * 60)
+    print("测试2: 保留失败的任务")
+    print("=" * 60)
+
+    space = ScratchSpace(root / "failed", keep="failed", keep_max=3)
+    runner = use_scratch(CodeRunner(), space)
+
+    result = await runner.execute_js("console.log('ok')", timeout=10.0)
+    assert result["success"] and result["file_path"] is None
+
+    result = await runner.execute_js("throw new Error('boom')", timeout=10.0)
+    assert not result["success"] and result["file_path"], result
+    kept = Path(result["file_path"]).parent
+    assert (kept / "script.js").read_text(encoding="utf-8") == "throw new Error('boom')"
+    saved = json.loads((kept / "result.json").read_text(encoding="utf-8"))
+    assert saved["success"] is False and "boom" in saved["error"]
+    print(f"✅ 失败的任务被保留: {kept.name}")
+
+    for i in range(4):
+        await runner.execute_js(f"throw new Error('e{i}')", timeout=10.0)
+        time.sleep(0.01)
+    remaining = sorted(path.name for path in space.root.iterdir())
+    assert len(remaining) == 3 and kept.name not in remaining, remaining
+    print("✅ 超过保留数量时删除最旧的目录")
+
+    # HTML 任务同样适用（没有游戏目录时冒烟测试加载失败的脚本）
+    if find_node():
+        result = await runner.execute_html("<script>missing();</script>", timeout=10.0)
+        assert not result["success"] and Path(result["file_path"]).name == "index.html"
+        assert Path(result["file_path"]).read_text(encoding="utf-8") == "<script>missing();</script>"
+        print("✅ 失败的页面被保留")
+
+    assert runner.cleanup_temp_files() == 3 and not list(space.root.iterdir())
+    print("✅ cleanup_temp_files 删除保留的目录")
+
+
+def test_disk_cap(root: Path):
+    """测试磁盘占用上限"""
+    print("\n" + "=" * 60)
+    print("测试3: 磁盘占用上限")
+    print("=" * 60)
+
+    space = ScratchSpace(root / "cap", keep="all", keep_max=100, max_mb=0.1)
+    for i in range(3):
+        with space.job("js") as job:
+            job.write_text("data.txt", "x" * 30000)
+            job.finish({"success": True})
+    assert len(list(space.root.iterdir())) == 3
+
+    # 新任务需要空间时删除最旧的保留目录
+    with space.job("js") as job:
+        job.write_text("data.txt", "x" * 60000)
+        assert len(list(space.root.iterdir())) <= 3
+    print("✅ 需要空间时删除旧的保留目录")
+
+    # 单个任务超过上限时报错，目录被删除
+    try:
+        with space.job("js") as job:
+            job.write_text("data.txt", "x" * 200000)
+        raise AssertionError("应当抛出 OSError")
+    except OSError as e:
+        assert "磁盘占用上限" in str(e)
+    assert job.path is None or not job.path.exists()
+    assert space._active_bytes == 0
+    print("✅ 超过上限时抛出 OSError")
+
+
+def test_stale_and_legacy(root: Path):
+    """测试遗留目录和旧版本文件的清理"""
+    print("\n" + "=" * 60)
+    print("测试4: 遗留文件清理")
+    print("=" * 60)
+
+    base = root / "stale"
+    stale = base / "js_old"
+    fresh = base / "js_running"
+    stale.mkdir(parents=True)
+    fresh.mkdir()
+    old = time.time() - 2 * 24 * 3600
+    os.utime(stale, (old, old))
+    (base / "test_1234.html").write_text("<html></html>", encoding="utf-8")
+    (base / "test_1234.js").write_text("1", encoding="utf-8")
+
+    ScratchSpace(base)
+    remaining = sorted(path.name for path in base.iterdir())
+    assert remaining == ["js_running"], remaining
+    print("✅ 异常退出遗留的目录和旧版本的固定文件名被删除，其它进程正在使用的目录保留")
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        if find_node():
+            await test_concurrent_jobs(root)
+            await test_keep_failed(root)
+        else:
+            print("⚠️ 未安装 Node.js，跳过执行测试")
+        test_disk_cap(root)
+        test_stale_and_legacy(root)
+
+
+if __name__ == "__main__":
+    print("\n🚀 开始代码执行临时目录测试\n")
+
+    asyncio.run(main())
+
+    print("\n✅ 所有测试完成！")
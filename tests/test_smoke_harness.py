@@ -0,0 +1,214 @@
+"""
+无头冒烟测试测试
+验证页面解析、模板游戏可以加载并运行（点击开始按钮、动画帧、绘制统计）、
+运行时异常（加载时、输入事件后、Canvas 参数错误）、缺失的脚本、死循环超时，以及测试Agent使用冒烟测试
+
+使用方法:
+    python tests/test_smoke_harness.py
+"""
+
+import asyncio
+import os
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+# LLMClient 初始化需要Key，测试中不会真正调用API
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from config import Config
+from prompts.code_generation_template import HTML5_GAME_TEMPLATE, JS_GAME_LOOP_TEMPLATE
+from tools.code_runner import CodeRunner
+from tools.node_pool import find_node
+from tools.smoke_harness import load_page
+
+
+def template_game():
+    """用代码生成模板拼出一个最小的可运行游戏"""
+    fields = set(re.findall(r"\{(\w+)\}", HTML5_GAME_TEMPLATE))
+    values = {name: "600" if name.startswith("canvas") else "测试游戏" for name in fields}
+    html = HTML5_GAME_TEMPLATE.format(**values)
+    js = JS_GAME_LOOP_TEMPLATE.format(game_title="测试游戏", timestamp="2026-01-01")
+    return html, js
+
+
+def write_game(directory: Path, html: str, js: str) -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / "index.html").write_text(html, encoding="utf-8")
+    (directory / "game.js").write_text(js, encoding="utf-8")
+
+
+def test_load_page():
+    """测试页面解析"""
+    print("\n" + "=" * 60)
+    print("测试1: 页面解析")
+    print("=" * 60)
+
+    html = """<!DOCTYPE html><html><head><style>body { color: red; }</style></head>
+<body><div id="ui"><span class="score">0</span><br><img src="a.png"></div>
+<canvas id="c" width="320" height="240"></canvas>
+<script>const first = 1;</script>
+<script src="https://cdn.example.com/lib.js"></script>
+<script src="./missing.js"></script>
+<script type="module" src="main.js"></script>
+<script>const second = first + 1;</script>
+</body></html>"""
+    page = load_page(html, Path("/nonexistent"))
+    elements = page["page"]["elements"]
+    tags = [element["tag"] for element in elements]
+    assert tags[:7] == ["html", "head", "style", "body", "div", "span", "br"], tags
+    span = elements[tags.index("span")]
+    assert span["text"] == "0" and elements[span["parent"]]["attrs"]["id"] == "ui"
+    assert elements[tags.index("canvas")]["parent"] == tags.index("body"), "br/img 没有结束标签"
+    assert [s["filename"] for s in page["scripts"]] == ["index.html#inline1", "index.html#inline2"]
+    assert page["errors"][0]["message"] == "脚本文件不存在: ./missing.js"
+    assert len(page["warnings"]) == 2 and "网络脚本未加载" in page["warnings"][0]
+    print("✅ 元素树、脚本顺序、缺失脚本和警告正确")
+
+
+async def test_template_game(tmp: Path):
+    """测试模板游戏可以正常运行"""
+    print("\n" + "=" * 60)
+    print("测试2: 模板游戏")
+    print("=" * 60)
+
+    html, js = template_game()
+    write_game(tmp / "ok", html, js)
+    runner = CodeRunner()
+    started = time.perf_counter()
+    result = await runner.execute_html(html, timeout=10.0, base_dir=str(tmp / "ok"))
+    elapsed = time.perf_counter() - started
+    smoke = result["smoke"]
+    assert result["success"] and result["error"] is None, result
+    assert smoke["frames"] == 120 and smoke["raf_frames"] == 120, smoke
+    assert smoke["frames_with_draws"] == 120 and smoke["draw_calls"] >= 120, "点击开始按钮后每帧都有绘制"
+    assert "游戏已准备就绪" in result["output"], "load 事件已触发"
+    print(f"✅ {result['output'].splitlines()[0]}，用时 {elapsed:.2f}秒")
+
+    # 没有游戏目录时只执行内联脚本
+    result = await runner.execute_html(html, timeout=10.0)
+    assert result["success"] and "未提供游戏目录" in result["output"]
+    print("✅ 没有游戏目录时给出警告")
+
+
+async def test_runtime_errors(tmp: Path):
+    """测试运行时异常"""
+    print("\n" + "=" * 60)
+    print("测试3: 运行时异常")
+    print("=" * 60)
+
+    html, js = template_game()
+    runner = CodeRunner()
+
+    # 按键后才出现的错误
+    broken = js.replace("keys[e.key] = true;", "keys[e.key] = true;\n    if (e.key === 'ArrowUp') player.jump();")
+    write_game(tmp / "input", html, broken)
+    result = await runner.execute_html(html, timeout=10.0, base_dir=str(tmp / "input"))
+    error = result["smoke"]["exceptions"][0]
+    assert not result["success"] and error["name"] == "ReferenceError" and error["file"] == "game.js", result
+    assert error["frame"] > 0 and error["line"] == broken.splitlines().index("    if (e.key === 'ArrowUp') player.jump();") + 1
+    print(f"✅ 输入事件中的错误: {result['error']}")
+
+    # 加载时找不到元素
+    broken = "const hud = document.getElementById('hud');\nhud.textContent = 'x';\n" + js
+    write_game(tmp / "missing_element", html, broken)
+    result = await runner.execute_html(html, timeout=10.0, base_dir=str(tmp / "missing_element"))
+    error = result["smoke"]["exceptions"][0]
+    assert error["name"] == "TypeError" and error["frame"] == -1 and (error["line"], error["column"]) == (2, 17), error
+    assert "加载时" in result["error"]
+    print(f"✅ 加载时的错误: {result['error']}")
+
+    # Canvas 参数错误（浏览器中同样会抛出）和不存在的方法
+    broken = js.replace("// TODO: 绘制游戏对象", "ctx.arc(10, 10, gameState.score - 1, 0, Math.PI);")
+    write_game(tmp / "canvas", html, broken)
+    result = await runner.execute_html(html, timeout=10.0, base_dir=str(tmp / "canvas"))
+    assert result["smoke"]["exceptions"][0]["name"] == "IndexSizeError", result["smoke"]["exceptions"]
+    broken = js.replace("// TODO: 绘制游戏对象", "ctx.fillCircle(10, 10, 5);")
+    write_game(tmp / "canvas", html, broken)
+    result = await runner.execute_html(html, timeout=10.0, base_dir=str(tmp / "canvas"))
+    error = result["smoke"]["exceptions"][0]
+    assert error["name"] == "TypeError" and "fillCircle" in error["message"], error
+    print("✅ Canvas 参数错误和拼错的方法被发现")
+
+    # 缺失的脚本文件
+    (tmp / "no_script").mkdir()
+    result = await runner.execute_html(html, timeout=10.0, base_dir=str(tmp / "no_script"))
+    assert not result["success"] and "脚本文件不存在: game.js" in result["error"]
+    assert "游戏循环可能没有启动" in result["output"]
+    print("✅ 缺失的 game.js 被发现")
+
+
+async def test_infinite_loop(tmp: Path):
+    """测试游戏循环中的死循环按超时处理"""
+    print("\n" + "=" * 60)
+    print("测试4: 死循环")
+    print("=" * 60)
+
+    html, js = template_game()
+    broken = js.replace("// TODO: 更新游戏对象的位置、状态等", "while (gameState.running) {}")
+    write_game(tmp / "loop", html, broken)
+    runner = CodeRunner()
+    started = time.perf_counter()
+    result = await runner.execute_html(html, timeout=1.0, base_dir=str(tmp / "loop"))
+    elapsed = time.perf_counter() - started
+    assert not result["success"] and result["smoke"]["timed_out"], result
+    assert "第0帧执行超时" in result["error"] and elapsed < 5, (result["error"], elapsed)
+
+    result = await runner.execute_html(html, timeout=10.0, base_dir=str(tmp / "ok"))
+    assert result["success"], "超时后工作进程仍然可用"
+    print(f"✅ {result['error'] or '死循环在 %.1f 秒内被发现' % elapsed}")
+
+
+async def test_tester_agent():
+    """测试测试Agent使用冒烟测试"""
+    print("\n" + "=" * 60)
+    print("测试5: 测试Agent")
+    print("=" * 60)
+
+    from agents.tester_agent import TesterAgent
+    from tools.tool_registry import ToolRegistry
+    from tools.file_tool import FileTool
+    if not ToolRegistry().has_tool("file"):
+        ToolRegistry().register_tool("file", FileTool())
+    if not ToolRegistry().has_tool("code_runner"):
+        ToolRegistry().register_tool("code_runner", CodeRunner())
+
+    html, js = template_game()
+    Config.PROJECTS_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=Config.PROJECTS_DIR) as tmp:
+        output_dir = Path(tmp) / "output"
+        write_game(output_dir, html, js.replace("updateScore();\n}", "updateScore();\n    undefinedHelper();\n}", 1))
+        tester = TesterAgent(project_name=Path(tmp).name)
+        result = await tester._execute_game_test()
+        assert not result["success"] and "undefinedHelper is not defined" in result["error"], result
+
+        write_game(output_dir, html, js)
+        result = await tester._execute_game_test()
+        assert result["success"] and "运行了 120 帧" in result["message"], result
+        print("✅ 测试Agent报告运行时错误，修复后测试通过")
+
+
+async def main():
+    test_load_page()
+    if not find_node():
+        print("⚠️ 未安装 Node.js，跳过运行测试")
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        await test_template_game(Path(tmp))
+        await test_runtime_errors(Path(tmp))
+        await test_infinite_loop(Path(tmp))
+    await test_tester_agent()
+
+
+if __name__ == "__main__":
+    print("\n🚀 开始无头冒烟测试测试\n")
+
+    asyncio.run(main())
+
+    print("\n✅ 所有测试完成！")
@@ -0,0 +1,201 @@
+"""
+代码符号索引测试
+验证定义提取、增量更新（只重新解析变化的文件）、FileTool 写入后立即更新、
+精确/前缀/模糊查询，以及 CodeSearchTool 的结果格式
+
+使用方法:
+    python tests/test_symbol_index.py
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+from tools.symbol_index import SymbolIndex, extract_symbols
+
+GAME_CODE = """// 主逻辑
+const GRAVITY = 9.8;
+let score = 0;
+const updatePlayer = (dt) => {
+    score += dt;
+};
+function renderScene(ctx) {
+    ctx.clear();
+}
+class PlayerController extends Base {
+    constructor(game) {
+        this.game = game;
+    }
+    async loadAssets() {
+        if (this.game) {
+            return true;
+        }
+    }
+}
+const helpers = {
+    playerSpeed: function () { return 3; }
+};
+"""
+
+
+def test_extract_symbols():
+    """测试定义提取"""
+    print("\n" + "=" * 60)
+    print("测试1: 定义提取")
+    print("=" * 60)
+
+    symbols = {(s["name"], s["kind"], s["decl"]) for s in extract_symbols(GAME_CODE)}
+    assert ("GRAVITY", "variable", "const") in symbols
+    assert ("score", "variable", "let") in symbols
+    assert ("updatePlayer", "function", "const") in symbols
+    assert ("renderScene", "function", None) in symbols
+    assert ("PlayerController", "class", None) in symbols
+    assert ("loadAssets", "method", None) in symbols
+    assert ("constructor", "method", None) in symbols
+    assert ("playerSpeed", "method", None) in symbols
+    assert not any(name == "if" for name, _, _ in symbols), "控制语句不应被当作方法"
+    line = next(s["line"] for s in extract_symbols(GAME_CODE) if s["name"] == "renderScene")
+    assert line == 7
+    print(f"✅ 提取到 {len(symbols)} 个定义")
+
+
+def test_incremental_index():
+    """测试增量更新与查询"""
+    print("\n" + "=" * 60)
+    print("测试2: 增量更新与查询")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / "game").mkdir()
+        (root / "game" / "node_modules").mkdir()
+        (root / "game" / "main.js").write_text(GAME_CODE, encoding="utf-8")
+        (root / "game" / "util.js").write_text("function clamp(v) {\n    return v;\n}\n", encoding="utf-8")
+        (root / "game" / "node_modules" / "lib.js").write_text("function clamp() {}\n", encoding="utf-8")
+        (root / "notes.md").write_text("function clamp() {}\n", encoding="utf-8")
+
+        db_path = root / "index" / "symbols.db"
+        index = SymbolIndex(str(db_path), root, refresh_interval=0)
+        index.refresh(".", "*.js")
+        assert index.stats["files_indexed"] == 2, index.stats
+        clamp = index.lookup("clamp")
+        assert [(s["file"], s["line"]) for s in clamp] == [("game/util.js", 1)], "node_modules 和不匹配的文件不应索引"
+        assert index.lookup("Clamp") == [], "精确查找区分大小写"
+
+        # 未变化的文件只stat不读取
+        index.refresh(".", "*.js")
+        assert index.stats["files_indexed"] == 2 and index.stats["files_skipped"] == 2
+
+        # 修改、删除、新增文件
+        time.sleep(0.01)
+        (root / "game" / "util.js").write_text("// 工具\nfunction clamp(v, lo, hi) {\n    return v;\n}\n", encoding="utf-8")
+        (root / "game" / "main.js").unlink()
+        (root / "game" / "audio.js").write_text("class AudioManager {}\n", encoding="utf-8")
+        index.refresh(".", "*.js")
+        assert index.lookup("clamp")[0]["line"] == 2
+        assert index.lookup("renderScene") == [] and index.stats["files_removed"] == 1
+        assert index.lookup("AudioManager", ("class",))[0]["file"] == "game/audio.js"
+        print(f"✅ 增量更新: {index.stats}")
+
+        # 目录过滤（不能把 game2 当作 game 的子目录）
+        (root / "game2").mkdir()
+        (root / "game2" / "x.js").write_text("function clamp() {}\n", encoding="utf-8")
+        index.refresh(".", "*.js")
+        assert len(index.lookup("clamp")) == 2
+        assert [s["file"] for s in index.lookup("clamp", directory="game")] == ["game/util.js"]
+        assert index.lookup("clamp", file_pattern="x.js")[0]["file"] == "game2/x.js"
+        index.close()
+
+        # 重新打开时沿用磁盘上的索引
+        reopened = SymbolIndex(str(db_path), root, refresh_interval=0)
+        assert reopened.lookup("AudioManager")
+        reopened.refresh(".", "*.js")
+        assert reopened.stats["files_indexed"] == 0, "重新打开后未变化的文件不应重新解析"
+        reopened.close()
+        print("✅ 目录过滤、持久化正常")
+
+
+def test_prefix_and_fuzzy():
+    """测试前缀与模糊查询"""
+    print("\n" + "=" * 60)
+    print("测试3: 前缀与模糊查询")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / "main.js").write_text(GAME_CODE, encoding="utf-8")
+        index = SymbolIndex(":memory:", root, refresh_interval=0)
+        index.refresh(".", "*.js")
+
+        names = [s["name"] for s in index.search_prefix("player")]
+        assert set(names) == {"PlayerController", "playerSpeed"}, names
+        assert index.search_prefix("zzz") == []
+        assert [s["name"] for s in index.search_prefix("render", kinds=("function",))] == ["renderScene"]
+
+        fuzzy = index.search_fuzzy("updatePlayr")
+        assert fuzzy[0]["name"] == "updatePlayer" and 0 < fuzzy[0]["score"] < 1
+        fuzzy = index.search_fuzzy("player")
+        assert {s["name"] for s in fuzzy[:3]} == {"PlayerController", "playerSpeed", "updatePlayer"}
+        assert index.search_fuzzy("gravity")[0]["score"] == 1.0
+        print("✅ 前缀查询与模糊查询正常")
+
+
+async def test_code_search_tool():
+    """测试 CodeSearchTool 使用索引，并在 FileTool 写入后立即更新"""
+    print("\n" + "=" * 60)
+    print("测试4: CodeSearchTool 与 FileTool 写入")
+    print("=" * 60)
+
+    from config import Config
+    from tools.code_search_tool import CodeSearchTool
+    from tools.file_tool import FileTool
+
+    Config.CODE_INDEX_PATH = ":memory:"
+    Config.CODE_INDEX_REFRESH_INTERVAL = 3600.0
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / "game").mkdir()
+        (root / "game" / "main.js").write_text(GAME_CODE, encoding="utf-8")
+        search = CodeSearchTool(str(root))
+        file_tool = FileTool(str(root))
+
+        functions = await search.search_function("updatePlayer", "game")
+        assert functions == [{"file": "game/main.js", "line": 4, "content": "const updatePlayer = (dt) => {",
+                              "type": "function"}]
+        assert (await search.search_variable("updatePlayer", "game"))[0]["type"] == "variable"
+        assert (await search.search_function("loadAssets", "game"))[0]["line"] == 14
+        assert (await search.search_class("PlayerController", "game"))[0]["line"] == 10
+        assert await search.search_function("a.b(", "game") == [], "特殊字符不应导致正则错误"
+        assert await search.search_function("clamp", "missing") == []
+        result = await search.search_all("updatePlayer", "game")
+        assert result["total"] == 2 and not result["classes"]
+
+        # 刷新间隔内，FileTool 写入的文件也能立即搜到
+        await file_tool.write("game/physics.js", "function applyGravity(body) {\n}\n")
+        assert (await search.search_function("applyGravity", "game"))[0]["file"] == "game/physics.js"
+        await file_tool.delete("game/physics.js")
+        assert await search.search_function("applyGravity", "game") == []
+
+        prefix = await search.search_prefix("render", "game")
+        assert prefix[0]["name"] == "renderScene" and prefix[0]["type"] == "function"
+        fuzzy = await search.search_fuzzy("PlayerControler", "game")
+        assert fuzzy[0]["name"] == "PlayerController" and "score" in fuzzy[0]
+        FileTool.remove_write_listener(search.index.update_file)
+    print("✅ 搜索结果格式不变，写入后立即可搜")
+
+
+if __name__ == "__main__":
+    print("\n🚀 开始代码符号索引测试\n")
+
+    test_extract_symbols()
+    test_incremental_index()
+    test_prefix_and_fuzzy()
+    asyncio.run(test_code_search_tool())
+
+    print("\n✅ 所有测试完成！")
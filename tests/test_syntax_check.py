@@ -0,0 +1,139 @@
+"""
+JavaScript 语法检查测试
+验证 node --check 检查（有Node时）、内置后备检查、错误位置、按内容哈希缓存，
+以及 GameValidator 能拦截语法错误的代码
+
+使用方法:
+    python tests/test_syntax_check.py
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+# LLMClient 初始化需要Key，测试中不会真正调用API
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from config import Config
+from tools.code_runner import CodeRunner
+from tools.js_parser import check_syntax
+
+VALID_CODE = """const canvas = document.getElementById('gameCanvas');
+function update(dt) {
+    const pattern = /[{(]/g;
+    return `score: ${dt}`;
+}
+"""
+
+# 括号配对但语法错误（之前的检查会放行）
+BAD_TOKEN_CODE = """function update(dt) {
+    let x = (dt +);
+}
+"""
+
+TRUNCATED_CODE = """function update(dt) {
+    if (dt > 0) {
+        render();
+"""
+
+
+async def test_node_check():
+    """测试 node --check"""
+    print("\n" + "=" * 60)
+    print("测试1: node --check")
+    print("=" * 60)
+
+    runner = CodeRunner()
+    if not runner._find_node():
+        print("⚠️ 未安装 Node.js，跳过")
+        return
+
+    Config.JS_SYNTAX_CHECKER = "auto"
+    result = await runner.validate_syntax(VALID_CODE, "javascript")
+    assert result["valid"] and result["checker"] == "node" and result["errors"] == []
+
+    result = await runner.validate_syntax(BAD_TOKEN_CODE, "javascript")
+    assert not result["valid"] and result["checker"] == "node"
+    error = result["errors"][0]
+    assert (error["line"], error["column"]) == (2, 18), error
+    assert error["message"].startswith("SyntaxError") and result["error"].startswith("第2行第18列")
+
+    result = await runner.validate_syntax(TRUNCATED_CODE, "javascript")
+    assert not result["valid"] and "end of input" in result["error"]
+
+    # ES模块语法按模块检查
+    result = await runner.validate_syntax("import { a } from './a.js';\nexport const b = a;\n", "javascript")
+    assert result["valid"], result
+
+    cached = await runner.validate_syntax(BAD_TOKEN_CODE, "javascript")
+    assert cached["cached"] and cached["errors"] == [error]
+    print(f"✅ node --check 报告位置: {cached['error']}")
+
+
+async def test_python_fallback():
+    """测试没有Node时的内置检查"""
+    print("\n" + "=" * 60)
+    print("测试2: 内置后备检查")
+    print("=" * 60)
+
+    runner = CodeRunner()
+    Config.JS_SYNTAX_CHECKER = "python"
+    try:
+        result = await runner.validate_syntax(VALID_CODE, "javascript")
+        assert result["valid"] and result["checker"] == "python"
+
+        result = await runner.validate_syntax(TRUNCATED_CODE, "javascript")
+        assert not result["valid"] and result["checker"] == "python"
+        assert [(e["line"], e["column"]) for e in result["errors"]] == [(1, 21), (2, 17)]
+        assert "没有闭合" in result["error"]
+
+        result = await runner.validate_syntax("const a = [1, 2);\nconst s = 'x;\n", "javascript")
+        messages = [e["message"] for e in result["errors"]]
+        assert messages == ["')' 与第1行的 '[' 不匹配", "字符串未闭合"], messages
+        assert result["errors"][1]["line"] == 2
+    finally:
+        Config.JS_SYNTAX_CHECKER = "auto"
+
+    assert check_syntax("/* 未闭合的注释\nlet a = 1;")[0]["message"] == "块注释未闭合"
+    assert check_syntax("} let a = 1;")[0]["message"] == "多余的 '}'"
+    print("✅ 内置检查报告未闭合的括号/字符串/注释和不匹配的括号")
+
+    parsed = CodeRunner._parse_node_error(
+        "[stdin]:3\n  foo(;\n      ^\n\nSyntaxError: Unexpected token ';'\n    at wrapSafe (node:internal)\n"
+    )
+    assert parsed == {"line": 3, "column": 7, "message": "SyntaxError: Unexpected token ';'"}
+    print("✅ Node错误输出解析正确")
+
+
+async def test_validator_rejects_bad_code():
+    """测试 GameValidator 拦截语法错误的代码"""
+    print("\n" + "=" * 60)
+    print("测试3: GameValidator 拦截语法错误")
+    print("=" * 60)
+
+    from tools.game_validator import GameValidator
+
+    validator = GameValidator()
+    code = VALID_CODE + "function gameLoop() { update(1); render(); }\nconst ctx = canvas.getContext('2d');\n"
+    good = await validator.validate_code(code)
+    bad = await validator.validate_code(code + BAD_TOKEN_CODE)
+    assert good["valid"] and good["checks"]["brackets"]["passed"]
+    assert bad["checks"]["brackets"]["passed"], "括号配对，之前的检查会放行"
+    assert not bad["valid"] and not bad["checks"]["js_syntax"]["passed"]
+    assert bad["checks"]["js_syntax"]["details"][0].startswith("第")
+    print(f"✅ {bad['checks']['js_syntax']['message']}")
+
+
+if __name__ == "__main__":
+    print("\n🚀 开始JavaScript语法检查测试\n")
+
+    asyncio.run(test_node_check())
+    asyncio.run(test_python_fallback())
+    asyncio.run(test_validator_rejects_bad_code())
+
+    print("\n✅ 所有测试完成！")
@@ -0,0 +1,198 @@
+"""
+性能追踪测试
+验证span嵌套与轨道划分、并发项目互不混淆、耗时汇总、Chrome Trace 导出，
+以及消息总线、文件工具、Agent、DAG阶段和工作流的埋点（使用假LLM，无需真实API Key）
+
+使用方法:
+    python tests/test_tracer.py
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+# LLMClient 初始化需要Key，测试中不会真正调用API
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from utils.tracer import Tracer, activate_tracer, current_tracer, deactivate_tracer, trace_span
+
+
+async def test_spans_and_tracks():
+    """测试span嵌套、轨道、丢弃和未启用时的空操作"""
+    print("\n" + "=" * 60)
+    print("测试1: span记录与轨道")
+    print("=" * 60)
+
+    with trace_span("ignored", "io") as span:
+        span.set(chars=1)
+    assert current_tracer() is None
+
+    tracer = Tracer("demo")
+    token = activate_tracer(tracer)
+    try:
+        with trace_span("handle:programmer", "agent", agent="programmer"):
+            with trace_span("llm.request", "llm"):
+                await asyncio.sleep(0.02)
+            with trace_span("poll", "queue") as span:
+                span.discard()
+
+        async def worker(name):
+            with trace_span(f"work:{name}", "agent", agent=name):
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(
+            asyncio.create_task(worker("artist"), name="agent:artist"),
+            asyncio.create_task(worker("tester"), name="agent:tester")
+        )
+
+        try:
+            with trace_span("file.read", "io"):
+                raise FileNotFoundError("x")
+        except FileNotFoundError:
+            pass
+    finally:
+        deactivate_tracer(token)
+
+    names = [s["name"] for s in tracer.spans]
+    assert "poll" not in names, "被丢弃的span不应记录"
+    llm = next(s for s in tracer.spans if s["name"] == "llm.request")
+    handle = next(s for s in tracer.spans if s["name"] == "handle:programmer")
+    assert llm["args"]["agent"] == "programmer", "子span应继承父span的agent"
+    assert handle["ts"] <= llm["ts"] and llm["ts"] + llm["dur"] <= handle["ts"] + handle["dur"]
+    work = {s["args"]["agent"]: s["tid"] for s in tracer.spans if s["name"].startswith("work:")}
+    assert len(set(work.values()) | {handle["tid"]}) == 3, "每个asyncio任务一条轨道"
+    assert tracer._track_names[work["artist"]] == "agent:artist"
+    assert next(s for s in tracer.spans if s["name"] == "file.read")["args"]["error"] == "FileNotFoundError"
+    print("✅ 嵌套、继承agent、按任务划分轨道、异常记录正常")
+
+    limited = Tracer("limited", max_spans=2)
+    token = activate_tracer(limited)
+    for index in range(5):
+        with trace_span(f"s{index}", "io"):
+            pass
+    deactivate_tracer(token)
+    assert len(limited.spans) == 2 and limited.dropped == 3
+    print("✅ 超过上限的span只计数")
+
+
+async def test_concurrent_projects():
+    """测试并发运行的项目各自记录"""
+    print("\n" + "=" * 60)
+    print("测试2: 并发项目互不混淆")
+    print("=" * 60)
+
+    async def run_project(name):
+        tracer = Tracer(name)
+        activate_tracer(tracer)
+
+        async def agent_loop():
+            with trace_span(f"handle:{name}", "agent", agent=name):
+                await asyncio.sleep(0.01)
+
+        # 启用追踪后创建的任务继承追踪器
+        await asyncio.create_task(agent_loop())
+        return tracer
+
+    first, second = await asyncio.gather(run_project("a"), run_project("b"))
+    assert [s["args"]["agent"] for s in first.spans] == ["a"]
+    assert [s["args"]["agent"] for s in second.spans] == ["b"]
+    assert current_tracer() is None
+    print("✅ 每个项目只记录自己的span")
+
+
+async def test_instrumentation_and_export():
+    """测试各组件的埋点、汇总和导出"""
+    print("\n" + "=" * 60)
+    print("测试3: 组件埋点、汇总与导出")
+    print("=" * 60)
+
+    from config import Config
+    from engine.agent import Agent
+    from engine.message_bus import MessageBus
+    from tools.file_tool import FileTool
+    from workflows.task_dag import DagTask, TaskDAG, DagExecutor
+    from workflows.game_dev_workflow import GameDevWorkflow
+
+    workflow = GameDevWorkflow("trace_check", "测试用")
+    tracer = Tracer("trace_check")
+    token = activate_tracer(tracer)
+    trace_start = time.perf_counter()
+
+    Config.PROJECTS_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=Config.PROJECTS_DIR) as tmp:
+        try:
+            agent = Agent("trace_agent", "测试", "你是测试Agent")
+
+            async def fake_generate(messages, system_prompt=None, temperature=None):
+                with trace_span("llm.request", "llm"):
+                    await asyncio.sleep(0.02)
+                return "好的"
+
+            agent.llm_client.generate_response = fake_generate
+            bus = MessageBus()
+            bus.subscribe("trace_inbox", lambda msg: None)
+            file_tool = FileTool()
+            doc = f"projects/{Path(tmp).name}/doc.md"
+
+            async def design():
+                await file_tool.write(doc, "# GDD")
+                await agent.think_and_respond("写策划")
+
+            async def review():
+                await bus.send({"from": "trace_agent", "to": "trace_inbox", "type": "answer",
+                                "content": "完成", "priority": "urgent"})
+                assert await bus.receive("trace_inbox", timeout=1.0)
+                assert await bus.receive("trace_inbox", timeout=0.01) is None
+                assert await file_tool.read(doc) == "# GDD"
+
+            await DagExecutor(TaskDAG([
+                DagTask("planning", design, outputs=["gdd"], title="策划"),
+                DagTask("review", review, inputs=["gdd"], title="评审")
+            ])).run()
+            bus.unsubscribe("trace_inbox", drop_queue=True)
+        finally:
+            deactivate_tracer(token)
+
+        summary = tracer.summary()
+        assert set(summary["by_phase"]) == {"策划", "评审"}
+        assert summary["by_category"]["io"]["count"] == 2
+        assert summary["by_category"]["bus"]["count"] == 1
+        assert summary["waits"]["bus.receive"]["count"] == 1, "超时的轮询不应计入"
+        assert summary["by_agent"]["trace_agent"]["llm_calls"] == 1
+        think = next(s for s in tracer.spans if s["name"] == "think:trace_agent")
+        assert think["args"]["response_chars"] == 2
+        phase_tracks = {tracer._track_names[s["tid"]] for s in tracer.spans if s["cat"] == "phase"}
+        assert phase_tracks == {"phase:planning", "phase:review"}
+        print(f"✅ 阶段/Agent/LLM/消息/文件埋点正常 ({summary['spans']} 个span)")
+
+        workflow.tracer = tracer
+        workflow.traces_dir = Path(tmp) / "traces"
+        workflow._export_trace(trace_start)
+        path = Path(workflow.get_status()["trace"]["export_path"])
+        assert path.parent == workflow.traces_dir and path.exists()
+        data = json.loads(path.read_text(encoding="utf-8"))
+        events = data["traceEvents"]
+        complete = [e for e in events if e["ph"] == "X"]
+        assert {"name", "cat", "ts", "dur", "pid", "tid"} <= set(complete[0])
+        assert any(e["name"] == "workflow" and e["cat"] == "workflow" for e in complete)
+        thread_names = {e["args"]["name"] for e in events if e["name"] == "thread_name"}
+        assert "phase:planning" in thread_names
+        print(f"✅ 导出 Chrome Trace: {len(complete)} 个事件，get_status() 包含汇总")
+
+
+if __name__ == "__main__":
+    print("\n🚀 开始性能追踪测试\n")
+
+    asyncio.run(test_spans_and_tracks())
+    asyncio.run(test_concurrent_projects())
+    asyncio.run(test_instrumentation_and_export())
+
+    print("\n✅ 所有测试完成！")
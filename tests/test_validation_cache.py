@@ -0,0 +1,229 @@
+"""
+验证结果缓存测试
+验证缓存按内容哈希和版本命中、持久化到项目目录、只重新检查改变的文件、
+测试Agent对同一份代码复用测试结果，以及Bug修复循环在代码没有改动时跳过重新测试
+
+使用方法:
+    python tests/test_validation_cache.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+# LLMClient 初始化需要Key，测试中不会真正调用API
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from config import Config
+from tools import validation_cache
+from tools.game_validator import GameValidator
+from tools.node_pool import find_node
+from tools.validation_cache import ValidationCache
+
+sys.path.insert(0, str(Path(__file__).parent))
+from test_game_validator import write_project
+
+
+def test_cache(tmp: Path):
+    """测试缓存的命中、版本、持久化和容量"""
+    print("\n" + "=" * 60)
+    print("测试1: 缓存")
+    print("=" * 60)
+
+    cache = ValidationCache(tmp / "cache", max_entries=3)
+    result = {"passed": True, "message": "ok", "details": []}
+    cache.put("js_syntax", 1, {"game.js": "aaa"}, result)
+    assert cache.get("js_syntax", 1, {"game.js": "aaa"}) == result
+    assert cache.get("js_syntax", 2, {"game.js": "aaa"}) is None, "版本改变后失效"
+    assert cache.get("js_syntax", 1, {"game.js": "bbb"}) is None, "内容改变后失效"
+    cache.get("js_syntax", 1, {"game.js": "aaa"})["details"].append("x")
+    assert cache.get("js_syntax", 1, {"game.js": "aaa"})["details"] == [], "返回的是副本"
+
+    reloaded = ValidationCache(tmp / "cache")
+    assert reloaded.get("js_syntax", 1, {"game.js": "aaa"}) == result
+    assert (tmp / "cache" / "checkpoints" / "validation_cache.json").exists()
+    print("✅ 按版本和内容哈希命中，重新加载后仍然有效")
+
+    for i in range(3):
+        cache.put("check", 1, {"file": str(i)}, i)
+    assert cache.get("js_syntax", 1, {"game.js": "aaa"}) is None and cache.get("check", 1, {"file": "2"}) == 2
+    print("✅ 超过容量时删除最久未使用的结果")
+
+    previous = Config.VALIDATION_CACHE_ENABLED
+    Config.VALIDATION_CACHE_ENABLED = False
+    try:
+        assert cache.get("check", 1, {"file": "2"}) is None
+    finally:
+        Config.VALIDATION_CACHE_ENABLED = previous
+    print("✅ 关闭缓存时不命中")
+
+
+async def test_validator(tmp: Path):
+    """测试项目验证只重新检查改变的文件"""
+    print("\n" + "=" * 60)
+    print("测试2: 项目验证")
+    print("=" * 60)
+
+    project = tmp / "validator"
+    write_project(project)
+    validator = GameValidator()
+    first = await validator.validate_project(str(project))
+    assert first["valid"] and first["cached"] == []
+
+    started = time.perf_counter()
+    second = await validator.validate_project(str(project))
+    elapsed = (time.perf_counter() - started) * 1000
+    assert second["cached"] == ["html_structure", "js_syntax", "game_executable", "game_completeness"], second["cached"]
+    assert second["checks"] == first["checks"]
+    print(f"✅ 文件未改变时 4 项检查全部复用 ({first['timings']['total']:.1f}ms -> {elapsed:.1f}ms)")
+
+    # 只改 game.js: HTML 的检查仍然复用
+    js_path = project / "output" / "game.js"
+    js_path.write_text(js_path.read_text(encoding="utf-8") + "\nconst broken = ;\n", encoding="utf-8")
+    third = await validator.validate_project(str(project))
+    assert third["cached"] == ["html_structure"], third["cached"]
+    assert not third["valid"] and "game_executable" in third["skipped"]
+    print("✅ 只改动 game.js 时只重新检查 JavaScript")
+
+    # 缓存在项目目录中，新进程（新的缓存实例）同样命中
+    validation_cache._caches.clear()
+    fourth = await GameValidator().validate_project(str(project))
+    assert fourth["cached"] == ["html_structure", "js_syntax", "game_completeness"], fourth["cached"]
+    assert fourth["checks"]["js_syntax"] == third["checks"]["js_syntax"]
+    assert "(缓存)" in validator.generate_report(fourth)
+
+    uncached = await validator.validate_project(str(project), use_cache=False)
+    assert uncached["cached"] == [] and uncached["checks"]["js_syntax"] == third["checks"]["js_syntax"]
+    print("✅ 缓存保存在项目目录中，重新加载后仍然命中")
+
+
+def setup_agents():
+    from tools.code_runner import CodeRunner
+    from tools.file_tool import FileTool
+    from tools.tool_registry import ToolRegistry
+    if not ToolRegistry().has_tool("file"):
+        ToolRegistry().register_tool("file", FileTool())
+    if not ToolRegistry().has_tool("code_runner"):
+        ToolRegistry().register_tool("code_runner", CodeRunner())
+
+
+async def test_tester_agent(project: Path):
+    """测试测试Agent对同一份代码复用测试结果"""
+    print("\n" + "=" * 60)
+    print("测试3: 测试Agent")
+    print("=" * 60)
+
+    from agents.tester_agent import TesterAgent
+    setup_agents()
+
+    write_project(project)
+    js_path = project / "output" / "game.js"
+    js_path.write_text(js_path.read_text(encoding="utf-8").replace("updateScore();\n}", "updateScore();\n    missingHelper();\n}", 1), encoding="utf-8")
+    tester = TesterAgent(project_name=project.name)
+    message = {"type": "request_review", "content": "请重新测试游戏。"}
+
+    reply = await tester.process_message(message)
+    assert "已记录Bug ID" in reply, reply
+    tracker = project / "shared_knowledge" / "bug_tracker.yaml"
+    bugs = tracker.read_text(encoding="utf-8").count("status: open")
+
+    started = time.perf_counter()
+    reply = await tester.process_message(message)
+    elapsed = (time.perf_counter() - started) * 1000
+    assert "问题仍未修复" in reply and "missingHelper" in reply, reply
+    assert tracker.read_text(encoding="utf-8").count("status: open") == bugs, "同一份代码不重复记录Bug"
+    print(f"✅ 代码未改变时复用测试结果 ({elapsed:.1f}ms)，不重复记录Bug")
+
+    # 图片内容改变不影响结果，新增文件（可能是缺失的资源）会重新测试
+    assets = project / "output" / "assets"
+    assets.mkdir()
+    (assets / "player.png").write_bytes(b"v1")
+    first = await tester._execute_game_test()
+    (assets / "player.png").write_bytes(b"v2")
+    second = await tester._execute_game_test()
+    assert not first.get("cached") and second.get("cached")
+    print("✅ 资源文件只看是否存在")
+
+
+async def test_bug_fix_loop(project: Path):
+    """测试Bug修复循环在代码没有改动时跳过重新测试"""
+    print("\n" + "=" * 60)
+    print("测试4: Bug修复循环")
+    print("=" * 60)
+
+    from workflows.checkpoint import WorkflowCheckpoint
+    from workflows.game_dev_workflow import GameDevWorkflow
+
+    write_project(project)
+    workflow = GameDevWorkflow(project.name, "测试用")
+    workflow.checkpoint = WorkflowCheckpoint(project)
+    workflow.checkpoint.reset(project.name, "测试用")
+    workflow.knowledge_base_dir.mkdir(parents=True, exist_ok=True)
+    (workflow.knowledge_base_dir / "bug_tracker.yaml").write_text("bugs:\n  - id: bug_1\n    status: open\n", encoding="utf-8")
+
+    class FakeProgrammer:
+        """第二次修复时才改动代码"""
+
+        def __init__(self):
+            self.fixes = 0
+            self.last_patch_report = None
+
+        def load_file_to_context(self, name, content):
+            pass
+
+    programmer = FakeProgrammer()
+    workflow.agents = {"programmer": programmer, "tester": object()}
+    sent = []
+
+    async def send(message):
+        sent.append(message["to"])
+        if message["to"] == "programmer":
+            programmer.fixes += 1
+            if programmer.fixes == 2:
+                js_path = project / "output" / "game.js"
+                js_path.write_text(js_path.read_text(encoding="utf-8") + "\n// fixed\n", encoding="utf-8")
+
+    async def wait_for_response(agent_id, timeout=30.0):
+        return {"content": "完成"}
+
+    async def boss_decision(**kwargs):
+        return "✅ 确认交付"
+
+    workflow.message_bus.send = send
+    workflow._wait_for_response = wait_for_response
+    workflow._request_boss_decision = boss_decision
+    await workflow._phase_6_5_bug_fixing()
+
+    assert sent == ["programmer", "programmer", "tester", "programmer"], sent
+    assert workflow.checkpoint.get_step("bug_fixing", "iterations_done") == 3
+    print("✅ 3 次修复中只有改动了代码的一次重新测试")
+
+
+async def main():
+    Config.PROJECTS_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=Config.PROJECTS_DIR) as tmp:
+        test_cache(Path(tmp))
+        await test_validator(Path(tmp))
+    # Agent 和工作流按项目名定位目录，项目需要直接位于 projects/ 下
+    if find_node():
+        with tempfile.TemporaryDirectory(dir=Config.PROJECTS_DIR) as tmp:
+            await test_tester_agent(Path(tmp))
+    else:
+        print("⚠️ 未安装 Node.js，跳过测试Agent测试")
+    with tempfile.TemporaryDirectory(dir=Config.PROJECTS_DIR) as tmp:
+        await test_bug_fix_loop(Path(tmp))
+
+
+if __name__ == "__main__":
+    print("\n🚀 开始验证结果缓存测试\n")
+
+    asyncio.run(main())
+
+    print("\n✅ 所有测试完成！")
@@ -0,0 +1,319 @@
+"""
+工作流检查点测试
+验证产出物哈希、检查点读写、续跑跳过规则、基于读取文档的增量重建和失败阶段的记录（无需LLM）
+
+使用方法:
+    python tests/test_workflow_checkpoint.py
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加 backend 到 Python 路径
+backend_path = Path(__file__).parent.parent / "backend"
+sys.path.insert(0, str(backend_path))
+
+# 工作流导入时会初始化LLM相关模块，测试中不会真正调用API
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+
+from workflows.checkpoint import WorkflowCheckpoint, hash_artifact
+from workflows.task_dag import DagTask, TaskDAG, DagExecutor
+
+
+def write(project_dir: Path, relative: str, content: str) -> None:
+    path = project_dir / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding="utf-8")
+
+
+def build_dag(log):
+    """与工作流结构相同的简化任务图"""
+    def make(name, inputs, outputs):
+        async def handler():
+            log.append(name)
+        return DagTask(name, handler, inputs=inputs, outputs=outputs)
+
+    return TaskDAG([
+        make("initiation", [], ["requirements"]),
+        make("planning", ["requirements"], ["gdd"]),
+        make("tech_design", ["gdd"], ["tdd"]),
+        make("art_assets", ["gdd"], ["art_assets"]),
+        make("coding", ["gdd", "tdd"], ["game_code"]),
+        make("bug_fixing", ["game_code", "art_assets"], ["release_candidate"]),
+    ])
+
+
+def test_hash_and_persistence():
+    """测试产出物哈希和检查点原子读写"""
+    print("\n" + "=" * 60)
+    print("测试1: 产出物哈希与检查点读写")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        project_dir = Path(tmp)
+        assert hash_artifact(project_dir, "gdd") is None, "文件缺失应返回None"
+        assert hash_artifact(project_dir, "requirements") == "", "非文件产出物应返回空串"
+
+        write(project_dir, "shared_knowledge/game_design_doc.md", "GDD v1")
+        first = hash_artifact(project_dir, "gdd")
+        write(project_dir, "shared_knowledge/game_design_doc.md", "GDD v2")
+        assert hash_artifact(project_dir, "gdd") != first
+
+        checkpoint = WorkflowCheckpoint(project_dir)
+        assert not checkpoint.load(), "没有检查点文件时应返回False"
+        checkpoint.reset("demo", "测试项目")
+        checkpoint.record_task("planning", ["gdd"], 1.5)
+        checkpoint.record_step("bug_fixing", "iterations_done", 2)
+        checkpoint.record_decision({"id": "d1", "title": "策划审批", "decision": "通过"})
+
+        loaded = WorkflowCheckpoint(project_dir)
+        assert loaded.load()
+        assert loaded.data["project_description"] == "测试项目"
+        assert loaded.data["completed"]["planning"]["outputs"]["gdd"] == hash_artifact(project_dir, "gdd")
+        assert loaded.get_step("bug_fixing", "iterations_done") == 2
+        assert loaded.data["decisions"][0]["decision"] == "通过"
+        assert not list(project_dir.glob("checkpoints/*.tmp")), "不应残留临时文件"
+
+        # 损坏的检查点视为不存在
+        loaded.path.write_text("{broken", encoding="utf-8")
+        assert not WorkflowCheckpoint(project_dir).load()
+    print("✅ 哈希、子步骤、决策记录和原子写入正常")
+
+
+async def test_resume_plan():
+    """测试续跑时跳过已完成且输入未变的阶段"""
+    print("\n" + "=" * 60)
+    print("测试2: 续跑跳过规则")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        project_dir = Path(tmp)
+        log = []
+        dag = build_dag(log)
+        checkpoint = WorkflowCheckpoint(project_dir)
+        checkpoint.reset("demo", "测试项目")
+
+        # 模拟一次在 coding 阶段失败的运行
+        write(project_dir, "shared_knowledge/game_design_doc.md", "GDD")
+        write(project_dir, "shared_knowledge/tech_design_doc.md", "TDD")
+        write(project_dir, "output/assets/player.png", "png")
+        for name in ["initiation", "planning", "tech_design", "art_assets"]:
+            checkpoint.record_task(name, dag.tasks[name].outputs)
+        checkpoint.record_step("coding", "files_done", 1)
+        checkpoint.set_status("失败", "coding")
+
+        # 输入未变: 只重跑失败阶段及其下游，子步骤进度保留
+        resumed = WorkflowCheckpoint(project_dir)
+        assert resumed.load()
+        skip = resumed.plan_resume(dag)
+        assert skip == {"initiation", "planning", "tech_design", "art_assets"}, skip
+        assert resumed.get_step("coding", "files_done") == 1
+
+        await DagExecutor(dag, skip=skip).run()
+        assert log == ["coding", "bug_fixing"], log
+        print(f"✅ 续跑只执行: {log}")
+
+        # 外部修改TDD: 技术设计本身保留，依赖TDD的编码重跑且子步骤作废
+        write(project_dir, "shared_knowledge/tech_design_doc.md", "TDD (老板修改)")
+        resumed = WorkflowCheckpoint(project_dir)
+        resumed.load()
+        skip = resumed.plan_resume(dag)
+        assert "tech_design" in skip and "coding" not in skip
+        assert resumed.get_step("coding", "files_done") is None
+        print("✅ 输入被修改时重跑下游阶段并清理子步骤")
+
+        # 删除完成时存在的素材: 美术阶段及其下游重跑
+        (project_dir / "output/assets/player.png").unlink()
+        resumed = WorkflowCheckpoint(project_dir)
+        resumed.load()
+        skip = resumed.plan_resume(dag)
+        assert "art_assets" not in skip and "planning" in skip
+        print("✅ 产出文件丢失时重跑对应阶段")
+
+        # 工作流自己修改文件后会刷新快照，不会触发重跑
+        checkpoint = WorkflowCheckpoint(project_dir)
+        checkpoint.load()
+        write(project_dir, "output/assets/player.png", "png v2")
+        checkpoint.record_task("art_assets", ["art_assets"])
+        checkpoint.record_task("coding", ["game_code"])
+        resumed = WorkflowCheckpoint(project_dir)
+        resumed.load()
+        assert {"art_assets", "tech_design", "planning"} <= resumed.plan_resume(dag)
+        print("✅ 工作流自身的修改不会导致重跑")
+
+
+def test_incremental_rebuild():
+    """测试按阶段实际读取的文档做增量重建"""
+    print("\n" + "=" * 60)
+    print("测试3: 增量重建")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        project_dir = Path(tmp)
+        dag = build_dag([])
+        checkpoint = WorkflowCheckpoint(project_dir)
+        checkpoint.reset("demo", "测试项目")
+
+        write(project_dir, "shared_knowledge/project_rules.yaml", "rules")
+        write(project_dir, "shared_knowledge/config_tables.yaml", "speed: 1")
+        write(project_dir, "shared_knowledge/game_design_doc.md", "GDD")
+        write(project_dir, "shared_knowledge/tech_design_doc.md", "TDD")
+        write(project_dir, "output/game.js", "code")
+        reads = {
+            "planning": ["shared_knowledge/project_rules.yaml"],
+            "coding": ["shared_knowledge/project_rules.yaml", "shared_knowledge/config_tables.yaml"],
+        }
+        for name in dag.order:
+            checkpoint.record_task(name, dag.tasks[name].outputs, reads=reads.get(name, ()))
+        checkpoint.set_status("已完成")
+
+        # 完全未修改: 全部跳过
+        rebuild = WorkflowCheckpoint(project_dir)
+        rebuild.load()
+        assert rebuild.plan_resume(dag) == set(dag.tasks)
+        print("✅ 无修改时所有阶段都跳过")
+
+        # 只修改配置表: 重跑编码及下游，策划和技术设计不重跑
+        write(project_dir, "shared_knowledge/config_tables.yaml", "speed: 2")
+        rebuild = WorkflowCheckpoint(project_dir)
+        rebuild.load()
+        assert rebuild.changed_files() == {"shared_knowledge/config_tables.yaml"}
+        skip = rebuild.plan_resume(dag)
+        assert skip == {"initiation", "planning", "tech_design", "art_assets"}, skip
+        assert "config_tables.yaml" in rebuild.last_plan["coding"]
+        assert rebuild.last_plan["bug_fixing"].startswith("上游重跑")
+        print(f"✅ 修改配置表只重跑: {[n for n in dag.order if n not in skip]}")
+
+        # 修改被多个阶段读取的项目规范: 读过它的策划和编码都要重跑
+        write(project_dir, "shared_knowledge/project_rules.yaml", "rules v2")
+        rebuild = WorkflowCheckpoint(project_dir)
+        rebuild.load()
+        assert rebuild.plan_resume(dag) == {"initiation"}
+        print("✅ 修改项目规范时重跑所有读取过它的阶段")
+
+
+async def check_read_tracking(workflow, project_dir: Path):
+    """在DAG任务协程内读取文档，应记录到该任务"""
+    task = workflow.task_graph.tasks["coding"]
+    await workflow._on_task_start(task)
+    await workflow._load_and_cache_document("config_tables.yaml")
+    return workflow._task_reads["coding"]
+
+
+def test_workflow_integration():
+    """测试工作流挂载检查点"""
+    print("\n" + "=" * 60)
+    print("测试4: 工作流检查点集成")
+    print("=" * 60)
+
+    from workflows.game_dev_workflow import GameDevWorkflow
+
+    workflow = GameDevWorkflow("checkpoint_check", "测试用")
+    assert workflow.checkpoint.path == workflow.project_dir / "checkpoints" / "workflow_checkpoint.json"
+    assert hasattr(workflow, "resume")
+    # 工作流任务图的每个产出物都能计算哈希（文件型或完成标记）
+    for task in workflow.task_graph.tasks.values():
+        for artifact in task.outputs:
+            hash_artifact(workflow.project_dir, artifact)
+    print("✅ 工作流已挂载检查点和续跑入口")
+
+    # 阶段运行时读取的文档会被记录为该阶段的依赖（FileTool只允许访问工作空间内的路径）
+    from config import Config
+    Config.PROJECTS_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=Config.PROJECTS_DIR) as tmp:
+        project_dir = Path(tmp)
+        write(project_dir, "shared_knowledge/config_tables.yaml", "speed: 1")
+        workflow.project_dir = project_dir
+        workflow.knowledge_base_dir = project_dir / "shared_knowledge"
+        reads = asyncio.run(check_read_tracking(workflow, project_dir))
+        assert reads == {"shared_knowledge/config_tables.yaml"}, reads
+        # 任务协程之外的读取不记到任何阶段
+        asyncio.run(workflow._load_and_cache_document("config_tables.yaml"))
+        assert reads == {"shared_knowledge/config_tables.yaml"}
+    print("✅ 阶段读取的文档被记录为依赖")
+
+
+async def run_failing_workflow(workflow, resume: bool = False):
+    """美术素材失败前，测试计划和编码已经启动（resume=True 时从检查点续跑）"""
+    async def noop():
+        pass
+
+    async def art_fails():
+        await asyncio.sleep(0.05)
+        raise RuntimeError("素材生成失败")
+
+    async def slow():
+        await asyncio.sleep(5)
+
+    async def initialize():
+        pass
+
+    for task in workflow.task_graph.tasks.values():
+        task.handler = noop
+    workflow.task_graph.tasks["art_assets"].handler = art_fails
+    workflow.task_graph.tasks["test_planning"].handler = slow
+    workflow.initialize = initialize
+    try:
+        await (workflow.resume() if resume else workflow.start())
+        raise AssertionError("工作流应当失败")
+    except RuntimeError:
+        pass
+
+
+async def run_all_tasks(workflow):
+    """所有阶段都成功，返回执行过的阶段"""
+    ran = set()
+
+    def record(name):
+        async def handler():
+            ran.add(name)
+        return handler
+
+    for name, task in workflow.task_graph.tasks.items():
+        task.handler = record(name)
+    await workflow.start()
+    return ran
+
+
+def test_failed_task():
+    """测试并发执行时记录真正失败的阶段"""
+    print("\n" + "=" * 60)
+    print("测试5: 失败阶段")
+    print("=" * 60)
+
+    from config import Config
+    from workflows.game_dev_workflow import GameDevWorkflow
+
+    Config.PROJECTS_DIR.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=Config.PROJECTS_DIR) as tmp:
+        workflow = GameDevWorkflow(Path(tmp).name, "测试用")
+        asyncio.run(run_failing_workflow(workflow))
+
+        assert workflow.current_phase > workflow.task_graph.index_of("art_assets") + 1, "美术素材之后还有阶段启动"
+        assert workflow._failed_phase == workflow.task_graph.index_of("art_assets") + 1
+        assert workflow._error_history[-1]["phase_name"] == "美术素材"
+        saved = WorkflowCheckpoint(workflow.project_dir)
+        assert saved.load() and saved.data["failed_task"] == "art_assets"
+
+        # 续跑失败后在同一工作流上重新 start()，所有阶段都要执行
+        asyncio.run(run_failing_workflow(workflow, resume=True))
+        assert workflow._resume_skip == set()
+        ran = asyncio.run(run_all_tasks(workflow))
+        assert ran == set(workflow.task_graph.order), f"start() 不应沿用续跑的跳过集合: {ran}"
+    print("✅ 检查点和错误历史记录抛出异常的阶段，而不是最后启动的阶段")
+    print("✅ 续跑结束后 start() 从头执行所有阶段")
+
+
+if __name__ == "__main__":
+    print("\n🚀 开始工作流检查点测试\n")
+
+    test_hash_and_persistence()
+    asyncio.run(test_resume_plan())
+    test_incremental_rebuild()
+    test_workflow_integration()
+    test_failed_task()
+
+    print("\n✅ 所有测试完成！")